@@ -21,37 +21,54 @@ Checkbox Launcher Interpreter Application
 """
 
 import gettext
+import importlib
 import logging
 import sys
 
 import checkbox_ng
 
-from plainbox.impl.jobcache import ResourceJobCache
-from plainbox.impl.session.assistant import SessionAssistant
-
 from checkbox_ng.utils import set_all_loggers_level
-from checkbox_ng.launcher.subcommands import (
-    Launcher,
-    List,
-    Run,
-    StartProvider,
-    Submit,
-    ListBootstrapped,
-    Expand,
-    TestPlanExport,
-    Show,
-)
-from checkbox_ng.launcher.check_config import CheckConfig
-from checkbox_ng.launcher.merge_reports import MergeReports
-from checkbox_ng.launcher.merge_submissions import MergeSubmissions
-from checkbox_ng.launcher.controller import RemoteController
-from checkbox_ng.launcher.agent import RemoteAgent
 
 
 _ = gettext.gettext
 
 _logger = logging.getLogger("checkbox-cli")
 
+#: Subcommands of checkbox-cli, mapped to the module and the name of the class
+#: implementing them. Modules are only imported when the subcommand is used,
+#: as some of them are expensive to import (urwid, rpyc, jinja2, ...)
+SUBCOMMANDS = {
+    "check-config": ("checkbox_ng.launcher.check_config", "CheckConfig"),
+    "launcher": ("checkbox_ng.launcher.subcommands", "Launcher"),
+    "list": ("checkbox_ng.launcher.subcommands", "List"),
+    "run": ("checkbox_ng.launcher.subcommands", "Run"),
+    "startprovider": ("checkbox_ng.launcher.subcommands", "StartProvider"),
+    "submit": ("checkbox_ng.launcher.subcommands", "Submit"),
+    "show": ("checkbox_ng.launcher.subcommands", "Show"),
+    "list-bootstrapped": (
+        "checkbox_ng.launcher.subcommands",
+        "ListBootstrapped",
+    ),
+    "expand": ("checkbox_ng.launcher.subcommands", "Expand"),
+    "merge-reports": ("checkbox_ng.launcher.merge_reports", "MergeReports"),
+    "merge-submissions": (
+        "checkbox_ng.launcher.merge_submissions",
+        "MergeSubmissions",
+    ),
+    "tp-export": ("checkbox_ng.launcher.subcommands", "TestPlanExport"),
+    "top-jobs": ("checkbox_ng.launcher.top_jobs", "TopJobs"),
+    "run-agent": ("checkbox_ng.launcher.agent", "RemoteAgent"),
+    "control": ("checkbox_ng.launcher.controller", "RemoteController"),
+}
+
+
+def load_subcommand(name):
+    """
+    Import and return the class implementing the subcommand ``name``
+    """
+    module_name, cls_name = SUBCOMMANDS[name]
+    return getattr(importlib.import_module(module_name), cls_name)
+
 
 class Context:
     def __init__(self, args, sa):
@@ -59,6 +76,8 @@ class Context:
         self.sa = sa
 
     def reset_sa(self):
+        from plainbox.impl.session.assistant import SessionAssistant
+
         self.sa = SessionAssistant()
 
 
@@ -79,7 +98,13 @@ def handle_top_parser(args, ctx):
         set_all_loggers_level(logging.INFO)
         ctx.args.verbose = True
     if "--clear-cache" in sys.argv:
+        from plainbox.impl.jobcache import ResourceJobCache
+        from plainbox.impl.unitcache import provider_unit_cache
+        from plainbox.impl.validationcache import unit_validation_cache
+
         ResourceJobCache().clear()
+        provider_unit_cache.clear()
+        unit_validation_cache.clear()
         ctx.args.clear_cache = True
     if "--clear-old-sessions" in sys.argv:
         old_sessions = [s[0] for s in ctx.sa.get_old_sessions()]
@@ -94,22 +119,6 @@ def handle_top_parser(args, ctx):
 def main():
     import argparse
 
-    commands = {
-        "check-config": CheckConfig,
-        "launcher": Launcher,
-        "list": List,
-        "run": Run,
-        "startprovider": StartProvider,
-        "submit": Submit,
-        "show": Show,
-        "list-bootstrapped": ListBootstrapped,
-        "expand": Expand,
-        "merge-reports": MergeReports,
-        "merge-submissions": MergeSubmissions,
-        "tp-export": TestPlanExport,
-        "run-agent": RemoteAgent,
-        "control": RemoteController,
-    }
     deprecated_commands = {
         "slave": "run-agent",
         "service": "run-agent",
@@ -117,7 +126,7 @@ def main():
         "remote": "control",
     }
 
-    known_cmds = list(commands.keys())
+    known_cmds = list(SUBCOMMANDS.keys())
     known_cmds += list(deprecated_commands.keys())
     known_cmds += ["-h", "--help"]
     if not (set(known_cmds) & set(sys.argv[1:])):
@@ -133,6 +142,14 @@ def main():
                 deprecated_commands[arg],
             )
 
+    # Answer --version right away, without loading any subcommand (unless
+    # there is some other work to do first, see handle_top_parser())
+    if "--version" in sys.argv and not (
+        {"--clear-cache", "--clear-old-sessions"} & set(sys.argv)
+    ):
+        print(checkbox_ng.__version__)
+        return 0
+
     top_parser = argparse.ArgumentParser()
     # You must handle these args in the function above, see docstring
     top_parser.add_argument(
@@ -162,7 +179,9 @@ def main():
         help=_("show program's version information and exit"),
     )
     top_parser.add_argument(
-        "subcommand", help=_("subcommand to run"), choices=commands.keys()
+        "subcommand",
+        help=_("subcommand to run"),
+        choices=SUBCOMMANDS.keys(),
     )
     # parse all the cli invocation until a subcommand is found
     # subcommand doesn't start with a '-'
@@ -173,9 +192,11 @@ def main():
             break
     args = top_parser.parse_args(sys.argv[1 : subcmd_index + 1])
     subcmd_parser = argparse.ArgumentParser()
-    subcmd = commands[args.subcommand]()
+    subcmd = load_subcommand(args.subcommand)()
     subcmd.register_arguments(subcmd_parser)
     sub_args = subcmd_parser.parse_args(sys.argv[subcmd_index + 1 :])
+    from plainbox.impl.session.assistant import SessionAssistant
+
     sa = SessionAssistant()
     ctx = Context(sub_args, sa)
     ctx = handle_top_parser(args, ctx)
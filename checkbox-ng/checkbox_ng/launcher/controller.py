@@ -125,6 +125,15 @@ class RemoteController(ReportsStage, MainLoopStage):
 
     name = "remote-control"
 
+    # Longest time (in seconds) the agent may wait for the output of a job
+    # before answering monitor_job(). Input from stdin is only forwarded to
+    # the job in between calls.
+    MONITOR_TIMEOUT = 0.5
+
+    # Plugins of the jobs that the agent can run in a batch, without a round
+    # trip to the controller for each of them
+    BATCH_PLUGINS = ("shell", "resource", "attachment")
+
     @property
     def is_interactive(self):
         return (
@@ -306,6 +315,7 @@ class RemoteController(ReportsStage, MainLoopStage):
                 keep_running = {
                     "idle": self.resume_or_start_new_session,
                     "running": self.wait_and_continue,
+                    "runningbatch": self.wait_for_batch_and_continue,
                     "finalizing": self.finish_session,
                     "testsselected": partial(
                         self.run_jobs, resumed_ongoing_session_info=payload
@@ -787,32 +797,60 @@ class RemoteController(ReportsStage, MainLoopStage):
     def wait_for_job(self, dont_finish=False):
         _logger.info("controller: Waiting for job to finish.")
         while True:
-            state, payload = self.sa.monitor_job()
+            # The agent answers as soon as the job prints something or ends
+            state, payload = self.sa.monitor_job(self.MONITOR_TIMEOUT)
             if payload and not self._is_bootstrapping:
-                for line in payload.splitlines():
-                    if line.startswith("stderr"):
-                        SimpleUI.red_text(line[6:])
-                    elif line.startswith("stdout"):
-                        SimpleUI.green_text(line[6:])
-                    else:
-                        SimpleUI.black_text(line[6:])
+                print_job_output(payload)
             if state == "running":
-                time.sleep(0.5)
-                while True:
-                    res = select.select([sys.stdin], [], [], 0)
-                    if not res[0]:
-                        break
-                    # XXX: this assumes that sys.stdin is chunked in lines
-                    buff = res[0][0].readline()
-                    self.sa.transmit_input(buff)
-                    if not buff:
-                        break
+                transmit_stdin(self.sa)
             else:
                 if dont_finish:
                     return
                 self.finish_job()
                 break
 
+    def wait_for_batch(self, jobs_repr=(), total_num=0):
+        """
+        Follow the batch of jobs run by the agent until it is done.
+
+        :param jobs_repr:
+            Representations of the jobs of the batch, used to print their
+            headers
+        :returns:
+            List of ids of the jobs that were run
+        """
+        _logger.info("controller: Waiting for batch to finish.")
+        jobs_by_id = {job["id"]: job for job in jobs_repr}
+        finished_list = []
+        while True:
+            state, payload = self.sa.monitor_batch(self.MONITOR_TIMEOUT)
+            for kind, job_id, data in json.loads(payload):
+                if kind == "start":
+                    job = jobs_by_id.get(job_id)
+                    if job:
+                        self._print_job_header(job, total_num)
+                    else:
+                        SimpleUI.header(job_id)
+                elif kind == "output":
+                    print_job_output(data)
+                elif kind == "finish":
+                    finished_list.append(job_id)
+                    SimpleUI.horiz_line()
+                    print(
+                        _("Outcome")
+                        + ": "
+                        + SimpleUI.C.result(MemoryJobResult({"outcome": data}))
+                    )
+            if state == "running":
+                transmit_stdin(self.sa)
+            else:
+                return finished_list
+
+    def wait_for_batch_and_continue(self):
+        print("Rejoined session.")
+        self.wait_for_batch()
+        self.run_jobs()
+
     def finish_job(self, result=None):
         _logger.info("controller: Finishing job with a result: %s", result)
         job_result = self.sa.finish_job(result)
@@ -896,19 +934,46 @@ class RemoteController(ReportsStage, MainLoopStage):
         )
         return True
 
+    def _print_job_header(self, job, total_num):
+        SimpleUI.header(
+            _("Running job {} / {}").format(job["num"], total_num, fill="-")
+        )
+        SimpleUI.header(job["name"])
+        print(_("ID: {0}").format(job["id"]))
+        print(_("Category: {0}").format(job["category_name"]))
+        SimpleUI.horiz_line()
+
+    def _run_batch(self, jobs_repr, total_num):
+        """
+        Let the agent run the automated jobs at the start of jobs_repr.
+
+        :returns:
+            List of ids of the jobs that were run
+        """
+        batch = list(
+            itertools.takewhile(
+                lambda job: job.get("plugin") in self.BATCH_PLUGINS, jobs_repr
+            )
+        )
+        self.sa.run_batch([job["id"] for job in batch])
+        return self.wait_for_batch(batch, total_num)
+
     def _run_jobs(self, jobs_repr, total_num=0):
-        for job in jobs_repr:
+        batched_job_ids = set()
+        for index, job in enumerate(jobs_repr):
+            if job["id"] in batched_job_ids:
+                continue
+            if job.get("plugin") in self.BATCH_PLUGINS:
+                # Automated jobs are run by the agent, without a round trip
+                # to the controller for each of them
+                batched_job_ids.update(
+                    self._run_batch(jobs_repr[index:], total_num)
+                )
+                if job["id"] in batched_job_ids:
+                    continue
             job_state = self.sa.get_job_state(job["id"])
             self.sa.note_metadata_starting_job(job, job_state)
-            SimpleUI.header(
-                _("Running job {} / {}").format(
-                    job["num"], total_num, fill="-"
-                )
-            )
-            SimpleUI.header(job["name"])
-            print(_("ID: {0}").format(job["id"]))
-            print(_("Category: {0}").format(job["category_name"]))
-            SimpleUI.horiz_line()
+            self._print_job_header(job, total_num)
             next_job = False
             while next_job is False:
                 for interaction in self.sa.run_job(job["id"]):
@@ -1022,6 +1087,34 @@ class RemoteController(ReportsStage, MainLoopStage):
                 continue
 
 
+def print_job_output(payload):
+    """
+    Print the output of a job, as returned by the agent
+    """
+    for line in payload.splitlines():
+        if line.startswith("stderr"):
+            SimpleUI.red_text(line[6:])
+        elif line.startswith("stdout"):
+            SimpleUI.green_text(line[6:])
+        else:
+            SimpleUI.black_text(line[6:])
+
+
+def transmit_stdin(sa):
+    """
+    Forward what is available on stdin to the job running on the agent
+    """
+    while True:
+        res = select.select([sys.stdin], [], [], 0)
+        if not res[0]:
+            break
+        # XXX: this assumes that sys.stdin is chunked in lines
+        buff = res[0][0].readline()
+        sa.transmit_input(buff)
+        if not buff:
+            break
+
+
 def is_hostname_a_loopback(hostname):
     """
     Check if hostname is a loopback address
@@ -395,17 +395,30 @@ class MainLoopStage(CheckboxUiStage):
             estimated_time -= job.estimated_duration or 0
 
     def _run_bootstrap_jobs(self, jobs_to_run):
+        max_workers = self.sa.config.get_value(
+            "features", "parallel_bootstrap"
+        )
+        if max_workers:
+            # The jobs run silently, announce them once they are done
+            for job_no, (job_id, _result) in enumerate(
+                self.sa.run_bootstrap_jobs(jobs_to_run, max_workers), start=1
+            ):
+                self._print_bootstrap_header(job_id, job_no, len(jobs_to_run))
+            return
         for job_no, job_id in enumerate(jobs_to_run, start=1):
-            print(
-                self.C.header(
-                    _("Bootstrap {} ({}/{})").format(
-                        job_id, job_no, len(jobs_to_run), fill="-"
-                    )
-                )
-            )
+            self._print_bootstrap_header(job_id, job_no, len(jobs_to_run))
             result_builder = self.sa.run_job(job_id, "piano", False)
             self.sa.use_job_result(job_id, result_builder.get_result())
 
+    def _print_bootstrap_header(self, job_id, job_no, total_num):
+        print(
+            self.C.header(
+                _("Bootstrap {} ({}/{})").format(
+                    job_id, job_no, total_num, fill="-"
+                )
+            )
+        )
+
     def _generate_job_infos(self, job_list):
         test_info_list = tuple()
         for job in job_list:
@@ -18,8 +18,13 @@
 
 from collections import namedtuple
 from unittest import TestCase, mock
+import json
+import subprocess
+import sys
 
 from checkbox_ng.launcher.checkbox_cli import (
+    SUBCOMMANDS,
+    load_subcommand,
     main,
     handle_top_parser,
 )
@@ -28,7 +33,7 @@ from checkbox_ng.launcher.checkbox_cli import (
 class CheckboxCliTests(TestCase):
     @mock.patch("sys.argv")
     @mock.patch("argparse.ArgumentParser")
-    @mock.patch("checkbox_ng.launcher.checkbox_cli.Launcher")
+    @mock.patch("checkbox_ng.launcher.subcommands.Launcher")
     def test_launcher_ok(
         self,
         launcher_mock,
@@ -51,6 +56,58 @@ class CheckboxCliTests(TestCase):
         self.assertTrue(launcher_mock.called)
         self.assertTrue(launcher_mock.invoked.called)
 
+    @mock.patch("sys.argv", ["checkbox-cli", "--version"])
+    @mock.patch("checkbox_ng.launcher.checkbox_cli.load_subcommand")
+    def test_version_does_not_load_subcommands(self, load_subcommand_mock):
+        with mock.patch("builtins.print") as print_mock:
+            self.assertEqual(main(), 0)
+        self.assertTrue(print_mock.called)
+        self.assertFalse(load_subcommand_mock.called)
+
+    def test_load_subcommand(self):
+        for name in SUBCOMMANDS:
+            with self.subTest(name=name):
+                subcmd_cls = load_subcommand(name)
+                self.assertTrue(hasattr(subcmd_cls, "register_arguments"))
+                self.assertTrue(hasattr(subcmd_cls, "invoked"))
+
+
+class CheckboxCliImportTests(TestCase):
+    # Modules that importing the entry point of checkbox-cli must not load,
+    # they are imported by the subcommands that need them
+    HEAVY_MODULES = (
+        "checkbox_ng.launcher.agent",
+        "checkbox_ng.launcher.controller",
+        "checkbox_ng.launcher.subcommands",
+        "jinja2",
+        "plainbox.impl.session",
+        "plainbox.vendor.rpyc",
+        "requests",
+        "urwid",
+    )
+    # Maximum number of plainbox and checkbox_ng modules that importing the
+    # entry point of checkbox-cli can load
+    MODULE_BUDGET = 10
+
+    def test_import_budget(self):
+        script = (
+            "import json, sys\n"
+            "import checkbox_ng.launcher.checkbox_cli\n"
+            "print(json.dumps(sorted(sys.modules)))\n"
+        )
+        output = subprocess.check_output([sys.executable, "-c", script])
+        module_list = json.loads(output.decode("UTF-8"))
+        for heavy in self.HEAVY_MODULES:
+            self.assertNotIn(heavy, module_list)
+        own_module_list = [
+            module
+            for module in module_list
+            if module.split(".")[0] in ("plainbox", "checkbox_ng")
+        ]
+        self.assertLessEqual(
+            len(own_module_list), self.MODULE_BUDGET, own_module_list
+        )
+
 
 @mock.patch("checkbox_ng.launcher.checkbox_cli.logging", new=mock.MagicMock())
 class TestHandleTopParser(TestCase):
@@ -72,11 +129,17 @@ class TestHandleTopParser(TestCase):
         self.assertTrue(set_all_loggers_level_mock.called)
 
     @mock.patch("sys.argv", ["--clear-cache"])
-    @mock.patch("checkbox_ng.launcher.checkbox_cli.ResourceJobCache")
-    def test_clear_cache(self, mock_cache):
+    @mock.patch("plainbox.impl.validationcache.unit_validation_cache")
+    @mock.patch("plainbox.impl.unitcache.provider_unit_cache")
+    @mock.patch("plainbox.impl.jobcache.ResourceJobCache")
+    def test_clear_cache(
+        self, mock_cache, mock_unit_cache, mock_validation_cache
+    ):
         ctx = mock.MagicMock()
         result = handle_top_parser(None, ctx)
         self.assertTrue(mock_cache().clear.called)
+        self.assertTrue(mock_unit_cache.clear.called)
+        self.assertTrue(mock_validation_cache.clear.called)
         self.assertTrue(result.args.clear_cache)
 
     @mock.patch("sys.argv", ["--clear-old-sessions"])
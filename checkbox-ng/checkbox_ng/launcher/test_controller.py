@@ -17,6 +17,7 @@
 # along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import json
 import socket
 
 from unittest import TestCase, mock
@@ -276,6 +277,88 @@ class ControllerTests(TestCase):
         self.assertTrue(self_mock.abandon.called)
         self.assertTrue(self_mock.resume_or_start_new_session.called)
 
+    @mock.patch("checkbox_ng.launcher.controller.SimpleUI")
+    @mock.patch("select.select")
+    @mock.patch("time.sleep")
+    def test_wait_for_job(self, sleep_mock, select_mock, simple_ui_mock):
+        self_mock = mock.MagicMock()
+        self_mock.MONITOR_TIMEOUT = RemoteController.MONITOR_TIMEOUT
+        self_mock._is_bootstrapping = False
+        self_mock.sa.monitor_job.side_effect = [
+            ("running", "stdoutsome output\n"),
+            ("done", ""),
+        ]
+        select_mock.return_value = ([], [], [])
+
+        RemoteController.wait_for_job(self_mock)
+
+        # the agent blocks until there is output, the controller doesn't poll
+        self_mock.sa.monitor_job.assert_called_with(
+            RemoteController.MONITOR_TIMEOUT
+        )
+        self.assertFalse(sleep_mock.called)
+        simple_ui_mock.green_text.assert_called_once_with("some output")
+        self.assertTrue(self_mock.finish_job.called)
+
+    @mock.patch("checkbox_ng.launcher.controller.SimpleUI")
+    @mock.patch("select.select")
+    def test_wait_for_batch(self, select_mock, simple_ui_mock):
+        self_mock = mock.MagicMock()
+        self_mock.MONITOR_TIMEOUT = RemoteController.MONITOR_TIMEOUT
+        self_mock.sa.monitor_batch.side_effect = [
+            (
+                "running",
+                json.dumps(
+                    [
+                        ["start", "job1", None],
+                        ["output", "job1", "stdoutsome output\n"],
+                        ["finish", "job1", "pass"],
+                        ["start", "job2", None],
+                    ]
+                ),
+            ),
+            ("done", json.dumps([["finish", "job2", "fail"]])),
+        ]
+        select_mock.return_value = ([], [], [])
+        jobs_repr = [{"id": "job1"}, {"id": "job2"}]
+
+        with mock.patch("builtins.print"):
+            finished = RemoteController.wait_for_batch(self_mock, jobs_repr, 2)
+
+        self.assertEqual(finished, ["job1", "job2"])
+        self_mock._print_job_header.assert_has_calls(
+            [mock.call(jobs_repr[0], 2), mock.call(jobs_repr[1], 2)]
+        )
+        simple_ui_mock.green_text.assert_called_once_with("some output")
+
+    def test__run_jobs_batch(self):
+        self_mock = mock.MagicMock()
+        self_mock.BATCH_PLUGINS = RemoteController.BATCH_PLUGINS
+        self_mock._run_batch.return_value = ["job1", "job2"]
+        jobs_repr = [
+            {"id": "job1", "plugin": "shell"},
+            {"id": "job2", "plugin": "resource"},
+        ]
+
+        RemoteController._run_jobs(self_mock, jobs_repr, 2)
+
+        self_mock._run_batch.assert_called_once_with(jobs_repr, 2)
+        self.assertFalse(self_mock.sa.run_job.called)
+
+    def test__run_batch(self):
+        self_mock = mock.MagicMock()
+        self_mock.BATCH_PLUGINS = RemoteController.BATCH_PLUGINS
+        jobs_repr = [
+            {"id": "job1", "plugin": "shell"},
+            {"id": "job2", "plugin": "manual"},
+            {"id": "job3", "plugin": "shell"},
+        ]
+
+        RemoteController._run_batch(self_mock, jobs_repr, 3)
+
+        self_mock.sa.run_batch.assert_called_once_with(["job1"])
+        self_mock.wait_for_batch.assert_called_once_with(jobs_repr[:1], 3)
+
     def test_resume_or_start_new_session_interactive(self):
         self_mock = mock.MagicMock()
         self_mock.should_start_via_autoresume.return_value = False
@@ -66,6 +66,32 @@ class TestMainLoopStage(TestCase):
 
         self.assertEqual(result_builder.outcome, "skip")
 
+    def test__run_bootstrap_jobs(self):
+        self_mock = mock.MagicMock()
+        self_mock.sa.config.get_value.return_value = 0
+
+        MainLoopStage._run_bootstrap_jobs(self_mock, ["a", "b"])
+
+        self.assertEqual(self_mock.sa.run_job.call_count, 2)
+        self.assertEqual(self_mock.sa.use_job_result.call_count, 2)
+        self.assertFalse(self_mock.sa.run_bootstrap_jobs.called)
+
+    def test__run_bootstrap_jobs_parallel(self):
+        self_mock = mock.MagicMock()
+        self_mock.sa.config.get_value.return_value = 4
+        self_mock.sa.run_bootstrap_jobs.return_value = iter(
+            [("a", mock.MagicMock()), ("b", mock.MagicMock())]
+        )
+
+        MainLoopStage._run_bootstrap_jobs(self_mock, ["a", "b"])
+
+        self_mock.sa.run_bootstrap_jobs.assert_called_once_with(["a", "b"], 4)
+        self.assertFalse(self_mock.sa.run_job.called)
+        self.assertEqual(
+            self_mock._print_bootstrap_header.call_args_list,
+            [mock.call("a", 1, 2), mock.call("b", 2, 2)],
+        )
+
 
 class TestReportsStage(TestCase):
     def test__get_submission_file_path(self):
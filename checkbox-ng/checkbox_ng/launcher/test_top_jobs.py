@@ -0,0 +1,141 @@
+# This file is part of Checkbox.
+#
+# Copyright 2024 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import json
+import os
+import tarfile
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from checkbox_ng.launcher.top_jobs import TopJobs
+
+
+def make_usage(cpu_user=0.0, cpu_system=0.0, max_rss=0, block_io=0):
+    return {
+        "cpu_user": cpu_user,
+        "cpu_system": cpu_system,
+        "max_rss": max_rss,
+        "block_input": block_io,
+        "block_output": 0,
+        "voluntary_ctx_switches": 0,
+        "involuntary_ctx_switches": 0,
+    }
+
+
+SUBMISSION = {
+    "results": [
+        {
+            "id": "light",
+            "full_id": "ns::light",
+            "duration": 10.0,
+            "resource_usage": make_usage(0.1, 0.1, 2048, 5),
+        },
+        {
+            "id": "manual",
+            "full_id": "ns::manual",
+            "duration": 60.0,
+            "resource_usage": None,
+        },
+    ],
+    "resource-results": [
+        {
+            "id": "heavy",
+            "full_id": "ns::heavy",
+            "duration": 2.0,
+            "resource_usage": make_usage(3.0, 1.0, 1024, 500),
+        },
+    ],
+    "attachment-results": [
+        {
+            "id": "old",
+            "full_id": "ns::old",
+            "duration": 1.0,
+        },
+    ],
+}
+
+
+class TopJobsTests(TestCase):
+    def test_get_top_jobs_cpu(self):
+        top_list = TopJobs().get_top_jobs(SUBMISSION)
+        self.assertEqual(
+            [result["id"] for result in top_list], ["heavy", "light"]
+        )
+
+    def test_get_top_jobs_rss(self):
+        top_list = TopJobs().get_top_jobs(SUBMISSION, "rss", 1)
+        self.assertEqual([result["id"] for result in top_list], ["light"])
+
+    def test_get_top_jobs_io(self):
+        top_list = TopJobs().get_top_jobs(SUBMISSION, "io")
+        self.assertEqual(
+            [result["id"] for result in top_list], ["heavy", "light"]
+        )
+
+    def test_get_top_jobs_duration(self):
+        # Jobs without resource usage still have a duration
+        top_list = TopJobs().get_top_jobs(SUBMISSION, "duration")
+        self.assertEqual(
+            [result["id"] for result in top_list],
+            ["manual", "light", "heavy", "old"],
+        )
+
+    def test_load_submission_tarball(self):
+        with TemporaryDirectory() as tmp:
+            data = json.dumps(SUBMISSION).encode("UTF-8")
+            info = tarfile.TarInfo("submission.json")
+            info.size = len(data)
+            path = os.path.join(tmp, "submission.tar.xz")
+            with tarfile.open(path, "w:xz") as tar:
+                tar.addfile(info, io.BytesIO(data))
+            self.assertEqual(TopJobs()._load_submission(path), SUBMISSION)
+
+    def test_load_submission_json(self):
+        with TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "submission.json")
+            with open(path, "wt") as stream:
+                json.dump(SUBMISSION, stream)
+            self.assertEqual(TopJobs()._load_submission(path), SUBMISSION)
+
+    def test_load_submission_missing(self):
+        with self.assertRaises(SystemExit):
+            TopJobs()._load_submission("/nonexistent/submission.tar.xz")
+
+    @patch("builtins.print")
+    def test_invoked(self, print_mock):
+        ctx = MagicMock()
+        ctx.args.sort = "cpu"
+        ctx.args.count = 10
+        with patch.object(TopJobs, "_load_submission") as load_mock:
+            load_mock.return_value = SUBMISSION
+            self.assertIsNone(TopJobs().invoked(ctx))
+        lines = [call[0][0] for call in print_mock.call_args_list]
+        self.assertEqual(len(lines), 3)
+        self.assertIn("CPU (s)", lines[0])
+        self.assertEqual(
+            lines[1].split(), ["4.00", "1.0M", "500", "2.00", "ns::heavy"]
+        )
+
+    @patch("builtins.print")
+    def test_invoked_no_resource_usage(self, print_mock):
+        ctx = MagicMock()
+        ctx.args.sort = "cpu"
+        ctx.args.count = 10
+        with patch.object(TopJobs, "_load_submission") as load_mock:
+            load_mock.return_value = {"results": [{"id": "old"}]}
+            self.assertEqual(TopJobs().invoked(ctx), 1)
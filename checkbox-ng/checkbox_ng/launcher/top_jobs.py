@@ -0,0 +1,145 @@
+# This file is part of Checkbox.
+#
+# Copyright 2024 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+:mod:`checkbox-ng.launcher.top_jobs` -- top-jobs sub-command
+============================================================
+
+Summary of the jobs of a submission that used the most resources.
+"""
+
+import json
+import tarfile
+
+
+def _usage(result, key):
+    return (result.get("resource_usage") or {}).get(key, 0)
+
+
+def _cpu_time(result):
+    return _usage(result, "cpu_user") + _usage(result, "cpu_system")
+
+
+def _block_io(result):
+    return _usage(result, "block_input") + _usage(result, "block_output")
+
+
+#: Ways to sort jobs, mapped to a function computing the cost of a job
+#: from its entry in submission.json
+SORT_KEYS = {
+    "cpu": _cpu_time,
+    "rss": lambda result: _usage(result, "max_rss"),
+    "io": _block_io,
+    "duration": lambda result: result.get("duration") or 0,
+}
+
+
+class TopJobs:
+    def register_arguments(self, parser):
+        parser.add_argument(
+            "submission",
+            metavar="SUBMISSION",
+            help="submission tarball or its submission.json file",
+        )
+        parser.add_argument(
+            "-n",
+            "--count",
+            type=int,
+            default=10,
+            help="number of jobs to show (default: %(default)s)",
+        )
+        parser.add_argument(
+            "-s",
+            "--sort",
+            choices=sorted(SORT_KEYS),
+            default="cpu",
+            help="resource to sort jobs by (default: %(default)s)",
+        )
+
+    def _load_submission(self, submission):
+        try:
+            if tarfile.is_tarfile(submission):
+                with tarfile.open(submission) as tar:
+                    stream = tar.extractfile("submission.json")
+                    return json.loads(stream.read().decode("UTF-8"))
+            with open(submission, "rt", encoding="UTF-8") as stream:
+                return json.load(stream)
+        except (OSError, KeyError, ValueError) as exc:
+            raise SystemExit("Cannot read {}: {}".format(submission, exc))
+
+    def get_top_jobs(self, data, sort="cpu", count=10):
+        """
+        Get the results of the most expensive jobs of a submission.
+
+        :param data:
+            Content of submission.json
+        :param sort:
+            One of the keys of :data:`SORT_KEYS`
+        :param count:
+            Maximum number of results to return
+        :returns:
+            A list of results (as found in submission.json), starting with the
+            most expensive one
+        """
+        result_list = [
+            result
+            for section in (
+                "results",
+                "resource-results",
+                "attachment-results",
+            )
+            for result in data.get(section, [])
+        ]
+        if sort != "duration":
+            # Jobs that didn't run a command have no cost to compare
+            result_list = [
+                result
+                for result in result_list
+                if result.get("resource_usage")
+            ]
+        result_list.sort(key=SORT_KEYS[sort], reverse=True)
+        return result_list[:count]
+
+    def invoked(self, ctx):
+        data = self._load_submission(ctx.args.submission)
+        top_list = self.get_top_jobs(data, ctx.args.sort, ctx.args.count)
+        if not top_list:
+            print(
+                "No resource usage recorded in {}".format(ctx.args.submission)
+            )
+            return 1
+        row_format = "{:>9} {:>9} {:>13} {:>12}  {}"
+        print(
+            row_format.format(
+                "CPU (s)", "Max RSS", "Block I/O ops", "Duration (s)", "Job"
+            )
+        )
+        for result in top_list:
+            if result.get("resource_usage"):
+                cpu = "{:.2f}".format(_cpu_time(result))
+                max_rss = "{:.1f}M".format(_usage(result, "max_rss") / 1024)
+                block_io = _block_io(result)
+            else:
+                cpu = max_rss = block_io = "-"
+            print(
+                row_format.format(
+                    cpu,
+                    max_rss,
+                    block_io,
+                    "{:.2f}".format(result.get("duration") or 0),
+                    result.get("full_id", result.get("id")),
+                )
+            )
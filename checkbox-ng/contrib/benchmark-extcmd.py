@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2024 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Compare the throughput of the ways extcmd can read the output of a job.
+
+The output of a command is read either with a thread for each pipe and a
+queue worker (``threaded``) or with a single thread polling both pipes
+(``selector``) and passed to the same delegates the job runner uses.
+
+    $ python3 contrib/benchmark-extcmd.py --size 64
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from plainbox.impl.runner import CommandOutputWriter
+from plainbox.impl.runner import IOLogRecordGenerator
+from plainbox.vendor import extcmd
+
+# Write SIZE MiB of output to stdout, either as lines of text or as random
+# binary data (with a newline every 256 bytes on average)
+PRODUCER = """
+import os, random, sys
+size, kind = int(sys.argv[1]) * 1024 * 1024, sys.argv[2]
+if kind == "text":
+    block = b"".join(b"line %05d of some job output\\n" % i for i in range(2048))
+else:
+    rng = random.Random(0)
+    block = bytes(rng.getrandbits(8) for _ in range(1024 * 1024))
+out = sys.stdout.buffer
+while size > 0:
+    out.write(block[:size])
+    size -= len(block)
+"""
+
+
+def read_threaded(cmd, proc):
+    stdout_reader = threading.Thread(
+        target=cmd._read_stream, args=(proc.stdout, "stdout")
+    )
+    stderr_reader = threading.Thread(
+        target=cmd._read_stream, args=(proc.stderr, "stderr")
+    )
+    queue_worker = threading.Thread(target=cmd._drain_queue)
+    queue_worker.start()
+    stdout_reader.start()
+    stderr_reader.start()
+    stdout_reader.join()
+    stderr_reader.join()
+    cmd._queue.put(None)
+    queue_worker.join()
+
+
+def read_selector(cmd, proc):
+    cmd._read_streams([(proc.stdout, "stdout"), (proc.stderr, "stderr")])
+
+
+def run(reader, size, kind, flags, scratch_dir):
+    io_log_gen = IOLogRecordGenerator()
+    record_count = [0]
+
+    def count_record(record):
+        record_count[0] += 1
+
+    io_log_gen.on_new_record.connect(count_record)
+    delegate = extcmd.Chain(
+        [
+            io_log_gen,
+            CommandOutputWriter(
+                os.path.join(scratch_dir, "stdout"),
+                os.path.join(scratch_dir, "stderr"),
+            ),
+        ]
+    )
+    cmd = extcmd.ExternalCommandWithDelegate(delegate, flags=flags)
+    delegate.on_begin(None, None)
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", PRODUCER, str(size), kind],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    reader(cmd, proc)
+    proc.wait()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    delegate.on_end(proc.returncode)
+    proc.stdout.close()
+    proc.stderr.close()
+    return elapsed, cpu, record_count[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--size", type=int, default=16, help="MiB written by the command"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="runs of each case (best kept)"
+    )
+    args = parser.parse_args()
+    readers = [("threaded", read_threaded), ("selector", read_selector)]
+    cases = [("text", 0), ("binary", 0), ("binary", extcmd.CHUNKED_IO)]
+    print(
+        "{:8} {:7} {:8} {:>9} {:>9} {:>10}".format(
+            "output", "mode", "reader", "MiB/s", "cpu (s)", "records"
+        )
+    )
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        for kind, flags in cases:
+            if flags & extcmd.CHUNKED_IO and args.size > 8:
+                # The threaded reader reads one byte at a time
+                size = 8
+            else:
+                size = args.size
+            for name, reader in readers:
+                elapsed, cpu, records = min(
+                    run(reader, size, kind, flags, scratch_dir)
+                    for _ in range(args.repeat)
+                )
+                print(
+                    "{:8} {:7} {:8} {:9.1f} {:9.2f} {:10}".format(
+                        kind,
+                        "chunked" if flags else "lines",
+                        name,
+                        size / elapsed,
+                        cpu,
+                        records,
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
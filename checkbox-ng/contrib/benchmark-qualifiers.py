@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2024 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Compare the time taken to select the jobs of test plans.
+
+Every test plan of the providers found in the source tree selects jobs from
+all of their units with select_units() and, the way it used to be done,
+with each qualifier voting on each unit. Both selections must be the same.
+The time taken by the compiled qualifier to tell which units a test plan
+designates (as SessionState.trim_job_list() does) is shown as well.
+
+    $ python3 contrib/benchmark-qualifiers.py --test-plan '.*cert.*full'
+"""
+
+import argparse
+import copy
+import glob
+import operator
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from plainbox.abc import IUnitQualifier
+from plainbox.impl.secure.qualifiers import CompiledQualifier
+from plainbox.impl.secure.qualifiers import FieldQualifier
+from plainbox.impl.secure.qualifiers import OperatorMatcher
+from plainbox.impl.secure.qualifiers import select_units
+from plainbox.impl.secure.qualifiers import get_flat_primitive_qualifier_list
+from plainbox.impl.session import SessionManager
+
+PROVIDERS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "providers"
+)
+
+
+def reference_select_units(unit_list, qualifier_list):
+    # select_units() as it used to be, each qualifier voting on each unit
+    included_list = []
+    included_set = set()
+    excluded_set = set()
+
+    def _handle_vote(qualifier, unit):
+        vote = qualifier.get_vote(unit)
+        if vote == IUnitQualifier.VOTE_INCLUDE:
+            if unit in included_set:
+                return
+            included_set.add(unit)
+            included_list.append(unit)
+        elif vote == IUnitQualifier.VOTE_EXCLUDE:
+            excluded_set.add(unit)
+
+    for qualifier in get_flat_primitive_qualifier_list(qualifier_list):
+        if (
+            isinstance(qualifier, FieldQualifier)
+            and qualifier.field == "id"
+            and isinstance(qualifier.matcher, OperatorMatcher)
+            and qualifier.matcher.op == operator.eq
+        ):
+            for unit in unit_list:
+                if unit.id == qualifier.matcher.value:
+                    _handle_vote(qualifier, unit)
+                    break
+                elif unit.template_id == qualifier.matcher.value:
+                    qualifier.field = "template_id"
+                    _handle_vote(qualifier, unit)
+        else:
+            for unit in unit_list:
+                _handle_vote(qualifier, unit)
+    return [unit for unit in included_list if unit not in excluded_set]
+
+
+def compiled_designated_units(unit_list, qualifier_list):
+    compiled = CompiledQualifier(qualifier_list)
+    return [unit for unit in unit_list if compiled.designates(unit)]
+
+
+def designated_units(unit_list, qualifier_list):
+    return [
+        unit
+        for unit in unit_list
+        if all(qualifier.designates(unit) for qualifier in qualifier_list)
+    ]
+
+
+def load_units(provider_dir):
+    with tempfile.TemporaryDirectory() as provider_path:
+        for manage_py in sorted(glob.glob(provider_dir + "/*/manage.py")):
+            subprocess.check_call(
+                [sys.executable, manage_py, "develop", "-d", provider_path],
+                stdout=subprocess.DEVNULL,
+            )
+        os.environ["PROVIDERPATH"] = provider_path
+        with SessionManager.get_throwaway_manager() as manager:
+            context = manager.default_device_context
+            unit_list = [
+                unit
+                for unit in context.unit_list
+                if unit.Meta.name in ("job", "template")
+            ]
+            test_plan_list = [
+                unit
+                for unit in context.unit_list
+                if unit.Meta.name == "test plan"
+            ]
+            # Nested parts are resolved while the providers can be found
+            for test_plan in test_plan_list:
+                test_plan.get_qualifier()
+            return unit_list, test_plan_list
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--providers",
+        default=PROVIDERS_DIR,
+        help="directory with the source of providers (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--test-plan",
+        default=".*",
+        help="regular expression matching the ids of the test plans to use",
+    )
+    args = parser.parse_args()
+    unit_list, test_plan_list = load_units(args.providers)
+    test_plan_list = [
+        test_plan
+        for test_plan in test_plan_list
+        if re.match(args.test_plan, test_plan.id)
+    ]
+    print(
+        "{} units, {} test plans".format(len(unit_list), len(test_plan_list))
+    )
+    print(
+        "{:>10} {:>6} {:>10} {:>10} {:>10}  {}".format(
+            "qualifiers", "units", "before (s)", "select (s)", "trim (s)", "id"
+        )
+    )
+    total_reference = total_select = 0
+    for test_plan in test_plan_list:
+        # Selecting units can modify qualifiers, give a copy to each run
+        qualifier_list = [test_plan.get_qualifier()]
+        reference_time, expected = timed(
+            reference_select_units, unit_list, copy.deepcopy(qualifier_list)
+        )
+        select_time, observed = timed(
+            select_units, unit_list, copy.deepcopy(qualifier_list)
+        )
+        if observed != expected:
+            sys.exit("selection of {} differs".format(test_plan.id))
+        trim_time, trimmed = timed(
+            compiled_designated_units,
+            unit_list,
+            copy.deepcopy(qualifier_list),
+        )
+        if trimmed != designated_units(
+            unit_list, copy.deepcopy(qualifier_list)
+        ):
+            sys.exit("votes of {} differ".format(test_plan.id))
+        total_reference += reference_time
+        total_select += select_time
+        print(
+            "{:10} {:6} {:10.4f} {:10.4f} {:10.4f}  {}".format(
+                len(get_flat_primitive_qualifier_list(qualifier_list)),
+                len(observed),
+                reference_time,
+                select_time,
+                trim_time,
+                test_plan.id,
+            )
+        )
+    print(
+        "total: reference {:.3f}s, select_units {:.3f}s".format(
+            total_reference, total_select
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
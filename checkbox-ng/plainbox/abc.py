@@ -806,6 +806,36 @@ class ISessionStateController(metaclass=ABCMeta):
         DEP_TYPE_RESOURCE. The second element is the name of the job.
         """
 
+    def get_declared_dependency_set(self, job):
+        """
+        Get the set of dependencies declared by a particular job.
+
+        :param job:
+            A IJobDefinition instance that is to be visited
+        :returns:
+            set of pairs (dep_type, job_name)
+
+        Unlike :meth:`get_dependency_set()` this should only include the
+        dependencies that don't depend on the other jobs of the session, as
+        they are computed once for each job. The default implementation
+        returns the value of :meth:`get_dependency_set()`.
+        """
+        return self.get_dependency_set(job)
+
+    def get_suspend_job_id_set(self, job):
+        """
+        Get the set of suspend jobs that need to run after a particular job.
+
+        :param job:
+            A IJobDefinition instance
+        :returns:
+            set of ids of suspend jobs
+
+        The default implementation returns an empty set, for controllers
+        that don't know about suspend jobs.
+        """
+        return set()
+
     @abstractmethod
     def get_inhibitor_list(self, session_state, job):
         """
@@ -0,0 +1,96 @@
+# This file is part of Checkbox.
+#
+# Copyright 2024 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+"""
+:mod:`plainbox.impl.cacheutils` -- helpers shared by on-disk caches
+===================================================================
+
+The caches of plainbox (resource job results, parsed unit files, unit
+validation results) live in their own directory of the user cache directory
+and store their entries as JSON documents.
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+
+
+def get_cache_path(name):
+    """
+    Get the directory of a cache.
+
+    :param name:
+        Name of the cache directory
+    :returns:
+        The directory in the plainbox directory of ``$SNAP_USER_COMMON/.cache``
+        when running in a snap, of ``$XDG_CACHE_HOME`` otherwise
+    """
+    suc = os.environ.get("SNAP_USER_COMMON")
+    if suc:
+        return os.path.join(suc, ".cache", "plainbox", name)
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+    if not xdg_cache_home:
+        xdg_cache_home = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(xdg_cache_home, "plainbox", name)
+
+
+def load_json_entry(entry_path):
+    """
+    Load a cache entry saved by :func:`store_json_entry()`.
+
+    :returns:
+        The JSON document or None if there is no such entry
+    :raises OSError, ValueError:
+        If the entry cannot be read or decoded
+    """
+    try:
+        with open(entry_path, "rb") as stream:
+            return json.loads(stream.read().decode("UTF-8"))
+    except FileNotFoundError:
+        return None
+
+
+def store_json_entry(entry_path, data):
+    """
+    Store a cache entry, creating its directory if needed.
+
+    The entry is written to a temporary file first so that concurrent readers
+    never see a partial entry.
+
+    :param data:
+        JSON-serializable document
+    :raises OSError, TypeError, ValueError:
+        If the entry cannot be written or the document serialized
+    """
+    cache_path = os.path.dirname(entry_path)
+    os.makedirs(cache_path, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_path, suffix=".tmp")
+    try:
+        with open(fd, "wb") as stream:
+            stream.write(
+                json.dumps(
+                    data,
+                    ensure_ascii=False,
+                    sort_keys=True,
+                    indent=None,
+                    separators=(",", ":"),
+                ).encode("UTF-8")
+            )
+        os.replace(tmp_path, entry_path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
@@ -34,6 +34,7 @@ from plainbox.impl.exporter import ByteStringStreamTranslator
 from plainbox.impl.session import SessionManager
 from plainbox.impl.session import SessionPeekHelper
 from plainbox.impl.session import SessionResumeError
+from plainbox.impl.session.storage import SessionRepositoryIndex
 from plainbox.impl.session.storage import WellKnownDirsHelper
 
 
@@ -67,13 +68,13 @@ class SessionInvocation:
 
     def list_sessions(self):
         storage = None
+        index = SessionRepositoryIndex.load()
         for storage in WellKnownDirsHelper.get_storage_list():
             if self.ns.only_ids:
                 print(storage.id)
                 continue
-            data = storage.load_checkpoint()
-            if len(data) > 0:
-                metadata = SessionPeekHelper().peek(data)
+            metadata = SessionPeekHelper().peek_storage(storage, index)
+            if metadata is not None:
                 print(
                     _("session {0} app:{1}, flags:{2!r}, title:{3!r}").format(
                         storage.id,
@@ -104,10 +105,9 @@ class SessionInvocation:
             else:
                 print("[{}]".format(session_id))
                 print(_("location:"), storage.location)
-                data = storage.load_checkpoint()
-                if len(data) == 0:
+                metadata = SessionPeekHelper().peek_storage(storage)
+                if metadata is None:
                     continue
-                metadata = SessionPeekHelper().peek(data)
                 print(_("application ID: {0!r}").format(metadata.app_id))
                 print(
                     _("application-specific blob: {0}").format(
@@ -397,7 +397,25 @@ CONFIG_SPEC = [
                 True,
                 "Invalid units generated by templates will be used and"
                 " reported as failures",
-            )
+            ),
+            "journaled_checkpoints": VarSpec(
+                bool,
+                False,
+                "Append small journal records to the session file instead of"
+                " rewriting it after every job",
+            ),
+            "background_system_information": VarSpec(
+                bool,
+                False,
+                "Collect the system information in the background while a"
+                " new session loads its providers",
+            ),
+            "parallel_bootstrap": VarSpec(
+                int,
+                0,
+                "Number of bootstrapping resource jobs that can run at the"
+                " same time (0 runs them one after the other)",
+            ),
         },
     ),
     (
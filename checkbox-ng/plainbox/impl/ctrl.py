@@ -54,7 +54,6 @@ from plainbox.impl.resource import (
 from plainbox.impl.secure.origin import JobOutputTextSource
 from plainbox.impl.secure.rfc822 import RFC822SyntaxError, gen_rfc822_records
 from plainbox.impl.session.jobs import InhibitionCause, JobReadinessInhibitor
-from plainbox.impl.unit.template import TemplateUnit
 from plainbox.impl.unit.unit import MissingParam
 from plainbox.impl.validation import Severity
 from plainbox.suspend_consts import Suspend
@@ -104,6 +103,29 @@ class CheckBoxSessionStateController(ISessionStateController):
         dep_type, is either DEP_TYPE_DIRECT, DEP_TYPE_ORDERING or
         DEP_TYPE_RESOURCE. The second element is the id of the job.
         """
+        ordering = DependencyMissingError.DEP_TYPE_ORDERING
+        result = self.get_declared_dependency_set(job)
+        if job.id in (Suspend.AUTO_JOB_ID, Suspend.MANUAL_JOB_ID):
+            suspend_deps = self._get_before_suspend_dependency_set(
+                job.id, job_list
+            )
+            result.update(zip(itertools.repeat(ordering), suspend_deps))
+        return result
+
+    def get_declared_dependency_set(self, job):
+        """
+        Get the set of dependencies declared by a particular job.
+
+        :param job:
+            A IJobDefinition instance that is to be visited
+        :returns:
+            set of pairs (dep_type, job_id)
+
+        Unlike :meth:`get_dependency_set()` this only includes the direct,
+        resource and ordering dependencies found in the definition of the
+        job. They don't depend on the other jobs so they can be computed
+        once for each job.
+        """
         direct = DependencyMissingError.DEP_TYPE_DIRECT
         ordering = DependencyMissingError.DEP_TYPE_ORDERING
         resource = DependencyMissingError.DEP_TYPE_RESOURCE
@@ -113,25 +135,31 @@ class CheckBoxSessionStateController(ISessionStateController):
             resource_deps = job.get_resource_dependencies()
         except ResourceProgramError:
             resource_deps = ()
-        suspend_job_id_list = [
-            Suspend.AUTO_JOB_ID,
-            Suspend.MANUAL_JOB_ID,
-        ]
-        if job.id in suspend_job_id_list:
-            suspend_deps = self._get_before_suspend_dependency_set(
-                job.id, job_list
-            )
-        else:
-            suspend_deps = set()
-        result = set(
+        return set(
             itertools.chain(
                 zip(itertools.repeat(direct), direct_deps),
                 zip(itertools.repeat(resource), resource_deps),
                 zip(itertools.repeat(ordering), after_deps),
-                zip(itertools.repeat(ordering), suspend_deps),
             )
         )
-        return result
+
+    def get_suspend_job_id_set(self, job):
+        """
+        Get the set of suspend jobs that need to run after a particular job.
+
+        :param job:
+            A IJobDefinition instance
+        :returns:
+            A set with the ids of the suspend jobs (Suspend.AUTO_JOB_ID
+            and/or Suspend.MANUAL_JOB_ID) that get an ordering dependency on
+            ``job`` when it is among the jobs to run, see
+            :meth:`_get_before_suspend_dependency_set()`
+        """
+        return {
+            suspend_job_id
+            for suspend_job_id in (Suspend.AUTO_JOB_ID, Suspend.MANUAL_JOB_ID)
+            if self._is_job_impacting_suspend(suspend_job_id, job)
+        }
 
     def _get_before_suspend_dependency_set(self, suspend_job_id, job_list):
         """
@@ -467,11 +495,7 @@ class CheckBoxSessionStateController(ISessionStateController):
         if result.outcome is IJobResult.OUTCOME_NONE:
             return
         # get all templates that use this (resource) job as template_resource
-        template_units = filter(
-            lambda unit: isinstance(unit, TemplateUnit)
-            and unit.resource_id == job.id,
-            session_state.unit_list,
-        )
+        template_units = session_state.get_template_list(job.id)
         # get the parsed resource (list of dict created from the resource
         # stdout)
         parsed_resource = session_state.resource_map[job.id]
@@ -498,12 +522,14 @@ class CheckBoxSessionStateController(ISessionStateController):
         else:
             new_units = filter(self._filter_invalid_log, new_units)
 
-        for new_unit in new_units:
-            # here they are added unconditionally as they will be checked
-            # before running to make error reporting possible or were already
-            # filtered by non-strict template expansion
-            session_state.add_unit(new_unit, via=job, recompute=False)
-        session_state._recompute_job_readiness()
+        # here they are added unconditionally as they will be checked
+        # before running to make error reporting possible or were already
+        # filtered by non-strict template expansion
+        session_state.add_units(new_units, via=job, recompute=False)
+        # Instantiated jobs are not on the run list yet so they are left
+        # undesired and cannot affect the readiness of other jobs, there is
+        # no need to recompute it here. The session will update readiness
+        # of the jobs affected by the result of this resource job.
 
 
 def gen_rfc822_records_from_io_log(job, result):
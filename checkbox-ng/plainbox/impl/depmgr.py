@@ -31,11 +31,12 @@ Job Dependency Solver.
 from abc import ABCMeta
 from abc import abstractproperty
 from logging import getLogger
+import collections
 import enum
+import time
 
 from plainbox.i18n import gettext as _
 
-
 logger = getLogger("plainbox.depmgr")
 
 
@@ -276,6 +277,96 @@ class Color(enum.Enum):
     BLACK = "black"
 
 
+class DependencyGraph:
+    """
+    Dependencies of a set of jobs.
+
+    The dependencies declared by each job and the suspend jobs that need to
+    run after it are computed by its controller the first time they are
+    needed. They are kept until the job is removed from the graph, so that
+    solving the graph again, after the desired jobs changed or after jobs
+    were added, doesn't parse resource programs or sibling definitions again.
+
+    :attr stats:
+        Counter of ``hit`` and ``miss`` lookups of the dependencies of a
+        job, of ``solve`` runs of :class:`DependencySolver` and of the
+        ``solve_time`` they took, in seconds
+    """
+
+    def __init__(self, job_list=()):
+        # Maps job.id to a tuple (job, dependency list, suspend job id set)
+        self._entry_map = {}
+        self.stats = collections.Counter()
+        for job in job_list:
+            self.add_job(job)
+
+    @property
+    def job_count(self):
+        """number of jobs whose dependencies are known."""
+        return len(self._entry_map)
+
+    @property
+    def edge_count(self):
+        """number of dependencies of the jobs whose dependencies are known."""
+        return sum(len(entry[1]) for entry in self._entry_map.values())
+
+    def add_job(self, job):
+        """
+        Add a job to the graph.
+
+        Dependencies of the job are computed when they are first looked up.
+        A job that was known under the same id is forgotten.
+        """
+        entry = self._entry_map.get(job.id)
+        if entry is not None and entry[0] is not job:
+            del self._entry_map[job.id]
+
+    def remove_job(self, job):
+        """Remove a job from the graph."""
+        self._entry_map.pop(job.id, None)
+
+    def get_dependency_list(self, job):
+        """
+        Get the dependencies declared by a job.
+
+        :param job:
+            A JobDefinition instance
+        :returns:
+            A tuple of pairs (dep_type, job_id)
+        """
+        return self._get_entry(job)[1]
+
+    def get_before_suspend_map(self, job_list):
+        """
+        Get the jobs that need to run before each suspend job.
+
+        :param job_list:
+            List of jobs to search dependencies on
+        :returns:
+            A dictionary mapping the id of each suspend job to the list of ids
+            of the jobs of ``job_list`` that need to run before it
+        """
+        before_suspend_map = collections.defaultdict(list)
+        for job in job_list:
+            for suspend_job_id in self._get_entry(job)[2]:
+                before_suspend_map[suspend_job_id].append(job.id)
+        return before_suspend_map
+
+    def _get_entry(self, job):
+        entry = self._entry_map.get(job.id)
+        if entry is not None and entry[0] is job:
+            self.stats["hit"] += 1
+            return entry
+        self.stats["miss"] += 1
+        entry = (
+            job,
+            tuple(job.controller.get_declared_dependency_set(job)),
+            frozenset(job.controller.get_suspend_job_id_set(job)),
+        )
+        self._entry_map[job.id] = entry
+        return entry
+
+
 class DependencySolver:
     """
     Dependency solver for Jobs.
@@ -289,12 +380,15 @@ class DependencySolver:
     COLOR_BLACK = Color.BLACK
 
     @classmethod
-    def resolve_dependencies(cls, job_list, visit_list=None):
+    def resolve_dependencies(cls, job_list, visit_list=None, graph=None):
         """
         Solve the dependency graph expressed as a list of job definitions.
 
         :param list job_list: list of known jobs
         :param list visit_list: (optional) list of jobs to solve
+        :param graph:
+            (optional) :class:`DependencyGraph` caching the dependencies of
+            the jobs across solves
 
         The visit_list, if specified, allows to consider only a part of the
         graph while still having access and knowledge of all jobs.
@@ -307,9 +401,9 @@ class DependencySolver:
         :raises DependencyMissingErorr:
             if a required job does not exist.
         """
-        return cls(job_list)._solve(visit_list)
+        return cls(job_list, graph)._solve(visit_list)
 
-    def __init__(self, job_list):
+    def __init__(self, job_list, graph=None):
         """
         Instantiate a new dependency solver with the specified list of jobs.
 
@@ -322,6 +416,10 @@ class DependencySolver:
         self._job_map = self._get_job_map(job_list)
         # Job colors, maps from job.id to COLOR_xxx
         self._job_color_map = {job.id: self.COLOR_WHITE for job in job_list}
+        # Dependencies of the jobs, possibly known from previous solves
+        self._graph = graph if graph is not None else DependencyGraph()
+        # Jobs that need to run before each suspend job, see _solve()
+        self._before_suspend_map = {}
         # The computed solution, made out of job instances. This is not
         # necessarily the only solution but the algorithm computes the same
         # value each time, given the same input.
@@ -339,22 +437,54 @@ class DependencySolver:
         logger.debug(_("Starting solve"))
         logger.debug(_("Solver job list: %r"), self._job_list)
         logger.debug(_("Solver visit list: %r"), visit_list)
+        start = time.perf_counter()
         if visit_list is None:
             visit_list = self._job_list
+        self._before_suspend_map = self._graph.get_before_suspend_map(
+            visit_list
+        )
         for job in visit_list:
-            self._visit(job=job, visit_list=visit_list)
-        logger.debug(_("Done solving"))
+            self._visit(job)
+        solve_time = time.perf_counter() - start
+        self._graph.stats["solve"] += 1
+        self._graph.stats["solve_time"] += solve_time
+        logger.debug(
+            _("Done solving %d jobs in %.3fs"), len(self._solution), solve_time
+        )
         # Return the solution
         return self._solution
 
-    def _visit(self, job, visit_list, trail=None):
+    def _get_dependency_list(self, job):
         """
         Internal method of DependencySolver.
 
-        Called each time a node is visited. Nodes already seen in _visited are
-        skipped. Attempts to enumerate all dependencies (both direct and
-        resource) and resolve them. Missing jobs cause DependencyMissingError
-        to be raised. Calls _visit recursively on all dependencies.
+        Get the dependencies of a job, pairs (dep_type, job_id), like the
+        get_dependency_set() method of its controller with the visit list as
+        the job list.
+        """
+        dependency_list = self._graph.get_dependency_list(job)
+        if job.id in self._before_suspend_map:
+            ordering = DependencyMissingError.DEP_TYPE_ORDERING
+            dependency_list += tuple(
+                (ordering, job_id)
+                for job_id in self._before_suspend_map[job.id]
+            )
+        return dependency_list
+
+    def _visit(self, job):
+        """
+        Internal method of DependencySolver.
+
+        Called for each job of the visit list. Jobs already visited are
+        skipped. Otherwise the job and, depth first, all of its dependencies
+        (both direct and resource) that were not visited yet are visited,
+        each of them being appended to the solution once all of its own
+        dependencies are. Missing jobs cause DependencyMissingError to be
+        raised and dependency loops cause DependencyCycleError to be raised.
+
+        The search uses an explicit stack (the trail of jobs being visited
+        and, for each of them, an iterator over its remaining dependencies)
+        so that long chains of dependencies don't hit the recursion limit.
         """
         try:
             color = self._job_color_map[job.id]
@@ -362,16 +492,18 @@ class DependencySolver:
             logger.debug(_("Visiting job that's not on the job_list: %r"), job)
             raise DependencyUnknownError(job)
         logger.debug(_("Visiting job %s (color %s)"), job.id, color)
-        if color == self.COLOR_WHITE:
-            # This node has not been visited yet. Let's mark it as GRAY (being
-            # visited) and iterate through the list of dependencies
-            self._job_color_map[job.id] = self.COLOR_GRAY
-            # If the trail was not specified start a trail for this node
-            if trail is None:
-                trail = [job]
-            for dep_type, job_id in job.controller.get_dependency_set(
-                job, visit_list
-            ):
+        if color != self.COLOR_WHITE:
+            # This node has been visited and is fully traced (all the nodes
+            # being visited are BLACK once the stack below is empty)
+            assert color == self.COLOR_BLACK
+            return
+        # Mark the node as GRAY (being visited) and start a trail for it.
+        # The trail gives proper error messages if a dependency loop exists.
+        self._job_color_map[job.id] = self.COLOR_GRAY
+        trail = [job]
+        stack = [iter(self._get_dependency_list(job))]
+        while stack:
+            for dep_type, job_id in stack[-1]:
                 # Dependency is just an id, we need to resolve it
                 # to a job instance. This can fail (missing dependencies)
                 # so let's guard against that.
@@ -379,34 +511,37 @@ class DependencySolver:
                     next_job = self._job_map[job_id]
                 except KeyError:
                     logger.debug(
-                        _("Found missing dependency: %r from %r"), job_id, job
+                        _("Found missing dependency: %r from %r"),
+                        job_id,
+                        trail[-1],
                     )
-                    raise DependencyMissingError(job, job_id, dep_type)
-                else:
-                    # For each dependency that we visit let's reuse the trail
-                    # to give proper error messages if a dependency loop exists
+                    raise DependencyMissingError(trail[-1], job_id, dep_type)
+                color = self._job_color_map[job_id]
+                if color == self.COLOR_WHITE:
+                    # Visit the dependency before the remaining dependencies
+                    # of the current node
                     logger.debug(_("Visiting dependency: %r"), next_job)
-                    # Update the trail as we visit that node
+                    self._job_color_map[job_id] = self.COLOR_GRAY
                     trail.append(next_job)
-                    self._visit(next_job, visit_list, trail)
-                    trail.pop()
-            # We've visited (recursively) all dependencies of this node,
-            # let's color it black and append it to the solution list.
-            logger.debug(_("Appending %r to solution"), job)
-            self._job_color_map[job.id] = self.COLOR_BLACK
-            self._solution.append(job)
-        elif color == self.COLOR_GRAY:
-            # This node is not fully traced yet but has been visited already
-            # so we've found a dependency loop. We need to cut the initial
-            # part of the trail so that we only report the part that actually
-            # forms a loop
-            trail = trail[trail.index(job) :]
-            logger.debug(_("Found dependency cycle: %r"), trail)
-            raise DependencyCycleError(trail)
-        else:
-            assert color == self.COLOR_BLACK
-            # This node has been visited and is fully traced.
-            # We can just skip it and go back
+                    stack.append(iter(self._get_dependency_list(next_job)))
+                    break
+                elif color == self.COLOR_GRAY:
+                    # This node is not fully traced yet but has been visited
+                    # already so we've found a dependency loop. We need to cut
+                    # the initial part of the trail so that we only report the
+                    # part that actually forms a loop
+                    loop = trail[trail.index(next_job) :] + [next_job]
+                    logger.debug(_("Found dependency cycle: %r"), loop)
+                    raise DependencyCycleError(loop)
+                # Otherwise the node is BLACK, we can just skip it
+            else:
+                # We've visited all dependencies of this node, let's color it
+                # black and append it to the solution list.
+                stack.pop()
+                done_job = trail.pop()
+                logger.debug(_("Appending %r to solution"), done_job)
+                self._job_color_map[done_job.id] = self.COLOR_BLACK
+                self._solution.append(done_job)
 
     @staticmethod
     def _get_job_map(job_list):
@@ -21,9 +21,8 @@ Definition for UnifiedRunner class.
 """
 
 import contextlib
+import copy
 import getpass
-import gzip
-import io
 import logging
 import os
 import select
@@ -39,9 +38,10 @@ from plainbox.impl.color import Colorizer
 from plainbox.impl.unit.job import supported_plugins
 from plainbox.impl.unit.unit import on_ubuntucore
 from plainbox.impl.result import (
-    IOLogRecordWriter,
+    BinaryIOLogRecordWriter,
     JobResultBuilder,
     IOLogRecord,
+    get_resource_usage,
 )
 from plainbox.impl.runner import (
     CommandOutputWriter,
@@ -88,7 +88,6 @@ class UnifiedRunner(IJobRunner):
         self._command_io_delegate = command_io_delegate
         self._dry_run = dry_run
         self._resource_cache = ResourceJobCache()
-        self._resource_cache.load()
         self._user_provider = normal_user_provider
         self._password_provider = password_provider
         self._stdin = stdin
@@ -140,6 +139,8 @@ class UnifiedRunner(IJobRunner):
             from_cache, result = self._resource_cache.get(
                 job.checksum,
                 lambda: self._run_command(job, environ).get_result(),
+                job.get_cache_input_list(),
+                job.cache_ttl,
             )
             if from_cache:
                 print(Colorizer().header(_("Using cached data!")))
@@ -176,6 +177,29 @@ class UnifiedRunner(IJobRunner):
         # to yield appropriate result
         return result_builder.get_result()
 
+    def get_worker_runner(self, stdin):
+        """
+        Get a runner to run a job at the same time as this one.
+
+        The runner shares the configuration and the resource cache of this
+        one but has its own UI delegate and running process.
+
+        :param stdin:
+            Stream the jobs it runs read from instead of sys.stdin
+        """
+        runner = copy.copy(self)
+        runner._job_runner_ui_delegate = JobRunnerUIDelegate()
+        runner._running_jobs_pid = None
+        runner._stdin = stdin
+        return runner
+
+    @property
+    def resource_cache(self):
+        """
+        :class:`ResourceJobCache` used for ``cachable`` resource jobs
+        """
+        return self._resource_cache
+
     def get_warm_up_sequence(self, job_list):
         # we no longer need a warm-up sequence
         # this is left here to conform to the interface
@@ -193,11 +217,9 @@ class UnifiedRunner(IJobRunner):
             ),
         )
         io_log_gen = IOLogRecordGenerator()
-        log = os.path.join(self._jobs_io_log_dir, "{}.record.gz".format(slug))
-        with gzip.open(log, mode="wb") as gzip_stream, io.TextIOWrapper(
-            gzip_stream, encoding="UTF-8"
-        ) as record_stream:
-            writer = IOLogRecordWriter(record_stream)
+        log = self.get_record_path_for_job(job)
+        with open(log, mode="wb") as record_stream:
+            writer = BinaryIOLogRecordWriter(record_stream)
             io_log_gen.on_new_record.connect(writer.write_record)
             delegate = extcmd.Chain(
                 [
@@ -210,18 +232,22 @@ class UnifiedRunner(IJobRunner):
             ecmd = extcmd.ExternalCommandWithDelegate(delegate)
             return_code = self.execute_job(job, environ, ecmd, self._stdin)
             io_log_gen.on_new_record.disconnect(writer.write_record)
+            writer.finish()
         if return_code == 0:
             outcome = IJobResult.OUTCOME_PASS
         elif return_code < 0:
             outcome = IJobResult.OUTCOME_CRASH
         else:
             outcome = IJobResult.OUTCOME_FAIL
-        return JobResultBuilder(
+        result_builder = JobResultBuilder(
             outcome=outcome,
             return_code=return_code,
             io_log_filename=log,
             execution_duration=time.time() - start_time,
         )
+        if ecmd.rusage is not None:
+            result_builder.resource_usage = get_resource_usage(ecmd.rusage)
+        return result_builder
 
     def execute_job(self, job, environ, extcmd_popen, stdin=None):
         """Run the 'binary' associated with the job."""
@@ -275,23 +301,17 @@ class UnifiedRunner(IJobRunner):
             # Start the process
             proc = extcmd_popen._popen(*args, **kwargs)
             self._running_jobs_pid = proc.pid
-            # Setup all worker threads. By now the pipes have been created and
-            # proc.stdout/proc.stderr point to open pipe objects.
-            stdout_reader = threading.Thread(
-                target=extcmd_popen._read_stream, args=(proc.stdout, "stdout")
-            )
-            stderr_reader = threading.Thread(
-                target=extcmd_popen._read_stream, args=(proc.stderr, "stderr")
+            # Read the output from a worker thread. By now the pipes have been
+            # created and proc.stdout/proc.stderr point to open pipe objects.
+            stream_reader = threading.Thread(
+                target=extcmd_popen._read_streams,
+                args=([(proc.stdout, "stdout"), (proc.stderr, "stderr")],),
             )
-            queue_worker = threading.Thread(target=extcmd_popen._drain_queue)
-            # Start all workers
-            queue_worker.start()
-            stdout_reader.start()
-            stderr_reader.start()
+            stream_reader.start()
             try:
                 while True:
                     try:
-                        proc.wait()
+                        extcmd_popen._wait(proc)
                         break
                     except KeyboardInterrupt:
                         is_alive = False
@@ -302,14 +322,10 @@ class UnifiedRunner(IJobRunner):
                         extcmd_popen._delegate.on_interrupt()
             finally:
                 self._running_jobs_pid = None
-                # Wait until all worker threads shut down
-                stdout_reader.join()
+                # Wait until all the output is read
+                stream_reader.join()
                 proc.stdout.close()
-                stderr_reader.join()
                 proc.stderr.close()
-                # Tell the queue worker to shut down
-                extcmd_popen._queue.put(None)
-                queue_worker.join()
                 os.close(in_r)
                 is_alive = False
                 forwarder_thread.join()
@@ -447,7 +463,7 @@ class UnifiedRunner(IJobRunner):
 
     def get_record_path_for_job(self, job):
         return os.path.join(
-            self._jobs_io_log_dir, "{}.record.gz".format(slugify(job.id))
+            self._jobs_io_log_dir, "{}.record.bin".format(slugify(job.id))
         )
 
     def send_signal(self, signal, target_user):
@@ -33,6 +33,7 @@ import base64
 
 from plainbox.i18n import gettext as _
 from plainbox.abc import ISessionStateExporter
+from plainbox.impl.result import iter_base64_chunks
 
 logger = getLogger("plainbox.exporter")
 
@@ -268,6 +269,10 @@ class SessionStateExporterBase(ISessionStateExporter):
                 data["result_map"][job_id][
                     "execution_duration"
                 ] = job_state.result.execution_duration
+            if job_state.result.resource_usage:
+                data["result_map"][job_id][
+                    "resource_usage"
+                ] = job_state.result.resource_usage
             if self.OPTION_WITH_COMMENTS in self._option_list:
                 data["result_map"][job_id][
                     "comments"
@@ -322,16 +327,9 @@ class SessionStateExporterBase(ISessionStateExporter):
         return data
 
     def _build_attachment_map(self, data, job_id, job_state):
-        raw_bytes = b"".join(
-            (
-                record[2]
-                for record in job_state.result.get_io_log()
-                if record[1] == "stdout"
-            )
+        data["attachment_map"][job_id] = "".join(
+            iter_base64_chunks(job_state.result.get_io_log_data("stdout"))
         )
-        data["attachment_map"][job_id] = base64.standard_b64encode(
-            raw_bytes
-        ).decode("ASCII")
 
     @classmethod
     def _squash_io_log(cls, io_log):
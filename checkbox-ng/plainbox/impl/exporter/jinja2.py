@@ -71,6 +71,21 @@ def do_is_name(text):
     return text == "name"
 
 
+def do_is_nonempty(iterable):
+    """A test for checking if an iterable yields any non-empty item."""
+    return any(item for item in iterable)
+
+
+def json_string_chunk(text):
+    """
+    Render a piece of a JSON string, without the surrounding quotes.
+
+    This is used to write long strings to JSON reports piece by piece, as
+    in ``"{% for chunk in chunks %}{{ chunk|json_string_chunk }}{% endfor %}"``
+    """
+    return Markup(json.dumps(text)[1:-1])
+
+
 def json_load_ordered_dict(text):
     """Render json dict in Jinja templates but keep keys ordering."""
     return json.loads(text, object_pairs_hook=OrderedDict)
@@ -162,7 +177,9 @@ class Jinja2SessionStateExporter(SessionStateExporterBase):
         env.filters["strip_ns"] = do_strip_ns
         env.filters["json_load_ordered_dict"] = json_load_ordered_dict
         env.filters["highlight_keys"] = highlight_keys
+        env.filters["json_string_chunk"] = json_string_chunk
         env.tests["is_name"] = do_is_name
+        env.tests["nonempty"] = do_is_nonempty
 
     def dump(self, data, stream):
         """
@@ -262,9 +279,8 @@ class Jinja2SessionStateExporter(SessionStateExporterBase):
         # any other possible validator that may use self
         try:
             # manually reading the stream to ensure decoding
-            raw = stream.read()
-            s = raw.decode("utf-8") if type(raw) == bytes else raw
-            json.loads(s)
+            # json.loads() decodes bytes by itself, don't make a copy
+            json.loads(stream.read())
             return []
         except Exception as exc:
             return [str(exc)]
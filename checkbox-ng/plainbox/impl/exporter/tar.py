@@ -28,11 +28,14 @@
 import os
 import tarfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 from tempfile import SpooledTemporaryFile
 
 from plainbox.impl.exporter import SessionStateExporterBase
 from plainbox.impl.exporter.jinja2 import Jinja2SessionStateExporter
 from plainbox.impl.providers import get_providers
+from plainbox.impl.result import get_io_log_companion_filename
+from plainbox.impl.result import io_log_text_cache
 from plainbox.impl.unit.exporter import ExporterUnitSupport
 
 
@@ -41,6 +44,9 @@ class TARSessionStateExporter(SessionStateExporterBase):
 
     SUPPORTED_OPTION_LIST = ()
 
+    #: Formats of the reports included in the archive
+    REPORT_FORMATS = ("html", "json", "junit")
+
     def dump_from_session_manager(self, manager, stream):
         """
         Extract data from session manager and dump it into the stream.
@@ -51,6 +57,8 @@ class TARSessionStateExporter(SessionStateExporterBase):
         :param stream:
             Byte stream to write to.
 
+        The reports are rendered concurrently, sharing the text of the I/O
+        logs, while the output files of the jobs are added to the archive.
         """
         preset = None
         mem_bytes = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
@@ -63,40 +71,81 @@ class TARSessionStateExporter(SessionStateExporterBase):
         if mem_mib < 1200:
             preset = 0
 
+        exporter_units = self._get_all_exporter_units()
+        # Trim the session up front, the report exporters would otherwise
+        # modify it while the other reports are being rendered
+        self._trim_session_manager(manager)
         job_state_map = manager.default_device_context.state.job_state_map
-        with tarfile.TarFile.open(None, "w:xz", stream, preset=preset) as tar:
-            for fmt in ("html", "json", "junit"):
-                unit = self._get_all_exporter_units()[
-                    "com.canonical.plainbox::{}".format(fmt)
-                ]
-                exporter = Jinja2SessionStateExporter(exporter_unit=unit)
-                with SpooledTemporaryFile(max_size=102400, mode="w+b") as _s:
-                    exporter.dump_from_session_manager(manager, _s)
-                    tarinfo = tarfile.TarInfo(name="submission.{}".format(fmt))
-                    tarinfo.size = _s.tell()
-                    tarinfo.mtime = time.time()
-                    _s.seek(0)  # Need to rewind the file, puagh
-                    tar.addfile(tarinfo, _s)
-            for job_id in manager.default_device_context.state.job_state_map:
-                job_state = job_state_map[job_id]
+        with io_log_text_cache(), ThreadPoolExecutor(
+            max_workers=len(self.REPORT_FORMATS)
+        ) as executor:
+            report_futures = [
+                executor.submit(
+                    self._render_report,
+                    exporter_units["com.canonical.plainbox::{}".format(fmt)],
+                    manager,
+                )
+                for fmt in self.REPORT_FORMATS
+            ]
+            try:
+                with tarfile.TarFile.open(
+                    None, "w:xz", stream, preset=preset
+                ) as tar:
+                    for fmt, future in zip(
+                        self.REPORT_FORMATS, report_futures
+                    ):
+                        with future.result() as _s:
+                            tarinfo = tarfile.TarInfo(
+                                name="submission.{}".format(fmt)
+                            )
+                            tarinfo.size = _s.tell()
+                            tarinfo.mtime = time.time()
+                            _s.seek(0)  # Need to rewind the file, puagh
+                            tar.addfile(tarinfo, _s)
+                    self._add_job_output_files(tar, job_state_map)
+            finally:
+                for future in report_futures:
+                    if future.cancel() or future.exception():
+                        continue
+                    future.result().close()
+
+    @staticmethod
+    def _render_report(exporter_unit, manager):
+        """Render one report to a temporary file and return it."""
+        exporter = Jinja2SessionStateExporter(exporter_unit=exporter_unit)
+        report = SpooledTemporaryFile(max_size=102400, mode="w+b")
+        try:
+            exporter.dump_from_session_manager(manager, report)
+        except BaseException:
+            report.close()
+            raise
+        return report
+
+    @staticmethod
+    def _add_job_output_files(tar, job_state_map):
+        """Add the stdout and stderr files of each job to the archive."""
+        for job_state in job_state_map.values():
+            try:
+                recordname = job_state.result.io_log_filename
+            except AttributeError:
+                continue
+            folder = "test_output"
+            if job_state.job.plugin == "attachment":
+                folder = "attachment_files"
+            for stdstream in ("stdout", "stderr"):
+                filename = get_io_log_companion_filename(recordname, stdstream)
                 try:
-                    recordname = job_state.result.io_log_filename
-                except AttributeError:
-                    continue
-                for stdstream in ("stdout", "stderr"):
-                    filename = recordname.replace("record.gz", stdstream)
-                    folder = "test_output"
-                    if job_state.job.plugin == "attachment":
-                        folder = "attachment_files"
-                    if os.path.exists(filename) and os.path.getsize(filename):
+                    with open(filename, "rb") as output:
+                        tarinfo = tar.gettarinfo(fileobj=output)
+                        if not tarinfo.size:
+                            continue
                         arcname = os.path.basename(filename)
                         if stdstream == "stdout":
                             arcname = os.path.splitext(arcname)[0]
-                        tar.add(
-                            filename,
-                            os.path.join(folder, arcname),
-                            recursive=False,
-                        )
+                        tarinfo.name = os.path.join(folder, arcname)
+                        tar.addfile(tarinfo, output)
+                except FileNotFoundError:
+                    continue
 
     def dump(self, session, stream):
         pass
@@ -27,6 +27,7 @@ from io import BytesIO
 from tempfile import TemporaryDirectory
 from textwrap import dedent
 from unittest import TestCase
+import json
 import os
 
 from plainbox.impl.exporter.jinja2 import Jinja2SessionStateExporter
@@ -165,3 +166,53 @@ class Jinja2SessionStateExporterTests(TestCase):
                 exporter.dump_from_session_manager(
                     self.manager_single_job, stream
                 )
+
+    def test_streaming_json(self):
+        template_filename = "template.json"
+        with TemporaryDirectory() as tmp:
+            tmpl = (
+                "{%- for job_id, job_state in"
+                " manager.state.job_state_map.items() %}"
+                "{%- if job_state.result.iter_io_log_as_flat_text()"
+                " is nonempty %}"
+                '{"io_log": "'
+                "{%- for chunk in job_state.result.iter_io_log_as_flat_text()"
+                " %}{{ chunk | json_string_chunk }}{% endfor %}"
+                '"}'
+                "{%- endif %}"
+                "{%- endfor %}"
+            )
+            pathname = os.path.join(tmp, template_filename)
+            with open(pathname, "w") as f:
+                f.write(tmpl)
+            data = {"template": template_filename, "extra_paths": [tmp]}
+            exporter_unit = mock.Mock(spec=ExporterUnitSupport, data=data)
+            exporter_unit.file_extension = "json"
+            exporter_unit.data_dir = tmp
+            exporter_unit.template = template_filename
+            exporter_unit.option_list = ()
+            exporter = Jinja2SessionStateExporter(
+                origin={
+                    "name": "Checkbox",
+                    "version": "1.0",
+                    "packaging": {"type": "source"},
+                },
+                exporter_unit=exporter_unit,
+            )
+            result = MemoryJobResult(
+                {
+                    "outcome": "fail",
+                    "io_log": [
+                        (0, "stdout", b'<"quoted"> \\ \xc3'),
+                        (0, "stdout", b"\xa9\n"),
+                    ],
+                }
+            )
+            job_state = self.manager_single_job.state.job_state_map["job_id"]
+            job_state.result = result
+            stream = BytesIO()
+            exporter.dump_from_session_manager(self.manager_single_job, stream)
+            self.assertEqual(
+                json.loads(stream.getvalue().decode("UTF-8")),
+                {"io_log": result.io_log_as_flat_text},
+            )
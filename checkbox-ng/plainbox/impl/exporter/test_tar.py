@@ -0,0 +1,108 @@
+# This file is part of Checkbox.
+#
+# Copyright 2024 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+plainbox.impl.exporter.test_tar
+===============================
+
+Test definitions for plainbox.impl.exporter.tar module
+"""
+
+import io
+import json
+import os
+import tarfile
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import mock
+
+from plainbox.abc import IJobResult
+from plainbox.impl.exporter.tar import TARSessionStateExporter
+from plainbox.impl.result import DiskJobResult
+from plainbox.impl.result import MemoryJobResult
+from plainbox.impl.session import SessionManager
+from plainbox.impl.unit.job import JobDefinition
+
+
+class TARExporterTests(TestCase):
+    def setUp(self):
+        self.scratch_dir = TemporaryDirectory()
+        self.addCleanup(self.scratch_dir.cleanup)
+        self.job = JobDefinition({"id": "job_id1", "_summary": "job 1"})
+        self.attachment = JobDefinition(
+            {"id": "dmesg_attachment", "plugin": "attachment"}
+        )
+        io_log_filename = os.path.join(
+            self.scratch_dir.name, "job_id1.record.bin"
+        )
+        with open(io_log_filename, "wb"):
+            pass
+        with open(
+            os.path.join(self.scratch_dir.name, "job_id1.stdout"), "wb"
+        ) as stream:
+            stream.write(b"foo\n")
+        # Empty output files are not included
+        with open(os.path.join(self.scratch_dir.name, "job_id1.stderr"), "wb"):
+            pass
+        self.job_result = DiskJobResult(
+            {
+                "outcome": IJobResult.OUTCOME_PASS,
+                "io_log_filename": io_log_filename,
+            }
+        )
+        self.attachment_result = MemoryJobResult(
+            {
+                "outcome": IJobResult.OUTCOME_PASS,
+                "io_log": [(0, "stdout", b"bar\n")],
+            }
+        )
+        self.session_manager = SessionManager.create()
+        self.addCleanup(self.session_manager.destroy)
+        self.session_manager.add_local_device_context()
+        state = self.session_manager.default_device_context.state
+        state.add_unit(self.job)
+        state.add_unit(self.attachment)
+        state.update_job_result(self.attachment, self.attachment_result)
+        state.job_state_map[self.job.id].result = self.job_result
+
+    def test_dump_from_session_manager(self):
+        stream = io.BytesIO()
+        exporter = TARSessionStateExporter()
+        with mock.patch.object(
+            exporter,
+            "_get_all_exporter_units",
+            wraps=exporter._get_all_exporter_units,
+        ) as mock_units:
+            exporter.dump_from_session_manager(self.session_manager, stream)
+        mock_units.assert_called_once_with()
+        stream.seek(0)
+        with tarfile.open(fileobj=stream, mode="r:xz") as tar:
+            self.assertEqual(
+                tar.getnames(),
+                [
+                    "submission.html",
+                    "submission.json",
+                    "submission.junit",
+                    "test_output/job_id1",
+                ],
+            )
+            self.assertEqual(
+                tar.extractfile("test_output/job_id1").read(), b"foo\n"
+            )
+            submission = json.loads(
+                tar.extractfile("submission.json").read().decode("UTF-8")
+            )
+        self.assertIn("bar", json.dumps(submission["attachment-results"]))
@@ -21,31 +21,102 @@
 
 This module should reduce the time needed to bootstrap a session
 by reusing previously obtained results.
+
+Results are stored by job checksum, so any change to the definition of a job
+makes it miss the cache. Jobs can also declare invalidation inputs (see
+:func:`get_input_fingerprint`) and a time to live. A cached result is only
+used if it is younger than the time to live and if none of the inputs changed
+since it was stored. Entries are read from the disk the first time a job is
+looked up.
 """
 
-import json
+import collections
+import contextlib
 import logging
 import os
+import platform
+import re
 import shutil
+import threading
+import time
+from plainbox.impl.cacheutils import get_cache_path
+from plainbox.impl.cacheutils import load_json_entry
+from plainbox.impl.cacheutils import store_json_entry
 from plainbox.impl.result import DiskJobResult
 from plainbox.i18n import gettext as _
 
 logger = logging.getLogger("plainbox.jobcache")
 
+#: Version of the format of cache entries, bump it when it changes
+CACHE_FORMAT = 1
+
+#: Pattern matched by each invalidation input a job can declare
+CACHE_INPUT_RE = re.compile(r"^(kernel-release|boot-id|env:\w+|/\S*)$")
+
+BOOT_ID_PATH = "/proc/sys/kernel/random/boot_id"
+
+
+def get_input_fingerprint(input_list):
+    """
+    Get the current value of invalidation inputs.
+
+    :param input_list:
+        List of inputs, each one of:
+
+        - ``kernel-release``: release of the running kernel
+        - ``boot-id``: identifier of the current boot
+        - ``env:NAME``: value of the environment variable NAME
+        - an absolute path: size and modification time of that file
+    :returns:
+        A dictionary mapping each input to its (JSON-serializable) value
+    :raises ValueError:
+        If an input is not one of the above
+    """
+    fingerprint = {}
+    for item in input_list:
+        if not CACHE_INPUT_RE.match(item):
+            raise ValueError(_("unknown cache input: {}").format(item))
+        if item == "kernel-release":
+            value = platform.release()
+        elif item == "boot-id":
+            try:
+                with open(BOOT_ID_PATH, "rt") as stream:
+                    value = stream.read().strip()
+            except OSError:
+                value = None
+        elif item.startswith("env:"):
+            value = os.environ.get(item[len("env:") :])
+        else:
+            try:
+                stat = os.stat(item)
+                value = [stat.st_size, stat.st_mtime_ns]
+            except OSError:
+                value = None
+        fingerprint[item] = value
+    return fingerprint
+
 
 class ResourceJobCache:
     """
     Cache storing results of previously run resource jobs
+
+    :attr stats:
+        Counter of cache lookups by outcome: ``hit``, ``miss`` (nothing
+        cached), ``expired`` (older than its time to live) and
+        ``invalidated`` (one of its inputs changed)
     """
 
-    def __init__(self):
-        """
-        Load existing entries from the filesystem
-        """
+    def __init__(self, cache_path=None):
+        self._cache_path = cache_path
+        # Entries read so far, by job checksum (None if there is no entry)
         self._cache = {}
+        self.stats = collections.Counter()
+        # Jobs can be looked up from several threads (parallel bootstrap)
+        self._stats_lock = threading.Lock()
 
     def clear(self):
         logger.debug("Clearing cache")
+        self._cache.clear()
         for root, subdirs, files in os.walk(self._get_cache_path()):
             for subdir in subdirs:
                 try:
@@ -54,94 +125,130 @@ class ResourceJobCache:
                     logger.warning("Failed to clear the cache. %s" % exc)
 
     def load(self):
-        for root, subdirs, files in os.walk(self._get_cache_path()):
-            for subdir in subdirs:
-                self._try_load_cache_entry(os.path.join(root, subdir))
+        """
+        Does nothing, entries are read when they are looked up by get()
+        """
 
-    def get(self, job_checksum, compute_fn):
+    def get(self, job_checksum, compute_fn, input_list=(), ttl=None):
         """
         Get a result from cache or run compute_fn to acquire it.
+
+        :param job_checksum:
+            Checksum of the job
+        :param compute_fn:
+            Function running the job, returning its result
+        :param input_list:
+            Invalidation inputs of the job, see :func:`get_input_fingerprint`
+        :param ttl:
+            Number of seconds a cached result can be used for, None if it
+            doesn't expire
+
         Return a pair containing:
             - a bool signifying whether the result was found in cache
             - a DiskJobResult object with the result
         """
-        in_cache = job_checksum in self._cache.keys()
-        if not in_cache:
+        try:
+            fingerprint = get_input_fingerprint(input_list)
+        except ValueError as exc:
+            logger.warning(_("Not caching job %s. %s"), job_checksum, exc)
+            return False, compute_fn()
+        entry = self._lookup(job_checksum)
+        if entry is None:
             logger.debug(_("%s not found in cache"), job_checksum)
-            result = compute_fn().get_builder().as_dict()
-            self._store(job_checksum, result.copy())
+            self._count("miss")
+        elif ttl is not None and time.time() - entry["created"] > ttl:
+            logger.debug(_("%s expired in cache"), job_checksum)
+            self._count("expired")
+        elif entry["inputs"] != fingerprint:
+            logger.debug(_("%s invalidated in cache"), job_checksum)
+            self._count("invalidated")
         else:
             logger.info(_("%s found in cache"), job_checksum)
-            result = self._cache[job_checksum]
-        return in_cache, DiskJobResult(result)
+            self._count("hit")
+            return True, DiskJobResult(entry["result"])
+        result = compute_fn().get_builder().as_dict()
+        self._store(job_checksum, result.copy(), fingerprint)
+        return False, DiskJobResult(result)
+
+    def _count(self, outcome):
+        with self._stats_lock:
+            self.stats[outcome] += 1
+
+    def _lookup(self, job_checksum):
+        if job_checksum not in self._cache:
+            self._cache[job_checksum] = self._try_load_cache_entry(
+                os.path.join(self._get_cache_path(), job_checksum)
+            )
+        return self._cache[job_checksum]
 
     def _try_load_cache_entry(self, job_cache_path):
         job_checksum = os.path.basename(job_cache_path)
         logger.debug(_("Loading cache entry %s"), job_checksum)
         try:
-            with open(
-                os.path.join(job_cache_path, "result.json"), "rb"
-            ) as result_file:
-                data = result_file.read()
-                cache_entry = json.loads(data.decode("UTF-8"))
-                if not os.path.exists(cache_entry["io_log_filename"]):
-                    logger.warning(
-                        _("Error loading cache entry. Missing %s"),
-                        cache_entry["io_log_filename"],
-                    )
-                    return
-                logger.debug(_("Cache entry %s loaded"), job_checksum)
-                self._cache[job_checksum] = cache_entry
+            cache_entry = load_json_entry(
+                os.path.join(job_cache_path, "result.json")
+            )
         except Exception as exc:
-            logger.warrning(_("Error loading cache entry. %s"), exc)
+            logger.warning(_("Error loading cache entry. %s"), exc)
+            return None
+        if cache_entry is None:
+            return None
+        if cache_entry.get("format") != CACHE_FORMAT:
+            logger.debug(_("Ignoring outdated cache entry %s"), job_checksum)
+            return None
+        io_log_filename = cache_entry["result"]["io_log_filename"]
+        if not os.path.exists(io_log_filename):
+            logger.warning(
+                _("Error loading cache entry. Missing %s"), io_log_filename
+            )
+            return None
+        logger.debug(_("Cache entry %s loaded"), job_checksum)
+        return cache_entry
 
     def _get_cache_path(self):
-        suc = os.environ.get("SNAP_USER_COMMON")
-        if suc:
-            return os.path.join(
-                suc, ".cache", "plainbox", "resource_job_cache"
-            )
-        xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
-        if not xdg_cache_home:
-            xdg_cache_home = os.path.join(os.path.expanduser("~"), ".cache")
-        return os.path.join(xdg_cache_home, "plainbox", "resource_job_cache")
+        return self._cache_path or get_cache_path("resource_job_cache")
 
-    def _store(self, job_checksum, result):
+    def _store(self, job_checksum, result, fingerprint):
         logger.info(
             _("Caching job result for job with checksum %s"), job_checksum
         )
         job_cache_path = os.path.join(self._get_cache_path(), job_checksum)
-        if os.path.exists(job_cache_path):
-            # this can happen if the loading failed, so let's clear the path
-            try:
-                shutil.rmtree(job_cache_path)
-            except Exception as exc:
-                logger.warning(
-                    _("Failed to remove path in Resource Cache: %s %s"),
-                    job_cache_path,
-                    exc,
-                )
-                return
-        os.makedirs(job_cache_path)
         cached_io_log_path = os.path.join(
             job_cache_path, os.path.basename(result["io_log_filename"])
         )
-        shutil.copyfile(result["io_log_filename"], cached_io_log_path)
+        try:
+            os.makedirs(job_cache_path, exist_ok=True)
+            self._link_or_copy(result["io_log_filename"], cached_io_log_path)
+        except OSError as exc:
+            logger.warning(
+                _("Failed to store cache entry in %s. %s"),
+                job_cache_path,
+                exc,
+            )
+            return
         result["io_log_filename"] = cached_io_log_path
-        data = json.dumps(
-            result,
-            ensure_ascii=False,
-            sort_keys=True,
-            indent=None,
-            separators=(",", ":"),
-        ).encode("UTF-8")
-        with open(
-            os.path.join(job_cache_path, "result.json"), "wb"
-        ) as result_file:
-            result_file.write(data)
-        logger.debug(
-            _("Wrote %s to %s"),
-            data,
-            os.path.join(job_cache_path, "result.json"),
-        )
-        self._cache[job_checksum] = result
+        cache_entry = {
+            "format": CACHE_FORMAT,
+            "created": time.time(),
+            "inputs": fingerprint,
+            "result": result,
+        }
+        result_path = os.path.join(job_cache_path, "result.json")
+        try:
+            store_json_entry(result_path, cache_entry)
+        except (OSError, TypeError, ValueError) as exc:
+            logger.warning(_("Failed to store cache entry. %s"), exc)
+            return
+        logger.debug(_("Wrote %s to %s"), cache_entry, result_path)
+        self._cache[job_checksum] = cache_entry
+
+    @staticmethod
+    def _link_or_copy(src, dst):
+        # A hard link is free and keeps the log around when the session that
+        # produced it is deleted. Copy it if the cache is on another device.
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
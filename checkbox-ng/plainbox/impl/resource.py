@@ -27,6 +27,7 @@
     THIS MODULE DOES NOT HAVE STABLE PUBLIC API
 """
 
+from functools import lru_cache
 import ast
 import sys
 import itertools
@@ -568,11 +569,6 @@ class ResourceExpression:
             else:
                 self._resource_id_list.append(resource_alias)
         self._text = text
-        self._lambda = eval(
-            "lambda {}: {}".format(
-                ", ".join(self._resource_alias_list), self._text
-            )
-        )
 
     def __str__(self):
         return self._text
@@ -644,91 +640,19 @@ class ResourceExpression:
         Each subsequent resource from the list will be bound to the resource
         id in the expression. The return value is True if any of the attempts
         return a true value, otherwise the result is False.
-        """
-        # in compound expressions 'and' takes precedence over 'or' so because
-        # we're recursively evaluating, we need to first evaluate the ors so
-        # ands become the leaves in the tree and are actually computed first
-
-        # operator by itself may be a part of some identifier so let's
-        # look for one surrounded by spaced
-
-        # if parenthesis are used in the expression then there's a high chance
-        # we'll break the syntax with a bruteforce split on operator. Let's
-        # not do a split on exprs with parenthesis
-        if not "(" in self._text:
-            or_pos = self._text.rfind(" or ")
-            if or_pos > 0:
-                lhs, rhs = self._split_and_evaluate(" or ", resource_map)
-                return lhs or rhs
-            and_pos = self._text.rfind(" and ")
-            if and_pos > 0:
-                lhs, rhs = self._split_and_evaluate(" and ", resource_map)
-                return lhs and rhs
-
-        # there are no conjuctions, so let's do a simple evaluation
-        for resource_list in resource_list_list:
-            for resource in resource_list:
-                if not isinstance(resource, Resource):
-                    raise TypeError(
-                        "Each resource must be a Resource instance"
-                    )
-        # Try each resource in sequence.
-        for resource_pack in itertools.product(*resource_list_list):
-            # Attempt to evaluate the code with the current resource
-            try:
-                result = self._lambda(*resource_pack)
-            except Exception as exc:
-                # Treat any exception as a non-fatal error
-                #
-                # XXX: it would be interesting to see if we have exceptions and
-                # why they happen.  We could do deeper validation this way.
-                logger.debug(
-                    _(
-                        "Exception in requirement expression %r (with %s=%r):"
-                        " %r"
-                    ),
-                    self._text,
-                    self._resource_id_list,
-                    resource_pack,
-                    exc,
-                )
-                continue
-            # Treat any true result as a success
-            if result:
-                logger.debug(
-                    _("Requirement %r matched (with %s=%r)"),
-                    self._text,
-                    self._resource_id_list,
-                    resource_pack,
-                )
-                return True
-        # If we get here then the expression did not match. It's pointless (as
-        # python returns None implicitly) but it's more explicit on the
-        # documentation side.
-        return False
 
-    def _split_and_evaluate(self, operator, resource_map):
-        head, tail = self._text.rsplit(operator, 1)
-        head_expr = ResourceExpression(
-            head, self._implicit_namespace, self._imports
-        )
-        new_res_list = [
-            resource_map[rid] for rid in head_expr.resource_id_list
-        ]
-        head_result = head_expr.evaluate(
-            *new_res_list, resource_map=resource_map
-        )
-        tail = tail.strip()
-        tail_expr = ResourceExpression(
-            tail, self._implicit_namespace, self._imports
-        )
-        new_res_list = [
-            resource_map[rid] for rid in tail_expr.resource_id_list
-        ]
-        tail_result = tail_expr.evaluate(
-            *new_res_list, resource_map=resource_map
+        .. note::
+            The ``resource_map`` argument is no longer needed to evaluate
+            compound expressions. Sub-expressions are bound to resources
+            using the resource lists passed as positional arguments. It is
+            still accepted for compatibility.
+        """
+        tree = _compile_expression_tree(self._text)
+        if isinstance(tree, _ExpressionLeaf):
+            return tree.evaluate_lists(resource_list_list)
+        return tree.evaluate(
+            dict(zip(self._resource_alias_list, resource_list_list))
         )
-        return (head_result, tail_result)
 
     @classmethod
     def _analyze(cls, text):
@@ -783,6 +707,316 @@ class ResourceExpression:
             ]
 
 
+class ResourceList(list):
+    """
+    A list of Resource objects that can keep indexes of its records.
+
+    Resource lists stored in the session are replaced, not modified, when
+    the resource job that produced them runs again. This allows the lists to
+    keep (lazily computed) indexes of resource records by the value of an
+    attribute, used to evaluate equality tests such as ``package.name ==
+    'fwts'`` without looking at every record. Indexes are discarded if the
+    length of the list changes.
+    """
+
+    def get_index(self, attr):
+        """
+        Get records indexed by the value of the given attribute.
+
+        :param attr:
+            Name of the attribute (field of the resource record)
+        :returns:
+            A tuple (index, unhashable) where index maps each (hashable)
+            attribute value to the list of records with that value and
+            unhashable is the list of records that could not be indexed.
+        """
+        if getattr(self, "_index_len", None) != len(self):
+            self._index_map = {}
+            self._index_len = len(self)
+        try:
+            return self._index_map[attr]
+        except KeyError:
+            pass
+        index = {}
+        unhashable = []
+        for resource in self:
+            value = getattr(resource, attr)
+            try:
+                index.setdefault(value, []).append(resource)
+            except TypeError:
+                unhashable.append(resource)
+        self._index_map[attr] = (index, unhashable)
+        return self._index_map[attr]
+
+
+class _Conjunct:
+    """
+    One of the terms of a leaf expression joined with 'and'.
+
+    Conjuncts are evaluated against the resources they reference and nothing
+    more. Conjuncts that test a single resource attribute for equality with a
+    literal can be evaluated with a :class:`ResourceList` index.
+    """
+
+    def __init__(self, node, alias_list):
+        names = {
+            child.id for child in ast.walk(node) if isinstance(child, ast.Name)
+        }
+        self.alias_list = [alias for alias in alias_list if alias in names]
+        self._code = compile(ast.Expression(body=node), "<requires>", "eval")
+        self.index_attr = None
+        self.index_value = None
+        if (
+            isinstance(node, ast.Compare)
+            and len(node.ops) == 1
+            and isinstance(node.ops[0], ast.Eq)
+        ):
+            for attr_node, value_node in (
+                (node.left, node.comparators[0]),
+                (node.comparators[0], node.left),
+            ):
+                if (
+                    isinstance(attr_node, ast.Attribute)
+                    and isinstance(attr_node.value, ast.Name)
+                    and attr_node.value.id in self.alias_list
+                    and not attr_node.attr.startswith("_")
+                ):
+                    try:
+                        value = ast.literal_eval(value_node)
+                        hash(value)
+                    except (ValueError, TypeError, SyntaxError):
+                        continue
+                    self.index_attr = attr_node.attr
+                    self.index_value = value
+                    break
+
+    def matches(self, resource_by_alias):
+        return bool(eval(self._code, _EVAL_GLOBALS, resource_by_alias))
+
+
+class _ExpressionLeaf:
+    """
+    Compiled expression that is evaluated against combinations of resources.
+
+    Leaves are expressions that are not split into sub-expressions any
+    further. A leaf is true if there is a combination of resources (one
+    record of each resource it references) for which the expression is true.
+    Exceptions are treated as false results.
+
+    The top-level 'and' of the expression is decomposed into conjuncts. Each
+    resource list is filtered by the conjuncts that only reference that
+    resource (using indexes when possible) and products of resources are
+    only taken for resources that are correlated by a conjunct.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.alias_list = ResourceExpression._analyze(text)
+        self._lambda = eval(
+            "lambda {}: {}".format(", ".join(self.alias_list), text)
+        )
+        body = ast.parse(text).body
+        if (
+            len(body) == 1
+            and isinstance(body[0].value, ast.BoolOp)
+            and isinstance(body[0].value.op, ast.And)
+        ):
+            node_list = body[0].value.values
+        elif len(body) == 1:
+            node_list = [body[0].value]
+        else:
+            node_list = None
+        if node_list is not None:
+            # Conjuncts that can use an index go first, they are the cheapest
+            # way to reduce the number of candidate resources
+            self._conjunct_list = sorted(
+                (_Conjunct(node, self.alias_list) for node in node_list),
+                key=lambda conjunct: conjunct.index_attr is None,
+            )
+        else:
+            self._conjunct_list = None
+
+    def evaluate(self, resource_lists_by_alias):
+        return self.evaluate_lists(
+            [resource_lists_by_alias[alias] for alias in self.alias_list]
+        )
+
+    def evaluate_lists(self, resource_list_list):
+        for resource_list in resource_list_list:
+            for resource in resource_list:
+                if not isinstance(resource, Resource):
+                    raise TypeError(
+                        "Each resource must be a Resource instance"
+                    )
+        if self._conjunct_list is None or len(resource_list_list) != len(
+            self.alias_list
+        ):
+            return self._evaluate_product(resource_list_list)
+        candidates = dict(zip(self.alias_list, resource_list_list))
+        correlated_list = []
+        for conjunct in self._conjunct_list:
+            if len(conjunct.alias_list) == 1:
+                alias = conjunct.alias_list[0]
+                candidates[alias] = self._filter(
+                    conjunct, alias, candidates[alias]
+                )
+            elif not conjunct.alias_list:
+                # Conjuncts that don't reference any resource are either true
+                # or false (or raise) for all the combinations of resources
+                if not self._matches(conjunct, {}):
+                    return False
+            else:
+                correlated_list.append(conjunct)
+        if not all(candidates.values()):
+            return False
+        # Group resources that are correlated by some conjunct and check that
+        # each group has a matching combination of resources
+        for group, conjunct_list in self._group(correlated_list):
+            for resource_pack in itertools.product(
+                *[candidates[alias] for alias in group]
+            ):
+                resource_by_alias = dict(zip(group, resource_pack))
+                if all(
+                    self._matches(conjunct, resource_by_alias)
+                    for conjunct in conjunct_list
+                ):
+                    break
+            else:
+                return False
+        logger.debug(_("Requirement %r matched"), self.text)
+        return True
+
+    def _filter(self, conjunct, alias, resource_list):
+        if conjunct.index_attr is not None and isinstance(
+            resource_list, ResourceList
+        ):
+            index, unhashable = resource_list.get_index(conjunct.index_attr)
+            matching = index.get(conjunct.index_value, [])
+            if not unhashable:
+                return matching
+            resource_list = matching + unhashable
+        return [
+            resource
+            for resource in resource_list
+            if self._matches(conjunct, {alias: resource})
+        ]
+
+    def _group(self, conjunct_list):
+        group_list = []
+        for conjunct in conjunct_list:
+            group = set(conjunct.alias_list)
+            members = [conjunct]
+            for other in group_list[:]:
+                if other[0] & group:
+                    group |= other[0]
+                    members.extend(other[1])
+                    group_list.remove(other)
+            group_list.append((group, members))
+        for group, members in group_list:
+            yield (
+                [alias for alias in self.alias_list if alias in group],
+                members,
+            )
+
+    def _matches(self, conjunct, resource_by_alias):
+        try:
+            return conjunct.matches(resource_by_alias)
+        except Exception as exc:
+            # Treat any exception as a non-fatal error
+            logger.debug(
+                _("Exception in requirement expression %r (with %r):" " %r"),
+                self.text,
+                resource_by_alias,
+                exc,
+            )
+            return False
+
+    def _evaluate_product(self, resource_list_list):
+        # Try each resource in sequence.
+        for resource_pack in itertools.product(*resource_list_list):
+            # Attempt to evaluate the code with the current resource
+            try:
+                result = self._lambda(*resource_pack)
+            except Exception as exc:
+                # Treat any exception as a non-fatal error
+                #
+                # XXX: it would be interesting to see if we have exceptions and
+                # why they happen.  We could do deeper validation this way.
+                logger.debug(
+                    _(
+                        "Exception in requirement expression %r (with %s=%r):"
+                        " %r"
+                    ),
+                    self.text,
+                    self.alias_list,
+                    resource_pack,
+                    exc,
+                )
+                continue
+            # Treat any true result as a success
+            if result:
+                logger.debug(
+                    _("Requirement %r matched (with %s=%r)"),
+                    self.text,
+                    self.alias_list,
+                    resource_pack,
+                )
+                return True
+        return False
+
+
+class _ExpressionBoolOp:
+    """
+    Compiled expression that combines two sub-expressions with and/or.
+
+    Each side is evaluated independently (against its own resources) and the
+    results are combined with short-circuiting.
+    """
+
+    def __init__(self, operator, head, tail):
+        self.operator = operator
+        self.head = head
+        self.tail = tail
+
+    def evaluate(self, resource_lists_by_alias):
+        head_result = self.head.evaluate(resource_lists_by_alias)
+        if self.operator == "or":
+            return head_result or self.tail.evaluate(resource_lists_by_alias)
+        return head_result and self.tail.evaluate(resource_lists_by_alias)
+
+
+@lru_cache(maxsize=None)
+def _compile_expression_tree(text):
+    """
+    Compile the text of a resource expression into an evaluation tree.
+
+    The tree only depends on the text of the expression, resources are bound
+    to leaves by their alias when the tree is evaluated, so that it can be
+    shared by all the expressions with the same text and compiled only once.
+
+    In compound expressions 'and' takes precedence over 'or' so the text is
+    split on the last 'or' first, making the 'and' sub-expressions leaves
+    deeper in the tree. Operators are only recognized when surrounded by
+    spaces as they may be a part of some identifier. If parenthesis are used
+    in the expression then there's a high chance we'll break the syntax with
+    a bruteforce split on operator, so such expressions are never split.
+    """
+    if "(" not in text:
+        for operator in (" or ", " and "):
+            if text.rfind(operator) > 0:
+                head, tail = text.rsplit(operator, 1)
+                return _ExpressionBoolOp(
+                    operator.strip(),
+                    _compile_expression_tree(head),
+                    _compile_expression_tree(tail.strip()),
+                )
+    return _ExpressionLeaf(text)
+
+
+# Global namespace in which compiled expressions are evaluated
+_EVAL_GLOBALS = globals()
+
+
 def parse_imports_stmt(imports):
     """
     Parse the 'imports' line and compute the imported symbols.
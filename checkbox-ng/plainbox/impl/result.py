@@ -28,6 +28,7 @@ This module has two basic implementation of :class:`IJobResult`:
 """
 
 import base64
+import bisect
 import codecs
 import gzip
 import inspect
@@ -35,6 +36,9 @@ import io
 import json
 import logging
 import re
+import struct
+import zlib
+from contextlib import contextmanager
 from contextlib import suppress
 from collections import namedtuple
 
@@ -77,6 +81,86 @@ ANSI_ESCAPE_SEQ_RE_STR = re.compile(r"(\x9B|\x1B\[)[0-?]*[ -\/]*[@-~]")
 #   data - the actual IO seen (bytes)
 IOLogRecord = namedtuple("IOLogRecord", "delay stream_name data".split())
 
+# Text conversions of I/O logs, see io_log_text_cache(). Job results are not
+# hashable, so the cache maps (id(result), kind) to a (result, text) tuple.
+# Keeping the result in the entry ensures its id is not reused by another
+# object while the cache is active.
+_io_log_text_cache = None
+
+#: Largest text (in characters) that the iter_io_log_as_*() methods of job
+#: results keep in the I/O log text cache. Longer texts are produced again on
+#: each use so that streaming exporters never hold them in memory.
+IO_LOG_TEXT_CACHE_MAX_CHARS = 64 * 1024
+
+#: Number of bytes encoded at a time by iter_base64_chunks() (a multiple of 3
+#: so that chunks can be concatenated without padding in between)
+BASE64_CHUNK_SIZE = 3 * 64 * 1024
+
+
+@contextmanager
+def io_log_text_cache():
+    """
+    Context manager that caches text conversions of I/O logs.
+
+    While the context is active the :attr:`io_log_as_flat_text` and
+    :attr:`io_log_as_text_attachment` properties of each job result are
+    computed once, instead of reading the I/O log again on each access. This
+    is meant for exporters that render the same session several times. The
+    cache is discarded when the (outermost) context ends.
+
+    The ``iter_io_log_as_*()`` methods also use the cache but only remember
+    texts shorter than :data:`IO_LOG_TEXT_CACHE_MAX_CHARS`.
+    """
+    global _io_log_text_cache
+    if _io_log_text_cache is not None:
+        yield
+        return
+    _io_log_text_cache = {}
+    try:
+        yield
+    finally:
+        _io_log_text_cache = None
+
+
+def iter_base64_chunks(data_iter, chunk_size=BASE64_CHUNK_SIZE):
+    """
+    Encode a sequence of bytes objects to base64, incrementally.
+
+    :param data_iter:
+        An iterable of bytes objects
+    :param chunk_size:
+        Approximate number of input bytes encoded at a time
+    :returns:
+        A generator of ASCII strings that, concatenated, are equal to the
+        base64 encoding of all the data.
+
+    >>> list(iter_base64_chunks([b'fo', b'ob', b'ar!'], chunk_size=3))
+    ['Zm9v', 'YmFy', 'IQ==']
+    """
+    buf = bytearray()
+    for data in data_iter:
+        buf += data
+        if len(buf) >= chunk_size:
+            cut = len(buf) - len(buf) % 3
+            yield base64.standard_b64encode(buf[:cut]).decode("ASCII")
+            del buf[:cut]
+    if buf:
+        yield base64.standard_b64encode(buf).decode("ASCII")
+
+
+# Layout of binary I/O log files, see BinaryIOLogRecordWriter
+BINARY_IO_LOG_MAGIC = b"\x89PBIOLOG"
+_BINARY_IO_LOG_INDEX_MAGIC = b"PBIOLIDX"
+_BLOCK_HEADER = struct.Struct(">BII")
+_BLOCK_STORED = 0
+_BLOCK_ZLIB = 1
+_BLOCK_END = 0xFF
+_RECORD_HEADER = struct.Struct(">dBI")
+_STREAM_NAMES = ("stdout", "stderr")
+_STREAM_NAMED = 0xFF
+_INDEX_ENTRY = struct.Struct(">QQ")
+_INDEX_FOOTER = struct.Struct(">QI8s")
+
 
 # Tuple representing meta-data associated with each possible value of "outcome"
 #
@@ -211,6 +295,39 @@ def outcome_meta(outcome):
     return OUTCOME_METADATA_MAP[outcome]
 
 
+def get_resource_usage(rusage):
+    """
+    Get the resource usage of a job from the usage of its process.
+
+    :param rusage:
+        A :class:`resource.struct_rusage` of the process of the job (see
+        :func:`os.wait4()`). It covers the job process and the descendants
+        that were waited for. Orphaned or daemonised children are not
+        counted.
+    :returns:
+        A dictionary with the following keys:
+
+        - ``cpu_user``: user CPU time in seconds
+        - ``cpu_system``: system CPU time in seconds
+        - ``max_rss``: maximum resident set size in kilobytes, of the
+          largest of these processes. The job process is forked from
+          Checkbox so this is never less than the size of Checkbox itself.
+        - ``block_input`` and ``block_output``: number of block I/O
+          operations
+        - ``voluntary_ctx_switches`` and ``involuntary_ctx_switches``:
+          number of context switches
+    """
+    return {
+        "cpu_user": rusage.ru_utime,
+        "cpu_system": rusage.ru_stime,
+        "max_rss": rusage.ru_maxrss,
+        "block_input": rusage.ru_inblock,
+        "block_output": rusage.ru_oublock,
+        "voluntary_ctx_switches": rusage.ru_nvcsw,
+        "involuntary_ctx_switches": rusage.ru_nivcsw,
+    }
+
+
 class JobResultBuilder(pod.POD):
     """A builder for job result objects."""
 
@@ -253,6 +370,13 @@ class JobResultBuilder(pod.POD):
         pod.UNSET,
         assign_filter_list=[pod.unset_or_typed],
     )
+    resource_usage = pod.Field(
+        "resources used by the (optional) test process, see"
+        " get_resource_usage()",
+        dict,
+        pod.UNSET,
+        assign_filter_list=[pod.unset_or_typed],
+    )
 
     def add_comment(self, comment):
         """
@@ -397,10 +521,46 @@ class _JobResultBase(IJobResult):
         """return code of the command associated with the job, if any."""
         return self._data.get("return_code")
 
+    @property
+    def resource_usage(self):
+        """
+        Resources used by the command associated with the job, if any.
+
+        See :func:`get_resource_usage()` for the keys of this dictionary.
+        """
+        return self._data.get("resource_usage")
+
+    @property
+    def cpu_time(self):
+        """
+        CPU time (user and system) in seconds used by the command associated
+        with the job, if known.
+        """
+        resource_usage = self._data.get("resource_usage")
+        if resource_usage is None:
+            return None
+        return resource_usage["cpu_user"] + resource_usage["cpu_system"]
+
     @property
     def io_log(self):
         return tuple(self.get_io_log())
 
+    def get_io_log_data(self, stream_name="stdout"):
+        """
+        Compute and return the data written to one of the I/O streams.
+
+        :param stream_name:
+            Name of the stream, typically "stdout" or "stderr"
+        :returns:
+            A sequence of bytes objects, the data portion of each
+            :class:`IOLogRecord` for that stream, in order.
+        """
+        return (
+            record.data
+            for record in self.get_io_log()
+            if record.stream_name == stream_name
+        )
+
     @property
     def io_log_as_flat_text(self):
         """
@@ -427,15 +587,35 @@ class _JobResultBase(IJobResult):
         >>> result.io_log_as_flat_text
         '�'
         """
-        return "".join(
-            CONTROL_CODE_RE_STR.sub("", text_chunk)
-            for text_chunk in codecs.iterdecode(
-                (record.data for record in self.get_io_log()),
-                "UTF-8",
-                "replace",
-            )
+        return self._get_cached_io_log_text(
+            "flat_text", lambda: "".join(self._iter_flat_text_chunks())
+        )
+
+    def iter_io_log_as_flat_text(self):
+        """
+        Generate :attr:`io_log_as_flat_text` piece by piece.
+
+        This is meant for exporters that write the text to a stream and
+        don't want to keep the whole I/O log in memory.
+
+        >>> result = MemoryJobResult({'io_log': [
+        ...            (0, 'stdout', b'foo\\n'),
+        ...            (1, 'stderr', b'bar\\n')]})
+        >>> list(result.iter_io_log_as_flat_text())
+        ['foo\\n', 'bar\\n']
+        """
+        return self._iter_cached_io_log_text(
+            "flat_text", self._iter_flat_text_chunks
         )
 
+    def _iter_flat_text_chunks(self):
+        for text_chunk in codecs.iterdecode(
+            (record.data for record in self.get_io_log()), "UTF-8", "replace"
+        ):
+            text_chunk = CONTROL_CODE_RE_STR.sub("", text_chunk)
+            if text_chunk:
+                yield text_chunk
+
     @property
     def io_log_as_text_attachment(self):
         """
@@ -453,21 +633,92 @@ class _JobResultBase(IJobResult):
             encoding) with Unicode control characters removed, if possible, or
             an empty string otherwise.
         """
+        return self._get_cached_io_log_text(
+            "text_attachment", self._compute_io_log_as_text_attachment
+        )
+
+    def iter_io_log_as_text_attachment(self):
+        """
+        Generate :attr:`io_log_as_text_attachment` piece by piece.
+
+        The stdout data is read twice: once to check that it can be decoded
+        at all (nothing is generated otherwise) and once to generate the text.
+        """
+        return self._iter_cached_io_log_text(
+            "text_attachment", self._iter_text_attachment_chunks
+        )
+
+    def _iter_text_attachment_chunks(self):
+        decoder = codecs.getincrementaldecoder("UTF-8")()
+        try:
+            for data in self.get_io_log_data("stdout"):
+                decoder.decode(data)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return
+        for text_chunk in codecs.iterdecode(
+            self.get_io_log_data("stdout"), "UTF-8"
+        ):
+            text_chunk = CONTROL_CODE_RE_STR.sub("", text_chunk)
+            if text_chunk:
+                yield text_chunk
+
+    def _compute_io_log_as_text_attachment(self):
         try:
             return "".join(
                 CONTROL_CODE_RE_STR.sub("", text_chunk)
                 for text_chunk in codecs.iterdecode(
-                    (
-                        record.data
-                        for record in self.get_io_log()
-                        if record[1] == "stdout"
-                    ),
-                    "UTF-8",
+                    self.get_io_log_data("stdout"), "UTF-8"
                 )
             )
         except UnicodeDecodeError:
             return ""
 
+    def _get_cached_io_log_text(self, kind, compute_fn):
+        """
+        Get a text conversion of the I/O log, see :func:`io_log_text_cache`.
+        """
+        cache = _io_log_text_cache
+        if cache is None:
+            return compute_fn()
+        key = (id(self), kind)
+        try:
+            return cache[key][1]
+        except KeyError:
+            text = compute_fn()
+            cache[key] = (self, text)
+            return text
+
+    def _iter_cached_io_log_text(self, kind, chunk_fn):
+        """
+        Generate a text conversion of the I/O log, using the cache if active.
+
+        Short texts are remembered in the cache once fully generated, see
+        :data:`IO_LOG_TEXT_CACHE_MAX_CHARS`.
+        """
+        cache = _io_log_text_cache
+        if cache is None:
+            yield from chunk_fn()
+            return
+        key = (id(self), kind)
+        if key in cache:
+            text = cache[key][1]
+            if text:
+                yield text
+            return
+        kept = []
+        kept_size = 0
+        for text_chunk in chunk_fn():
+            if kept is not None:
+                kept_size += len(text_chunk)
+                if kept_size <= IO_LOG_TEXT_CACHE_MAX_CHARS:
+                    kept.append(text_chunk)
+                else:
+                    kept = None
+            yield text_chunk
+        if kept is not None:
+            cache[key] = (self, "".join(kept))
+
     @property
     def img_type(self):
         """
@@ -477,7 +728,7 @@ class _JobResultBase(IJobResult):
             io_log_filename = self.io_log_filename
         except AttributeError:
             return ""
-        filename = io_log_filename.replace("record.gz", "stdout")
+        filename = get_io_log_companion_filename(io_log_filename, "stdout")
 
         with suppress(ImportError):
             import imghdr  # removed since python3.13
@@ -493,14 +744,25 @@ class _JobResultBase(IJobResult):
 
     @property
     def io_log_as_base64(self):
+        return "".join(self.iter_io_log_as_base64())
+
+    def iter_io_log_as_base64(self):
+        """
+        Generate the base64 encoding of the stdout file piece by piece.
+
+        Nothing is generated for results that don't store their I/O log
+        on disk.
+        """
         try:
             io_log_filename = self.io_log_filename
         except AttributeError:
-            return ""
-        filename = io_log_filename.replace("record.gz", "stdout")
-        with open(filename, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read())
-        return encoded_string.decode("ASCII")
+            return
+        filename = get_io_log_companion_filename(io_log_filename, "stdout")
+        with open(filename, "rb") as stream:
+            yield from iter_base64_chunks(
+                iter(lambda: stream.read(BASE64_CHUNK_SIZE), b""),
+                BASE64_CHUNK_SIZE,
+            )
 
     @property
     def is_hollow(self):
@@ -557,16 +819,37 @@ class DiskJobResult(_JobResultBase):
         return self._data.get("io_log_filename")
 
     def get_io_log(self):
+        return self._read_io_log()
+
+    def get_io_log_data(self, stream_name="stdout"):
+        return (record.data for record in self._read_io_log(stream_name))
+
+    def _read_io_log(self, stream_name=None):
+        """
+        Read records from the I/O log file.
+
+        Both the binary format and the legacy, gzip-compressed JSON format are
+        supported. Only the binary format can skip records of other streams
+        without decoding them.
+        """
         record_path = self.io_log_filename
-        if record_path:
+        if not record_path:
+            return
+        with open(record_path, "rb") as stream:
+            magic = stream.read(len(BINARY_IO_LOG_MAGIC))
+            stream.seek(0)
+            if magic == BINARY_IO_LOG_MAGIC:
+                reader = BinaryIOLogRecordReader(stream)
+                yield from reader.iter_records(stream_name=stream_name)
+                return
             with gzip.GzipFile(
-                record_path, mode="rb"
+                fileobj=stream, mode="rb"
             ) as gzip_stream, io.TextIOWrapper(
                 gzip_stream, encoding="UTF-8"
-            ) as stream:
-                for record in IOLogRecordReader(stream):
-                    record = IOLogRecord(record[0], record[1], record.data)
-                    yield record
+            ) as text_stream:
+                for record in IOLogRecordReader(text_stream):
+                    if stream_name is None or record[1] == stream_name:
+                        yield record
 
     @property
     def io_log(self):
@@ -648,3 +931,251 @@ class IOLogRecordReader:
             if record is None:
                 break
             yield record
+
+
+class BinaryIOLogRecordWriter:
+    """
+    Class for writing :class:`IOLogRecord` instances to a binary stream.
+
+    The binary format is a more compact replacement of the format used by
+    :class:`IOLogRecordWriter`. It looks like this::
+
+        file   := MAGIC block* [end index footer]
+        block  := codec:u8 size:u32 count:u32 data[size]
+        end    := 0xFF:u8 0:u32 0:u32
+        record := delay:f64 stream:u8 size:u32 [name] payload[size]
+        index  := (offset:u64 first_record:u64)*
+        footer := index_offset:u64 block_count:u32 "PBIOLIDX"
+
+    Records are buffered and written in blocks of up to about ``block_size``
+    bytes, each block is either stored as-is or compressed with zlib. A
+    stream identifier of 0 stands for stdout, 1 for stderr and 0xFF for a
+    stream whose name (length:u8 followed by UTF-8 text) comes right after the
+    record header. All integers are big-endian.
+
+    The index, written by :meth:`finish()`, maps blocks to their offset in the
+    file (counted from the start of the magic string) and to the number of
+    the first record they hold, it allows random access to records. A file
+    without the index (for instance one that is still being written) can be
+    read sequentially.
+    """
+
+    def __init__(self, stream, compress=True, block_size=65536):
+        """
+        Initialize a new writer.
+
+        :param stream:
+            A binary stream to write to
+        :param compress:
+            If True (the default) blocks are compressed with zlib
+        :param block_size:
+            Approximate size of the (uncompressed) blocks
+        """
+        self.stream = stream
+        self.compress = compress
+        self.block_size = block_size
+        self._buffer = bytearray()
+        self._buffer_count = 0
+        self._record_count = 0
+        self._offset = 0
+        self._index = []
+        self._write(BINARY_IO_LOG_MAGIC)
+
+    def _write(self, data):
+        self.stream.write(data)
+        self._offset += len(data)
+
+    def close(self):
+        self.finish()
+        self.stream.close()
+
+    def write_record(self, record):
+        """Write an :class:`IOLogRecord` to the stream."""
+        delay, stream_name, data = record
+        try:
+            stream_id = _STREAM_NAMES.index(stream_name)
+        except ValueError:
+            stream_id = _STREAM_NAMED
+        self._buffer += _RECORD_HEADER.pack(delay, stream_id, len(data))
+        if stream_id == _STREAM_NAMED:
+            name = stream_name.encode("UTF-8")
+            self._buffer.append(len(name))
+            self._buffer += name
+        self._buffer += data
+        self._buffer_count += 1
+        if len(self._buffer) >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        """Write all the buffered records as a block and flush the stream."""
+        if self._buffer_count:
+            if self.compress:
+                codec, data = _BLOCK_ZLIB, zlib.compress(self._buffer)
+            else:
+                codec, data = _BLOCK_STORED, bytes(self._buffer)
+            self._index.append((self._offset, self._record_count))
+            self._write(
+                _BLOCK_HEADER.pack(codec, len(data), self._buffer_count)
+            )
+            self._write(data)
+            self._record_count += self._buffer_count
+            self._buffer.clear()
+            self._buffer_count = 0
+        self.stream.flush()
+
+    def finish(self):
+        """Write the remaining records and the index of blocks."""
+        self.flush()
+        self._write(_BLOCK_HEADER.pack(_BLOCK_END, 0, 0))
+        index_offset = self._offset
+        for entry in self._index:
+            self._write(_INDEX_ENTRY.pack(*entry))
+        self._write(
+            _INDEX_FOOTER.pack(
+                index_offset, len(self._index), _BINARY_IO_LOG_INDEX_MAGIC
+            )
+        )
+        self.stream.flush()
+
+
+class BinaryIOLogRecordReader:
+    """
+    Class for streaming :class:`IOLogRecord` instances from a binary stream.
+
+    See :class:`BinaryIOLogRecordWriter` for the description of the format.
+    Blocks that are incomplete (because the file is still being written or
+    because the writer was interrupted) are ignored.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        if stream.read(len(BINARY_IO_LOG_MAGIC)) != BINARY_IO_LOG_MAGIC:
+            raise ValueError(_("Not a binary I/O log"))
+        try:
+            self._base = stream.tell() - len(BINARY_IO_LOG_MAGIC)
+        except (OSError, io.UnsupportedOperation):
+            self._base = None
+        self._index = None
+
+    def close(self):
+        self.stream.close()
+
+    def __iter__(self):
+        """Iterate over the entire stream generating subsequent records."""
+        return self.iter_records()
+
+    def iter_records(self, start=0, stream_name=None):
+        """
+        Iterate over the records of the stream.
+
+        :param start:
+            Number of the first record to generate. The index is used to
+            seek to the right block when it is available.
+        :param stream_name:
+            If not None, only records of the given stream are generated,
+            records of other streams are skipped without being decoded.
+        """
+        skip = start
+        if start:
+            index = self.get_index()
+            if index:
+                first_list = [first for offset, first in index]
+                offset, first = index[bisect.bisect(first_list, start) - 1]
+                self.stream.seek(self._base + offset)
+                skip = start - first
+        for codec, data, count in self._iter_blocks():
+            if skip >= count:
+                skip -= count
+                continue
+            data = self._decode_block(codec, data)
+            yield from self._iter_block_records(data, stream_name, skip)
+            skip = 0
+
+    def get_index(self):
+        """
+        Load the index of blocks.
+
+        :returns:
+            A list of pairs (offset, first_record), one for each block, or
+            None if the stream is not seekable or has no index.
+        """
+        if self._index is not None or self._base is None:
+            return self._index
+        position = self.stream.tell()
+        try:
+            self.stream.seek(0, io.SEEK_END)
+            end = self.stream.tell()
+            if (
+                end - self._base
+                < len(BINARY_IO_LOG_MAGIC) + _INDEX_FOOTER.size
+            ):
+                return None
+            self.stream.seek(end - _INDEX_FOOTER.size)
+            index_offset, block_count, magic = _INDEX_FOOTER.unpack(
+                self.stream.read(_INDEX_FOOTER.size)
+            )
+            if magic != _BINARY_IO_LOG_INDEX_MAGIC:
+                return None
+            self.stream.seek(self._base + index_offset)
+            data = self.stream.read(block_count * _INDEX_ENTRY.size)
+            self._index = list(_INDEX_ENTRY.iter_unpack(data))
+            return self._index
+        finally:
+            self.stream.seek(position)
+
+    def _iter_blocks(self):
+        while True:
+            header = self.stream.read(_BLOCK_HEADER.size)
+            if len(header) < _BLOCK_HEADER.size:
+                return
+            codec, size, count = _BLOCK_HEADER.unpack(header)
+            if codec == _BLOCK_END:
+                return
+            data = self.stream.read(size)
+            if len(data) < size:
+                return
+            yield codec, data, count
+
+    @staticmethod
+    def _decode_block(codec, data):
+        if codec == _BLOCK_ZLIB:
+            return zlib.decompress(data)
+        elif codec == _BLOCK_STORED:
+            return data
+        raise ValueError(_("Unsupported I/O log block: {}").format(codec))
+
+    @staticmethod
+    def _iter_block_records(data, stream_name, skip):
+        """Generate records from one block, except for the first ``skip``."""
+        view = memoryview(data)
+        offset = 0
+        while offset < len(view):
+            delay, stream_id, size = _RECORD_HEADER.unpack_from(view, offset)
+            offset += _RECORD_HEADER.size
+            if stream_id == _STREAM_NAMED:
+                name_size = view[offset]
+                name = str(view[offset + 1 : offset + 1 + name_size], "UTF-8")
+                offset += 1 + name_size
+            else:
+                name = _STREAM_NAMES[stream_id]
+            if skip:
+                skip -= 1
+            elif stream_name is None or name == stream_name:
+                yield IOLogRecord(
+                    delay, name, view[offset : offset + size].tobytes()
+                )
+            offset += size
+
+
+def get_io_log_companion_filename(io_log_filename, stream_name):
+    """
+    Get the name of the file with the raw output of the given stream.
+
+    The runner writes the data of each stream (stdout, stderr) to a plain
+    file next to the I/O log file, this function computes its name for both
+    binary and legacy (``.record.gz``) I/O log files.
+    """
+    for suffix in (".record.bin", ".record.gz"):
+        if io_log_filename.endswith(suffix):
+            return io_log_filename[: -len(suffix)] + "." + stream_name
+    return io_log_filename + "." + stream_name
@@ -78,6 +78,21 @@ class IOLogRecordGenerator(extcmd.DelegateBase):
         record = IOLogRecord(delay.total_seconds(), stream_name, line)
         self.on_new_record(record)
 
+    def on_lines(self, stream_name, lines):
+        """
+        Internal method of extcmd.DelegateBase.
+
+        Creates a new IOLogRecord for each line of a batch. The lines of a
+        batch were read at the same time, so all but the first one are
+        recorded with no delay.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        delay = (now - self.last_msg).total_seconds()
+        self.last_msg = now
+        for line in lines:
+            self.on_new_record(IOLogRecord(delay, stream_name, line))
+            delay = 0.0
+
     @morris.signal
     def on_new_record(self, record):
         """
@@ -145,6 +160,14 @@ class CommandOutputWriter(extcmd.DelegateBase):
         elif stream_name == "stderr":
             self.stderr.write(line)
 
+    def on_lines(self, stream_name, lines):
+        """
+        Internal method of extcmd.DelegateBase.
+
+        Called for each batch of lines of output.
+        """
+        self.on_line(stream_name, b"".join(lines))
+
 
 class FallbackCommandOutputPrinter(extcmd.DelegateBase):
     """
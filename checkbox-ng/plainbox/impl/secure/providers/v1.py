@@ -41,6 +41,7 @@ from plainbox.impl.secure.config import PatternValidator
 from plainbox.impl.secure.config import Unset
 from plainbox.impl.secure.origin import Origin
 from plainbox.impl.secure.plugins import FsPlugInCollection
+from plainbox.impl.secure.plugins import LazyFileContent
 from plainbox.impl.secure.plugins import LazyFsPlugInCollection
 from plainbox.impl.secure.plugins import PlugIn
 from plainbox.impl.secure.plugins import PlugInError
@@ -52,6 +53,8 @@ from plainbox.impl.unit import all_units
 from plainbox.impl.unit.file import FileRole
 from plainbox.impl.unit.file import FileUnit
 from plainbox.impl.unit.testplan import TestPlanUnit
+from plainbox.impl.unitcache import UnitFileCacheEntry
+from plainbox.impl.unitcache import provider_unit_cache
 from plainbox.impl.validation import Severity
 from plainbox.impl.validation import ValidationError
 
@@ -207,18 +210,32 @@ class UnitPlugIn(ProviderContentPlugIn):
             If checking, use this validation context.
         """
         logger.debug(_("Loading units from %r..."), filename)
-        try:
-            records = load_rfc822_records(
-                text, source=FileTextSource(filename)
-            )
-        except RFC822SyntaxError as exc:
-            raise PlugInError(
-                _("Cannot load job definitions from {!r}: {}").format(
-                    filename, exc
+        namespace = provider.namespace if provider else None
+        # Only files that are really read from disk can be cached, not
+        # content provided by fake plug-in collections
+        use_cache = (
+            isinstance(text, LazyFileContent) and provider_unit_cache.enabled
+        )
+        cache_entry = None
+        if use_cache:
+            cache_entry = provider_unit_cache.lookup(filename, text, namespace)
+        if cache_entry is not None:
+            records = cache_entry.record_list
+            checksum_list = cache_entry.checksum_list
+        else:
+            try:
+                records = load_rfc822_records(
+                    text, source=FileTextSource(filename)
                 )
-            )
+            except RFC822SyntaxError as exc:
+                raise PlugInError(
+                    _("Cannot load job definitions from {!r}: {}").format(
+                        filename, exc
+                    )
+                )
+            checksum_list = [None] * len(records)
         unit_list = []
-        for record in records:
+        for record, checksum in zip(records, checksum_list):
             unit_name = record.data.get("unit", "job")
             try:
                 unit_cls = self._get_unit_cls(unit_name)
@@ -234,6 +251,9 @@ class UnitPlugIn(ProviderContentPlugIn):
                         record, exc
                     )
                 )
+            if checksum is not None:
+                # Computed from the same record when the file was cached
+                unit._checksum = checksum
             if check:
                 for issue in unit.check(context=context, live=True):
                     if issue.severity is Severity.error:
@@ -251,6 +271,15 @@ class UnitPlugIn(ProviderContentPlugIn):
                     )
             unit_list.append(unit)
             logger.debug(_("Loaded %r"), unit)
+        if use_cache and cache_entry is None:
+            provider_unit_cache.store(
+                filename,
+                text,
+                namespace,
+                UnitFileCacheEntry(
+                    records, [unit.checksum for unit in unit_list]
+                ),
+            )
         return unit_list
 
     def discover_units(
@@ -26,6 +26,7 @@ some set of rules.
 """
 
 import abc
+import collections
 import functools
 import itertools
 import logging
@@ -44,7 +45,6 @@ from plainbox.i18n import gettext as _
 from plainbox.impl import pod
 from plainbox.impl.secure.origin import Origin
 
-
 _logger = logging.getLogger("plainbox.secure.qualifiers")
 
 
@@ -450,6 +450,224 @@ def get_flat_primitive_qualifier_list(qualifier_list):
     )
 
 
+class _FieldVoteIndex:
+    """
+    Votes of the qualifiers looking at one field of units.
+
+    Helper of :class:`CompiledQualifier`. Values compared for equality are
+    looked up in a dictionary. Patterns are combined into one regular
+    expression for inclusive qualifiers and one for exclusive qualifiers.
+    """
+
+    def __init__(self):
+        # Maps each value to a pair (index of the first inclusive qualifier
+        # or None, whether any exclusive qualifier matches it)
+        self.value_map = {}
+        self.include_pattern_list = []
+        self.exclude_pattern_list = []
+        self.include_re = None
+        self.include_index_list = []
+        self.exclude_re = None
+
+    def add_value(self, index, value, inclusive):
+        include_index, excluded = self.value_map.get(value, (None, False))
+        if inclusive:
+            if include_index is None:
+                include_index = index
+        else:
+            excluded = True
+        self.value_map[value] = include_index, excluded
+
+    def add_pattern(self, index, pattern, inclusive):
+        if inclusive:
+            self.include_pattern_list.append((index, pattern))
+        else:
+            self.exclude_pattern_list.append((index, pattern))
+
+    def compile(self):
+        if self.include_pattern_list:
+            # Python regular expressions try alternatives from left to right
+            # so the group that matches is the one of the first qualifier
+            self.include_re = re.compile(
+                "|".join(
+                    "({})".format(pattern.pattern)
+                    for index, pattern in self.include_pattern_list
+                )
+            )
+            self.include_index_list = [
+                index for index, pattern in self.include_pattern_list
+            ]
+        if self.exclude_pattern_list:
+            self.exclude_re = re.compile(
+                "|".join(
+                    "(?:{})".format(pattern.pattern)
+                    for index, pattern in self.exclude_pattern_list
+                )
+            )
+
+
+class CompiledQualifier:
+    """
+    A list of qualifiers compiled to vote on many units quickly.
+
+    Qualifiers comparing a field of units to a value (that is
+    :class:`JobIdQualifier` and :class:`FieldQualifier` with an
+    :class:`OperatorMatcher` using ``operator.eq``) are looked up in a
+    dictionary. Regular expressions of :class:`RegExpJobQualifier` and
+    :class:`FieldQualifier` with a :class:`PatternMatcher` are combined
+    into a single regular expression for each field. Any other qualifier (or
+    pattern that cannot be combined, such as one with groups or flags) votes
+    as usual.
+
+    Votes are the same as the ones of a :class:`CompositeQualifier` of the
+    same qualifiers.
+    """
+
+    def __init__(self, qualifier_list):
+        """
+        Compile a list of qualifiers.
+
+        :param qualifier_list:
+            A list of IUnitQualifier objects, composite qualifiers are
+            flattened
+        """
+        self._qualifier_list = get_flat_primitive_qualifier_list(
+            qualifier_list
+        )
+        # Maps field names to _FieldVoteIndex objects
+        self._field_map = {}
+        # Pairs (index, qualifier) of the qualifiers that could not be
+        # compiled
+        self._other_list = []
+        default_flags = re.compile("").flags
+        for index, qualifier in enumerate(self._qualifier_list):
+            if isinstance(qualifier, JobIdQualifier):
+                field_value_list = [("id", qualifier.id)]
+                pattern = None
+            elif isinstance(qualifier, RegExpJobQualifier):
+                field_value_list = None
+                pattern = qualifier._pattern
+            elif isinstance(qualifier, FieldQualifier) and isinstance(
+                qualifier.matcher, OperatorMatcher
+            ):
+                if qualifier.matcher.op is operator.eq:
+                    field_value_list = [
+                        (str(qualifier.field), qualifier.matcher.value)
+                    ]
+                else:
+                    field_value_list = None
+                pattern = None
+            elif isinstance(qualifier, FieldQualifier) and isinstance(
+                qualifier.matcher, PatternMatcher
+            ):
+                field_value_list = None
+                pattern = qualifier.matcher._pattern
+            else:
+                field_value_list = pattern = None
+            if field_value_list is not None:
+                try:
+                    hash(field_value_list[0][1])
+                except TypeError:
+                    field_value_list = None
+            if pattern is not None and (
+                pattern.groups or pattern.flags != default_flags
+            ):
+                pattern = None
+            if field_value_list is not None:
+                for field, value in field_value_list:
+                    self._get_field_index(field).add_value(
+                        index, value, qualifier.inclusive
+                    )
+            elif pattern is not None:
+                if isinstance(qualifier, RegExpJobQualifier):
+                    field_list = ["id", "template_id"]
+                else:
+                    field_list = [str(qualifier.field)]
+                for field in field_list:
+                    self._get_field_index(field).add_pattern(
+                        index, pattern, qualifier.inclusive
+                    )
+            else:
+                self._other_list.append((index, qualifier))
+        for field_index in self._field_map.values():
+            field_index.compile()
+
+    def _get_field_index(self, field):
+        if field not in self._field_map:
+            self._field_map[field] = _FieldVoteIndex()
+        return self._field_map[field]
+
+    @property
+    def qualifier_list(self):
+        """flat list of the qualifiers that were compiled."""
+        return self._qualifier_list
+
+    def get_vote_summary(self, unit):
+        """
+        Get a summary of the votes of all the qualifiers for a unit.
+
+        :param unit:
+            A unit (JobDefinition or TemplateUnit)
+        :returns:
+            A pair (include_index, excluded). ``include_index`` is the index
+            (in :attr:`qualifier_list`) of the first qualifier that voted to
+            include the unit, or None. ``excluded`` is True if any qualifier
+            voted to exclude the unit.
+        """
+        include_index = None
+        excluded = False
+        for field, field_index in self._field_map.items():
+            value = getattr(unit, field)
+            try:
+                value_vote = field_index.value_map.get(value)
+            except TypeError:
+                value_vote = None
+            if value_vote is not None:
+                if value_vote[0] is not None and (
+                    include_index is None or value_vote[0] < include_index
+                ):
+                    include_index = value_vote[0]
+                excluded = excluded or value_vote[1]
+            if not isinstance(value, str) or not value:
+                # Patterns only apply to text (RegExpJobQualifier ignores
+                # units that are not instantiated from templates)
+                continue
+            if field_index.include_re is not None:
+                match = field_index.include_re.match(value)
+                if match is not None:
+                    index = field_index.include_index_list[match.lastindex - 1]
+                    if include_index is None or index < include_index:
+                        include_index = index
+            if not excluded and field_index.exclude_re is not None:
+                excluded = field_index.exclude_re.match(value) is not None
+        for index, qualifier in self._other_list:
+            vote = qualifier.get_vote(unit)
+            if vote == IUnitQualifier.VOTE_INCLUDE:
+                if include_index is None or index < include_index:
+                    include_index = index
+            elif vote == IUnitQualifier.VOTE_EXCLUDE:
+                excluded = True
+        return include_index, excluded
+
+    def get_vote(self, unit):
+        """
+        Get one of the ``VOTE_IGNORE``, ``VOTE_INCLUDE``, ``VOTE_EXCLUDE``
+        votes that the qualifiers associated with the specified unit.
+
+        See :meth:`CompositeQualifier.get_vote()`.
+        """
+        include_index, excluded = self.get_vote_summary(unit)
+        if excluded:
+            return IUnitQualifier.VOTE_EXCLUDE
+        elif include_index is not None:
+            return IUnitQualifier.VOTE_INCLUDE
+        else:
+            return IUnitQualifier.VOTE_IGNORE
+
+    def designates(self, unit):
+        return self.get_vote(unit) == IUnitQualifier.VOTE_INCLUDE
+
+
 def select_units(unit_list, qualifier_list):
     """
     Select desired units.
@@ -464,102 +682,97 @@ def select_units(unit_list, qualifier_list):
     # Flatten the qualifier list, so that we can see the fine structure of
     # composite objects.
     flat_qualifier_list = get_flat_primitive_qualifier_list(qualifier_list)
-    # Short-circuit if there are no units to select. Min is used later and this
-    # will allow us to assume that the matrix is not empty.
+    # Short-circuit if there are no units to select.
     if not flat_qualifier_list:
         return []
-    # Vote matrix, encodes the vote cast by a particular qualifier for a
-    # particular unit. Visually it's a two-dimensional array like this:
-    #
-    #   ^
-    # q |
-    # u |   X
-    # a |
-    # l |  ........
-    # i |
-    # f |             .
-    # i | .
-    # e |          .
-    # r |
-    #    ------------------->
-    #                    unit
-    #
-    # The vertical axis represents qualifiers from the flattened qualifier
-    # list.  The horizontal axis represents units from unit_list. Dots
-    # represent inclusion, X represents exclusion.
-    #
-    # The result of the select_units() function is a list of units that have at
-    # least one inclusion and no exclusions. The resulting list is ordered by
-    # increasing qualifier index.
-    #
-    # The algorithm implemented below is composed of two steps.
-    #
-    # The first step iterates over the vote matrix (row-major, meaning that we
-    # visit all columns for each visit of one row) and constructs two
-    # structures: a set of units that got VOTE_INCLUDE and a list of those
-    # units, in the order of discovery. All VOTE_EXCLUDE votes are collected in
-    # another set.
+    # Conceptually, each qualifier casts a vote for each unit. The result of
+    # the select_units() function is a list of units that have at least one
+    # inclusion and no exclusions. The resulting list is ordered by
+    # increasing index of the first qualifier that included each unit, then
+    # by position in unit_list.
     #
-    # The second step filters-out all items from the excluded unit set from the
-    # selected unit list.
+    # Casting every vote would be O(N x M), where N is the number of
+    # qualifiers (flattened) and M is the number of units. Test plans have
+    # hundreds of qualifiers and sessions have thousands of units, so:
     #
-    # The final complexity is O(N x M) + O(M), where N is the number of
-    # qualifiers (flattened) and M is the number of units. The algorithm
-    # assumes that set lookup is a O(1) operation which is true enough for
-    # python.
+    # - qualifiers referring to a specific unit by id (the super-common case)
+    #   look it up in a map of unit positions.
+    # - the other qualifiers are compiled into a CompiledQualifier that
+    #   tells, for each unit, the first qualifier that included it and
+    #   whether any qualifier excluded it.
     #
-    # A possible optimization would differentiate qualifiers that may select
-    # more than one unit and fall-back to the current implementation while
-    # short-circuiting qualifiers that may select at most one unit with a
-    # separate set lookup. That would make the algorithm "mostly" linear in the
-    # common case.
-    #
-    # As a separate feature, we might return a list of qualifiers that never
-    # matched anything. That may be helpful for debugging.
-
     # A list is needed to keep the unit ordering, while the sets prevent
     # duplicates.
-    included_list = []
-    included_set = set()
+    id_position_map = {}
+    template_position_map = collections.defaultdict(list)
+    for position, unit in enumerate(unit_list):
+        id_position_map.setdefault(unit.id, position)
+        if unit.template_id:
+            template_position_map[unit.template_id].append(position)
+    # Maps units to a tuple (qualifier index, position, unit) of the first
+    # vote that included them
+    included_map = {}
     excluded_set = set()
 
-    def _handle_vote(qualifier, unit):
+    def _handle_vote(index, position, unit, vote):
         """
-        Update list and sets of included/excluded units based on their related
-        qualifiers.
+        Update the map and set of included/excluded units based on their
+        related qualifiers.
         """
-        vote = qualifier.get_vote(unit)
         if vote == IUnitQualifier.VOTE_INCLUDE:
-            if unit in included_set:
-                return
-            included_set.add(unit)
-            included_list.append(unit)
+            key = (index, position, unit)
+            if unit not in included_map or key[:2] < included_map[unit][:2]:
+                included_map[unit] = key
         elif vote == IUnitQualifier.VOTE_EXCLUDE:
             excluded_set.add(unit)
 
-    for qualifier in flat_qualifier_list:
+    compiled_list = []
+    compiled_index_list = []
+    for index, qualifier in enumerate(flat_qualifier_list):
         if (
             isinstance(qualifier, FieldQualifier)
             and qualifier.field == "id"
             and isinstance(qualifier.matcher, OperatorMatcher)
             and qualifier.matcher.op == operator.eq
         ):
-            # optimize the super-common case where a qualifier refers to
-            # a specific unit by using the id_to_index_map to instantly
-            # perform the requested operation on a single unit
-            for unit in unit_list:
-                if unit.id == qualifier.matcher.value:
-                    _handle_vote(qualifier, unit)
+            # The qualifier designates the first unit with that id. It also
+            # matches the template id information of the units before it,
+            # that is either the template id a job has been instantiated
+            # from, or the template itself. Need to get the vote for those
+            # units based on their template_id field, not their id field
+            value = qualifier.matcher.value
+            id_position = id_position_map.get(value)
+            for position in template_position_map.get(value, ()):
+                if id_position is not None and position >= id_position:
                     break
-                elif unit.template_id == qualifier.matcher.value:
-                    # the qualifier matches the template id information,
-                    # that is either the template id this job has been
-                    # instantiated from, or the template itself. Need to get
-                    # the vote for this unit based on its template_id field,
-                    # not its id field
-                    qualifier.field = "template_id"
-                    _handle_vote(qualifier, unit)
+                qualifier.field = "template_id"
+                unit = unit_list[position]
+                _handle_vote(index, position, unit, qualifier.get_vote(unit))
+            if id_position is not None:
+                unit = unit_list[id_position]
+                _handle_vote(
+                    index, id_position, unit, qualifier.get_vote(unit)
+                )
         else:
-            for unit in unit_list:
-                _handle_vote(qualifier, unit)
-    return [unit for unit in included_list if unit not in excluded_set]
+            compiled_list.append(qualifier)
+            compiled_index_list.append(index)
+    if compiled_list:
+        compiled = CompiledQualifier(compiled_list)
+        for position, unit in enumerate(unit_list):
+            include_index, excluded = compiled.get_vote_summary(unit)
+            if excluded:
+                _handle_vote(None, position, unit, IUnitQualifier.VOTE_EXCLUDE)
+            if include_index is not None:
+                _handle_vote(
+                    compiled_index_list[include_index],
+                    position,
+                    unit,
+                    IUnitQualifier.VOTE_INCLUDE,
+                )
+    return [
+        unit
+        for index, position, unit in sorted(
+            included_map.values(), key=lambda key: key[:2]
+        )
+        if unit not in excluded_set
+    ]
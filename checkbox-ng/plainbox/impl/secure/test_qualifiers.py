@@ -35,6 +35,7 @@ from plainbox.impl.job import JobDefinition
 from plainbox.impl.secure.origin import FileTextSource
 from plainbox.impl.secure.origin import Origin
 from plainbox.impl.secure.origin import UnknownTextSource
+from plainbox.impl.secure.qualifiers import CompiledQualifier
 from plainbox.impl.secure.qualifiers import CompositeQualifier
 from plainbox.impl.secure.qualifiers import FieldQualifier
 from plainbox.impl.secure.qualifiers import IMatcher
@@ -568,6 +569,103 @@ class CompositeQualifierTests(TestCase):
             CompositeQualifier([]).origin
 
 
+class CompiledQualifierTests(TestCase):
+    """
+    Test cases for CompiledQualifier class
+    """
+
+    def setUp(self):
+        self.origin = mock.Mock(name="origin", spec_set=Origin)
+        self.job_list = [
+            make_job("foo"),
+            make_job("foo-bar"),
+            make_job("bar"),
+            make_job("baz"),
+            make_job("foo-1", **{"template-id": "foo-tpl"}),
+        ]
+
+    def assertSameVotes(self, qualifier_list):
+        composite = CompositeQualifier(qualifier_list)
+        compiled = CompiledQualifier(qualifier_list)
+        for job in self.job_list:
+            self.assertEqual(
+                compiled.get_vote(job), composite.get_vote(job), job.id
+            )
+            self.assertEqual(
+                compiled.designates(job), composite.designates(job), job.id
+            )
+
+    def test_empty(self):
+        self.assertSameVotes([])
+
+    def test_literals(self):
+        self.assertSameVotes(
+            [
+                JobIdQualifier("foo", self.origin),
+                FieldQualifier(
+                    "id", OperatorMatcher(operator.eq, "bar"), self.origin
+                ),
+                JobIdQualifier("bar", self.origin, inclusive=False),
+                FieldQualifier(
+                    "template_id",
+                    OperatorMatcher(operator.eq, "foo-tpl"),
+                    self.origin,
+                ),
+            ]
+        )
+
+    def test_patterns(self):
+        self.assertSameVotes(
+            [
+                FieldQualifier("id", PatternMatcher("^foo.*$"), self.origin),
+                FieldQualifier(
+                    "id", PatternMatcher("^.*bar$"), self.origin, False
+                ),
+                RegExpJobQualifier("ba.", self.origin),
+                # RegExpJobQualifier matches the template id too
+                RegExpJobQualifier("^foo-t", self.origin, inclusive=False),
+            ]
+        )
+
+    def test_uncombined_patterns(self):
+        # Patterns with groups or flags are not combined with the others
+        self.assertSameVotes(
+            [
+                FieldQualifier("id", PatternMatcher("^(foo)$"), self.origin),
+                FieldQualifier(
+                    "id", PatternMatcher("(?i)^BA.$"), self.origin, False
+                ),
+                FieldQualifier(
+                    "id", OperatorMatcher(operator.ne, "baz"), self.origin
+                ),
+            ]
+        )
+
+    def test_get_vote_summary(self):
+        compiled = CompiledQualifier(
+            [
+                CompositeQualifier(
+                    [
+                        JobIdQualifier("bar", self.origin),
+                        RegExpJobQualifier("foo.*", self.origin),
+                    ]
+                ),
+                FieldQualifier("id", PatternMatcher("^ba.$"), self.origin),
+                JobIdQualifier("foo", self.origin),
+                JobIdQualifier("foo", self.origin, inclusive=False),
+            ]
+        )
+        self.assertEqual(len(compiled.qualifier_list), 5)
+        foo, foo_bar, bar, baz, foo_1 = self.job_list
+        self.assertEqual(compiled.get_vote_summary(foo), (1, True))
+        self.assertEqual(compiled.get_vote_summary(foo_bar), (1, False))
+        self.assertEqual(compiled.get_vote_summary(bar), (0, False))
+        self.assertEqual(compiled.get_vote_summary(baz), (2, False))
+        self.assertEqual(
+            compiled.get_vote_summary(make_job("qux")), (None, False)
+        )
+
+
 class FunctionTests(TestCase):
 
     def setUp(self):
@@ -698,3 +796,26 @@ class FunctionTests(TestCase):
         qualifiers = [qual_incl, qual_excl]
         expected_list = [templated_job_a]
         self.assertEqual(select_units(job_list, qualifiers), expected_list)
+
+    def test_select_units__qualifier_order(self):
+        """
+        verify that select_units() orders units by the first qualifier that
+        included them, whatever kind of qualifier it is
+        """
+        job_a = JobDefinition({"id": "a"})
+        job_b1 = JobDefinition({"id": "b1"})
+        job_b2 = JobDefinition({"id": "b2"})
+        job_c = JobDefinition({"id": "c"})
+        qualifiers = [
+            JobIdQualifier("c", self.origin),
+            FieldQualifier("id", PatternMatcher("^b.*$"), self.origin),
+            FieldQualifier(
+                "id", OperatorMatcher(operator.eq, "a"), self.origin
+            ),
+            RegExpJobQualifier("b2", self.origin, inclusive=False),
+            RegExpJobQualifier(".*", self.origin),
+        ]
+        for job_list in permutations([job_a, job_b1, job_b2, job_c], 4):
+            self.assertEqual(
+                select_units(job_list, qualifiers), [job_c, job_b1, job_a]
+            )
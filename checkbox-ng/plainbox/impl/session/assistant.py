@@ -34,6 +34,7 @@ import os
 import shlex
 import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from tempfile import SpooledTemporaryFile
 
 
@@ -72,6 +73,7 @@ from plainbox.impl.session.restart import (
     RemoteDebRestartStrategy,
 )
 from plainbox.impl.session.resume import IncompatibleJobError
+from plainbox.impl.session.storage import SessionRepositoryIndex
 from plainbox.impl.session.storage import WellKnownDirsHelper
 from plainbox.impl.transport import OAuthTransport, TransportError
 from plainbox.impl.unit.exporter import ExporterError
@@ -192,6 +194,8 @@ class SessionAssistant:
         self._context = None
         self._metadata = None
         self._runner = None
+        # Runners of the jobs running ahead while bootstrapping
+        self._worker_runner_list = []
         self._job_start_time = None
         # Keep a record of jobs run during bootstrap phase
         self._bootstrap_done_list = []
@@ -442,12 +446,12 @@ class SessionAssistant:
             is the likely cause.
         """
         UsageExpectation.of(self).enforce()
+        index = SessionRepositoryIndex.load()
         for storage in WellKnownDirsHelper.get_storage_list():
-            data = storage.load_checkpoint()
-            if len(data) == 0:
-                continue
             try:
-                metadata = SessionPeekHelper().peek(data)
+                metadata = SessionPeekHelper().peek_storage(storage, index)
+                if metadata is None:
+                    continue
                 if metadata.app_id == self._app_id:
                     if (allow_not_flagged and not metadata.flags) or (
                         metadata.flags & flags
@@ -505,7 +509,11 @@ class SessionAssistant:
         """
         UsageExpectation.of(self).enforce()
         self._manager = SessionManager.create(prefix=title + "-")
+        if self._config.get_value("features", "journaled_checkpoints"):
+            self._manager.enable_journal()
         self._context = self._manager.add_local_device_context()
+        if self._config.get_value("features", "background_system_information"):
+            self._context.state.start_system_information_collection()
         for provider in self._selected_providers:
             if provider.problem_list:
                 _logger.error(
@@ -579,6 +587,8 @@ class SessionAssistant:
         self._manager = SessionManager.load_session(
             all_units, self._resume_candidates[session_id][0]
         )
+        if self._config.get_value("features", "journaled_checkpoints"):
+            self._manager.enable_journal()
         self._context = self._manager.default_device_context
         self._metadata = self._context.state.metadata
         self._command_io_delegate = JobRunnerUIDelegate(_SilentUI())
@@ -645,12 +655,10 @@ class SessionAssistant:
         # also, when this function is called invalidate the cache, as it may
         # have been modified by some external source
         self._resume_candidates = {}
+        index = SessionRepositoryIndex.load()
         for storage in WellKnownDirsHelper.get_storage_list():
-            data = storage.load_checkpoint()
-            if len(data) == 0:
-                continue
             try:
-                metadata = SessionPeekHelper().peek(data)
+                metadata = SessionPeekHelper().peek_storage(storage, index)
             except SessionResumeError:
                 _logger.info(
                     "Exception raised when trying to resume " "session: %s",
@@ -658,7 +666,8 @@ class SessionAssistant:
                 )
             else:
                 if (
-                    metadata.app_id == self._app_id
+                    metadata is not None
+                    and metadata.app_id == self._app_id
                     and SessionMetaData.FLAG_INCOMPLETE in metadata.flags
                 ):
                     self._resume_candidates[storage.id] = (
@@ -826,14 +835,26 @@ class SessionAssistant:
         self._context.state.update_desired_job_list(
             desired_job_list, include_mandatory=False
         )
-        for job in self._context.state.run_list:
-            if self._context.state.job_state_map[job.id].result_history:
-                continue
-            UsageExpectation.of(self).allowed_calls[
-                self.run_job
-            ] = "to run bootstrapping job"
-            rb = self.run_job(job.id, "silent", False)
-            self.use_job_result(job.id, rb.get_result())
+        max_workers = self._config.get_value("features", "parallel_bootstrap")
+        if max_workers:
+            job_id_list = [
+                job.id
+                for job in self._context.state.run_list
+                if not self._context.state.job_state_map[job.id].result_history
+            ]
+            for _job_id, _result in self._run_bootstrap_jobs(
+                job_id_list, max_workers
+            ):
+                pass
+        else:
+            for job in self._context.state.run_list:
+                if self._context.state.job_state_map[job.id].result_history:
+                    continue
+                UsageExpectation.of(self).allowed_calls[
+                    self.run_job
+                ] = "to run bootstrapping job"
+                rb = self.run_job(job.id, "silent", False)
+                self.use_job_result(job.id, rb.get_result())
         # we may have a list of rejected jobs if this session is a resumed
         # session
         already_rejected = [
@@ -856,6 +877,7 @@ class SessionAssistant:
         )
         self._metadata.flags.add(SessionMetaData.FLAG_INCOMPLETE)
         self._manager.checkpoint()
+        self._log_resource_cache_stats()
 
     @raises(UnexpectedMethodCall)
     def hand_pick_jobs(self, id_patterns: "Iterable[str]"):
@@ -927,6 +949,124 @@ class SessionAssistant:
         )
         return [job.id for job in self._context.state.run_list]
 
+    @raises(UnexpectedMethodCall)
+    def run_bootstrap_jobs(self, job_id_list, max_workers):
+        """
+        Run bootstrapping jobs, some of them at the same time.
+
+        :param job_id_list:
+            Identifiers of the jobs to run, as returned by
+            :meth:`get_bootstrap_todo_list()`.
+        :param max_workers:
+            Maximum number of jobs running at the same time.
+        :raises UnexpectedMethodCall:
+            If the call is made at an unexpected time. Do not catch this error.
+            It is a bug in your program. The error message will indicate what
+            is the likely cause.
+        :returns:
+            An iterator of (job_id, result) pairs, in the order of
+            job_id_list. The jobs run as the iterator is consumed and each
+            result is already fed back to the session when it is produced.
+
+        This method can be used instead of calling :meth:`run_job()` and
+        :meth:`use_job_result()` for each job of the bootstrap todo list.
+        Resource jobs that run as the current user are started (silently) in
+        a pool of threads as soon as all their dependencies have a result.
+        Other jobs are run with :meth:`run_job()` when their turn comes.
+        Results are always fed back to the session in the order of
+        job_id_list, so the session ends up the same as if the jobs were run
+        one after the other.
+        """
+        UsageExpectation.of(self).enforce()
+        return self._run_bootstrap_jobs(job_id_list, max_workers)
+
+    def _run_bootstrap_jobs(self, job_id_list, max_workers):
+        job_state_map = self._context.state.job_state_map
+        # Jobs without a result yet, dependencies on them hold jobs back
+        unfinished = set(job_id_list)
+        # Jobs that may start ahead of their turn (in order) to the ids of
+        # their dependencies
+        ahead_map = {
+            job_id: self._get_dependency_id_set(job_state_map[job_id].job)
+            for job_id in job_id_list
+            if self._can_run_ahead(job_state_map[job_id].job)
+        }
+        running = {}
+        start_time_map = {}
+        ui = _SilentUI()
+        # Jobs running ahead don't read what is typed in the terminal
+        with open(os.devnull) as devnull, ThreadPoolExecutor(
+            max_workers=max_workers
+        ) as executor:
+            for job_id in job_id_list:
+                for ahead_id, dep_id_set in list(ahead_map.items()):
+                    if len(running) >= max_workers:
+                        break
+                    job_state = job_state_map[ahead_id]
+                    if dep_id_set & unfinished or not job_state.can_start():
+                        continue
+                    del ahead_map[ahead_id]
+                    # As in run_job(), a crash is blamed on the job started
+                    # last
+                    self._context.state.metadata.running_job_name = ahead_id
+                    self._manager.checkpoint()
+                    runner = self._runner.get_worker_runner(devnull)
+                    self._worker_runner_list.append(runner)
+                    start_time_map[ahead_id] = time.time()
+                    running[ahead_id] = executor.submit(
+                        self._run_job_ahead,
+                        runner,
+                        job_state,
+                        ui,
+                    )
+                if job_id in running:
+                    runner, result = running.pop(job_id).result()
+                    self._worker_runner_list.remove(runner)
+                    # The job ran for its own execution duration, not until
+                    # its result is used
+                    self._job_start_time = None
+                    self._metadata.last_job_start_time = start_time_map.pop(
+                        job_id
+                    )
+                    UsageExpectation.of(self).allowed_calls[
+                        self.use_job_result
+                    ] = "to use the result of bootstrapping job"
+                    self.use_job_result(job_id, result)
+                else:
+                    ahead_map.pop(job_id, None)
+                    UsageExpectation.of(self).allowed_calls[
+                        self.run_job
+                    ] = "to run bootstrapping job"
+                    result = self.run_job(job_id, "silent", False).get_result()
+                    self.use_job_result(job_id, result)
+                unfinished.discard(job_id)
+                yield job_id, result
+
+    def _run_job_ahead(self, runner, job_state, ui):
+        start_time = time.time()
+        result = runner.run_job(
+            job_state.job, job_state, self._config.environment, ui
+        )
+        result.execution_duration = time.time() - start_time
+        return runner, result
+
+    @staticmethod
+    def _can_run_ahead(job):
+        # Resource jobs are probes that don't interact with anything, unless
+        # they need another user (and maybe a password) or restart the device
+        return (
+            job.plugin == "resource"
+            and not job.user
+            and not {"noreturn", "autorestart"} & job.get_flag_set()
+        )
+
+    @staticmethod
+    def _get_dependency_id_set(job):
+        return {
+            dep_id
+            for (dep_type, dep_id) in job.controller.get_dependency_set(job)
+        }
+
     @raises(UnexpectedMethodCall)
     def finish_bootstrap(self):
         """
@@ -992,6 +1132,21 @@ class SessionAssistant:
         # No bootstrap is done update the cache of jobs that were run
         # during bootstrap phase
         self._bootstrap_done_list = self.get_dynamic_done_list()
+        self._log_resource_cache_stats()
+
+    def _log_resource_cache_stats(self):
+        # Custom runners may not have a resource job cache
+        resource_cache = getattr(self._runner, "resource_cache", None)
+        if resource_cache is not None and resource_cache.stats:
+            _logger.info(
+                "Resource job cache: %s",
+                ", ".join(
+                    "{} {}".format(count, outcome)
+                    for (outcome, count) in sorted(
+                        resource_cache.stats.items()
+                    )
+                ),
+            )
 
     @raises(KeyError, UnexpectedMethodCall)
     def use_alternate_selection(self, selection: "Iterable[str]"):
@@ -1793,7 +1948,7 @@ class SessionAssistant:
         for flag in finalizable_flags:
             if flag in self._metadata.flags:
                 self._metadata.flags.remove(flag)
-        self._manager.checkpoint()
+        self._manager.checkpoint(snapshot=True)
         UsageExpectation.of(self).allowed_calls = {
             self.finalize_session: "to finalize session",
             self.export_to_transport: "to export the results and send them",
@@ -1960,6 +2115,8 @@ class SessionAssistant:
 
     def send_signal(self, signal, target_user):
         self._runner.send_signal(signal, target_user)
+        for runner in list(self._worker_runner_list):
+            runner.send_signal(signal, target_user)
 
     def _get_allowed_calls_in_normal_state(self) -> dict:
         return {
@@ -1980,6 +2137,7 @@ class SessionAssistant:
             self.get_dynamic_todo_list: "to see what is yet to be executed",
             self.get_manifest_repr: ("to get participating manifest units"),
             self.run_job: "to run a given job",
+            self.run_bootstrap_jobs: "to run bootstrapping jobs",
             self.use_alternate_selection: "to change the selection",
             self.get_resumable_sessions: "get resume candidates",
             self.hand_pick_jobs: "to generate new selection and use it",
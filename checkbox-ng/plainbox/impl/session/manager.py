@@ -43,6 +43,7 @@ from plainbox.impl.session.state import SessionDeviceContext
 from plainbox.impl.session.state import SessionState
 from plainbox.impl.session.storage import LockedStorageError
 from plainbox.impl.session.storage import SessionStorage
+from plainbox.impl.session.suspend import SessionJournalWriter
 from plainbox.impl.session.suspend import SessionSuspendHelper
 from plainbox.impl.unit.testplan import TestPlanUnit
 from plainbox.vendor import morris
@@ -104,6 +105,16 @@ class SessionManager(pod.POD):
 
     _throwaway_managers = dict()
 
+    # SessionJournalWriter used by checkpoint(), see enable_journal()
+    _journal = None
+
+    # Meta-data last saved by checkpoint(), see _save_metadata()
+    _last_metadata_repr = None
+
+    # Title, flags and application id last saved to the session repository
+    # index, see _save_metadata()
+    _last_index_key = None
+
     def _on_test_plans_changed(self, old: "Any", new: "Any") -> None:
         self._propagate_test_plans()
 
@@ -267,6 +278,7 @@ class SessionManager(pod.POD):
         logger.debug("SessionManager.load_session()")
         try:
             data = storage.load_checkpoint()
+            journal = storage.load_journal()
         except IOError as exc:
             if exc.errno == errno.ENOENT:
                 state = SessionState(unit_list)
@@ -275,21 +287,52 @@ class SessionManager(pod.POD):
         else:
             state = SessionResumeHelper(
                 unit_list, flags, storage.location
-            ).resume(data, early_cb)
+            ).resume(data, early_cb, journal)
         context = SessionDeviceContext(state)
         return cls([context], storage)
 
-    def checkpoint(self):
+    def checkpoint(self, snapshot=False):
         """
         Create a checkpoint of the session.
 
         After calling this method you can later reopen the same session with
         :meth:`SessionManager.load_session()`.
+
+        If the journal was enabled with :meth:`enable_journal()` then most
+        checkpoints only append a small record to the session journal instead
+        of saving a full snapshot of the session.
+
+        :param snapshot:
+            Save a full snapshot even if the journal is enabled, for example
+            when the session is finalized. This also updates the entry of the
+            session in the session repository index, which is otherwise only
+            updated when the session is first saved or when its title, flags
+            or application id change.
         """
         logger.debug("SessionManager.checkpoint()")
-        data = SessionSuspendHelper().suspend(
-            self.state, self.storage.location
-        )
+        if (
+            self._journal is not None
+            and not snapshot
+            and not self._journal.needs_snapshot
+        ):
+            record = self._journal.record(
+                self.state, self.storage.location, self.storage.append_journal
+            )
+            if record:
+                self._save_metadata(new_checkpoint=False)
+            return
+        if self._journal is not None:
+            self._journal.snapshot(
+                self.state, self.storage.location, self._save_checkpoint
+            )
+        else:
+            data = SessionSuspendHelper().suspend(
+                self.state, self.storage.location
+            )
+            self._save_checkpoint(data)
+        self._save_metadata(update_index=snapshot)
+
+    def _save_checkpoint(self, data):
         logger.debug(
             ngettext(
                 "Saving %d byte of checkpoint data to %r",
@@ -305,6 +348,39 @@ class SessionManager(pod.POD):
             self.storage.break_lock()
             self.storage.save_checkpoint(data)
 
+    def _save_metadata(self, new_checkpoint=True, update_index=False):
+        # Keep a copy of the meta-data next to the checkpoint so that listing
+        # sessions doesn't have to decode the checkpoint. The copy stays valid
+        # while the journal grows, so after a journal record it is only saved
+        # again if the meta-data changed.
+        metadata_repr = SessionSuspendHelper().suspend_metadata(
+            self.state, self.storage.location
+        )
+        if not new_checkpoint and metadata_repr == self._last_metadata_repr:
+            return
+        # Updating the index locks and rewrites it, so only do it when what
+        # applications filter sessions on changes. Stale index entries are
+        # ignored in favor of the sidecar.
+        metadata = metadata_repr["session"]["metadata"]
+        index_key = (metadata["title"], metadata["flags"], metadata["app_id"])
+        if index_key != self._last_index_key:
+            update_index = True
+        self.storage.save_metadata(metadata_repr, update_index=update_index)
+        self._last_metadata_repr = metadata_repr
+        if update_index:
+            self._last_index_key = index_key
+
+    def enable_journal(self):
+        """
+        Use journaled checkpoints for the rest of the life of this manager.
+
+        The first checkpoint made after calling this method saves a full
+        snapshot of the session. Subsequent checkpoints append records to the
+        session journal, compacting it into a new snapshot from time to time.
+        """
+        if self._journal is None:
+            self._journal = SessionJournalWriter()
+
     def destroy(self):
         """
         Destroy all of the filesystem artifacts of the session.
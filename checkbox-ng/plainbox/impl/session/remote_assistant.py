@@ -26,7 +26,7 @@ import time
 from collections import namedtuple
 from contextlib import suppress
 from tempfile import SpooledTemporaryFile
-from threading import Thread, Lock
+from threading import Condition, Event, Thread, Lock
 from plainbox.impl.config import Configuration
 from plainbox.impl.execution import UnifiedRunner
 from plainbox.impl.session.assistant import SessionAssistant
@@ -66,18 +66,57 @@ Bootstrapping = "bootstrapping"
 Bootstrapped = "bootstrapped"
 TestsSelected = "testsselected"
 Running = "running"
+RunningBatch = "runningbatch"
 Interacting = "interacting"
 Finalizing = "finalizing"
 
 
-class BufferedUI(SilentUI):
-    """UI type that queues the output for later reading."""
+class OutputWaitMixin:
+    """
+    Mixin letting the agent wait for the output of the running job.
+
+    Classes using it override :meth:`_has_output()` to tell if some output
+    is queued up and notify ``_output_ready`` when there is some.
+    """
 
     def __init__(self):
         super().__init__()
         self.lock = Lock()
+        self._output_ready = Condition(self.lock)
+        self._woken_up = False
+
+    def _has_output(self):
+        """Tell if some output is queued up, there never is by default."""
+        return False
+
+    def wait_for_output(self, timeout):
+        """
+        Wait until some output is queued up, :meth:`wake_up()` is called or
+        timeout (in seconds) elapses.
+        """
+        with self.lock:
+            self._output_ready.wait_for(
+                lambda: self._has_output() or self._woken_up, timeout
+            )
+            self._woken_up = False
+
+    def wake_up(self):
+        """Stop waiting for output in :meth:`wait_for_output()`."""
+        with self.lock:
+            self._woken_up = True
+            self._output_ready.notify_all()
+
+
+class BufferedUI(OutputWaitMixin, SilentUI):
+    """UI type that queues the output for later reading."""
+
+    def __init__(self):
+        super().__init__()
         self._output = io.StringIO()
 
+    def _has_output(self):
+        return self._output.tell()
+
     def _ignore_program_output(self, stream_name, line):
         pass
 
@@ -89,6 +128,7 @@ class BufferedUI(SilentUI):
                 # Don't start a agent->controller transfer for binary attachments
                 self._output.write("hidden(Hiding binary test output)\n")
                 self.got_program_output = self._ignore_program_output
+            self._output_ready.notify_all()
 
     def get_output(self):
         """Returns all the output queued up since previous call."""
@@ -98,17 +138,21 @@ class BufferedUI(SilentUI):
             return output
 
 
-class RemoteSilentUI(SilentUI):
+class RemoteSilentUI(OutputWaitMixin, SilentUI):
     """SilentUI + fake get_output."""
 
     def __init__(self):
         super().__init__()
         self._msg = "hidden(Command output hidden)"
 
+    def _has_output(self):
+        return bool(self._msg)
+
     def get_output(self):
-        msg = self._msg
-        self._msg = ""
-        return msg
+        with self.lock:
+            msg = self._msg
+            self._msg = ""
+            return msg
 
 
 class BackgroundExecutor(Thread):
@@ -120,6 +164,7 @@ class BackgroundExecutor(Thread):
         self._ui = ui
         self._builder = None
         self._started_real_run = False
+        self._finished = Event()
         self._sa.session_change_lock.acquire()
         self.start()
         _logger.debug("BackgroundExecutor started for %s" % job_id)
@@ -133,17 +178,96 @@ class BackgroundExecutor(Thread):
 
     def run(self):
         self._started_real_run = True
-        self._builder = self._real_run(self._job_id, self._ui, False)
+        try:
+            self._builder = self._real_run(self._job_id, self._ui, False)
+        finally:
+            self._finished.set()
+            self._sa.note_job_finished()
         _logger.debug("Finished running")
 
+    @property
+    def finished(self):
+        """True once the job has been run (the thread may still be alive)."""
+        return self._finished.is_set()
+
     def outcome(self):
         return self._builder.outcome
 
 
+class BatchExecutor(Thread):
+    """
+    Thread running a sequence of automated jobs on the agent.
+
+    See :meth:`RemoteSessionAssistant.run_batch()`.
+    """
+
+    def __init__(self, sa, job_id_list):
+        super().__init__()
+        self._sa = sa
+        self._job_id_list = job_id_list
+        self._events = []
+        self._events_ready = Condition()
+        self._finished = Event()
+        self.start()
+        _logger.debug("BatchExecutor started for %s", job_id_list)
+
+    def run(self):
+        try:
+            for job_id in self._job_id_list:
+                if not self._sa.run_batched_job(job_id, self):
+                    break
+        finally:
+            self._sa.note_batch_finished()
+            with self._events_ready:
+                self._finished.set()
+                self._events_ready.notify_all()
+        _logger.debug("Finished running batch")
+
+    @property
+    def finished(self):
+        """True once the batch has been run (the thread may still be alive)."""
+        return self._finished.is_set()
+
+    def add_event(self, kind, job_id, payload=None):
+        """
+        Queue up an event for the controller.
+
+        Output of the job printed so far is queued up first, so that the
+        controller sees everything in order.
+        """
+        with self._events_ready:
+            self._queue_output()
+            self._events.append((kind, job_id, payload))
+            self._events_ready.notify_all()
+
+    def take_events(self, timeout):
+        """
+        Get the events queued up since the previous call.
+
+        If there are none, wait up to timeout seconds for one. The output of
+        the job printed so far is included as an ``output`` event.
+        """
+        with self._events_ready:
+            self._events_ready.wait_for(
+                lambda: self._events or self.finished, timeout
+            )
+            self._queue_output()
+            events = self._events
+            self._events = []
+            return events
+
+    def _queue_output(self):
+        output = self._sa.get_job_output()
+        if output:
+            self._events.append(
+                ("output", self._sa.currently_running_job, output)
+            )
+
+
 class RemoteSessionAssistant:
     """Remote execution enabling wrapper for the SessionAssistant"""
 
-    REMOTE_API_VERSION = 13
+    REMOTE_API_VERSION = 15
 
     def __init__(self, cmd_callback):
         _logger.debug("__init__()")
@@ -164,6 +288,7 @@ class RemoteSessionAssistant:
         self._state = Idle
         self._sa = SessionAssistant()
         self._be = None
+        self._batch = None
         self._session_id = ""
         self._jobs_count = 0
         self._job_index = 0
@@ -175,6 +300,10 @@ class RemoteSessionAssistant:
         self.session_change_lock.acquire(blocking=False)
         self.session_change_lock.release()
 
+    def note_job_finished(self):
+        """Called by the BackgroundExecutor when the job has been run."""
+        self._ui.wake_up()
+
     def note_metadata_starting_job(self, job, job_state):
         self._sa.note_metadata_starting_job(job, job_state)
 
@@ -443,21 +572,7 @@ class RemoteSessionAssistant:
         job_state = self._sa.get_job_state(job_id)
 
         if not job_state.can_start():
-            outcome = IJobResult.OUTCOME_NOT_SUPPORTED
-            for inhibitor in job_state.readiness_inhibitor_list:
-                if (
-                    inhibitor.cause == InhibitionCause.FAILED_RESOURCE
-                    and "fail-on-resource" in job.get_flag_set()
-                ):
-                    outcome = IJobResult.OUTCOME_FAIL
-                    break
-                elif inhibitor.cause != InhibitionCause.FAILED_DEP:
-                    continue
-                related_job_state = self._sa._context.state.job_state_map[
-                    inhibitor.related_job.id
-                ]
-                if related_job_state.result.outcome == IJobResult.OUTCOME_SKIP:
-                    outcome = IJobResult.OUTCOME_SKIP
+            outcome = self._get_cant_start_outcome(job, job_state)
 
             def cant_start_builder(*args, **kwargs):
                 result_builder = JobResultBuilder(
@@ -527,6 +642,108 @@ class RemoteSessionAssistant:
                 Interaction("verification", job.verification, self._be)
             )
 
+    def _get_cant_start_outcome(self, job, job_state):
+        """Get the outcome of a job that cannot start."""
+        outcome = IJobResult.OUTCOME_NOT_SUPPORTED
+        for inhibitor in job_state.readiness_inhibitor_list:
+            if (
+                inhibitor.cause == InhibitionCause.FAILED_RESOURCE
+                and "fail-on-resource" in job.get_flag_set()
+            ):
+                return IJobResult.OUTCOME_FAIL
+            elif inhibitor.cause != InhibitionCause.FAILED_DEP:
+                continue
+            related_job_state = self._sa._context.state.job_state_map[
+                inhibitor.related_job.id
+            ]
+            if related_job_state.result.outcome == IJobResult.OUTCOME_SKIP:
+                outcome = IJobResult.OUTCOME_SKIP
+        return outcome
+
+    @allowed_when(TestsSelected)
+    def run_batch(self, job_ids):
+        """
+        Run a sequence of automated jobs without involving the controller.
+
+        The jobs are run in order, in a background thread, until one of them
+        needs the controller (a job that is not automated, or that may not
+        return) or the list is exhausted. Use :meth:`monitor_batch()` to
+        follow the progress of the batch. Jobs that were not run have to be
+        run with :meth:`run_job()`.
+        """
+        _logger.debug("run_batch: %r", job_ids)
+        self._state = RunningBatch
+        self._batch = BatchExecutor(self, list(job_ids))
+
+    @allowed_when(RunningBatch, TestsSelected, Idle)
+    def monitor_batch(self, timeout=0):
+        """
+        Check the progress of the batch started with :meth:`run_batch()`.
+
+        :param timeout:
+            Wait up to this many seconds for something to happen before
+            returning
+        :returns:
+            (state, payload) tuple. State is either "running" or "done".
+            Payload is a JSON list of ``[kind, job_id, data]`` events, where
+            kind is "start" (the job started), "output" (data is the output
+            of the job, as returned by :meth:`monitor_job()`) or "finish"
+            (data is the outcome of the job).
+        """
+        _logger.debug("monitor_batch(%r)", timeout)
+        if not self._batch:
+            return ("done", "[]")
+        events = self._batch.take_events(timeout)
+        state = "done" if self._batch.finished else "running"
+        return (state, json.dumps(events))
+
+    def run_batched_job(self, job_id, batch):
+        """
+        Run a job of a batch started with :meth:`run_batch()`.
+
+        :returns:
+            False, without running it, if the job has to be run by the
+            controller.
+        """
+        job = self._sa.get_job(job_id)
+        if (
+            not job.automated
+            or not job.command
+            or "noreturn" in job.get_flag_set()
+        ):
+            return False
+        job_state = self._sa.get_job_state(job_id)
+        self._job_index = (
+            self._jobs_count - len(self._sa.get_dynamic_todo_list()) + 1
+        )
+        self._currently_running_job = job_id
+        self._current_comments = ""
+        batch.add_event("start", job_id)
+        self._sa.note_metadata_starting_job({"id": job_id}, job_state)
+        if job_state.can_start():
+            ui = self._get_ui_for_job(job)
+            result = self._sa.run_job(job_id, ui, False).get_result()
+        else:
+            result = JobResultBuilder(
+                outcome=self._get_cant_start_outcome(job, job_state),
+                comments=job_state.get_readiness_description(),
+            ).get_result()
+        self._sa.use_job_result(job_id, result)
+        batch.add_event("finish", job_id, result.outcome)
+        return True
+
+    def note_batch_finished(self):
+        """Called by the BatchExecutor when it is done."""
+        self._update_state_after_job()
+
+    @property
+    def currently_running_job(self):
+        return self._currently_running_job
+
+    def get_job_output(self):
+        """Get the output of the current job printed since previous call."""
+        return self._ui.get_output()
+
     @allowed_when(Started, Bootstrapping)
     def run_bootstrapping_job(self, job_id):
         self._currently_running_job = job_id
@@ -534,19 +751,26 @@ class RemoteSessionAssistant:
         self._be = BackgroundExecutor(self, job_id, self._sa.run_job)
 
     @allowed_when(Running, Bootstrapping, Interacting, TestsSelected)
-    def monitor_job(self):
+    def monitor_job(self, timeout=0):
         """
         Check the state of the currently running job.
 
+        :param timeout:
+            If the job is running, wait up to this many seconds for it to
+            print something or to finish before returning. This lets the
+            controller get the output as soon as it is printed without
+            polling.
         :returns:
             (state, payload) tuple.
             Payload conveys detailed info that's characteristic
             to the current state.
         """
-        _logger.debug("monitor_job()")
+        _logger.debug("monitor_job(%r)", timeout)
         # either return [done, running, awaiting response]
         # TODO: handle awaiting_response (reading from stdin by the job)
-        if self._be and self._be.is_alive():
+        if timeout and self._be and not self._be.finished:
+            self._ui.wait_for_output(timeout)
+        if self._be and not self._be.finished and self._be.is_alive():
             return ("running", self._ui.get_output())
         else:
             return ("done", self._ui.get_output())
@@ -562,7 +786,7 @@ class RemoteSessionAssistant:
         """
         _logger.debug("whats_up() -> %r", self._state)
         payload = None
-        if self._state == Running:
+        if self._state in (Running, RunningBatch):
             payload = (
                 self._job_index,
                 self._jobs_count,
@@ -616,17 +840,20 @@ class RemoteSessionAssistant:
                 result = self._be.wait().get_result()
         self._sa.use_job_result(self._currently_running_job, result)
         if self._state != Bootstrapping:
-            if not self._sa.get_dynamic_todo_list():
-                if self._launcher.get_value(
-                    "ui", "auto_retry"
-                ) and self.get_rerun_candidates("auto"):
-                    self._state = TestsSelected
-                else:
-                    self._state = Idle
-            else:
-                self._state = TestsSelected
+            self._update_state_after_job()
         return result
 
+    def _update_state_after_job(self):
+        if not self._sa.get_dynamic_todo_list():
+            if self._launcher.get_value(
+                "ui", "auto_retry"
+            ) and self.get_rerun_candidates("auto"):
+                self._state = TestsSelected
+            else:
+                self._state = Idle
+        else:
+            self._state = TestsSelected
+
     def get_rerun_candidates(self, session_type="manual"):
         return self._sa.get_rerun_candidates(session_type)
 
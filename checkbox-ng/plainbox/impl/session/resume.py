@@ -48,11 +48,14 @@ so two assumptions are made:
 from collections import deque
 import base64
 import binascii
+import contextlib
 import gzip
+import hashlib
 import json
 import logging
 import os
 import re
+import time
 
 from plainbox.i18n import gettext as _
 from plainbox.impl.result import DiskJobResult
@@ -71,6 +74,20 @@ from plainbox.impl.session.system_information import (
 logger = logging.getLogger("plainbox.session.resume")
 
 
+@contextlib.contextmanager
+def _timed_phase(phase_timings, phase):
+    """
+    Add the time spent in the block to ``phase_timings[phase]`` (in seconds)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase_timings[phase] = (
+            phase_timings.get(phase, 0.0) + time.perf_counter() - start
+        )
+
+
 class SessionResumeError(Exception):
     """
     Base for all session resume exceptions.
@@ -126,20 +143,30 @@ class EnvelopeUnpackMixIn:
 
     This class assists in unpacking the "envelope" in which the session data is
     actually stored. The envelope is simply gzip but other kinds of envelope
-    can be added later.
+    can be added later. Journal records appended to the session since the
+    envelope was written can be replayed on top of it.
     """
 
-    def unpack_envelope(self, data):
+    def unpack_envelope(self, data, journal=b""):
         """
         Unpack the binary envelope and get access to a JSON object.
 
         :param data:
             Bytes representing the dormant session
+        :param journal:
+            (optional) Bytes representing the session journal, as created by
+            :class:`~plainbox.impl.session.suspend.SessionJournalWriter`
         :returns:
             the JSON representation of a session stored in the envelope
         :raises CorruptedSessionError:
             if the representation of the session is corrupted in any way
         """
+        json_repr = self._unpack_gzip_json(data)
+        if journal:
+            self._replay_journal(json_repr, data, journal)
+        return json_repr
+
+    def _unpack_gzip_json(self, data):
         try:
             data = gzip.decompress(data)
         except IOError:
@@ -153,16 +180,59 @@ class EnvelopeUnpackMixIn:
         except ValueError:
             raise CorruptedSessionError(_("Cannot interpret session JSON"))
 
+    def _replay_journal(self, json_repr, data, journal):
+        """
+        Apply journal records to the JSON representation of a session.
+
+        Journals written against a different base snapshot (which can happen
+        if the machine crashed right after a new snapshot was saved) are
+        ignored as the snapshot already includes everything they describe.
+        A trailing record that was only partially written is ignored as well.
+        """
+        lines = journal.split(b"\n")
+        # Anything after the last newline is an incomplete record
+        if lines[-1]:
+            logger.warning(_("Ignoring incomplete session journal record"))
+        records = []
+        for line in lines[:-1]:
+            try:
+                records.append(json.loads(line.decode("UTF-8")))
+            except ValueError:
+                raise CorruptedSessionError(
+                    _("Cannot interpret session journal")
+                )
+        if not records:
+            return
+        header = records[0]
+        if not isinstance(header, dict) or header.get("journal") != 1:
+            raise CorruptedSessionError(_("Unsupported session journal"))
+        if header.get("base") != hashlib.sha256(data).hexdigest():
+            logger.warning(_("Ignoring stale session journal"))
+            return
+        try:
+            session_repr = json_repr["session"]
+            for record in records[1:]:
+                for key, entries in record.get("update", {}).items():
+                    session_repr.setdefault(key, {}).update(entries)
+                for key, entry_keys in record.get("remove", {}).items():
+                    for entry_key in entry_keys:
+                        session_repr[key].pop(entry_key, None)
+                session_repr.update(record.get("replace", {}))
+        except (AttributeError, KeyError, TypeError):
+            raise CorruptedSessionError(_("Cannot replay session journal"))
+
 
 class SessionPeekHelper(EnvelopeUnpackMixIn):
     """A helper class to peek at session state meta-data quickly."""
 
-    def peek(self, data):
+    def peek(self, data, journal=b""):
         """
         Peek at the meta-data of a dormant session.
 
         :param data:
             Bytes representing the dormant session
+        :param journal:
+            (optional) Bytes representing the session journal
         :returns:
             a SessionMetaData object
         :raises CorruptedSessionError:
@@ -170,7 +240,43 @@ class SessionPeekHelper(EnvelopeUnpackMixIn):
         :raises IncompatibleSessionError:
             if session serialization format is not supported
         """
-        json_repr = self.unpack_envelope(data)
+        json_repr = self.unpack_envelope(data, journal)
+        return self._peek_json(json_repr)
+
+    def peek_storage(self, storage, index=None):
+        """
+        Peek at the meta-data of a session in the session repository.
+
+        The meta-data is taken from the session repository index or from the
+        meta-data sidecar of the session if they are up to date. Otherwise
+        the checkpoint is decoded. Peeking never writes anything, the sidecar
+        and the index are only saved by
+        :meth:`~plainbox.impl.session.manager.SessionManager.checkpoint()`.
+
+        :param storage:
+            A :class:`~plainbox.impl.session.storage.SessionStorage`
+        :param index:
+            (optional) The session repository index, as returned by
+            :meth:`SessionRepositoryIndex.load()`
+        :returns:
+            a SessionMetaData object or None if the session was not saved yet
+        :raises CorruptedSessionError:
+            if the representation of the session is corrupted in any way
+        :raises IncompatibleSessionError:
+            if session serialization format is not supported
+        """
+        metadata_repr = storage.load_metadata(index)
+        if metadata_repr is not None:
+            try:
+                return self._peek_json(metadata_repr)
+            except SessionResumeError as exc:
+                logger.warning(
+                    _("Ignoring meta-data sidecar of %s: %s"), storage.id, exc
+                )
+        data = storage.load_checkpoint()
+        if len(data) == 0:
+            return None
+        json_repr = self.unpack_envelope(data, storage.load_journal())
         return self._peek_json(json_repr)
 
     def _peek_json(self, json_repr):
@@ -201,6 +307,8 @@ class SessionPeekHelper(EnvelopeUnpackMixIn):
             return SessionPeekHelper7().peek_json(json_repr)
         elif version == 8:
             return SessionPeekHelper8().peek_json(json_repr)
+        elif version == 9:
+            return SessionPeekHelper9().peek_json(json_repr)
         else:
             raise IncompatibleSessionError(
                 _("Unsupported version {}").format(version)
@@ -265,8 +373,10 @@ class SessionResumeHelper(EnvelopeUnpackMixIn):
         logger.debug("Session Resume Helper started with jobs: %r", job_list)
         self.flags = flags
         self.location = location
+        # Time (in seconds) spent in each phase of the last resume() call
+        self.phase_timings = {}
 
-    def resume(self, data, early_cb=None):
+    def resume(self, data, early_cb=None, journal=b""):
         """
         Resume a dormant session.
 
@@ -278,6 +388,10 @@ class SessionResumeHelper(EnvelopeUnpackMixIn):
             be used to register signal listeners on the new session before this
             method call returns. The callback accepts one argument, session,
             which is being resumed.
+        :param journal:
+            (optional) Bytes representing the session journal. Records from
+            the journal are replayed on top of the dormant session before it
+            is resumed.
         :returns:
             resumed session instance
         :rtype:
@@ -297,9 +411,22 @@ class SessionResumeHelper(EnvelopeUnpackMixIn):
             if session serialization format is not supported
         :raises IncompatibleJobError:
             if serialized jobs are not the same as current jobs
+
+        The time spent in each phase of the resume process is stored in
+        :attr:`phase_timings` (and logged).
         """
-        json_repr = self.unpack_envelope(data)
-        return self._resume_json(json_repr, early_cb)
+        self.phase_timings = {}
+        with _timed_phase(self.phase_timings, "unpack"):
+            json_repr = self.unpack_envelope(data, journal)
+        session = self._resume_json(json_repr, early_cb)
+        logger.debug(
+            _("Resume phase timings: %s"),
+            ", ".join(
+                "{}: {:.3f}s".format(phase, duration)
+                for phase, duration in self.phase_timings.items()
+            ),
+        )
+        return session
 
     def _resume_json(self, json_repr, early_cb=None):
         """
@@ -310,7 +437,9 @@ class SessionResumeHelper(EnvelopeUnpackMixIn):
         are related to semantic incompatibilities or corrupted internal state.
         """
         logger.debug(_("Resuming from json... (see below)"))
-        logger.debug(json.dumps(json_repr, indent=4))
+        # Dumping a large session is expensive, only do it when it is logged
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(json_repr, indent=4))
         _validate(json_repr, value_type=dict)
         version = _validate(json_repr, key="version", choice=[1])
         if version == 1:
@@ -345,11 +474,18 @@ class SessionResumeHelper(EnvelopeUnpackMixIn):
             helper = SessionResumeHelper8(
                 self.job_list, self.flags, self.location
             )
+        elif version == 9:
+            helper = SessionResumeHelper9(
+                self.job_list, self.flags, self.location
+            )
         else:
             raise IncompatibleSessionError(
                 _("Unsupported version {}").format(version)
             )
-        return helper.resume_json(json_repr, early_cb)
+        try:
+            return helper.resume_json(json_repr, early_cb)
+        finally:
+            self.phase_timings.update(helper.phase_timings)
 
 
 class ResumeDiscardQualifier(SimpleQualifier):
@@ -625,6 +761,19 @@ class SessionPeekHelper8(MetaDataHelper7MixIn, SessionPeekHelper6):
     """
 
 
+class SessionPeekHelper9(SessionPeekHelper8):
+    """
+    Helper class for implementing session peek feature
+
+    This class works with data constructed by
+    :class:`~plainbox.impl.session.suspend.SessionSuspendHelper9` which has
+    been pre-processed by :class:`SessionPeekHelper` (to strip the initial
+    envelope).
+
+    The only goal of this class is to reconstruct session state meta-data.
+    """
+
+
 class SessionResumeHelper1(MetaDataHelper1MixIn):
     """
     Helper class for implementing session resume feature.
@@ -691,6 +840,8 @@ class SessionResumeHelper1(MetaDataHelper1MixIn):
         self.job_list = job_list
         self.flags = 0
         self.location = location
+        # Time (in seconds) spent in each phase of the last resume
+        self.phase_timings = {}
         # Convert flag string constants into numeric flags
         if flags is not None:
             if self.FLAG_FILE_REFERENCE_CHECKS_S in flags:
@@ -738,14 +889,18 @@ class SessionResumeHelper1(MetaDataHelper1MixIn):
         logger.debug(
             _("Starting to restore jobs and results to %r..."), session
         )
-        self._restore_SessionState_jobs_and_results(session, session_repr)
+        with _timed_phase(self.phase_timings, "jobs_and_results"):
+            self._restore_SessionState_jobs_and_results(session, session_repr)
         logger.debug(_("Starting to restore metadata..."))
-        self._restore_SessionState_metadata(session.metadata, session_repr)
+        with _timed_phase(self.phase_timings, "metadata"):
+            self._restore_SessionState_metadata(session.metadata, session_repr)
         logger.debug(_("restored metadata %r"), session.metadata)
         logger.debug(_("Starting to restore desired job list..."))
-        self._restore_SessionState_desired_job_list(session, session_repr)
+        with _timed_phase(self.phase_timings, "desired_job_list"):
+            self._restore_SessionState_desired_job_list(session, session_repr)
         logger.debug(_("Starting to restore job list..."))
-        self._restore_SessionState_job_list(session, session_repr)
+        with _timed_phase(self.phase_timings, "job_list"):
+            self._restore_SessionState_job_list(session, session_repr)
         # Return whatever we've got
         logger.debug(_("Resume complete!"))
         return session
@@ -754,67 +909,75 @@ class SessionResumeHelper1(MetaDataHelper1MixIn):
         """
         Process representation of a session and restore jobs and results.
 
-        This method reconstructs all jobs and results in several stages.
-        The first pass just goes over all the jobs and results and restores
-        all of the non-generated jobs using :meth:`_process_job()` method.
-        Any jobs that cannot be processed (generated job) is saved for further
-        processing.
+        This method reconstructs all jobs and results in a single pass, using
+        :meth:`_process_job()` for each job. Jobs that are already known are
+        processed in alphabetic order. Generated jobs only become known once
+        the result of the resource job they are instantiated from is
+        replayed, so they are processed right after that job (again, in
+        alphabetic order). Jobs that are never generated make the session
+        corrupted.
+
+        Everything is done inside a :meth:`SessionState.bulk_add()` block, so
+        the signals announcing new units are fired once, at the end, and job
+        readiness is not updated for each result (it is computed when the
+        desired job list is restored).
         """
         # Representation of all of the job definitions
         jobs_repr = _validate(session_repr, key="jobs", value_type=dict)
         # Representation of all of the job results
         results_repr = _validate(session_repr, key="results", value_type=dict)
-        # List of jobs (ids) that could not be processed on the first pass
-        leftover_jobs = deque()
-        # Ensure siblings are generated in the session
-        [session.add_unit(u) for u in self.job_list if u.Meta.name == "job"]
-        # Run a first pass through jobs and results. Anything that didn't
-        # work (generated jobs) gets added to leftover_jobs list.
-        # To make this bit deterministic (we like determinism) we're always
-        # going to process job results in alphabetic orderer.
-        first_pass_list = sorted(
-            set(jobs_repr.keys()) | set(results_repr.keys())
+        # Ids of jobs that still have to be processed (not known yet)
+        pending_set = set(jobs_repr.keys()) | set(results_repr.keys())
+        pending_set.update(
+            session_repr.get("metadata", {}).get("rejected_jobs", [])
         )
-        for job_id in first_pass_list:
-            try:
-                self._process_job(session, jobs_repr, results_repr, job_id)
-            except KeyError:
-                leftover_jobs.append(job_id)
-
-        leftover_jobs += session_repr.get("metadata", {}).get(
-            "rejected_jobs", []
-        )
-        # Process leftovers. For each iteration the leftover_jobs list should
-        # shrink or we're not making any progress. If that happens we've got
-        # undefined jobs (in general the session is corrupted)
-        while leftover_jobs:
-            # Append a sentinel object so that we can know when we're
-            # done "iterating" over the collection once.
-            # Also: https://twitter.com/zygoon/status/370213046678872065
-            leftover_jobs.append(None)
-            leftover_shrunk = False
-            while leftover_jobs:  # pragma: no branch
-                job_id = leftover_jobs.popleft()
-                # Treat the sentinel None object as the end of the iteration
-                if job_id is None:
-                    break
+        with session.bulk_add(recompute=False):
+            # Ensure siblings are generated in the session
+            session.add_units(
+                (u for u in self.job_list if u.Meta.name == "job"),
+                recompute=False,
+            )
+            # To make this bit deterministic (we like determinism) we're
+            # always going to process job results in alphabetic order.
+            work_queue = deque(self._take_known_jobs(session, pending_set))
+            while work_queue:
+                job_id = work_queue.popleft()
+                job_count = len(session.job_state_map)
                 try:
                     self._process_job(session, jobs_repr, results_repr, job_id)
                 except KeyError as exc:
-                    logger.debug("Seen KeyError for %r", exc)
-                    leftover_jobs.append(job_id)
-                else:
-                    leftover_shrunk = True
-            # Check if we're making any progress.
-            # We don't want to keep spinning on a list of some bogus jobs
-            # that nothing generated so we need an end condition for that case
-            if not leftover_shrunk:
+                    raise CorruptedSessionError(
+                        _("Unable to restore job {!r}: {!r}").format(
+                            job_id, exc.args[0]
+                        )
+                    ) from exc
+                if len(session.job_state_map) != job_count and pending_set:
+                    # The result generated some jobs, process them next
+                    work_queue.extendleft(
+                        reversed(self._take_known_jobs(session, pending_set))
+                    )
+            # Anything left was never generated, the session is corrupted
+            if pending_set:
                 raise CorruptedSessionError(
                     _("Unknown jobs remaining: {}").format(
-                        ", ".join(leftover_jobs)
+                        ", ".join(sorted(pending_set))
                     )
                 )
 
+    @staticmethod
+    def _take_known_jobs(session, pending_set):
+        """
+        Remove ids of jobs known to the session from pending_set.
+
+        :returns:
+            The sorted list of removed ids
+        """
+        known_list = sorted(
+            job_id for job_id in pending_set if job_id in session.job_state_map
+        )
+        pending_set.difference_update(known_list)
+        return known_list
+
     def _process_job(self, session, jobs_repr, results_repr, job_id):
         """
         Process all representation details associated with a particular job.
@@ -1247,18 +1410,25 @@ class SessionResumeHelper6(MetaDataHelper6MixIn, SessionResumeHelper5):
                 session = new_session
         # Restore bits and pieces of state
         logger.debug(_("Starting to restore metadata..."))
-        self._restore_SessionState_metadata(session.metadata, session_repr)
+        with _timed_phase(self.phase_timings, "metadata"):
+            self._restore_SessionState_metadata(session.metadata, session_repr)
         logger.debug(_("restored metadata %r"), session.metadata)
         logger.debug(
             _("Starting to restore jobs and results to %r..."), session
         )
-        self._restore_SessionState_jobs_and_results(session, session_repr)
+        with _timed_phase(self.phase_timings, "jobs_and_results"):
+            self._restore_SessionState_jobs_and_results(session, session_repr)
         logger.debug(_("Starting to restore mandatory job list..."))
-        self._restore_SessionState_mandatory_job_list(session, session_repr)
+        with _timed_phase(self.phase_timings, "mandatory_job_list"):
+            self._restore_SessionState_mandatory_job_list(
+                session, session_repr
+            )
         logger.debug(_("Starting to restore desired job list..."))
-        self._restore_SessionState_desired_job_list(session, session_repr)
+        with _timed_phase(self.phase_timings, "desired_job_list"):
+            self._restore_SessionState_desired_job_list(session, session_repr)
         logger.debug(_("Starting to restore job list..."))
-        self._restore_SessionState_job_list(session, session_repr)
+        with _timed_phase(self.phase_timings, "job_list"):
+            self._restore_SessionState_job_list(session, session_repr)
         # Return whatever we've got
         logger.debug(_("Resume complete!"))
         return session
@@ -1285,12 +1455,30 @@ class SessionResumeHelper8(SessionResumeHelper7):
 
     def _build_SessionState(self, session_repr, early_cb=None):
         session_state = super()._build_SessionState(session_repr, early_cb)
-        self._restore_SessionState_system_information(
-            session_state, session_repr
-        )
+        with _timed_phase(self.phase_timings, "system_information"):
+            self._restore_SessionState_system_information(
+                session_state, session_repr
+            )
         return session_state
 
 
+class SessionResumeHelper9(SessionResumeHelper8):
+    @classmethod
+    def _build_JobResult(cls, result_repr, flags, location):
+        """
+        Reconstruct a single job result, along with its resource usage.
+        """
+        result = super()._build_JobResult(result_repr, flags, location)
+        resource_usage = _validate(
+            result_repr.get("resource_usage"), value_type=dict, value_none=True
+        )
+        if resource_usage is not None:
+            result = result.get_builder(
+                resource_usage=resource_usage
+            ).get_result()
+        return result
+
+
 def _validate(obj, **flags):
     """Multi-purpose extraction and validation function."""
     # Fetch data from the container OR use json_repr directly
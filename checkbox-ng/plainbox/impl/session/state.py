@@ -22,8 +22,10 @@ Session State Handling.
 ============================================================
 """
 import collections
+import contextlib
 import json
 import logging
+import os
 import re
 
 from plainbox.abc import IJobResult
@@ -31,13 +33,18 @@ from plainbox.i18n import gettext as _
 from plainbox.impl import deprecated
 from plainbox.impl.depmgr import DependencyDuplicateError
 from plainbox.impl.depmgr import DependencyError
+from plainbox.impl.depmgr import DependencyGraph
 from plainbox.impl.depmgr import DependencySolver
+from plainbox.impl.resource import ResourceList
+from plainbox.impl.secure.qualifiers import CompiledQualifier
 from plainbox.impl.secure.qualifiers import select_units
 from plainbox.impl.session.jobs import JobState
 from plainbox.impl.session.jobs import UndesiredJobReadinessInhibitor
+from plainbox.impl.session.system_information import BackgroundCollection
 from plainbox.impl.session.system_information import (
     collect as collect_system_information,
 )
+from plainbox.impl.session.system_information import collect_in_background
 from plainbox.impl.unit.job import JobDefinition
 from plainbox.impl.unit.unit_with_id import UnitWithId
 from plainbox.impl.unit.testplan import TestPlanUnitSupport
@@ -440,10 +447,10 @@ class SessionDeviceContext:
             )
         self._provider_list.append(provider)
         self.on_provider_added(provider)
-        if add_units:
-            for unit in provider.unit_list:
-                self.add_unit(unit, False)
-        self.state._recompute_job_readiness()
+        with self.state.bulk_add():
+            if add_units:
+                for unit in provider.unit_list:
+                    self.add_unit(unit, False)
 
     def add_unit(self, unit, recompute=True):
         """
@@ -675,6 +682,11 @@ class SessionState:
     :ivar dict metadata: instance of :class:`SessionMetaData`
     """
 
+    # When set, each incremental readiness update is followed by a full
+    # recompute and any difference between the two is logged as an error.
+    # This is a debugging aid and makes every job result O(N) again.
+    cross_check_readiness = bool(os.getenv("PLAINBOX_DEBUG_READINESS"))
+
     @morris.signal
     def on_job_state_map_changed(self):
         """
@@ -769,13 +781,25 @@ class SessionState:
         self._job_list = job_list
         self._unit_list = unit_list
         self._job_state_map = {job.id: JobState(job) for job in self._job_list}
+        # Dependencies of the jobs, kept across dependency solver runs
+        self._dependency_graph = DependencyGraph(job_list)
         self._desired_job_list = []
         self._mandatory_job_list = []
         self._run_list = []
         self._resource_map = {}
+        # Index of templates by the id of their resource job
+        self._template_index = collections.defaultdict(list)
+        for unit in self._unit_list:
+            self._index_template(unit)
+        # Reverse dependency index (job id -> dependent jobs on the run list)
+        # maintained by _recompute_job_readiness(). None means "stale".
+        self._readiness_dependents = None
+        # Units added in the current bulk_add() block, None outside of it
+        self._bulk_unit_list = None
         self._fake_resources = False
         self._metadata = SessionMetaData()
-        # If unset, this is loaded via system_information
+        # If unset, this is loaded via system_information. It is a
+        # BackgroundCollection while a background collection is running
         self._system_information = None
 
         super(SessionState, self).__init__()
@@ -802,7 +826,10 @@ class SessionState:
         # job and can do efficient operations later.
         #
         # The whole function should be O(N), where N is len(job_list)
-        remove_flags = [qualifier.designates(job) for job in self._job_list]
+        compiled_qualifier = CompiledQualifier([qualifier])
+        remove_flags = [
+            compiled_qualifier.designates(job) for job in self._job_list
+        ]
         # Build a list of (job, should_remove) flags, we'll be using this list
         # a few times below.
         job_and_flag_list = list(zip(self._job_list, remove_flags))
@@ -833,6 +860,7 @@ class SessionState:
         for job, should_remove in job_and_flag_list:
             if should_remove:
                 del self._job_state_map[job.id]
+                self._dependency_graph.remove_job(job)
                 if job.id in self._resource_map:
                     del self._resource_map[job.id]
         # Compute a list of jobs to retain
@@ -857,8 +885,22 @@ class SessionState:
                 self.on_job_removed(job)
                 self.on_unit_removed(job)
 
+    def start_system_information_collection(self):
+        """
+        Start collecting the system information in the background.
+
+        The collection is joined the first time :attr:`system_information`
+        is accessed (at the first checkpoint of the session). This does
+        nothing if the system information is already known or being
+        collected.
+        """
+        if self._system_information is None:
+            self._system_information = collect_in_background()
+
     @property
     def system_information(self):
+        if isinstance(self._system_information, BackgroundCollection):
+            self._system_information = self._system_information.result()
         if not self._system_information:
             # This is a new session, we need to query this infos
             self._system_information = collect_system_information()
@@ -917,7 +959,7 @@ class SessionState:
             # resources or runtime complexity.
             try:
                 self._run_list = DependencySolver.resolve_dependencies(
-                    job_list, self._desired_job_list
+                    job_list, self._desired_job_list, self._dependency_graph
                 )
             except DependencyError as exc:
                 # When a dependency error is detected remove the affected job
@@ -999,11 +1041,16 @@ class SessionState:
         records. A new entry is created in the resource map (entirely replacing
         any old entries), with a list of the resources that were parsed from
         the IO log.
+
+        Inside a :meth:`bulk_add()` block readiness is not updated, it is
+        recomputed for all jobs when the block ends (or, if the block was
+        started with ``recompute=False``, by the caller).
         """
         job.controller.observe_result(
             self, job, result, fake_resources=self._fake_resources
         )
-        self._recompute_job_readiness()
+        if self._bulk_unit_list is None:
+            self._update_job_readiness(job)
 
     @deprecated("0.9", "use the add_unit() method instead")
     def add_job(self, new_job, recompute=True):
@@ -1081,8 +1128,96 @@ class SessionState:
         else:
             return self._add_other_unit(new_unit)
 
+    def add_units(self, unit_list, recompute=True, via=None):
+        """
+        Add a number of units to the session.
+
+        :param unit_list:
+            An iterable of units to add
+        :param recompute:
+            If True, recompute readiness inhibitors for all jobs, once, after
+            all of the units are added.
+        :returns:
+            A list with the unit that was actually added (or the existing,
+            identical unit) for each of the units, see :meth:`add_unit()`
+
+        :raises DependencyDuplicateError:
+            if a duplicate, clashing job definition is detected. None of the
+            units are added in that case.
+
+        This is a shorthand for calling :meth:`add_unit()` for each unit
+        inside a :meth:`bulk_add()` block.
+        """
+        with self.bulk_add(recompute=recompute):
+            return [
+                self.add_unit(unit, recompute=False, via=via)
+                for unit in unit_list
+            ]
+
+    @contextlib.contextmanager
+    def bulk_add(self, recompute=True):
+        """
+        Context manager for adding a number of units at once.
+
+        :param recompute:
+            If True, recompute readiness inhibitors for all jobs when the
+            block ends (the recompute argument of :meth:`add_unit()` is
+            ignored inside the block). Callers that go on to call
+            :meth:`update_desired_job_list()` should pass False, so that the
+            dependency graph is solved and readiness is computed only once.
+
+        Units added inside the block are registered right away, so that
+        clashing jobs are detected immediately, but the signals announcing
+        them are held back. When the block ends
+        :meth:`on_job_state_map_changed()` is fired once, followed by
+        :meth:`on_unit_added()` (and :meth:`on_job_added()`) for each new
+        unit, in the order they were added.
+
+        If the block raises an exception all the units added inside it are
+        discarded and no signal is fired. Blocks can be nested, only the
+        outermost one has any effect. Units must not be removed inside the
+        block.
+        """
+        if self._bulk_unit_list is not None:
+            yield
+            return
+        unit_count = len(self._unit_list)
+        job_count = len(self._job_list)
+        self._bulk_unit_list = []
+        try:
+            yield
+        except BaseException:
+            self._rollback_bulk_add(unit_count, job_count)
+            raise
+        else:
+            unit_list = self._bulk_unit_list
+            self._bulk_unit_list = None
+            if any(unit.Meta.name == "job" for unit in unit_list):
+                self.on_job_state_map_changed()
+            for unit in unit_list:
+                self.on_unit_added(unit)
+                if unit.Meta.name == "job":
+                    self.on_job_added(unit)
+            if recompute:
+                self._recompute_job_readiness()
+
+    def _rollback_bulk_add(self, unit_count, job_count):
+        for unit in self._bulk_unit_list:
+            if unit.Meta.name == "job":
+                del self._job_state_map[unit.id]
+                self._dependency_graph.remove_job(unit)
+            elif unit.Meta.name == "template":
+                self._template_index[unit.resource_id].remove(unit)
+        del self._unit_list[unit_count:]
+        del self._job_list[job_count:]
+        self._bulk_unit_list = None
+
     def _add_other_unit(self, new_unit):
         self.unit_list.append(new_unit)
+        self._index_template(new_unit)
+        if self._bulk_unit_list is not None:
+            self._bulk_unit_list.append(new_unit)
+            return new_unit
         self.on_unit_added(new_unit)
         return new_unit
 
@@ -1094,10 +1229,14 @@ class SessionState:
             # Register the new job in our state
             self.job_state_map[new_job.id] = JobState(new_job)
             self.job_list.append(new_job)
+            self._dependency_graph.add_job(new_job)
             self.unit_list.append(new_job)
-            self.on_job_state_map_changed()
-            self.on_unit_added(new_job)
-            self.on_job_added(new_job)
+            if self._bulk_unit_list is not None:
+                self._bulk_unit_list.append(new_job)
+            else:
+                self.on_job_state_map_changed()
+                self.on_unit_added(new_job)
+                self.on_job_added(new_job)
             self._add_job_siblings_unit(new_job, recompute, via)
             return new_job
         else:
@@ -1108,8 +1247,8 @@ class SessionState:
             self._add_job_siblings_unit(new_job, recompute, via)
             return existing_job
         finally:
-            # Update all job readiness state
-            if recompute:
+            # Update all job readiness state (bulk_add() does it at the end)
+            if recompute and self._bulk_unit_list is None:
                 self._recompute_job_readiness()
 
     def _add_job_siblings_unit(self, new_job, recompute, via):
@@ -1209,25 +1348,46 @@ class SessionState:
         """
         self._unit_list.remove(unit)
         self.on_unit_removed(unit)
+        if unit.Meta.name == "template":
+            template_list = self._template_index.get(unit.resource_id, [])
+            if unit in template_list:
+                template_list.remove(unit)
         if unit.Meta.name == "job":
             self._job_list.remove(unit)
             del self._job_state_map[unit.id]
+            self._dependency_graph.remove_job(unit)
             try:
                 del self._resource_map[unit.id]
             except KeyError:
                 pass
+            self._readiness_dependents = None
             if recompute:
                 self._recompute_job_readiness()
             self.on_job_removed(unit)
             self.on_job_state_map_changed()
 
+    def _index_template(self, unit):
+        if unit.Meta.name == "template":
+            self._template_index[unit.resource_id].append(unit)
+
+    def get_template_list(self, resource_id):
+        """
+        Get the templates instantiated from the given resource job.
+
+        :param resource_id:
+            The id of the resource job
+        :returns:
+            A list of TemplateUnit objects, in the order they were added
+        """
+        return list(self._template_index.get(resource_id, ()))
+
     def set_resource_list(self, resource_id, resource_list):
         """
         Add or change a resource with the given id.
 
         Resources silently overwrite any old resources with the same id.
         """
-        self._resource_map[resource_id] = resource_list
+        self._resource_map[resource_id] = ResourceList(resource_list)
 
     @property
     def job_list(self):
@@ -1240,6 +1400,17 @@ class SessionState:
         """
         return self._job_list
 
+    @property
+    def dependency_graph(self):
+        """
+        Dependencies of the known jobs.
+
+        A :class:`~plainbox.impl.depmgr.DependencyGraph` kept up to date as
+        jobs are added and removed, its statistics tell how much time was
+        spent solving dependencies.
+        """
+        return self._dependency_graph
+
     @property
     def mandatory_job_list(self):
         """
@@ -1524,3 +1695,80 @@ class SessionState:
             # Ask the job controller about inhibitors affecting this job
             for inhibitor in job.controller.get_inhibitor_list(self, job):
                 job_state.readiness_inhibitor_list.append(inhibitor)
+        self._readiness_dependents = self._compute_readiness_dependents()
+
+    def _compute_readiness_dependents(self):
+        """
+        Internal method of SessionState.
+
+        Computes the reverse dependency index used by
+        :meth:`_update_job_readiness()`. The index maps the id of each job
+        whose result (or resources) are consulted when computing inhibitors
+        to the list of run list jobs that consult it, in run list order.
+        """
+        dependents = collections.defaultdict(list)
+        before_suspend_map = self._dependency_graph.get_before_suspend_map(
+            self._run_list
+        )
+        for job in self._run_list:
+            dep_id_set = {
+                dep_id
+                for dep_type, dep_id in (
+                    self._dependency_graph.get_dependency_list(job)
+                )
+            }
+            dep_id_set.update(before_suspend_map.get(job.id, ()))
+            dep_id_set.update(job.get_salvage_dependencies())
+            for dep_id in dep_id_set:
+                dependents[dep_id].append(job)
+        return dependents
+
+    def _update_job_readiness(self, changed_job):
+        """
+        Internal method of SessionState.
+
+        Re-computes readiness of the jobs affected by a new result of
+        ``changed_job``. Readiness inhibitors depend only on the results
+        and resources of the direct, ordering, resource and salvage
+        dependencies of a job, so only the jobs that list ``changed_job``
+        among those need to be looked at again. Falls back to
+        :meth:`_recompute_job_readiness()` when the index is stale.
+        """
+        if self._readiness_dependents is None:
+            self._recompute_job_readiness()
+            return
+        for job in self._readiness_dependents.get(changed_job.id, ()):
+            job_state = self._job_state_map.get(job.id)
+            if job_state is None:
+                continue
+            job_state.readiness_inhibitor_list = list(
+                job.controller.get_inhibitor_list(self, job)
+            )
+        if self.cross_check_readiness:
+            self._cross_check_job_readiness(changed_job)
+
+    def _cross_check_job_readiness(self, changed_job):
+        """
+        Internal method of SessionState.
+
+        Compares the readiness computed incrementally with a full recompute,
+        logging each job for which they differ. The result of the full
+        recompute is kept.
+        """
+        incremental = {
+            job_id: list(job_state.readiness_inhibitor_list)
+            for job_id, job_state in self._job_state_map.items()
+        }
+        self._recompute_job_readiness()
+        for job_id, job_state in self._job_state_map.items():
+            if incremental[job_id] != job_state.readiness_inhibitor_list:
+                logger.error(
+                    _(
+                        "Readiness of %s after result of %s differs: %r"
+                        " (incremental) != %r (full)"
+                    ),
+                    job_id,
+                    changed_job.id,
+                    incremental[job_id],
+                    job_state.readiness_inhibitor_list,
+                )
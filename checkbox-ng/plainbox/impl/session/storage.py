@@ -27,12 +27,16 @@ create (allocate) and remove all of the files associated with a particular
 session.
 """
 
+import contextlib
 import datetime
 import errno
+import fcntl
+import json
 import logging
 import os
 import shutil
 import stat
+import tempfile
 
 from plainbox.i18n import gettext as _, ngettext
 from plainbox.impl.runner import slugify
@@ -127,11 +131,7 @@ class WellKnownDirsHelper:
         logger.debug(_("Enumerating sessions in %s"), repo)
         try:
             # Try to enumerate the directory
-            item_list = sorted(
-                os.listdir(repo),
-                key=lambda x: os.stat(os.path.join(repo, x)).st_mtime,
-                reverse=True,
-            )
+            item_list = os.listdir(repo)
         except OSError as exc:
             # If the directory does not exist,
             # silently return empty collection
@@ -139,23 +139,127 @@ class WellKnownDirsHelper:
                 return []
             # Don't silence any other errors
             raise
-        session_list = []
+        candidate_list = []
         # Check each item by looking for directories
         for item in item_list:
-            pathname = os.path.join(repo, item)
-            # Make sure not to follow any symlinks here
-            stat_result = os.lstat(pathname)
             # Consider non-hidden directories that end with the word .session
-            if (
-                not item.startswith(".")
-                and item.endswith(".session")
-                and stat.S_ISDIR(stat_result.st_mode)
-            ):
+            if item.startswith(".") or not item.endswith(".session"):
+                continue
+            pathname = os.path.join(repo, item)
+            try:
+                # Make sure not to follow any symlinks here
+                stat_result = os.lstat(pathname)
+            except FileNotFoundError:
+                # The session was removed since the directory was listed
+                continue
+            if stat.S_ISDIR(stat_result.st_mode):
                 logger.debug(_("Found possible session in %r"), pathname)
-                session = SessionStorage(os.path.splitext(item)[0])
-                session_list.append(session)
+                candidate_list.append((stat_result.st_mtime, item))
+        candidate_list.sort(reverse=True)
         # Return the full list
-        return session_list
+        return [
+            SessionStorage(os.path.splitext(item)[0])
+            for _mtime, item in candidate_list
+        ]
+
+
+def _write_json_atomically(pathname, obj):
+    """
+    Write a JSON document so that readers see either the old or new content.
+    """
+    dirname, basename = os.path.split(pathname)
+    fd, tmp_pathname = tempfile.mkstemp(
+        dir=dirname, prefix=".{}.".format(basename), suffix=".next"
+    )
+    try:
+        with open(fd, "wt", encoding="UTF-8") as stream:
+            json.dump(obj, stream, separators=(",", ":"))
+        os.replace(tmp_pathname, pathname)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_pathname)
+        raise
+
+
+class SessionRepositoryIndex:
+    """
+    Index of the meta-data of all the sessions in the session repository.
+
+    The index is a single JSON file that maps the id of each session to a
+    copy of its meta-data sidecar (see :meth:`SessionStorage.save_metadata()`).
+    It lets applications list the stored sessions without reading anything
+    but the index. Entries are only trusted if their checkpoint stamp still
+    matches the session.
+
+    The index lives in a hidden directory of the session repository, so that
+    its lock and temporary files never show up while sessions are listed.
+    """
+
+    _INDEX_DIR = ".session-index"
+
+    _INDEX_FILE = "index.json"
+
+    _INDEX_LOCK = "index.lock"
+
+    @classmethod
+    def index_dir(cls):
+        return os.path.join(
+            WellKnownDirsHelper.session_repository(), cls._INDEX_DIR
+        )
+
+    @classmethod
+    def index_file(cls):
+        return os.path.join(cls.index_dir(), cls._INDEX_FILE)
+
+    @classmethod
+    def load(cls):
+        """
+        Load the index.
+
+        :returns:
+            A dictionary mapping session ids to meta-data sidecar entries.
+            The dictionary is empty if the index is missing or unreadable.
+        """
+        try:
+            with open(cls.index_file(), "rt", encoding="UTF-8") as stream:
+                index = json.load(stream)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            logger.warning(_("Cannot load session index: %s"), exc)
+            return {}
+        if not isinstance(index, dict):
+            return {}
+        return index
+
+    @classmethod
+    def update(cls, session_id, entry):
+        """
+        Add, replace or (if entry is None) remove the entry of one session.
+
+        The index is locked for the duration of the update, so that
+        concurrent updates don't lose each other's entries, and is replaced
+        atomically.
+
+        :raises IOError, OSError:
+            on various problems related to accessing the filesystem
+        """
+        if entry is None and not os.path.exists(cls.index_file()):
+            return
+        os.makedirs(cls.index_dir(), exist_ok=True)
+        lock_pathname = os.path.join(cls.index_dir(), cls._INDEX_LOCK)
+        lock_fd = os.open(lock_pathname, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            index = cls.load()
+            if entry is None:
+                if index.pop(session_id, None) is None:
+                    return
+            else:
+                index[session_id] = entry
+            _write_json_atomically(cls.index_file(), index)
+        finally:
+            os.close(lock_fd)
 
 
 class LockedStorageError(IOError):
@@ -184,6 +288,10 @@ class SessionStorage:
 
     _SESSION_FILE_NEXT = "session.next"
 
+    _SESSION_JOURNAL = "session.journal"
+
+    _SESSION_METADATA = "session.meta"
+
     def __init__(self, id):
         """
         Initialize a :class:`SessionStorage` with the given location.
@@ -219,6 +327,20 @@ class SessionStorage:
         """
         return os.path.join(self.location, self._SESSION_FILE)
 
+    @property
+    def journal_file(self):
+        """
+        pathname of the session journal file
+        """
+        return os.path.join(self.location, self._SESSION_JOURNAL)
+
+    @property
+    def metadata_file(self):
+        """
+        pathname of the session meta-data sidecar file
+        """
+        return os.path.join(self.location, self._SESSION_METADATA)
+
     @classmethod
     def create(cls, prefix="pbox-"):
         """
@@ -261,6 +383,107 @@ class SessionStorage:
             logger.warning(_("Cannot remove %s"), path)
 
         shutil.rmtree(self.location, onerror=error_handler)
+        try:
+            SessionRepositoryIndex.update(self.id, None)
+        except OSError as exc:
+            logger.warning(_("Cannot update session index: %s"), exc)
+
+    def get_checkpoint_stamp(self):
+        """
+        Get a value that changes each time checkpoint data is saved.
+
+        :returns:
+            A list with the size and modification time of the session file and
+            the size of the journal, or None if there is no session file.
+        """
+        try:
+            session_stat = os.stat(self.session_file)
+        except FileNotFoundError:
+            return None
+        try:
+            journal_size = os.stat(self.journal_file).st_size
+        except FileNotFoundError:
+            journal_size = 0
+        return [session_stat.st_size, session_stat.st_mtime_ns, journal_size]
+
+    def save_metadata(self, metadata_repr, stamp=None, update_index=True):
+        """
+        Save the meta-data sidecar of the session and update the index.
+
+        The sidecar is a small JSON file that holds a copy of the session
+        meta-data along with the stamp (see :meth:`get_checkpoint_stamp()`)
+        of the checkpoint it was taken from. It lets applications peek at the
+        meta-data without decoding the checkpoint. A sidecar is only used
+        while the session file is the one it was taken from, so it never
+        needs to be written together with the checkpoint. It stays valid
+        while the journal grows: it must be saved again after appending
+        journal data that changes the meta-data. Index entries are only used
+        while their stamp matches the checkpoint.
+
+        :param metadata_repr:
+            JSON-friendly representation of the meta-data
+        :param stamp:
+            Stamp of the checkpoint the meta-data comes from. The stamp of the
+            current checkpoint is used if omitted.
+        :param update_index:
+            If False, only the sidecar is saved
+        """
+        if stamp is None:
+            stamp = self.get_checkpoint_stamp()
+        entry = {"stamp": stamp, "metadata": metadata_repr}
+        try:
+            _write_json_atomically(self.metadata_file, entry)
+        except OSError as exc:
+            logger.warning(_("Cannot save session meta-data: %s"), exc)
+            # The old sidecar may still look valid
+            with contextlib.suppress(OSError):
+                os.remove(self.metadata_file)
+            return
+        if update_index:
+            try:
+                SessionRepositoryIndex.update(self.id, entry)
+            except OSError as exc:
+                logger.warning(_("Cannot update session index: %s"), exc)
+
+    def load_metadata(self, index=None):
+        """
+        Load the meta-data of the session, if it is up to date.
+
+        :param index:
+            (optional) Session repository index, as returned by
+            :meth:`SessionRepositoryIndex.load()`. The sidecar file is read
+            only if the index has no up to date entry for this session.
+        :returns:
+            The representation of the meta-data that was passed to
+            :meth:`save_metadata()` or None if there is no meta-data for the
+            current checkpoint.
+        """
+        stamp = self.get_checkpoint_stamp()
+        if stamp is None:
+            return None
+        entry = (index or {}).get(self.id)
+        if isinstance(entry, dict) and entry.get("stamp") == stamp:
+            return entry.get("metadata")
+        try:
+            with open(self.metadata_file, "rt", encoding="UTF-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            logger.warning(_("Cannot load session meta-data: %s"), exc)
+            return None
+        if not isinstance(entry, dict):
+            return None
+        sidecar_stamp = entry.get("stamp")
+        # The sidecar covers journal data appended after it was saved
+        if (
+            not isinstance(sidecar_stamp, list)
+            or len(sidecar_stamp) != len(stamp)
+            or sidecar_stamp[:-1] != stamp[:-1]
+            or sidecar_stamp[-1] > stamp[-1]
+        ):
+            return None
+        return entry.get("metadata")
 
     def load_checkpoint(self):
         """
@@ -447,6 +670,15 @@ class SessionStorage:
                 # TRANSLATORS: unlinking as in deleting a file
                 logger.warning(_("Unlinking %r"), self._SESSION_FILE_NEXT)
                 os.unlink(self._SESSION_FILE_NEXT, dir_fd=location_fd)
+            else:
+                # The new session file supersedes any journal that was
+                # appended to the previous one. Should we crash before the
+                # journal is gone the resume code will notice that the journal
+                # was written against a different base and ignore it.
+                try:
+                    os.unlink(self._SESSION_JOURNAL, dir_fd=location_fd)
+                except FileNotFoundError:
+                    pass
             # Flush kernel buffers on the directory.
             #
             # This should ensure the rename operation is really on disk by now.
@@ -468,6 +700,95 @@ class SessionStorage:
             logger.debug(_("Closing descriptor %d"), location_fd)
             os.close(location_fd)
 
+    def load_journal(self):
+        """
+        Load journal data from the filesystem
+
+        :returns:
+            data appended with :meth:`append_journal()` since the most recent
+            call to :meth:`save_checkpoint()`
+        :rtype: bytes
+
+        :raises IOError, OSError:
+            on various problems related to accessing the filesystem
+        """
+        try:
+            with open(self.journal_file, "rb") as stream:
+                return stream.read()
+        except FileNotFoundError:
+            # Treat lack of 'session.journal' file as an empty journal
+            return b""
+
+    def append_journal(self, data):
+        """
+        Append journal data to the filesystem.
+
+        Unlike :meth:`save_checkpoint()` this method does not rewrite the
+        session file. The data is appended to the journal file which is
+        synchronized to disk before this method returns. The journal is
+        discarded by the next call to :meth:`save_checkpoint()`.
+
+        :raises TypeError:
+            if data is not a bytes object.
+
+        :raises IOError, OSError:
+            on various problems related to accessing the filesystem.
+        """
+        if not isinstance(data, bytes):
+            raise TypeError("data must be bytes")
+        logger.debug(
+            ngettext(
+                "Appending %d byte of journal data",
+                "Appending %d bytes of journal data",
+                len(data),
+            ),
+            len(data),
+        )
+        location_fd = os.open(self.location, os.O_DIRECTORY)
+        try:
+            try:
+                journal_fd = os.open(
+                    self._SESSION_JOURNAL,
+                    os.O_WRONLY | os.O_APPEND,
+                    dir_fd=location_fd,
+                )
+                created = False
+            except FileNotFoundError:
+                journal_fd = os.open(
+                    self._SESSION_JOURNAL,
+                    os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                    0o644,
+                    dir_fd=location_fd,
+                )
+                created = True
+            try:
+                num_written = os.write(journal_fd, data)
+                if num_written != len(data):
+                    raise IOError(_("partial write?"))
+                try:
+                    os.fsync(journal_fd)
+                except OSError as exc:
+                    logger.warning(
+                        _("Cannot synchronize file %r: %s"),
+                        self._SESSION_JOURNAL,
+                        exc,
+                    )
+            finally:
+                os.close(journal_fd)
+            if created:
+                # Make sure the directory entry of the new journal survives
+                # a crash as well.
+                try:
+                    os.fsync(location_fd)
+                except OSError as exc:
+                    logger.warning(
+                        _("Cannot synchronize directory %r: %s"),
+                        self.location,
+                        exc,
+                    )
+        finally:
+            os.close(location_fd)
+
     def break_lock(self):
         """
         Forcibly unlock the storage by removing a file created during
@@ -83,10 +83,43 @@ Serialization format versions
 5) Same as '4' but DiskJobResult is stored with a relative pathname to the log
    file if session_dir is provided.
 6) Same as '5' plus store the list of mandatory jobs.
+7) Same as '6' plus store the start time of the last job.
+8) Same as '7' plus store the system information.
+9) Same as '8' plus store the resource usage of each job result.
+
+Journaled checkpoints
+^^^^^^^^^^^^^^^^^^^^^
+Instead of writing a new snapshot after every change, a session can be saved
+as a base snapshot followed by a journal of small records (see
+:class:`SessionJournalWriter`). Each record is a single line of JSON that
+describes how the representation of the session changed since the previous
+record. The first line of the journal is a header that identifies the base
+snapshot the journal applies to::
+
+    {"journal": 1, "base": "<sha256 of the base snapshot>"}
+
+Subsequent lines may contain the following keys:
+
+``update``:
+    Mapping of one of the keyed sections of the session (``jobs``,
+    ``results`` or ``system_information``) to the entries that were added or
+    changed in that section.
+
+``remove``:
+    Mapping of one of the keyed sections to the list of keys that are gone.
+
+``replace``:
+    Mapping of the remaining session keys (``metadata``,
+    ``desired_job_list``, ...) to their new value.
+
+Replaying the journal on top of the base snapshot yields exactly the same
+representation as a full snapshot would. The journal is periodically
+compacted by writing a new base snapshot.
 """
 
 import base64
 import gzip
+import hashlib
 import json
 import logging
 import os
@@ -128,6 +161,34 @@ class SessionSuspendHelper1:
         :returns bytes: the serialized data
         """
         json_repr = self._json_repr(session, session_dir)
+        return self._encode(json_repr)
+
+    def suspend_metadata(self, session, session_dir=None):
+        """
+        Compute the representation of the session meta-data alone.
+
+        The result has the same structure as the representation of the whole
+        session, restricted to the meta-data. It is saved in the meta-data
+        sidecar of the session (see
+        :meth:`SessionStorage.save_metadata()`) and can be read back with
+        :meth:`SessionPeekHelper.peek_storage()`.
+
+        :returns:
+            JSON-friendly representation
+        :rtype:
+            dict
+        """
+        return {
+            "version": self.VERSION,
+            "session": {
+                "metadata": self._repr_SessionMetaData(
+                    session.metadata, session_dir
+                )
+            },
+        }
+
+    def _encode(self, json_repr):
+        """Compute the binary (gzipped JSON) form of a representation."""
         data = json.dumps(
             json_repr,
             ensure_ascii=False,
@@ -670,6 +731,8 @@ class SessionSuspendHelper8(SessionSuspendHelper7):
 
     def _repr_SessionState(self, obj, session_dir):
         data = super()._repr_SessionState(obj, session_dir)
+        # This joins a background collection, its commands are killed after
+        # the collectors' timeout
         data["system_information"] = {
             tool_name: tool_output.to_dict()
             for (tool_name, tool_output) in obj.system_information.items()
@@ -677,5 +740,203 @@ class SessionSuspendHelper8(SessionSuspendHelper7):
         return data
 
 
+class SessionSuspendHelper9(SessionSuspendHelper8):
+    VERSION = 9
+
+    def _repr_JobResultBase(self, obj, session_dir):
+        """
+        Compute the representation of _JobResultBase.
+
+        The dictionary has the following keys *in addition to* what is
+        produced by :meth:`SessionSuspendHelper1._repr_JobResultBase()`:
+
+            ``resource_usage``
+                Resources used by the test command (or None), see
+                :func:`plainbox.impl.result.get_resource_usage()`
+        """
+        data = super()._repr_JobResultBase(obj, session_dir)
+        data["resource_usage"] = obj.resource_usage
+        return data
+
+
 # Alias for the most recent version
-SessionSuspendHelper = SessionSuspendHelper8
+SessionSuspendHelper = SessionSuspendHelper9
+
+
+class SessionJournalWriter:
+    """
+    Helper class for computing journaled checkpoints of a session.
+
+    The writer keeps the representation of the last checkpoint in memory so
+    that each subsequent checkpoint can be expressed as a small record that
+    only mentions what has changed. Every so often (see
+    :attr:`max_records` and :attr:`max_journal_ratio`) the journal is
+    compacted and a full snapshot has to be written instead.
+
+    The writer only creates bytes objects to save. Actual saving should be
+    performed using
+    :meth:`~plainbox.impl.session.storage.SessionStorage.save_checkpoint()`
+    for snapshots and
+    :meth:`~plainbox.impl.session.storage.SessionStorage.append_journal()`
+    for journal records.
+    """
+
+    VERSION = 1
+
+    # Keys of the session representation that map identifiers to values and
+    # which are journaled entry-by-entry. All the other keys are journaled
+    # as a whole.
+    KEYED_SECTIONS = ("jobs", "results", "system_information")
+
+    # Compact after that many records were appended to the journal
+    max_records = 100
+
+    # Compact when the journal grows past this fraction of the base size
+    max_journal_ratio = 0.5
+
+    def __init__(self, suspend_helper=None):
+        if suspend_helper is None:
+            suspend_helper = SessionSuspendHelper()
+        self._helper = suspend_helper
+        self._last_repr = None
+        self._base_digest = None
+        self._base_size = 0
+        self._journal_size = 0
+        self._num_records = 0
+
+    @property
+    def needs_snapshot(self):
+        """
+        Flag indicating that the next checkpoint must be a full snapshot.
+
+        This is the case before the first snapshot is made and when the
+        journal has grown large enough to be worth compacting.
+        """
+        if self._last_repr is None:
+            return True
+        if self._num_records >= self.max_records:
+            return True
+        return self._journal_size > self._base_size * self.max_journal_ratio
+
+    def snapshot(self, session, session_dir=None, save=None):
+        """
+        Compute a full snapshot and use it as the base of a new journal.
+
+        :param session:
+            The SessionState object to represent.
+        :param session_dir:
+            (optional) The base directory of the session.
+        :param save:
+            (optional) Callable saving the snapshot, typically the
+            ``save_checkpoint()`` method of the session storage.
+            The state of the writer only advances once it returns. If it
+            raises, the next checkpoint has to be a full snapshot again.
+        :returns bytes:
+            The serialized data, compatible with
+            :meth:`SessionSuspendHelper.suspend()`
+        """
+        json_repr = self._helper._json_repr(session, session_dir)
+        data = self._helper._encode(json_repr)
+        if save is not None:
+            try:
+                save(data)
+            except BaseException:
+                self._last_repr = None
+                raise
+        self._last_repr = json_repr
+        self._base_digest = hashlib.sha256(data).hexdigest()
+        self._base_size = len(data)
+        self._journal_size = 0
+        self._num_records = 0
+        return data
+
+    def record(self, session, session_dir=None, append=None):
+        """
+        Compute a journal record describing changes since the last checkpoint.
+
+        :param session:
+            The SessionState object to represent.
+        :param session_dir:
+            (optional) The base directory of the session.
+        :param append:
+            (optional) Callable saving the record, typically the
+            ``append_journal()`` method of the session storage.
+            The state of the writer only advances once it returns. If it
+            raises, the journal may hold a partial record so the next
+            checkpoint has to be a full snapshot.
+        :returns bytes:
+            The serialized record (prefixed with the journal header if this is
+            the first record after a snapshot) or an empty bytes object if
+            nothing has changed.
+        :raises ValueError:
+            If called before the first call to :meth:`snapshot()`
+        """
+        if self._last_repr is None:
+            raise ValueError("journal records need a base snapshot")
+        json_repr = self._helper._json_repr(session, session_dir)
+        delta = self._diff(self._last_repr["session"], json_repr["session"])
+        if not delta:
+            return b""
+        data = self._encode_line(delta)
+        if self._num_records == 0:
+            data = (
+                self._encode_line(
+                    {"journal": self.VERSION, "base": self._base_digest}
+                )
+                + data
+            )
+        if append is not None:
+            try:
+                append(data)
+            except BaseException:
+                self._last_repr = None
+                raise
+        self._last_repr = json_repr
+        self._journal_size += len(data)
+        self._num_records += 1
+        return data
+
+    def _diff(self, old, new):
+        update = {}
+        remove = {}
+        replace = {}
+        for key, new_value in new.items():
+            old_value = old.get(key)
+            if key in self.KEYED_SECTIONS and isinstance(old_value, dict):
+                changed = {
+                    item_key: item_value
+                    for item_key, item_value in new_value.items()
+                    if item_key not in old_value
+                    or old_value[item_key] != item_value
+                }
+                gone = sorted(
+                    item_key
+                    for item_key in old_value
+                    if item_key not in new_value
+                )
+                if changed:
+                    update[key] = changed
+                if gone:
+                    remove[key] = gone
+            elif key not in old or old_value != new_value:
+                replace[key] = new_value
+        delta = {}
+        if update:
+            delta["update"] = update
+        if remove:
+            delta["remove"] = remove
+        if replace:
+            delta["replace"] = replace
+        return delta
+
+    def _encode_line(self, obj):
+        return (
+            json.dumps(
+                obj,
+                ensure_ascii=False,
+                sort_keys=True,
+                indent=None,
+                separators=(",", ":"),
+            )
+            + "\n"
+        ).encode("UTF-8")
@@ -2,10 +2,17 @@
 
 import abc
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import run, PIPE, check_output, STDOUT, CalledProcessError
+from subprocess import TimeoutExpired
 
 from plainbox import vendor
 
+#: Maximum number of collectors running at the same time
+MAX_CONCURRENT_COLLECTORS = 4
+
 
 class CollectorOutputs(dict):
     """
@@ -70,19 +77,77 @@ class CollectorMeta(type):
         return collector_type
 
     @classmethod
-    def collect(cls) -> CollectorOutputs:
-        return CollectorOutputs(
-            {
-                name: collector().collect()
+    def collect(
+        cls, max_workers=MAX_CONCURRENT_COLLECTORS
+    ) -> CollectorOutputs:
+        """
+        Runs all the collectors, up to max_workers of them at the same time.
+
+        The outputs are in the order in which the collectors were registered
+        """
+        if not cls.collectors:
+            return CollectorOutputs()
+        max_workers = min(max_workers, len(cls.collectors))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                name: executor.submit(collector().collect)
                 for (name, collector) in cls.collectors.items()
             }
-        )
+            return CollectorOutputs(
+                {name: future.result() for (name, future) in futures.items()}
+            )
 
 
 def collect() -> dict:
     return CollectorMeta.collect()
 
 
+class BackgroundCollection:
+    """
+    Collection of the system information running in a background thread.
+
+    The thread is a daemon, so an application that exits before the
+    collection ends is not held back by it.
+    """
+
+    def __init__(self, collect_fn=collect):
+        self._collect_fn = collect_fn
+        self._outputs = None
+        self._exception = None
+        self._thread = threading.Thread(
+            target=self._run, name="system-information", daemon=True
+        )
+
+    def start(self) -> "BackgroundCollection":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self._outputs = self._collect_fn()
+        except Exception as exc:
+            self._exception = exc
+
+    @property
+    def done(self) -> bool:
+        return not self._thread.is_alive()
+
+    def result(self) -> CollectorOutputs:
+        """
+        Waits for the collection to end and returns its outputs
+
+        :raises: whatever the collection raised
+        """
+        self._thread.join()
+        if self._exception is not None:
+            raise self._exception
+        return self._outputs
+
+
+def collect_in_background() -> BackgroundCollection:
+    return BackgroundCollection().start()
+
+
 class OutputABC:
     @abc.abstractmethod
     def to_dict(self):
@@ -139,20 +204,26 @@ class CollectionOutput:
         self,
         tool_version: str,
         outputs: "OutputABC",
+        duration: float = None,
     ):
         self.tool_version = tool_version
         self.outputs = outputs
+        # Time (in seconds) it took to collect, None if unknown
+        self.duration = duration
 
     @property
     def success(self):
         return isinstance(self.outputs, OutputSuccess)
 
     def to_dict(self):
-        return {
+        dct = {
             "tool_version": self.tool_version,
             "success": self.success,
             "outputs": self.outputs.to_dict(),
         }
+        if self.duration is not None:
+            dct["duration"] = self.duration
+        return dct
 
     @classmethod
     def from_dict(cls, dct):
@@ -160,10 +231,13 @@ class CollectionOutput:
             outputs = OutputSuccess.from_dict(dct["outputs"])
         else:
             outputs = OutputFailure.from_dict(dct["outputs"])
-        return cls(dct["tool_version"], outputs)
+        return cls(dct["tool_version"], outputs, dct.get("duration"))
 
 
 class Collector(metaclass=CollectorMeta):
+    #: Seconds after which a collection (or version) command is killed
+    TIMEOUT = 120
+
     def __init__(self, collection_cmd: list, version_cmd: list):
         self.collection_cmd = collection_cmd
         self.version_cmd = version_cmd
@@ -175,15 +249,16 @@ class Collector(metaclass=CollectorMeta):
         :returns: the version fetched form the version_cmd if it runs
                   succesfully
         :returns: a failure message with the exception as a postfix if
-                  version_cmd fails
+                  version_cmd fails or times out
         """
         try:
             return check_output(
                 self.version_cmd,
                 universal_newlines=True,
                 stderr=STDOUT,
+                timeout=self.TIMEOUT,
             )
-        except CalledProcessError as e:
+        except (CalledProcessError, TimeoutExpired) as e:
             return "Failed to collect with error: {}".format(e)
 
     def collect_outputs(self) -> "(OutputSuccess|OutputFailure)":
@@ -194,13 +269,28 @@ class Collector(metaclass=CollectorMeta):
                   is json parsable
         :returns: (OutputFailure, N) if the command returns (N != 0) or the
                   output is not json parsable
+        :returns: (OutputFailure, None) if the command times out
         """
-        collection_result = run(
-            self.collection_cmd,
-            universal_newlines=True,
-            stdout=PIPE,
-            stderr=PIPE,
-        )
+        try:
+            collection_result = run(
+                self.collection_cmd,
+                universal_newlines=True,
+                stdout=PIPE,
+                stderr=PIPE,
+                timeout=self.TIMEOUT,
+            )
+        except TimeoutExpired as e:
+            # The output captured before the timeout is never decoded
+            stderr = e.stderr or ""
+            if isinstance(stderr, bytes):
+                stderr = stderr.decode("utf-8", "replace")
+            return OutputFailure(
+                stdout="Collection timed out after {} seconds".format(
+                    e.timeout
+                ),
+                stderr=stderr,
+                return_code=None,
+            )
         if collection_result.returncode != 0:
             outputs = OutputFailure(
                 stdout=collection_result.stdout,
@@ -227,10 +317,15 @@ class Collector(metaclass=CollectorMeta):
         return outputs
 
     def collect(self) -> CollectionOutput:
+        start = time.monotonic()
         version_str = self.collect_version()
         outputs = self.collect_outputs()
 
-        return CollectionOutput(tool_version=version_str, outputs=outputs)
+        return CollectionOutput(
+            tool_version=version_str,
+            outputs=outputs,
+            duration=time.monotonic() - start,
+        )
 
 
 class InxiCollector(Collector):
@@ -20,15 +20,20 @@
 
 """Tests for the session assistant module class."""
 
+import threading
 from unittest import mock
 from functools import partial
 
+from plainbox.abc import IJobResult
+from plainbox.impl.result import JobResultBuilder
 from plainbox.impl.secure.providers.v1 import Provider1
 from plainbox.impl.session.assistant import (
     SessionAssistant,
     UsageExpectation,
     SessionMetaData,
 )
+from plainbox.impl.session.state import SessionState
+from plainbox.impl.testing_utils import make_job
 from plainbox.impl.unit.job import JobDefinition
 from plainbox.vendor import morris
 
@@ -208,6 +213,112 @@ class SessionAssistantTests(morris.SignalTestCase):
             self_mock._context.state.update_desired_job_list.call_count, 2
         )
 
+    @mock.patch("plainbox.impl.session.state.select_units")
+    @mock.patch("plainbox.impl.unit.testplan.TestPlanUnit")
+    def test_bootstrap_parallel(self, mock_tpu, mock_su, mock_get_providers):
+        self_mock = mock.MagicMock()
+        self_mock._config.get_value.return_value = 4
+        self_mock._context.state.run_list = [make_job("a")]
+        self_mock._context.state.job_state_map = {"a": mock.MagicMock()}
+        self_mock._context.state.job_state_map["a"].result_history = ()
+        SessionAssistant.bootstrap(self_mock)
+        self_mock._run_bootstrap_jobs.assert_called_once_with(["a"], 4)
+        self.assertFalse(self_mock.run_job.called)
+
+    def test_run_bootstrap_jobs(self, mock_get_providers):
+        r1 = make_job("r1", plugin="resource")
+        r2 = make_job("r2", plugin="resource")
+        r3 = make_job("r3", plugin="resource", depends="r1")
+        shell = make_job("shell", plugin="shell")
+        root = make_job("root", plugin="resource", user="root")
+        self_mock = mock.MagicMock()
+        self_mock._context.state = state = SessionState(
+            [r1, r2, r3, shell, root]
+        )
+        state.update_desired_job_list([r1, r2, r3, shell, root])
+        self_mock._can_run_ahead = SessionAssistant._can_run_ahead
+        self_mock._get_dependency_id_set = (
+            SessionAssistant._get_dependency_id_set
+        )
+        self_mock._run_job_ahead = partial(
+            SessionAssistant._run_job_ahead, self_mock
+        )
+        self_mock._metadata = state.metadata
+        self_mock._worker_runner_list = []
+        worker_runner = self_mock._runner.get_worker_runner.return_value
+
+        def use_job_result(job_id, result):
+            state.update_job_result(state.job_state_map[job_id].job, result)
+
+        self_mock.use_job_result.side_effect = use_job_result
+        # r1 and r2 have to run at the same time to get past the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def run_job(job, job_state, environ, ui):
+            if job.id in ("r1", "r2"):
+                barrier.wait()
+            else:
+                # r3 only starts once the result of r1 is known
+                self.assertEqual(
+                    state.job_state_map["r1"].result.outcome,
+                    IJobResult.OUTCOME_PASS,
+                )
+            return JobResultBuilder(
+                outcome=IJobResult.OUTCOME_PASS
+            ).get_result()
+
+        worker_runner.run_job.side_effect = run_job
+        self_mock.run_job.return_value = JobResultBuilder(
+            outcome=IJobResult.OUTCOME_FAIL
+        )
+
+        job_id_list = ["r1", "r2", "r3", "shell", "root"]
+        results = list(
+            SessionAssistant._run_bootstrap_jobs(self_mock, job_id_list, 2)
+        )
+
+        # Results come in order
+        self.assertEqual([job_id for job_id, _ in results], job_id_list)
+        self.assertEqual(
+            [result.outcome for _, result in results],
+            ["pass", "pass", "pass", "fail", "fail"],
+        )
+        self.assertEqual(
+            state.job_state_map["r3"].result.outcome, IJobResult.OUTCOME_PASS
+        )
+        # Jobs that can't run ahead go through run_job()/use_job_result()
+        self.assertEqual(
+            self_mock.run_job.call_args_list,
+            [
+                mock.call("shell", "silent", False),
+                mock.call("root", "silent", False),
+            ],
+        )
+        # Each job running ahead has its own runner
+        self.assertEqual(worker_runner.run_job.call_count, 3)
+        self.assertEqual(self_mock._runner.get_worker_runner.call_count, 3)
+        self.assertFalse(self_mock._runner.run_job.called)
+        self.assertEqual(self_mock._worker_runner_list, [])
+        # and its result is used like the result of run_job()
+        self.assertEqual(
+            [call[0][0] for call in self_mock.use_job_result.call_args_list],
+            job_id_list,
+        )
+        self.assertIsNotNone(
+            state.job_state_map["r1"].result.execution_duration
+        )
+        self.assertIn(state.metadata.running_job_name, ("r1", "r2", "r3"))
+        self.assertIsNotNone(state.metadata.last_job_start_time)
+
+    def test_send_signal(self, mock_get_providers):
+        self_mock = mock.MagicMock()
+        worker_runner = mock.MagicMock()
+        self_mock._worker_runner_list = [worker_runner]
+        SessionAssistant.send_signal(self_mock, 9, "user")
+        self_mock._runner.send_signal.assert_called_once_with(9, "user")
+        # Jobs running ahead while bootstrapping are signalled too
+        worker_runner.send_signal.assert_called_once_with(9, "user")
+
     @mock.patch("plainbox.impl.session.state.select_units")
     def test_hand_pick_jobs(self, mock_su, mock_get_providers):
         self_mock = mock.MagicMock()
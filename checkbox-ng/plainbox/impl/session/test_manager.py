@@ -102,6 +102,112 @@ class SessionManagerTests(SignalTestCase):
         self.storage.save_checkpoint.assert_called_with(
             helper_cls().suspend(self.context.state)
         )
+        # Ensure that the meta-data sidecar was saved as well
+        self.storage.save_metadata.assert_called_once_with(
+            helper_cls().suspend_metadata(self.context.state),
+            update_index=True,
+        )
+
+    def test_checkpoint__journal(self):
+        """
+        verify that SessionManager.checkpoint() saves a snapshot first and
+        then appends journal records once the journal is enabled.
+        """
+        writer_name = "plainbox.impl.session.manager.SessionJournalWriter"
+        helper_name = "plainbox.impl.session.manager.SessionSuspendHelper"
+        with mock.patch(writer_name) as writer_cls, mock.patch(helper_name):
+            writer = writer_cls()
+            writer.snapshot.side_effect = lambda state, location, save: save(
+                b"data"
+            )
+            self.manager.enable_journal()
+            writer.needs_snapshot = True
+            self.manager.checkpoint()
+            writer.snapshot.assert_called_with(
+                self.context.state,
+                self.storage.location,
+                self.manager._save_checkpoint,
+            )
+            self.storage.save_checkpoint.assert_called_with(b"data")
+            writer.needs_snapshot = False
+            self.manager.checkpoint()
+            writer.record.assert_called_with(
+                self.context.state,
+                self.storage.location,
+                self.storage.append_journal,
+            )
+            self.manager.checkpoint(snapshot=True)
+        self.assertEqual(self.storage.save_checkpoint.call_count, 2)
+        self.assertEqual(writer.record.call_count, 1)
+
+    def _metadata_repr(self, title, flags=(), running_job_name=None):
+        return {
+            "session": {
+                "metadata": {
+                    "title": title,
+                    "flags": list(flags),
+                    "app_id": "app",
+                    "running_job_name": running_job_name,
+                }
+            }
+        }
+
+    def test_checkpoint__journal_metadata(self):
+        """
+        verify that journal records only save the meta-data sidecar, and
+        only when the meta-data changed.
+        """
+        writer_name = "plainbox.impl.session.manager.SessionJournalWriter"
+        helper_name = "plainbox.impl.session.manager.SessionSuspendHelper"
+        with mock.patch(writer_name) as writer_cls, mock.patch(
+            helper_name
+        ) as helper_cls:
+            writer = writer_cls()
+            suspend_metadata = helper_cls().suspend_metadata
+            suspend_metadata.return_value = self._metadata_repr("1")
+            self.manager.enable_journal()
+            writer.needs_snapshot = True
+            self.manager.checkpoint()
+            writer.needs_snapshot = False
+            self.manager.checkpoint()
+            suspend_metadata.return_value = self._metadata_repr("1", (), "a")
+            self.manager.checkpoint()
+        self.assertEqual(writer.record.call_count, 2)
+        self.assertEqual(
+            self.storage.save_metadata.call_args_list,
+            [
+                mock.call(self._metadata_repr("1"), update_index=True),
+                mock.call(
+                    self._metadata_repr("1", (), "a"), update_index=False
+                ),
+            ],
+        )
+
+    def test_checkpoint__index_updates(self):
+        """
+        verify that checkpoints only update the session repository index
+        when the session is first saved, when it is finalized and when its
+        title or flags change.
+        """
+        helper_name = "plainbox.impl.session.manager.SessionSuspendHelper"
+        with mock.patch(helper_name) as helper_cls:
+            suspend_metadata = helper_cls().suspend_metadata
+            for metadata_repr in (
+                self._metadata_repr("t"),
+                self._metadata_repr("t", (), "a"),
+                self._metadata_repr("t", ("incomplete",), "a"),
+                self._metadata_repr("t", ("incomplete",), "b"),
+            ):
+                suspend_metadata.return_value = metadata_repr
+                self.manager.checkpoint()
+            self.manager.checkpoint(snapshot=True)
+        self.assertEqual(
+            [
+                call[1]["update_index"]
+                for call in self.storage.save_metadata.call_args_list
+            ],
+            [True, False, True, False, True],
+        )
 
     def test_load_session(self):
         """
@@ -127,7 +233,7 @@ class SessionManagerTests(SignalTestCase):
         helper_cls.assert_called_with(unit_list, flags, self.storage.location)
         # Ensure that the helper instance was asked to recreate session state
         helper_cls().resume.assert_called_with(
-            self.storage.load_checkpoint(), None
+            self.storage.load_checkpoint(), None, self.storage.load_journal()
         )
         # Ensure that the resulting manager has correct data inside
         self.assertEqual(manager.state, helper_cls().resume())
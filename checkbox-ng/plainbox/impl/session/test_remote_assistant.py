@@ -17,7 +17,9 @@
 # You should have received a copy of the GNU General Public License
 # along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
 
+import json
 from os.path import exists
+from threading import Event, Lock, Thread
 
 from unittest import TestCase, mock
 
@@ -477,6 +479,206 @@ class RemoteAssistantFinishJobTests(TestCase):
         )
 
 
+class RemoteAssistantMonitorJobTests(TestCase):
+    def setUp(self):
+        self.ui = remote_assistant.BufferedUI()
+        self.rsa = mock.MagicMock()
+        self.rsa._state = remote_assistant.Running
+        self.rsa._ui = self.ui
+        self.rsa.session_change_lock = Lock()
+        self.rsa.note_job_finished = self.ui.wake_up
+
+    def test_wait_for_output(self):
+        thread = Thread(
+            target=self.ui.got_program_output, args=("stdout", b"line\n")
+        )
+        thread.start()
+        self.addCleanup(thread.join)
+        self.ui.wait_for_output(60)
+        self.assertEqual(self.ui.get_output(), "stdoutline\n")
+
+    def test_wait_for_output_timeout(self):
+        self.ui.wait_for_output(0.01)
+        self.assertEqual(self.ui.get_output(), "")
+
+    def test_monitor_job(self):
+        may_finish = Event()
+
+        def real_run(job_id, ui, *args):
+            ui.got_program_output("stdout", b"line\n")
+            may_finish.wait()
+            return mock.Mock()
+
+        self.rsa._be = remote_assistant.BackgroundExecutor(
+            self.rsa, "job_id", real_run, self.ui
+        )
+        self.addCleanup(self.rsa._be.join)
+        self.addCleanup(may_finish.set)
+        monitor_job = remote_assistant.RemoteSessionAssistant.monitor_job
+        self.assertEqual(
+            monitor_job(self.rsa, 60), ("running", "stdoutline\n")
+        )
+        may_finish.set()
+        # returns as soon as the job is finished, not after the timeout
+        self.assertEqual(monitor_job(self.rsa, 60), ("done", ""))
+        self.assertTrue(self.rsa._be.finished)
+
+
+class RemoteAssistantMonitorSilentJobTests(TestCase):
+    def setUp(self):
+        self.ui = remote_assistant.RemoteSilentUI()
+        self.rsa = mock.MagicMock()
+        self.rsa._state = remote_assistant.Running
+        self.rsa._ui = self.ui
+        self.rsa.session_change_lock = Lock()
+
+    def test_wait_for_output(self):
+        # The hidden output notice is returned right away
+        self.ui.wait_for_output(60)
+        self.assertEqual(self.ui.get_output(), "hidden(Command output hidden)")
+        self.ui.wait_for_output(0.01)
+        self.assertEqual(self.ui.get_output(), "")
+
+    def test_monitor_job(self):
+        may_finish = Event()
+
+        def real_run(job_id, ui, *args):
+            may_finish.wait()
+            return mock.Mock()
+
+        self.rsa.note_job_finished.side_effect = (
+            lambda: remote_assistant.RemoteSessionAssistant.note_job_finished(
+                self.rsa
+            )
+        )
+        self.rsa._be = remote_assistant.BackgroundExecutor(
+            self.rsa, "job_id", real_run, self.ui
+        )
+        self.addCleanup(self.rsa._be.join)
+        self.addCleanup(may_finish.set)
+        monitor_job = remote_assistant.RemoteSessionAssistant.monitor_job
+        self.assertEqual(
+            monitor_job(self.rsa, 60),
+            ("running", "hidden(Command output hidden)"),
+        )
+        may_finish.set()
+        # note_job_finished() wakes up the silent UI too
+        self.assertEqual(monitor_job(self.rsa, 60), ("done", ""))
+        self.assertTrue(self.rsa._be.finished)
+
+
+class RemoteAssistantBatchTests(TestCase):
+    def setUp(self):
+        self.rsa = mock.MagicMock()
+        self.rsa._state = remote_assistant.TestsSelected
+        self.rsa.get_job_output.return_value = ""
+        self.batch = mock.MagicMock()
+
+    def test_run_batched_job(self):
+        job = mock.Mock(automated=True, command="true")
+        job.get_flag_set.return_value = set()
+        self.rsa._sa.get_job.return_value = job
+        self.rsa._sa.get_job_state().can_start.return_value = True
+        self.rsa._sa.run_job().get_result.return_value = MemoryJobResult(
+            {"outcome": IJobResult.OUTCOME_PASS}
+        )
+
+        self.assertTrue(
+            remote_assistant.RemoteSessionAssistant.run_batched_job(
+                self.rsa, "job_id", self.batch
+            )
+        )
+
+        self.rsa._sa.run_job.assert_called_with(
+            "job_id", self.rsa._get_ui_for_job(), False
+        )
+        self.rsa._sa.use_job_result.assert_called_once_with("job_id", mock.ANY)
+        self.batch.add_event.assert_has_calls(
+            [
+                mock.call("start", "job_id"),
+                mock.call("finish", "job_id", IJobResult.OUTCOME_PASS),
+            ]
+        )
+
+    def test_run_batched_job_cant_start(self):
+        job = mock.Mock(automated=True, command="true")
+        job.get_flag_set.return_value = set()
+        self.rsa._sa.get_job.return_value = job
+        self.rsa._sa.get_job_state().can_start.return_value = False
+        self.rsa._get_cant_start_outcome.return_value = (
+            IJobResult.OUTCOME_NOT_SUPPORTED
+        )
+        self.rsa._sa.get_job_state().get_readiness_description.return_value = (
+            "reason"
+        )
+
+        self.assertTrue(
+            remote_assistant.RemoteSessionAssistant.run_batched_job(
+                self.rsa, "job_id", self.batch
+            )
+        )
+
+        self.assertFalse(self.rsa._sa.run_job.called)
+        self.batch.add_event.assert_called_with(
+            "finish", "job_id", IJobResult.OUTCOME_NOT_SUPPORTED
+        )
+
+    def test_run_batched_job_needs_controller(self):
+        manual_job = mock.Mock(automated=False, command=None)
+        noreturn_job = mock.Mock(automated=True, command="reboot")
+        noreturn_job.get_flag_set.return_value = {"noreturn"}
+        for job in (manual_job, noreturn_job):
+            self.rsa._sa.get_job.return_value = job
+            self.assertFalse(
+                remote_assistant.RemoteSessionAssistant.run_batched_job(
+                    self.rsa, "job_id", self.batch
+                )
+            )
+        self.assertFalse(self.batch.add_event.called)
+        self.assertFalse(self.rsa._sa.run_job.called)
+
+    def test_batch_executor(self):
+        def run_batched_job(job_id, batch):
+            if job_id == "manual":
+                return False
+            batch.add_event("start", job_id)
+            batch.add_event("finish", job_id, IJobResult.OUTCOME_PASS)
+            return True
+
+        self.rsa.run_batched_job.side_effect = run_batched_job
+        batch = remote_assistant.BatchExecutor(
+            self.rsa, ["job1", "job2", "manual", "job3"]
+        )
+        batch.join()
+
+        self.assertTrue(batch.finished)
+        self.assertEqual(
+            batch.take_events(60),
+            [
+                ("start", "job1", None),
+                ("finish", "job1", IJobResult.OUTCOME_PASS),
+                ("start", "job2", None),
+                ("finish", "job2", IJobResult.OUTCOME_PASS),
+            ],
+        )
+        self.assertTrue(self.rsa.note_batch_finished.called)
+
+    def test_monitor_batch(self):
+        self.rsa._batch.take_events.return_value = [
+            ("output", "job1", "stdoutline\n")
+        ]
+        self.rsa._batch.finished = False
+
+        state, payload = remote_assistant.RemoteSessionAssistant.monitor_batch(
+            self.rsa, 60
+        )
+
+        self.assertEqual(state, "running")
+        self.assertEqual(
+            json.loads(payload), [["output", "job1", "stdoutline\n"]]
+        )
+
+
 class SessionAssistantAgentTests(TestCase):
     def test_on_connect(self):
         conn = mock.Mock()
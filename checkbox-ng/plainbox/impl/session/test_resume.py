@@ -51,6 +51,7 @@ from plainbox.impl.session.resume import SessionPeekHelper5
 from plainbox.impl.session.resume import SessionPeekHelper6
 from plainbox.impl.session.resume import SessionPeekHelper7
 from plainbox.impl.session.resume import SessionPeekHelper8
+from plainbox.impl.session.resume import SessionPeekHelper9
 from plainbox.impl.session.resume import SessionResumeError
 from plainbox.impl.session.resume import SessionResumeHelper
 from plainbox.impl.session.resume import SessionResumeHelper1
@@ -61,8 +62,14 @@ from plainbox.impl.session.resume import SessionResumeHelper5
 from plainbox.impl.session.resume import SessionResumeHelper6
 from plainbox.impl.session.resume import SessionResumeHelper7
 from plainbox.impl.session.resume import SessionResumeHelper8
+from plainbox.impl.session.resume import SessionResumeHelper9
+from plainbox.impl.session.manager import SessionManager
 from plainbox.impl.session.state import SessionState
+from plainbox.impl.session.storage import SessionStorage
+from plainbox.impl.session.suspend import SessionJournalWriter
+from plainbox.impl.session.suspend import SessionSuspendHelper
 from plainbox.impl.testing_utils import make_job
+from plainbox.impl.unit.template import TemplateUnit
 from plainbox.testing_utils.testcases import TestCaseWithParameters
 from plainbox.vendor import mock
 
@@ -375,10 +382,19 @@ class SessionResumeHelperTests(TestCase):
             )
 
     def test_resume_dispatch_v9(self):
-        data = gzip.compress(b'{"version":9}')
+        helper9 = SessionResumeHelper9
+        with mock.patch.object(helper9, "resume_json"):
+            data = gzip.compress(b'{"session":{},"version":9}')
+            SessionResumeHelper([], None, None).resume(data)
+            helper9.resume_json.assert_called_once_with(
+                {"session": {}, "version": 9}, None
+            )
+
+    def test_resume_dispatch_v10(self):
+        data = gzip.compress(b'{"version":10}')
         with self.assertRaises(IncompatibleSessionError) as boom:
             SessionResumeHelper([], None, None).resume(data)
-        self.assertEqual(str(boom.exception), "Unsupported version 9")
+        self.assertEqual(str(boom.exception), "Unsupported version 10")
 
 
 class SessionPeekHelperTests(TestCase):
@@ -597,10 +613,59 @@ class SessionPeekHelperTests(TestCase):
             )
 
     def test_peek_dispatch_v9(self):
-        data = gzip.compress(b'{"version":9}')
+        helper9 = SessionPeekHelper9
+        with mock.patch.object(helper9, "peek_json"):
+            data = gzip.compress(b'{"session":{},"version":9}')
+            SessionPeekHelper().peek(data)
+            helper9.peek_json.assert_called_once_with(
+                {"session": {}, "version": 9}
+            )
+
+    def test_peek_dispatch_v10(self):
+        data = gzip.compress(b'{"version":10}')
         with self.assertRaises(IncompatibleSessionError) as boom:
             SessionPeekHelper().peek(data)
-        self.assertEqual(str(boom.exception), "Unsupported version 9")
+        self.assertEqual(str(boom.exception), "Unsupported version 10")
+
+    def _make_stored_session(self):
+        manager = SessionManager.create()
+        self.addCleanup(manager.destroy)
+        manager.add_local_device_context()
+        metadata = manager.state.metadata
+        metadata.title = "title"
+        metadata.app_id = "app-id"
+        metadata.app_blob = b"blob"
+        metadata.flags = {"incomplete"}
+        manager.checkpoint()
+        return manager.storage
+
+    def test_peek_storage__sidecar(self):
+        storage = self._make_stored_session()
+        with mock.patch.object(storage, "load_checkpoint") as load:
+            metadata = SessionPeekHelper().peek_storage(storage)
+        load.assert_not_called()
+        self.assertEqual(metadata.title, "title")
+        self.assertEqual(metadata.app_id, "app-id")
+        self.assertEqual(metadata.app_blob, b"blob")
+        self.assertEqual(metadata.flags, {"incomplete"})
+
+    def test_peek_storage__stale_sidecar(self):
+        storage = self._make_stored_session()
+        storage.save_metadata(
+            {"version": 8, "session": {"metadata": {"title": "old"}}},
+            stamp=[0, 0, 0],
+        )
+        with mock.patch.object(storage, "save_metadata") as save:
+            metadata = SessionPeekHelper().peek_storage(storage)
+        self.assertEqual(metadata.title, "title")
+        # Peeking doesn't write the sidecar or the index
+        save.assert_not_called()
+
+    def test_peek_storage__not_saved(self):
+        storage = mock.Mock(spec=SessionStorage)
+        storage.load_metadata.return_value = None
+        storage.load_checkpoint.return_value = b""
+        self.assertIsNone(SessionPeekHelper().peek_storage(storage))
 
 
 class SessionResumeTests(TestCase):
@@ -645,6 +710,104 @@ class SessionResumeTests(TestCase):
             SessionResumeHelper([], None, None).resume(data)
         self.assertIsInstance(boom.exception.__context__, ValueError)
 
+    @mock.patch(
+        "plainbox.impl.session.resume.SessionResumeHelper8."
+        "_restore_SessionState_system_information"
+    )
+    def test_resume_phase_timings(self, _):
+        """
+        verify that resume() records the time spent in each phase
+        """
+        data = gzip.compress(
+            b'{"session":{"desired_job_list":[],"jobs":{},"metadata":'
+            b'{"app_blob":null,"app_id":null,"custom_joblist":false,'
+            b'"flags":[],"rejected_jobs":[],"running_job_name":null,'
+            b'"title":null,"last_job_start_time":null},"results":{},'
+            b'"mandatory_job_list":[]},"version":8}'
+        )
+        helper = SessionResumeHelper([], None, None)
+        helper.resume(data)
+        self.assertEqual(
+            set(helper.phase_timings),
+            {
+                "unpack",
+                "metadata",
+                "jobs_and_results",
+                "mandatory_job_list",
+                "desired_job_list",
+                "job_list",
+                "system_information",
+            },
+        )
+        for duration in helper.phase_timings.values():
+            self.assertGreaterEqual(duration, 0)
+
+
+class SessionJournalReplayTests(TestCase):
+    """
+    Tests for replaying journals created by
+    :class:`~plainbox.impl.session.suspend.SessionJournalWriter`
+    """
+
+    def setUp(self):
+        patcher = mock.patch(
+            "plainbox.impl.session.state.collect_system_information",
+            return_value={},
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.job_a = make_job(id="a")
+        self.job_b = make_job(id="b")
+        self.state = SessionState([self.job_a, self.job_b])
+        self.state.update_desired_job_list([self.job_a, self.job_b])
+        self.writer = SessionJournalWriter()
+        self.base = self.writer.snapshot(self.state)
+
+    def _full_repr(self):
+        return SessionSuspendHelper()._json_repr(self.state, None)
+
+    def test_replay_matches_full_snapshot(self):
+        journal = b""
+        self.state.metadata.flags = {"incomplete"}
+        self.state.metadata.running_job_name = "a"
+        journal += self.writer.record(self.state)
+        self.state.update_job_result(
+            self.job_a, MemoryJobResult({"outcome": IJobResult.OUTCOME_PASS})
+        )
+        self.state.metadata.running_job_name = None
+        journal += self.writer.record(self.state)
+        self.state.update_desired_job_list([self.job_a])
+        journal += self.writer.record(self.state)
+        json_repr = SessionPeekHelper().unpack_envelope(self.base, journal)
+        self.assertEqual(json_repr, self._full_repr())
+
+    def test_replay_ignores_incomplete_record(self):
+        self.state.metadata.title = "one"
+        journal = self.writer.record(self.state)
+        expected = self._full_repr()
+        self.state.metadata.title = "two"
+        journal += self.writer.record(self.state)[:-5]
+        json_repr = SessionPeekHelper().unpack_envelope(self.base, journal)
+        self.assertEqual(json_repr, expected)
+
+    def test_replay_ignores_stale_journal(self):
+        self.state.metadata.title = "one"
+        journal = self.writer.record(self.state)
+        new_base = self.writer.snapshot(self.state)
+        self.state.metadata.title = "two"
+        json_repr = SessionPeekHelper().unpack_envelope(new_base, journal)
+        self.assertEqual(json_repr["session"]["metadata"]["title"], "one")
+
+    def test_replay_garbage_journal(self):
+        with self.assertRaises(CorruptedSessionError):
+            SessionPeekHelper().unpack_envelope(self.base, b"{\n")
+
+    def test_peek_with_journal(self):
+        self.state.metadata.title = "title"
+        journal = self.writer.record(self.state)
+        metadata = SessionPeekHelper().peek(self.base, journal)
+        self.assertEqual(metadata.title, "title")
+
 
 class SessionStateResumeHelper8Tests(TestCase):
     def test_calls_restore_SessionState_system_information(self):
@@ -677,6 +840,47 @@ class SessionStateResumeHelper8Tests(TestCase):
         self.assertFalse(collect_mock.called)
 
 
+class SessionResumeHelper9Tests(TestCase):
+    def test_build_JobResult_restores_resource_usage(self):
+        resource_usage = {"cpu_user": 1.0, "cpu_system": 0.5}
+        obj_repr = {
+            "outcome": "pass",
+            "comments": None,
+            "return_code": 0,
+            "execution_duration": 1.5,
+            "io_log": [],
+            "resource_usage": resource_usage,
+        }
+        obj = SessionResumeHelper9._build_JobResult(obj_repr, 0, None)
+        self.assertIsInstance(obj, MemoryJobResult)
+        self.assertEqual(obj.outcome, "pass")
+        self.assertEqual(obj.execution_duration, 1.5)
+        self.assertEqual(obj.resource_usage, resource_usage)
+
+    def test_build_JobResult_allows_missing_resource_usage(self):
+        obj_repr = {
+            "outcome": "pass",
+            "comments": None,
+            "return_code": 0,
+            "execution_duration": None,
+            "io_log": [],
+        }
+        obj = SessionResumeHelper9._build_JobResult(obj_repr, 0, None)
+        self.assertIsNone(obj.resource_usage)
+
+    def test_build_JobResult_checks_type_of_resource_usage(self):
+        obj_repr = {
+            "outcome": "pass",
+            "comments": None,
+            "return_code": 0,
+            "execution_duration": None,
+            "io_log": [],
+            "resource_usage": "lots",
+        }
+        with self.assertRaises(CorruptedSessionError):
+            SessionResumeHelper9._build_JobResult(obj_repr, 0, None)
+
+
 class SessionStateResumeTests(TestCaseWithParameters):
     """
     Tests for :class:`~plainbox.impl.session.resume.SessionResumeHelper1`,
@@ -2089,6 +2293,112 @@ class SessionJobsAndResultsResumeTests(TestCaseWithParameters):
             )
         self.assertEqual(str(boom.exception), "Unknown jobs remaining: job-id")
 
+    def test_malformed_jobs_get_reported(self):
+        """
+        verify that _restore_SessionState_jobs_and_results() reports
+        a KeyError while processing a job as CorruptedSessionError
+        """
+        job = make_job(id="job")
+        session_repr = {"jobs": {job.id: job.checksum}, "results": {}}
+        helper = self.parameters.resume_cls([], None, None)
+        session = SessionState([job])
+        with mock.patch.object(
+            helper, "_process_job", side_effect=KeyError("outcome")
+        ):
+            with self.assertRaises(CorruptedSessionError) as boom:
+                helper._restore_SessionState_jobs_and_results(
+                    session, session_repr
+                )
+        self.assertEqual(
+            str(boom.exception), "Unable to restore job 'job': 'outcome'"
+        )
+
+    def _result_repr(self, stdout=b""):
+        return [
+            {
+                "outcome": "pass",
+                "comments": None,
+                "execution_duration": None,
+                "return_code": None,
+                "io_log": [
+                    [
+                        0.0,
+                        "stdout",
+                        base64.standard_b64encode(stdout).decode("ASCII"),
+                    ]
+                ],
+            }
+        ]
+
+    def test_generated_jobs_are_processed_after_their_resource(self):
+        """
+        verify that _restore_SessionState_jobs_and_results() processes
+        generated jobs right after the resource job that generates them,
+        in a single pass
+        """
+        resource_job = make_job(id="res", plugin="resource")
+        template = TemplateUnit(
+            {
+                "template-resource": "res",
+                "id": "gen-{attr}",
+                "plugin": "shell",
+                "command": "true",
+            }
+        )
+        job_a = make_job(id="a-job")
+        job_z = make_job(id="z-job")
+        session_repr = {
+            "jobs": {
+                "a-job": job_a.checksum,
+                "res": resource_job.checksum,
+                # The checksum of generated jobs is not checked here
+                "gen-x": "checksum",
+                "z-job": job_z.checksum,
+            },
+            "results": {
+                "a-job": self._result_repr(),
+                "res": self._result_repr(b"attr: x"),
+                "gen-x": self._result_repr(),
+                "z-job": self._result_repr(),
+            },
+        }
+        helper = self.parameters.resume_cls(
+            [], [SessionResumeHelper1.FLAG_IGNORE_JOB_CHECKSUMS_S], None
+        )
+        session = SessionState([job_a, resource_job, template, job_z])
+        with mock.patch.object(
+            session, "update_job_result", wraps=session.update_job_result
+        ) as update_job_result:
+            helper._restore_SessionState_jobs_and_results(
+                session, session_repr
+            )
+        self.assertEqual(
+            [call[0][0].id for call in update_job_result.call_args_list],
+            ["a-job", "res", "gen-x", "z-job"],
+        )
+        self.assertEqual(session.job_state_map["gen-x"].result.outcome, "pass")
+
+    def test_readiness_is_not_updated_for_each_result(self):
+        """
+        verify that _restore_SessionState_jobs_and_results() does not
+        update job readiness while results are replayed
+        """
+        job = make_job(id="job")
+        session_repr = {
+            "jobs": {job.id: job.checksum},
+            "results": {job.id: self._result_repr()},
+        }
+        helper = self.parameters.resume_cls([], None, None)
+        session = SessionState([job])
+        with mock.patch.object(
+            session, "_update_job_readiness"
+        ) as update_job_readiness:
+            helper._restore_SessionState_jobs_and_results(
+                session, session_repr
+            )
+        update_job_readiness.assert_not_called()
+        self.assertEqual(session.job_state_map[job.id].result.outcome, "pass")
+
 
 class SessionJobListResumeTests(TestCaseWithParameters):
     """
@@ -44,9 +44,11 @@ from plainbox.impl.session import UndesiredJobReadinessInhibitor
 from plainbox.impl.session.state import JobState
 from plainbox.impl.session.state import SessionDeviceContext
 from plainbox.impl.session.state import SessionMetaData
+from plainbox.impl.session.system_information import BackgroundCollection
 from plainbox.impl.testing_utils import make_job
 from plainbox.impl.unit.job import JobDefinition
 from plainbox.impl.unit.category import CategoryUnit
+from plainbox.impl.unit.template import TemplateUnit
 from plainbox.impl.unit.unit_with_id import UnitWithId
 from plainbox.suspend_consts import Suspend
 from plainbox.vendor.morris import SignalTestCase
@@ -232,6 +234,21 @@ class SessionStateAPITests(TestCase):
             [UndesiredJobReadinessInhibitor],
         )
 
+    def test_get_template_list(self):
+        template = TemplateUnit(
+            {"template-resource": "R", "id": "A-{attr}", "plugin": "shell"}
+        )
+        other_template = TemplateUnit(
+            {"template-resource": "X", "id": "B-{attr}", "plugin": "shell"}
+        )
+        session = SessionState([template])
+        session.add_unit(other_template)
+        self.assertEqual(session.get_template_list("R"), [template])
+        self.assertEqual(session.get_template_list("X"), [other_template])
+        self.assertEqual(session.get_template_list("Y"), [])
+        session.remove_unit(template)
+        self.assertEqual(session.get_template_list("R"), [])
+
     def test_add_unit_duplicate_job(self):
         # Define a job
         job = make_job("A")
@@ -497,6 +514,26 @@ class SessionStateAPITests(TestCase):
             self.assertFalse(collect_system_information_mock.called)
             self.assertEqual(return_value, {"inxi": {}})
 
+    @patch("plainbox.impl.session.state.collect_in_background")
+    def test_system_information_background_collection(
+        self, collect_in_background_mock
+    ):
+        pending = MagicMock(spec=BackgroundCollection, done=False)
+        pending.result.return_value = {"inxi": {}}
+        collect_in_background_mock.return_value = pending
+        session = SessionState([])
+        session.start_system_information_collection()
+        self.assertFalse(pending.result.called)
+        # The background collection is joined on first access
+        with patch(
+            "plainbox.impl.session.state.collect_system_information"
+        ) as collect_system_information_mock:
+            self.assertEqual(session.system_information, {"inxi": {}})
+            self.assertFalse(collect_system_information_mock.called)
+        # and it is not started again once known
+        session.start_system_information_collection()
+        self.assertEqual(collect_in_background_mock.call_count, 1)
+
 
 class SessionStateTrimTests(TestCase):
     """
@@ -533,6 +570,16 @@ class SessionStateTrimTests(TestCase):
         self.session.trim_job_list(JobIdQualifier("a", self.origin))
         self.assertNotIn("a", self.session.resource_map)
 
+    def test_trim_does_remove_dependencies(self):
+        """
+        verify that trim_job_list() forgets the dependencies of removed jobs
+        """
+        self.session.update_desired_job_list([self.job_a, self.job_b])
+        self.assertEqual(self.session.dependency_graph.job_count, 2)
+        self.session.update_desired_job_list([self.job_b])
+        self.session.trim_job_list(JobIdQualifier("a", self.origin))
+        self.assertEqual(self.session.dependency_graph.job_count, 1)
+
     def test_trim_fires_on_job_removed(self):
         """
         verify that trim_job_list() fires on_job_removed() signal
@@ -943,6 +990,204 @@ class SessionStateReactionToJobResultTests(TestCase):
         )
 
 
+class SessionStateIncrementalReadinessTests(TestCase):
+    # A -(resource dependency)-> R
+    # X -(direct dependency) -> Y
+    # Z -(after dependency) -> Y
+    # S -(salvage dependency) -> Y
+
+    def setUp(self):
+        self.job_A = make_job("A", requires="R.attr == 'value'")
+        self.job_R = make_job("R", plugin="resource")
+        self.job_X = make_job("X", depends="Y")
+        self.job_Y = make_job("Y")
+        self.job_Z = make_job("Z", after="Y")
+        self.job_S = make_job("S", salvages="Y")
+        self.job_list = [
+            self.job_A,
+            self.job_R,
+            self.job_X,
+            self.job_Y,
+            self.job_Z,
+            self.job_S,
+        ]
+        self.session = SessionState(self.job_list)
+        self.session.update_desired_job_list(self.job_list)
+
+    def full_readiness(self):
+        return {
+            job_id: list(job_state.readiness_inhibitor_list)
+            for job_id, job_state in self.session.job_state_map.items()
+        }
+
+    def assertReadinessMatchesFullRecompute(self):
+        incremental = self.full_readiness()
+        self.session._recompute_job_readiness()
+        self.assertEqual(incremental, self.full_readiness())
+
+    def test_reverse_index(self):
+        dependents = self.session._readiness_dependents
+        self.assertEqual(dependents["R"], [self.job_A])
+        self.assertEqual(
+            set(dependents["Y"]), {self.job_X, self.job_Z, self.job_S}
+        )
+        self.assertNotIn("A", dependents)
+
+    def test_update_job_result__only_dependents_are_recomputed(self):
+        result_Y = MemoryJobResult({"outcome": IJobResult.OUTCOME_PASS})
+        with patch.object(
+            self.job_Y.controller,
+            "get_inhibitor_list",
+            wraps=self.job_Y.controller.get_inhibitor_list,
+        ) as mock_get:
+            self.session.update_job_result(self.job_Y, result_Y)
+        self.assertEqual(
+            {call[0][1] for call in mock_get.call_args_list},
+            {self.job_X, self.job_Z, self.job_S},
+        )
+        self.assertTrue(self.session.job_state_map["X"].can_start())
+        self.assertTrue(self.session.job_state_map["Z"].can_start())
+        self.assertFalse(self.session.job_state_map["S"].can_start())
+        self.assertReadinessMatchesFullRecompute()
+
+    def test_update_job_result__resource(self):
+        result_R = MemoryJobResult(
+            {
+                "outcome": IJobResult.OUTCOME_PASS,
+                "io_log": [(0, "stdout", b"attr: value\n")],
+            }
+        )
+        self.session.update_job_result(self.job_R, result_R)
+        self.assertTrue(self.session.job_state_map["A"].can_start())
+        self.assertReadinessMatchesFullRecompute()
+
+    def test_update_job_result__failed_dependency(self):
+        result_Y = MemoryJobResult({"outcome": IJobResult.OUTCOME_FAIL})
+        self.session.update_job_result(self.job_Y, result_Y)
+        self.assertFalse(self.session.job_state_map["X"].can_start())
+        self.assertTrue(self.session.job_state_map["Z"].can_start())
+        self.assertTrue(self.session.job_state_map["S"].can_start())
+        self.assertReadinessMatchesFullRecompute()
+
+    def test_remove_unit_invalidates_index(self):
+        self.session.update_desired_job_list([self.job_A])
+        self.session.remove_unit(self.job_X, recompute=False)
+        self.assertIsNone(self.session._readiness_dependents)
+        result_Y = MemoryJobResult({"outcome": IJobResult.OUTCOME_PASS})
+        self.session.update_job_result(self.job_Y, result_Y)
+        self.assertIsNotNone(self.session._readiness_dependents)
+        self.assertReadinessMatchesFullRecompute()
+
+    def test_dependencies_are_computed_once(self):
+        graph = self.session.dependency_graph
+        # All the jobs were solved (and their dependencies looked up) already
+        self.assertEqual(graph.job_count, 6)
+        miss_count = graph.stats["miss"]
+        solve_count = graph.stats["solve"]
+        self.session.update_desired_job_list([self.job_A, self.job_X])
+        self.assertEqual(graph.stats["miss"], miss_count)
+        self.assertEqual(graph.stats["solve"], solve_count + 1)
+        self.session.remove_unit(self.job_Z)
+        self.assertEqual(graph.job_count, 5)
+
+    @patch("plainbox.impl.session.state.logger")
+    def test_cross_check_readiness(self, mock_logger):
+        self.session.cross_check_readiness = True
+        result_Y = MemoryJobResult({"outcome": IJobResult.OUTCOME_PASS})
+        self.session.update_job_result(self.job_Y, result_Y)
+        self.assertFalse(mock_logger.error.called)
+        # Simulate a stale index, the cross-check reports and repairs it
+        self.session._readiness_dependents.clear()
+        result_Y = MemoryJobResult({"outcome": IJobResult.OUTCOME_FAIL})
+        self.session.update_job_result(self.job_Y, result_Y)
+        self.assertTrue(mock_logger.error.called)
+        self.assertFalse(self.session.job_state_map["X"].can_start())
+
+
+class SessionStateBulkAddTests(SignalTestCase):
+    def setUp(self):
+        self.job_A = make_job("A")
+        self.job_B = make_job("B", depends="A")
+        self.session = SessionState([])
+
+    def test_add_units(self):
+        duplicate_A = make_job("A")
+        added = self.session.add_units([self.job_A, self.job_B, duplicate_A])
+        self.assertEqual(added, [self.job_A, self.job_B, self.job_A])
+        self.assertEqual(self.session.job_list, [self.job_A, self.job_B])
+        self.assertEqual(self.session.unit_list, [self.job_A, self.job_B])
+
+    def test_add_units__single_recompute(self):
+        with patch.object(self.session, "_recompute_job_readiness") as mock:
+            self.session.add_units([self.job_A, self.job_B])
+        mock.assert_called_once_with()
+
+    def test_bulk_add__signals_are_deferred(self):
+        self.watchSignal(self.session.on_job_state_map_changed)
+        self.watchSignal(self.session.on_unit_added)
+        self.watchSignal(self.session.on_job_added)
+        with self.session.bulk_add():
+            self.session.add_unit(self.job_A)
+            self.session.add_unit(self.job_B)
+            self.assertEqual(self._events_seen, [])
+        self.assertEqual(
+            [signal for signal, args, kwargs in self._events_seen].count(
+                self.session.on_job_state_map_changed
+            ),
+            1,
+        )
+        self.assertSignalOrdering(
+            self.assertSignalFired(self.session.on_job_state_map_changed),
+            self.assertSignalFired(self.session.on_unit_added, self.job_A),
+            self.assertSignalFired(self.session.on_job_added, self.job_A),
+            self.assertSignalFired(self.session.on_unit_added, self.job_B),
+            self.assertSignalFired(self.session.on_job_added, self.job_B),
+        )
+
+    def test_bulk_add__rollback_on_clash(self):
+        template = TemplateUnit(
+            {"template-resource": "R", "id": "T-{attr}", "plugin": "shell"}
+        )
+        self.session.add_unit(self.job_A)
+        self.watchSignal(self.session.on_unit_added)
+        with self.assertRaises(DependencyDuplicateError):
+            self.session.add_units(
+                [self.job_B, template, make_job("A", plugin="other")]
+            )
+        self.assertEqual(self.session.job_list, [self.job_A])
+        self.assertEqual(self.session.unit_list, [self.job_A])
+        self.assertEqual(list(self.session.job_state_map), ["A"])
+        self.assertEqual(self.session.get_template_list("R"), [])
+        self.assertSignalNotFired(self.session.on_unit_added, self.job_B)
+
+    def test_bulk_add__nested(self):
+        with patch.object(self.session, "_recompute_job_readiness") as mock:
+            with self.session.bulk_add():
+                self.session.add_units([self.job_A])
+                self.session.add_units([self.job_B])
+                mock.assert_not_called()
+        mock.assert_called_once_with()
+
+    def test_bulk_add__no_recompute(self):
+        with patch.object(self.session, "_recompute_job_readiness") as mock:
+            with self.session.bulk_add(recompute=False):
+                self.session.add_unit(self.job_A)
+        mock.assert_not_called()
+        self.session.update_desired_job_list([self.job_A])
+        self.assertTrue(self.session.job_state_map["A"].can_start())
+
+    def test_bulk_add__results_do_not_update_readiness(self):
+        self.session.add_units([self.job_A, self.job_B])
+        self.session.update_desired_job_list([self.job_A, self.job_B])
+        result = MemoryJobResult({"outcome": IJobResult.OUTCOME_PASS})
+        with self.session.bulk_add():
+            with patch.object(self.session, "_update_job_readiness") as mock:
+                self.session.update_job_result(self.job_A, result)
+            mock.assert_not_called()
+            self.assertFalse(self.session.job_state_map["B"].can_start())
+        self.assertTrue(self.session.job_state_map["B"].can_start())
+
+
 class SessionMetadataTests(TestCase):
     def test_smoke(self):
         metadata = SessionMetaData()
@@ -24,9 +24,12 @@
 Test definitions for :mod:`plainbox.impl.session.storage`
 """
 
+from tempfile import TemporaryDirectory
 from unittest import TestCase
+from unittest import mock
 import os
 
+from plainbox.impl.session.storage import SessionRepositoryIndex
 from plainbox.impl.session.storage import SessionStorage
 from plainbox.impl.session.storage import WellKnownDirsHelper
 
@@ -71,3 +74,159 @@ class SessionStorageTests(TestCase):
         self.assertEqual(data_out, data_in)
         # Remove the storage now
         storage.remove()
+
+    def test_append_load_journal(self):
+        storage = SessionStorage.create("test_storage-")
+        self.addCleanup(storage.remove)
+        self.assertEqual(storage.load_journal(), b"")
+        storage.append_journal(b"one\n")
+        storage.append_journal(b"two\n")
+        self.assertEqual(storage.load_journal(), b"one\ntwo\n")
+
+    def test_save_checkpoint_discards_journal(self):
+        storage = SessionStorage.create("test_storage-")
+        self.addCleanup(storage.remove)
+        storage.save_checkpoint(b"base")
+        storage.append_journal(b"record\n")
+        storage.save_checkpoint(b"new base")
+        self.assertEqual(storage.load_checkpoint(), b"new base")
+        self.assertEqual(storage.load_journal(), b"")
+
+    def test_checkpoint_stamp(self):
+        storage = SessionStorage.create("test_storage-")
+        self.addCleanup(storage.remove)
+        self.assertIsNone(storage.get_checkpoint_stamp())
+        storage.save_checkpoint(b"data")
+        stamp = storage.get_checkpoint_stamp()
+        self.assertEqual(stamp[0], 4)
+        storage.append_journal(b"more")
+        self.assertNotEqual(storage.get_checkpoint_stamp(), stamp)
+
+    def test_save_load_metadata(self):
+        storage = SessionStorage.create("test_storage-")
+        self.addCleanup(storage.remove)
+        storage.save_checkpoint(b"data")
+        self.assertIsNone(storage.load_metadata())
+        storage.save_metadata({"title": "t"})
+        self.assertEqual(storage.load_metadata(), {"title": "t"})
+        self.assertEqual(
+            SessionRepositoryIndex.load()[storage.id]["metadata"],
+            {"title": "t"},
+        )
+        # The sidecar covers journal data appended after it was saved
+        storage.append_journal(b"more")
+        self.assertEqual(storage.load_metadata(), {"title": "t"})
+        # but not a new snapshot
+        storage.save_checkpoint(b"new data")
+        self.assertIsNone(storage.load_metadata())
+
+    def test_load_metadata_truncated_journal(self):
+        storage = SessionStorage.create("test_storage-")
+        self.addCleanup(storage.remove)
+        storage.save_checkpoint(b"data")
+        stamp = storage.get_checkpoint_stamp()
+        storage.save_metadata({"title": "t"}, stamp[:-1] + [10])
+        self.assertIsNone(storage.load_metadata())
+
+    def test_save_metadata_failure(self):
+        storage = SessionStorage.create("test_storage-")
+        self.addCleanup(storage.remove)
+        storage.save_checkpoint(b"data")
+        storage.save_metadata({"title": "old"})
+        storage.append_journal(b"more")
+        with mock.patch(
+            "plainbox.impl.session.storage._write_json_atomically",
+            side_effect=OSError("disk full"),
+        ):
+            with self.assertLogs(level="WARNING"):
+                storage.save_metadata({"title": "new"})
+        # The old sidecar doesn't pass for the new meta-data
+        self.assertIsNone(storage.load_metadata())
+
+    def test_save_metadata_without_index(self):
+        storage = SessionStorage.create("test_storage-")
+        self.addCleanup(storage.remove)
+        storage.save_checkpoint(b"data")
+        storage.save_metadata({"title": "t"}, update_index=False)
+        self.assertEqual(storage.load_metadata(), {"title": "t"})
+        self.assertNotIn(storage.id, SessionRepositoryIndex.load())
+
+    def test_load_metadata_from_index(self):
+        storage = SessionStorage.create("test_storage-")
+        self.addCleanup(storage.remove)
+        storage.save_checkpoint(b"data")
+        index = {
+            storage.id: {
+                "stamp": storage.get_checkpoint_stamp(),
+                "metadata": {"title": "index"},
+            }
+        }
+        self.assertEqual(storage.load_metadata(index), {"title": "index"})
+        # Index entries are stale once the session changes
+        storage.append_journal(b"more")
+        self.assertIsNone(storage.load_metadata(index))
+
+    def test_remove_updates_index(self):
+        storage = SessionStorage.create("test_storage-")
+        storage.save_checkpoint(b"data")
+        storage.save_metadata({})
+        self.assertIn(storage.id, SessionRepositoryIndex.load())
+        storage.remove()
+        self.assertNotIn(storage.id, SessionRepositoryIndex.load())
+
+
+class GetStorageListTests(TestCase):
+    def setUp(self):
+        scratch_dir = TemporaryDirectory()
+        self.addCleanup(scratch_dir.cleanup)
+        patcher = mock.patch.object(
+            WellKnownDirsHelper,
+            "session_repository",
+            return_value=scratch_dir.name,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.repo = scratch_dir.name
+
+    def test_youngest_first(self):
+        old = SessionStorage.create("old-")
+        new = SessionStorage.create("new-")
+        os.utime(old.location, (0, 0))
+        self.assertEqual(
+            [storage.id for storage in WellKnownDirsHelper.get_storage_list()],
+            [new.id, old.id],
+        )
+
+    def test_skips_vanished_entries(self):
+        storage = SessionStorage.create("test_storage-")
+        with mock.patch(
+            "os.listdir",
+            return_value=["gone.session", storage.id + ".session"],
+        ):
+            storage_list = WellKnownDirsHelper.get_storage_list()
+        self.assertEqual([item.id for item in storage_list], [storage.id])
+
+    def test_list_during_index_update(self):
+        storage = SessionStorage.create("test_storage-")
+        storage.save_checkpoint(b"data")
+        listing = []
+        real_replace = os.replace
+
+        def replace(src, dst):
+            # List the repository while the temporary file exists and look
+            # at what was listed once it has been renamed
+            item_list = os.listdir(self.repo)
+            real_replace(src, dst)
+            with mock.patch("os.listdir", return_value=item_list):
+                listing.extend(WellKnownDirsHelper.get_storage_list())
+
+        with mock.patch("os.replace", side_effect=replace):
+            storage.save_metadata({"title": "t"})
+        # Once while saving the sidecar, once while updating the index
+        self.assertEqual(
+            [item.id for item in listing], [storage.id, storage.id]
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.repo)),
+            [".session-index", storage.id + ".session"],
+        )
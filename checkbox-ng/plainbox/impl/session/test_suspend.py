@@ -27,6 +27,8 @@ Test definitions for :mod:`plainbox.impl.session.suspend` module
 from functools import partial
 from unittest import TestCase
 import gzip
+import hashlib
+import json
 
 from plainbox.abc import IJobResult
 from plainbox.impl.job import JobDefinition
@@ -35,12 +37,18 @@ from plainbox.impl.result import IOLogRecord
 from plainbox.impl.result import MemoryJobResult
 from plainbox.impl.session.state import SessionMetaData
 from plainbox.impl.session.state import SessionState
+from plainbox.impl.session.suspend import SessionJournalWriter
 from plainbox.impl.session.suspend import SessionSuspendHelper1
 from plainbox.impl.session.suspend import SessionSuspendHelper2
 from plainbox.impl.session.suspend import SessionSuspendHelper3
 from plainbox.impl.session.suspend import SessionSuspendHelper4
 from plainbox.impl.session.suspend import SessionSuspendHelper5
 from plainbox.impl.session.suspend import SessionSuspendHelper6
+from plainbox.impl.session.suspend import SessionSuspendHelper8
+from plainbox.impl.session.suspend import SessionSuspendHelper9
+from plainbox.impl.session.system_information import BackgroundCollection
+from plainbox.impl.session.system_information import CollectionOutput
+from plainbox.impl.session.system_information import OutputSuccess
 from plainbox.impl.testing_utils import make_job
 from plainbox.vendor import mock
 
@@ -930,6 +938,188 @@ class SessionSuspendHelper6Tests(SessionSuspendHelper5Tests):
         )
 
 
+class SessionSuspendHelper8Tests(TestCase):
+    """
+    Tests for various methods of SessionSuspendHelper8
+    """
+
+    def setUp(self):
+        self.helper = SessionSuspendHelper8()
+        self.session_dir = None
+
+    def test_repr_SessionState_system_information(self):
+        state = SessionState([])
+        state.system_information = {
+            "inxi": CollectionOutput("1.0", OutputSuccess({}, ""), 2.0)
+        }
+        data = self.helper._repr_SessionState(state, self.session_dir)
+        self.assertEqual(
+            data["system_information"],
+            {
+                "inxi": {
+                    "tool_version": "1.0",
+                    "success": True,
+                    "duration": 2.0,
+                    "outputs": {"payload": {}, "stderr": ""},
+                }
+            },
+        )
+
+    @mock.patch("plainbox.impl.session.state.collect_in_background")
+    def test_repr_SessionState_system_information_pending(
+        self, mock_collect_in_background
+    ):
+        # A checkpoint waits for a background collection
+        state = SessionState([])
+        pending = mock.Mock(spec=BackgroundCollection, done=False)
+        pending.result.return_value = {
+            "inxi": CollectionOutput("1.0", OutputSuccess({}, ""), 2.0)
+        }
+        mock_collect_in_background.return_value = pending
+        state.start_system_information_collection()
+        data = self.helper._repr_SessionState(state, self.session_dir)
+        self.assertEqual(list(data["system_information"]), ["inxi"])
+        pending.result.assert_called_once_with()
+
+
+class SessionSuspendHelper9Tests(TestCase):
+    """
+    Tests for various methods of SessionSuspendHelper9
+    """
+
+    def setUp(self):
+        self.helper = SessionSuspendHelper9()
+        self.session_dir = None
+
+    def test_repr_JobResult_resource_usage(self):
+        resource_usage = {"cpu_user": 1.0, "cpu_system": 0.5, "max_rss": 512}
+        result = MemoryJobResult(
+            {"outcome": "pass", "resource_usage": resource_usage}
+        )
+        data = self.helper._repr_JobResult(result, self.session_dir)
+        self.assertEqual(data["resource_usage"], resource_usage)
+
+    def test_repr_JobResult_no_resource_usage(self):
+        result = DiskJobResult(
+            {"outcome": "pass", "io_log_filename": "/tmp/job.record.gz"}
+        )
+        data = self.helper._repr_JobResult(result, self.session_dir)
+        self.assertIsNone(data["resource_usage"])
+
+
+class SessionJournalWriterTests(TestCase):
+    """
+    Tests for :class:`~plainbox.impl.session.suspend.SessionJournalWriter`
+    """
+
+    def setUp(self):
+        patcher = mock.patch(
+            "plainbox.impl.session.state.collect_system_information",
+            return_value={},
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.job_a = make_job(id="a")
+        self.job_b = make_job(id="b")
+        self.state = SessionState([self.job_a, self.job_b])
+        self.state.update_desired_job_list([self.job_a, self.job_b])
+        self.writer = SessionJournalWriter()
+
+    def _decode(self, data):
+        return [
+            json.loads(line) for line in data.decode("UTF-8").split("\n")[:-1]
+        ]
+
+    def test_needs_snapshot_initially(self):
+        self.assertTrue(self.writer.needs_snapshot)
+        with self.assertRaises(ValueError):
+            self.writer.record(self.state)
+
+    def test_snapshot(self):
+        data = self.writer.snapshot(self.state)
+        self.assertEqual(
+            json.loads(gzip.decompress(data).decode("UTF-8"))["version"], 9
+        )
+        self.assertFalse(self.writer.needs_snapshot)
+
+    def test_record__nothing_changed(self):
+        self.writer.snapshot(self.state)
+        self.assertEqual(self.writer.record(self.state), b"")
+
+    def test_record__first_record_has_header(self):
+        base = self.writer.snapshot(self.state)
+        self.state.metadata.title = "title"
+        header, record = self._decode(self.writer.record(self.state))
+        self.assertEqual(
+            header,
+            {"journal": 1, "base": hashlib.sha256(base).hexdigest()},
+        )
+        self.assertEqual(record["replace"]["metadata"]["title"], "title")
+        self.assertNotIn("update", record)
+
+    def test_record__only_changed_results(self):
+        self.writer.snapshot(self.state)
+        self.state.metadata.title = "title"
+        self.writer.record(self.state)
+        result = MemoryJobResult({"outcome": IJobResult.OUTCOME_PASS})
+        self.state.update_job_result(self.job_b, result)
+        (record,) = self._decode(self.writer.record(self.state))
+        self.assertEqual(list(record["update"]["results"]), ["b"])
+        self.assertNotIn("replace", record)
+
+    def test_record__append(self):
+        self.writer.snapshot(self.state)
+        self.state.metadata.title = "title"
+        append = mock.Mock()
+        data = self.writer.record(self.state, append=append)
+        append.assert_called_once_with(data)
+        self.assertEqual(self.writer.record(self.state, append=append), b"")
+        self.assertEqual(append.call_count, 1)
+
+    def test_record__failed_append(self):
+        self.writer.snapshot(self.state)
+        self.state.metadata.title = "title"
+        append = mock.Mock(side_effect=OSError)
+        with self.assertRaises(OSError):
+            self.writer.record(self.state, append=append)
+        # The record may have been partially written, compact the journal
+        self.assertTrue(self.writer.needs_snapshot)
+        self.writer.snapshot(self.state)
+        self.assertEqual(self.writer.record(self.state), b"")
+
+    def test_snapshot__save(self):
+        save = mock.Mock()
+        data = self.writer.snapshot(self.state, save=save)
+        save.assert_called_once_with(data)
+        self.assertFalse(self.writer.needs_snapshot)
+
+    def test_snapshot__failed_save(self):
+        self.writer.snapshot(self.state)
+        self.state.metadata.title = "title"
+        save = mock.Mock(side_effect=OSError)
+        with self.assertRaises(OSError):
+            self.writer.snapshot(self.state, save=save)
+        # The new base was not saved, records must not be appended to it
+        self.assertTrue(self.writer.needs_snapshot)
+
+    def test_needs_snapshot_after_max_records(self):
+        self.writer.max_records = 2
+        self.writer.max_journal_ratio = 100
+        self.writer.snapshot(self.state)
+        self.state.metadata.title = "one"
+        self.writer.record(self.state)
+        self.assertFalse(self.writer.needs_snapshot)
+        self.state.metadata.title = "two"
+        self.writer.record(self.state)
+        self.assertTrue(self.writer.needs_snapshot)
+
+    def test_needs_snapshot_when_journal_is_large(self):
+        self.writer.snapshot(self.state)
+        self.state.metadata.app_blob = b"x" * 4096
+        self.writer.record(self.state)
+        self.assertTrue(self.writer.needs_snapshot)
+
+
 class RegressionTests(TestCase):
 
     def test_1388055(self):
@@ -1,11 +1,14 @@
 import json
+import sys
+import threading
 from copy import copy
 from unittest import TestCase
 from contextlib import contextmanager
-from subprocess import CalledProcessError
+from subprocess import CalledProcessError, TimeoutExpired
 from unittest.mock import MagicMock, patch
 
 from plainbox.impl.session.system_information import (
+    BackgroundCollection,
     Collector,
     CollectorMeta,
     OutputSuccess,
@@ -40,6 +43,18 @@ class TestCollector(TestCase):
         # in the version info
         self.assertIn("Command failed", version)
 
+    def test_collect_version_timeout(self):
+        self_mock = MagicMock()
+        with patch(
+            "plainbox.impl.session.system_information.check_output"
+        ) as check_output_mock:
+            check_output_mock.side_effect = TimeoutExpired("version_cmd", 5)
+            version = Collector.collect_version(self_mock)
+        self.assertIn("timed out", version)
+        self.assertEqual(
+            check_output_mock.call_args[1]["timeout"], self_mock.TIMEOUT
+        )
+
     def test_collect_outputs_success(self):
         self_mock = MagicMock()
 
@@ -102,6 +117,38 @@ class TestCollector(TestCase):
         self.assertIn(collection_result.stdout, outputs.stdout)
         self.assertIn(exception_str, outputs.stdout)
 
+    def test_collect_outputs_timeout(self):
+        self_mock = MagicMock()
+
+        with patch("plainbox.impl.session.system_information.run") as run_mock:
+            run_mock.side_effect = TimeoutExpired(
+                "collection_cmd", 5, stderr="partial"
+            )
+            outputs = Collector.collect_outputs(self_mock)
+        # A collector that hangs is reported as failed
+        self.assertTrue(isinstance(outputs, OutputFailure))
+        self.assertIn("timed out after 5 seconds", outputs.stdout)
+        self.assertEqual(outputs.stderr, "partial")
+        self.assertIsNone(outputs.return_code)
+        self.assertEqual(run_mock.call_args[1]["timeout"], self_mock.TIMEOUT)
+
+    def test_collect_outputs_timeout_stderr(self):
+        collector = Collector(
+            collection_cmd=[
+                sys.executable,
+                "-c",
+                "import sys, time; print('partial', file=sys.stderr, "
+                "flush=True); time.sleep(10)",
+            ],
+            version_cmd=[],
+        )
+        collector.TIMEOUT = 1
+        outputs = collector.collect_outputs()
+        self.assertTrue(isinstance(outputs, OutputFailure))
+        self.assertEqual(outputs.stderr, "partial\n")
+        # The failure can be stored in the session
+        json.dumps(outputs.to_dict())
+
     def test_collect_ok(self):
         collector = Collector(version_cmd=[], collection_cmd=[])
         with patch(
@@ -123,6 +170,8 @@ class TestCollector(TestCase):
             # The version_str is stored as is
             self.assertEqual(collection_output.tool_version, "version_str")
             self.assertTrue(collection_output.success)
+            # The time it took is recorded
+            self.assertGreaterEqual(collection_output.duration, 0)
 
     def test_collect_fail(self):
         collector = Collector(version_cmd=[], collection_cmd=[])
@@ -174,6 +223,17 @@ class TestCollectionOutput(TestCase):
         }
         self.assertEqual(collection_output.to_dict(), expected_dict)
 
+    def test_to_dict_duration(self):
+        output_success = OutputSuccess({"key": "value"}, "")
+        collection_output = CollectionOutput(
+            tool_version="1.0", outputs=output_success, duration=1.5
+        )
+        self.assertEqual(collection_output.to_dict()["duration"], 1.5)
+        self.assertEqual(
+            CollectionOutput.from_dict(collection_output.to_dict()).duration,
+            1.5,
+        )
+
     def test_from_dict_success(self):
         input_dict = {
             "tool_version": "1.0",
@@ -189,6 +249,8 @@ class TestCollectionOutput(TestCase):
         self.assertEqual(collection_output.outputs.payload, {"key": "value"})
         self.assertEqual(collection_output.outputs.stderr, "")
         self.assertTrue(collection_output.success)
+        # Sessions saved before durations were recorded don't have one
+        self.assertIsNone(collection_output.duration)
 
     def test_from_dict_failure(self):
         input_dict = {
@@ -257,3 +319,54 @@ class TestCollectorMeta(TestCase):
                 COLLECTOR_NAME = "will_register"
 
             self.assertIn("will_register", CollectorMeta.collectors)
+
+    def test_collect_concurrent(self):
+        # Both collectors have to be running at the same time to get past
+        # the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        class Waiting:
+            def collect(self):
+                barrier.wait()
+                return self.COLLECTOR_NAME
+
+        with self._preserve_collectors():
+            CollectorMeta.collectors = {}
+
+            class First(Waiting, metaclass=CollectorMeta):
+                COLLECTOR_NAME = "first"
+
+            class Second(Waiting, metaclass=CollectorMeta):
+                COLLECTOR_NAME = "second"
+
+            outputs = CollectorMeta.collect()
+
+        self.assertEqual(
+            list(outputs.items()), [("first", "first"), ("second", "second")]
+        )
+
+    def test_collect_no_collectors(self):
+        with self._preserve_collectors():
+            CollectorMeta.collectors = {}
+            self.assertEqual(CollectorMeta.collect(), {})
+
+
+class TestBackgroundCollection(TestCase):
+    def test_result(self):
+        event = threading.Event()
+
+        def collect_fn():
+            event.wait(5)
+            return {"inxi": "output"}
+
+        collection = BackgroundCollection(collect_fn).start()
+        self.assertFalse(collection.done)
+        event.set()
+        self.assertEqual(collection.result(), {"inxi": "output"})
+        self.assertTrue(collection.done)
+
+    def test_result_exception(self):
+        collection = BackgroundCollection(MagicMock(side_effect=OSError))
+        collection.start()
+        with self.assertRaises(OSError):
+            collection.result()
@@ -0,0 +1,84 @@
+# This file is part of Checkbox.
+#
+# Copyright 2024 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+plainbox.impl.test_cacheutils
+=============================
+
+Test definitions for plainbox.impl.cacheutils module
+"""
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import mock
+import os
+
+from plainbox.impl.cacheutils import get_cache_path
+from plainbox.impl.cacheutils import load_json_entry
+from plainbox.impl.cacheutils import store_json_entry
+
+
+class GetCachePathTests(TestCase):
+    def test_xdg(self):
+        with mock.patch.dict(
+            os.environ, {"XDG_CACHE_HOME": "/xdg"}, clear=True
+        ):
+            self.assertEqual(get_cache_path("name"), "/xdg/plainbox/name")
+
+    def test_home(self):
+        with mock.patch.dict(os.environ, {"HOME": "/home/u"}, clear=True):
+            self.assertEqual(
+                get_cache_path("name"), "/home/u/.cache/plainbox/name"
+            )
+
+    def test_snap(self):
+        with mock.patch.dict(
+            os.environ,
+            {"SNAP_USER_COMMON": "/snap", "XDG_CACHE_HOME": "/xdg"},
+        ):
+            self.assertEqual(
+                get_cache_path("name"), "/snap/.cache/plainbox/name"
+            )
+
+
+class JsonEntryTests(TestCase):
+    def setUp(self):
+        self.scratch_dir = TemporaryDirectory()
+        self.addCleanup(self.scratch_dir.cleanup)
+        self.cache_path = os.path.join(self.scratch_dir.name, "cache")
+        self.entry_path = os.path.join(self.cache_path, "entry.json")
+
+    def test_round_trip(self):
+        self.assertIsNone(load_json_entry(self.entry_path))
+        store_json_entry(self.entry_path, {"key": ["välue", 1]})
+        self.assertEqual(
+            load_json_entry(self.entry_path), {"key": ["välue", 1]}
+        )
+
+    def test_corrupted(self):
+        os.makedirs(self.cache_path)
+        with open(self.entry_path, "wt") as stream:
+            stream.write("{")
+        with self.assertRaises(ValueError):
+            load_json_entry(self.entry_path)
+
+    def test_store_failure(self):
+        store_json_entry(self.entry_path, {"key": "old"})
+        with self.assertRaises(TypeError):
+            store_json_entry(self.entry_path, {"key": object()})
+        # The old entry is kept and no temporary file is left behind
+        self.assertEqual(load_json_entry(self.entry_path), {"key": "old"})
+        self.assertEqual(os.listdir(self.cache_path), ["entry.json"])
@@ -101,6 +101,38 @@ class CheckBoxSessionStateControllerTests(TestCase):
             {("ordering", "j7")},
         )
 
+    def test_get_declared_dependency_set(self):
+        job = JobDefinition(
+            {"depends": "j1", "requires": "j2.attr == 1", "after": "j3"}
+        )
+        self.assertEqual(
+            self.ctrl.get_declared_dependency_set(job),
+            {("direct", "j1"), ("resource", "j2"), ("ordering", "j3")},
+        )
+        # Jobs that need to run before a suspend job are not declared by it
+        job_g = JobDefinition({"id": "j7", "flags": Suspend.AUTO_FLAG})
+        suspend_job = JobDefinition({"id": Suspend.AUTO_JOB_ID})
+        self.assertEqual(
+            self.ctrl.get_declared_dependency_set(suspend_job), set()
+        )
+
+    def test_get_suspend_job_id_set(self):
+        job_a = JobDefinition({"id": "j1"})
+        self.assertEqual(self.ctrl.get_suspend_job_id_set(job_a), set())
+        job_b = JobDefinition(
+            {
+                "id": "j2",
+                "flags": Suspend.AUTO_FLAG,
+                "siblings": json.dumps(
+                    [{"id": "sibling-j2", "depends": Suspend.MANUAL_JOB_ID}]
+                ),
+            }
+        )
+        self.assertEqual(
+            self.ctrl.get_suspend_job_id_set(job_b),
+            {Suspend.AUTO_JOB_ID, Suspend.MANUAL_JOB_ID},
+        )
+
     def test_get_inhibitor_list_PENDING_RESOURCE(self):
         # verify that jobs that require a resource that hasn't been
         # invoked yet produce the PENDING_RESOURCE inhibitor
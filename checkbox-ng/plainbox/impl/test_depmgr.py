@@ -25,12 +25,18 @@ Test definitions for plainbox.impl.depmgr module
 """
 
 from unittest import TestCase
+import sys
 
+from plainbox.abc import ISessionStateController
 from plainbox.impl.depmgr import DependencyCycleError
 from plainbox.impl.depmgr import DependencyDuplicateError
+from plainbox.impl.depmgr import DependencyGraph
 from plainbox.impl.depmgr import DependencyMissingError
 from plainbox.impl.depmgr import DependencySolver
+from plainbox.impl.secure.origin import Origin
 from plainbox.impl.testing_utils import make_job
+from plainbox.impl.unit.job import JobDefinition
+from plainbox.suspend_consts import Suspend
 
 
 class DependencyCycleErrorTests(TestCase):
@@ -306,3 +312,106 @@ class TestDependencySolver(TestCase):
         with self.assertRaises(DependencyCycleError) as call:
             DependencySolver.resolve_dependencies(job_list)
         self.assertEqual(call.exception.job_list, [A, R, A])
+
+    def test_long_dependency_chain(self):
+        # This tests a chain longer than the recursion limit
+        # J0 -> J1 -> ... -> Jn
+        length = sys.getrecursionlimit() * 2
+        origin = Origin.get_caller_origin()
+        job_list = [
+            JobDefinition(
+                {"id": "J{}".format(i), "depends": "J{}".format(i + 1)}, origin
+            )
+            for i in range(length)
+        ]
+        job_list.append(JobDefinition({"id": "J{}".format(length)}, origin))
+        observed = DependencySolver.resolve_dependencies(
+            job_list, job_list[:1]
+        )
+        self.assertEqual(
+            [job.id for job in observed], [job.id for job in job_list[::-1]]
+        )
+
+    def test_before_suspend_deps(self):
+        # Jobs flagged also-after-suspend run before the suspend job, if
+        # they are on the visit list
+        S = make_job(id=Suspend.AUTO_JOB_ID)
+        A = make_job(id="A", flags=Suspend.AUTO_FLAG)
+        B = make_job(id="B", flags=Suspend.AUTO_FLAG)
+        job_list = [S, A, B]
+        observed = DependencySolver.resolve_dependencies(job_list)
+        self.assertEqual(observed, [A, B, S])
+        observed = DependencySolver.resolve_dependencies(job_list, [S, B])
+        self.assertEqual(observed, [B, S])
+
+
+class DependencyGraphTests(TestCase):
+
+    def test_dependencies_are_cached(self):
+        A = make_job(id="A", depends="B", requires='R.attr == "value"')
+        B = make_job(id="B")
+        R = make_job(id="R", plugin="resource")
+        graph = DependencyGraph([A, B, R])
+        job_list = [A, B, R]
+        first = DependencySolver.resolve_dependencies(job_list, [A], graph)
+        self.assertEqual(graph.stats["miss"], 3)
+        self.assertEqual(graph.job_count, 3)
+        self.assertEqual(graph.edge_count, 2)
+        second = DependencySolver.resolve_dependencies(job_list, [A], graph)
+        self.assertEqual(first, second)
+        self.assertEqual(graph.stats["miss"], 3)
+        self.assertEqual(graph.stats["solve"], 2)
+        self.assertGreater(graph.stats["solve_time"], 0)
+
+    def test_add_job_replaces_job(self):
+        A = make_job(id="A", depends="B")
+        B = make_job(id="B")
+        graph = DependencyGraph([A, B])
+        self.assertEqual(graph.get_dependency_list(A), (("direct", "B"),))
+        new_A = make_job(id="A")
+        graph.add_job(new_A)
+        self.assertEqual(graph.job_count, 0)
+        self.assertEqual(graph.get_dependency_list(new_A), ())
+        # Adding the same job again keeps what is known about it
+        graph.add_job(new_A)
+        self.assertEqual(graph.job_count, 1)
+
+    def test_remove_job(self):
+        A = make_job(id="A", depends="B")
+        graph = DependencyGraph([A])
+        graph.get_dependency_list(A)
+        graph.remove_job(A)
+        self.assertEqual(graph.job_count, 0)
+        self.assertEqual(graph.edge_count, 0)
+
+    def test_get_before_suspend_map(self):
+        A = make_job(id="A", flags=Suspend.AUTO_FLAG)
+        B = make_job(id="B")
+        graph = DependencyGraph([A, B])
+        self.assertEqual(
+            graph.get_before_suspend_map([A, B]), {Suspend.AUTO_JOB_ID: ["A"]}
+        )
+        self.assertEqual(graph.get_before_suspend_map([B]), {})
+
+    def test_controller_without_declared_dependencies(self):
+        class MinimalController(ISessionStateController):
+            def get_dependency_set(self, job):
+                return {
+                    ("direct", dep) for dep in job.get_direct_dependencies()
+                }
+
+            def get_inhibitor_list(self, session_state, job):
+                return []
+
+            def observe_result(self, session_state, job, result):
+                pass
+
+        controller = MinimalController()
+        A = JobDefinition({"id": "A", "depends": "B"}, controller=controller)
+        B = JobDefinition({"id": "B"}, controller=controller)
+        graph = DependencyGraph([A, B])
+        self.assertEqual(graph.get_dependency_list(A), (("direct", "B"),))
+        self.assertEqual(graph.get_before_suspend_map([A, B]), {})
+        self.assertEqual(
+            DependencySolver.resolve_dependencies([A, B], [A], graph), [B, A]
+        )
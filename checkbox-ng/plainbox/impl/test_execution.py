@@ -16,6 +16,9 @@
 # You should have received a copy of the GNU General Public License
 # along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
+from tempfile import TemporaryDirectory
+
 from plainbox.impl.execution import UnifiedRunner
 from plainbox.impl.unit.job import InvalidJob
 
@@ -40,3 +43,74 @@ class UnifiedRunnerTests(TestCase):
         self.assertTrue(output_writer.on_chunk.called)
         self.assertTrue(output_writer.on_end.called)
         self.assertEqual(result.outcome, "fail")
+
+    def test_run_command_resource_usage(self):
+        self_mock = mock.MagicMock()
+        rusage = mock.MagicMock(
+            ru_utime=1.5,
+            ru_stime=0.5,
+            ru_maxrss=1024,
+            ru_inblock=8,
+            ru_oublock=16,
+            ru_nvcsw=3,
+            ru_nivcsw=4,
+        )
+
+        def execute_job(job, environ, ecmd, stdin):
+            ecmd.rusage = rusage
+            return 0
+
+        self_mock.execute_job.side_effect = execute_job
+        with TemporaryDirectory() as tmp:
+            self_mock._jobs_io_log_dir = tmp
+            self_mock.get_record_path_for_job.return_value = os.path.join(
+                tmp, "job.record.gz"
+            )
+            builder = UnifiedRunner._run_command(
+                self_mock, mock.MagicMock(id="job"), {}
+            )
+
+        self.assertEqual(builder.return_code, 0)
+        self.assertEqual(
+            builder.resource_usage,
+            {
+                "cpu_user": 1.5,
+                "cpu_system": 0.5,
+                "max_rss": 1024,
+                "block_input": 8,
+                "block_output": 16,
+                "voluntary_ctx_switches": 3,
+                "involuntary_ctx_switches": 4,
+            },
+        )
+        self.assertEqual(builder.get_result().cpu_time, 2.0)
+
+    def test_run_command_no_resource_usage(self):
+        self_mock = mock.MagicMock()
+        self_mock.execute_job.return_value = 1
+        with TemporaryDirectory() as tmp:
+            self_mock._jobs_io_log_dir = tmp
+            self_mock.get_record_path_for_job.return_value = os.path.join(
+                tmp, "job.record.gz"
+            )
+            builder = UnifiedRunner._run_command(
+                self_mock, mock.MagicMock(id="job"), {}
+            )
+
+        self.assertEqual(builder.outcome, "fail")
+        self.assertIsNone(builder.get_result().resource_usage)
+        self.assertIsNone(builder.get_result().cpu_time)
+
+    def test_get_worker_runner(self):
+        runner = UnifiedRunner("session", [], "/io-logs", stdin="stdin")
+        runner._running_jobs_pid = 42
+        stdin = mock.Mock()
+        worker = runner.get_worker_runner(stdin)
+        self.assertIsNot(worker, runner)
+        self.assertIsNot(
+            worker._job_runner_ui_delegate, runner._job_runner_ui_delegate
+        )
+        self.assertIsNone(worker._running_jobs_pid)
+        self.assertIs(worker._stdin, stdin)
+        self.assertIs(worker.resource_cache, runner.resource_cache)
+        self.assertEqual(runner._stdin, "stdin")
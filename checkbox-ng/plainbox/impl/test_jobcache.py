@@ -0,0 +1,181 @@
+# This file is part of Checkbox.
+#
+# Copyright 2024 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+plainbox.impl.test_jobcache
+===========================
+
+Test definitions for plainbox.impl.jobcache module
+"""
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import mock
+import json
+import os
+
+from plainbox.impl.jobcache import ResourceJobCache
+from plainbox.impl.jobcache import get_input_fingerprint
+from plainbox.impl.result import DiskJobResult
+
+
+class GetInputFingerprintTests(TestCase):
+    def test_empty(self):
+        self.assertEqual(get_input_fingerprint([]), {})
+
+    @mock.patch("platform.release", return_value="6.8.0-1-generic")
+    def test_kernel_release(self, mock_release):
+        self.assertEqual(
+            get_input_fingerprint(["kernel-release"]),
+            {"kernel-release": "6.8.0-1-generic"},
+        )
+
+    @mock.patch.dict(os.environ, {"CACHE_TEST_VAR": "value"})
+    def test_env(self):
+        self.assertEqual(
+            get_input_fingerprint(["env:CACHE_TEST_VAR", "env:CACHE_NOPE"]),
+            {"env:CACHE_TEST_VAR": "value", "env:CACHE_NOPE": None},
+        )
+
+    def test_file(self):
+        with TemporaryDirectory() as scratch_dir:
+            path = os.path.join(scratch_dir, "status")
+            with open(path, "wt") as stream:
+                stream.write("content")
+            os.utime(path, ns=(1000, 1000))
+            self.assertEqual(get_input_fingerprint([path]), {path: [7, 1000]})
+            os.remove(path)
+            self.assertEqual(get_input_fingerprint([path]), {path: None})
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            get_input_fingerprint(["relative/path"])
+
+
+class ResourceJobCacheTests(TestCase):
+    def setUp(self):
+        self.scratch_dir = TemporaryDirectory()
+        self.addCleanup(self.scratch_dir.cleanup)
+        self.cache_path = os.path.join(self.scratch_dir.name, "cache")
+        self.io_log_filename = os.path.join(
+            self.scratch_dir.name, "job.record.gz"
+        )
+        with open(self.io_log_filename, "wb") as stream:
+            stream.write(b"io log")
+        self.compute_fn = mock.Mock(
+            return_value=DiskJobResult(
+                {"outcome": "pass", "io_log_filename": self.io_log_filename}
+            )
+        )
+
+    def get(self, cache=None, **kwargs):
+        cache = cache or ResourceJobCache(self.cache_path)
+        return cache.get("checksum", self.compute_fn, **kwargs)
+
+    def test_miss_then_hit(self):
+        cache = ResourceJobCache(self.cache_path)
+        from_cache, result = self.get(cache)
+        self.assertFalse(from_cache)
+        self.assertEqual(result.outcome, "pass")
+        # The result of this run still refers to the log of the session
+        self.assertEqual(result.io_log_filename, self.io_log_filename)
+        self.assertEqual(cache.stats, {"miss": 1})
+        # Another cache (i.e. another session) finds it on disk
+        cache = ResourceJobCache(self.cache_path)
+        from_cache, result = self.get(cache)
+        self.assertTrue(from_cache)
+        self.assertEqual(result.outcome, "pass")
+        self.assertEqual(self.compute_fn.call_count, 1)
+        self.assertEqual(cache.stats, {"hit": 1})
+        # The IO log is linked, not copied
+        self.assertTrue(
+            os.path.samefile(result.io_log_filename, self.io_log_filename)
+        )
+        # And it survives the session that produced it
+        os.remove(self.io_log_filename)
+        with open(result.io_log_filename, "rb") as stream:
+            self.assertEqual(stream.read(), b"io log")
+
+    def test_lookups_are_lazy(self):
+        self.get()
+        cache = ResourceJobCache(self.cache_path)
+        with mock.patch("builtins.open") as mock_open:
+            cache.load()
+        self.assertFalse(mock_open.called)
+        self.assertTrue(cache.get("checksum", self.compute_fn)[0])
+        self.assertTrue(cache.get("checksum", self.compute_fn)[0])
+        self.assertEqual(list(cache._cache), ["checksum"])
+
+    def test_expired(self):
+        with mock.patch("time.time", return_value=1000):
+            self.get(ttl=60)
+        with mock.patch("time.time", return_value=1059):
+            self.assertTrue(self.get(ttl=60)[0])
+        cache = ResourceJobCache(self.cache_path)
+        with mock.patch("time.time", return_value=1061):
+            self.assertFalse(self.get(cache, ttl=60)[0])
+        self.assertEqual(cache.stats, {"expired": 1})
+        self.assertEqual(self.compute_fn.call_count, 2)
+        # The new result is cached
+        with mock.patch("time.time", return_value=1062):
+            self.assertTrue(self.get(ttl=60)[0])
+
+    def test_invalidated(self):
+        input_list = ["env:CACHE_TEST_VAR"]
+        with mock.patch.dict(os.environ, {"CACHE_TEST_VAR": "1"}):
+            self.get(input_list=input_list)
+            self.assertTrue(self.get(input_list=input_list)[0])
+        cache = ResourceJobCache(self.cache_path)
+        with mock.patch.dict(os.environ, {"CACHE_TEST_VAR": "2"}):
+            self.assertFalse(self.get(cache, input_list=input_list)[0])
+            self.assertTrue(self.get(input_list=input_list)[0])
+        self.assertEqual(cache.stats, {"invalidated": 1})
+        self.assertEqual(self.compute_fn.call_count, 2)
+
+    def test_unknown_input(self):
+        cache = ResourceJobCache(self.cache_path)
+        from_cache, result = cache.get(
+            "checksum", self.compute_fn, ["relative/path"]
+        )
+        self.assertFalse(from_cache)
+        self.assertIs(result, self.compute_fn.return_value)
+        self.assertFalse(os.path.exists(self.cache_path))
+
+    def test_outdated_entry(self):
+        # Entries written before the format was versioned are not used
+        entry_path = os.path.join(self.cache_path, "checksum")
+        os.makedirs(entry_path)
+        with open(os.path.join(entry_path, "result.json"), "wt") as stream:
+            json.dump(
+                {"outcome": "fail", "io_log_filename": self.io_log_filename},
+                stream,
+            )
+        cache = ResourceJobCache(self.cache_path)
+        self.assertFalse(self.get(cache)[0])
+        self.assertEqual(cache.stats, {"miss": 1})
+        self.assertTrue(self.get()[0])
+
+    def test_missing_io_log(self):
+        self.get()
+        cache = ResourceJobCache(self.cache_path)
+        os.remove(os.path.join(self.cache_path, "checksum", "job.record.gz"))
+        self.assertFalse(self.get(cache)[0])
+
+    def test_clear(self):
+        self.get()
+        cache = ResourceJobCache(self.cache_path)
+        cache.clear()
+        self.assertFalse(self.get(cache)[0])
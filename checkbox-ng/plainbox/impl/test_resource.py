@@ -34,10 +34,13 @@ from plainbox.impl.resource import FakeResource
 from plainbox.impl.resource import NoResourcesReferenced
 from plainbox.impl.resource import Resource
 from plainbox.impl.resource import ResourceExpression
+from plainbox.impl.resource import ResourceList
 from plainbox.impl.resource import ResourceNodeVisitor
 from plainbox.impl.resource import ResourceProgram
 from plainbox.impl.resource import ResourceProgramError
 from plainbox.impl.resource import ResourceSyntaxError
+from plainbox.impl.resource import _compile_expression_tree
+from plainbox.vendor import mock
 
 
 class ExpressionFailedTests(TestCase):
@@ -417,6 +420,34 @@ class ResourceExpressionTests(TestCase):
             )
         )
 
+    def test_compound_expression_without_resource_map(self):
+        expr = ResourceExpression("a.foo == 1 or b.bar == 2")
+        self.assertTrue(
+            expr.evaluate([Resource({"foo": 2})], [Resource({"bar": 2})])
+        )
+        self.assertFalse(
+            expr.evaluate([Resource({"foo": 2})], [Resource({"bar": 3})])
+        )
+
+    def test_compound_expression_is_compiled_once(self):
+        resource_map = {
+            "a": [Resource({"foo": 1})],
+            "b": [Resource({"bar": 2})],
+        }
+        text = "a.foo == 1 and b.bar == 2 or a.foo == 3"
+        ResourceExpression(text).evaluate(resource_map["a"], resource_map["b"])
+        expr = ResourceExpression(text)
+        with mock.patch.object(ResourceExpression, "_analyze") as analyze:
+            self.assertTrue(
+                expr.evaluate(resource_map["a"], resource_map["b"])
+            )
+        analyze.assert_not_called()
+
+    def test_compound_expression_short_circuits(self):
+        expr = ResourceExpression("a.foo == 1 or b.bar == 2")
+        # Evaluating the right hand side would raise TypeError
+        self.assertTrue(expr.evaluate([Resource({"foo": 1})], [{"bar": 2}]))
+
     def test_evaluate_no_namespaces(self):
         self.assertFalse(ResourceExpression("whatever").evaluate([]))
 
@@ -471,6 +502,105 @@ class ResourceExpressionTests(TestCase):
         )
 
 
+class ResourceListTests(TestCase):
+
+    def test_get_index(self):
+        resource_list = ResourceList(
+            [
+                Resource({"name": "a"}),
+                Resource({"name": "b"}),
+                Resource({"name": "a", "version": "2"}),
+                Resource({"name": ["unhashable"]}),
+            ]
+        )
+        index, unhashable = resource_list.get_index("name")
+        self.assertEqual(index["a"], [resource_list[0], resource_list[2]])
+        self.assertEqual(index["b"], [resource_list[1]])
+        self.assertEqual(unhashable, [resource_list[3]])
+        index, unhashable = resource_list.get_index("version")
+        self.assertEqual(index[""], resource_list[:2] + resource_list[3:])
+
+    def test_get_index_is_cached(self):
+        resource_list = ResourceList([Resource({"name": "a"})])
+        self.assertIs(
+            resource_list.get_index("name"), resource_list.get_index("name")
+        )
+        resource_list.append(Resource({"name": "b"}))
+        index, unhashable = resource_list.get_index("name")
+        self.assertEqual(index["b"], [resource_list[1]])
+
+    def test_equal_to_list(self):
+        self.assertEqual(ResourceList([Resource({})]), [Resource({})])
+
+
+class IndexedResourceExpressionTests(TestCase):
+    """
+    Tests for evaluation of expressions referencing many resources or many
+    conditions on the same resource.
+    """
+
+    def test_uses_index(self):
+        package = ResourceList(
+            [Resource({"name": str(i)}) for i in range(100)]
+        )
+        expr = ResourceExpression("(package.name == '42') and True")
+        with mock.patch.object(
+            ResourceList, "get_index", wraps=package.get_index
+        ) as get_index:
+            self.assertTrue(expr.evaluate(package))
+        get_index.assert_called_once_with("name")
+        expr = ResourceExpression("(package.name == '420') and True")
+        self.assertFalse(expr.evaluate(package))
+
+    def test_uncorrelated_resources_are_not_multiplied(self):
+        a = ResourceList([Resource({"x": str(i)}) for i in range(1000)])
+        b = ResourceList([Resource({"y": str(i)}) for i in range(1000)])
+        expr = ResourceExpression("(a.x == '999') and b.y == '999'")
+        with mock.patch("plainbox.impl.resource.itertools.product") as product:
+            self.assertTrue(expr.evaluate(a, b))
+        product.assert_not_called()
+
+    def test_correlated_resources(self):
+        a = [Resource({"x": "1"}), Resource({"x": "2"})]
+        b = [Resource({"y": "2"}), Resource({"y": "3"})]
+        expr = ResourceExpression("(a.x == b.y) and a.x != '1'")
+        self.assertTrue(expr.evaluate(a, b))
+        expr = ResourceExpression("(a.x == b.y) and a.x != '2'")
+        self.assertFalse(expr.evaluate(a, b))
+
+    def test_empty_resource_list(self):
+        expr = ResourceExpression("(a.x == '1') and b.y == b.y")
+        self.assertFalse(expr.evaluate([Resource({"x": "1"})], []))
+
+    def test_same_as_product(self):
+        a = [
+            Resource({"x": "1", "z": "a"}),
+            Resource({"x": "2", "z": "b"}),
+            Resource({"x": 3}),
+        ]
+        b = ResourceList(
+            [Resource({"y": "2"}), Resource({"y": ["3"]}), Resource({})]
+        )
+        text_list = [
+            "(a.x == '1') and a.z == 'b'",
+            "(a.x == '1') and b.y == '2'",
+            "(a.x == b.y) and b.y == '2'",
+            "(a.x == '2') and a.z == 'b' and b.y == ''",
+            "('2' == b.y) and a.x > '0'",
+            "(a.x > 2) and b.y == ['3']",
+            "(a.x == '1') or b.y == '3'",
+            "(a.x == '1') and 1 == 2",
+            "len(a.z) == 1 and b.y == '2'",
+        ]
+        for text in text_list:
+            with self.subTest(text=text):
+                expr = ResourceExpression(text)
+                leaf = _compile_expression_tree(text)
+                self.assertEqual(
+                    expr.evaluate(a, b), leaf._evaluate_product([a, b])
+                )
+
+
 class ResourceProgramTests(TestCase):
 
     def setUp(self):
@@ -27,14 +27,19 @@ from tempfile import TemporaryDirectory
 from unittest import TestCase
 import doctest
 import io
+import os
 
 from plainbox.abc import IJobResult
+from plainbox.impl.result import BinaryIOLogRecordReader
+from plainbox.impl.result import BinaryIOLogRecordWriter
 from plainbox.impl.result import DiskJobResult
 from plainbox.impl.result import IOLogRecord
 from plainbox.impl.result import IOLogRecordReader
 from plainbox.impl.result import IOLogRecordWriter
 from plainbox.impl.result import JobResultBuilder
 from plainbox.impl.result import MemoryJobResult
+from plainbox.impl.result import get_io_log_companion_filename
+from plainbox.impl.result import io_log_text_cache
 from plainbox.impl.testing_utils import make_io_log
 from plainbox.vendor import mock
 
@@ -106,6 +111,44 @@ class DiskJobResultTests(TestCase, CommonTestsMixIn):
         self.assertEqual(result.return_code, 0)
         self.assertFalse(result.is_hollow)
 
+    @mock.patch("plainbox.impl.result.logger")
+    def test_binary_io_log(self, mock_logger):
+        io_log_filename = os.path.join(self.scratch_dir.name, "A.record.bin")
+        with open(io_log_filename, "wb") as stream:
+            writer = BinaryIOLogRecordWriter(stream)
+            writer.write_record((0, "stdout", b"blah\n"))
+            writer.write_record((0.5, "stderr", b"oops\n"))
+            writer.finish()
+        result = DiskJobResult({"io_log_filename": io_log_filename})
+        self.assertEqual(
+            result.io_log,
+            ((0, "stdout", b"blah\n"), (0.5, "stderr", b"oops\n")),
+        )
+        self.assertEqual(list(result.get_io_log_data("stderr")), [b"oops\n"])
+        self.assertEqual(result.io_log_as_text_attachment, "blah\n")
+
+    def test_legacy_io_log_data(self):
+        result = DiskJobResult(
+            {
+                "io_log_filename": make_io_log(
+                    [(0, "stdout", b"blah\n"), (1, "stderr", b"oops\n")],
+                    self.scratch_dir.name,
+                ),
+            }
+        )
+        self.assertEqual(list(result.get_io_log_data()), [b"blah\n"])
+
+    def test_iter_io_log_as_base64(self):
+        io_log_filename = os.path.join(self.scratch_dir.name, "A.record.bin")
+        with open(os.path.join(self.scratch_dir.name, "A.stdout"), "wb") as f:
+            f.write(b"foobar!")
+        result = DiskJobResult({"io_log_filename": io_log_filename})
+        with mock.patch("plainbox.impl.result.BASE64_CHUNK_SIZE", 3):
+            self.assertEqual(
+                list(result.iter_io_log_as_base64()), ["Zm9v", "YmFy", "IQ=="]
+            )
+        self.assertEqual(result.io_log_as_base64, "Zm9vYmFyIQ==")
+
     def test_io_log_as_text_attachment(self):
         result = MemoryJobResult(
             {
@@ -167,6 +210,67 @@ class MemoryJobResultTests(TestCase, CommonTestsMixIn):
         )
         self.assertEqual(result.io_log_as_text_attachment, "foo")
 
+    def test_io_log_text_cache(self):
+        result = MemoryJobResult({"io_log": [(0, "stdout", b"foo")]})
+        with mock.patch.object(
+            MemoryJobResult, "get_io_log", wraps=result.get_io_log
+        ) as mock_get_io_log:
+            with io_log_text_cache():
+                self.assertEqual(result.io_log_as_flat_text, "foo")
+                self.assertEqual(result.io_log_as_flat_text, "foo")
+            self.assertEqual(mock_get_io_log.call_count, 1)
+            # Outside of the block nothing is cached
+            self.assertEqual(result.io_log_as_flat_text, "foo")
+            self.assertEqual(mock_get_io_log.call_count, 2)
+
+    def test_io_log_text_cache_short_lived_results(self):
+        with io_log_text_cache():
+            for text in ("foo", "bar", "baz"):
+                # Each result is freed right away, its id may be reused
+                result = MemoryJobResult(
+                    {"io_log": [(0, "stdout", text.encode("UTF-8"))]}
+                )
+                self.assertEqual(result.io_log_as_flat_text, text)
+                del result
+
+    def test_iter_io_log_as_text_attachment(self):
+        result = MemoryJobResult(
+            {"io_log": [(0, "stdout", b"caf\xc3"), (0, "stdout", b"\xa9")]}
+        )
+        self.assertEqual(
+            "".join(result.iter_io_log_as_text_attachment()), "caf\xe9"
+        )
+        result = MemoryJobResult({"io_log": [(0, "stdout", b"foo\xff")]})
+        self.assertEqual(list(result.iter_io_log_as_text_attachment()), [])
+
+    def test_iter_io_log_text_cache_limit(self):
+        result = MemoryJobResult(
+            {
+                "io_log": [
+                    (0, "stdout", b"foo"),
+                    (0, "stderr", b"bar"),
+                ]
+            }
+        )
+        with mock.patch.object(
+            MemoryJobResult, "get_io_log", wraps=result.get_io_log
+        ) as mock_get_io_log:
+            with io_log_text_cache():
+                self.assertEqual(
+                    list(result.iter_io_log_as_flat_text()), ["foo", "bar"]
+                )
+                self.assertEqual(
+                    list(result.iter_io_log_as_flat_text()), ["foobar"]
+                )
+            self.assertEqual(mock_get_io_log.call_count, 1)
+            with mock.patch(
+                "plainbox.impl.result.IO_LOG_TEXT_CACHE_MAX_CHARS", 5
+            ), io_log_text_cache():
+                list(result.iter_io_log_as_flat_text())
+                list(result.iter_io_log_as_flat_text())
+            # Text too long to be cached is read again
+            self.assertEqual(mock_get_io_log.call_count, 3)
+
 
 class IOLogRecordWriterTests(TestCase):
 
@@ -200,6 +304,81 @@ class IOLogRecordWriterTests(TestCase):
         self.assertEqual(record_list, [self._RECORD])
 
 
+class BinaryIOLogRecordWriterTests(TestCase):
+
+    _RECORDS = [
+        IOLogRecord(0.123, "stdout", b"some\ndata"),
+        IOLogRecord(0.5, "stderr", b"error"),
+        IOLogRecord(1.0, "custom", b""),
+        IOLogRecord(1.5, "stdout", b"more data"),
+    ]
+
+    def write(self, records=_RECORDS, finish=True, **kwargs):
+        stream = io.BytesIO()
+        writer = BinaryIOLogRecordWriter(stream, **kwargs)
+        for record in records:
+            writer.write_record(record)
+        if finish:
+            writer.finish()
+        else:
+            writer.flush()
+        stream.seek(0)
+        return stream
+
+    def test_round_trip(self):
+        for compress in (True, False):
+            with self.subTest(compress=compress):
+                reader = BinaryIOLogRecordReader(self.write(compress=compress))
+                self.assertEqual(list(reader), self._RECORDS)
+
+    def test_stream_filter(self):
+        reader = BinaryIOLogRecordReader(self.write())
+        self.assertEqual(
+            list(reader.iter_records(stream_name="stdout")),
+            [self._RECORDS[0], self._RECORDS[3]],
+        )
+
+    def test_random_access(self):
+        records = [
+            IOLogRecord(i, "stdout", str(i).encode()) for i in range(100)
+        ]
+        stream = self.write(records, block_size=64)
+        reader = BinaryIOLogRecordReader(stream)
+        index = reader.get_index()
+        self.assertGreater(len(index), 10)
+        self.assertEqual(index[0], (len(b"\x89PBIOLOG"), 0))
+        self.assertEqual(list(reader.iter_records(start=42)), records[42:])
+        stream.seek(0)
+        reader = BinaryIOLogRecordReader(stream)
+        self.assertEqual(list(reader.iter_records(start=100)), [])
+
+    def test_without_index(self):
+        stream = self.write(finish=False)
+        reader = BinaryIOLogRecordReader(stream)
+        self.assertIsNone(reader.get_index())
+        self.assertEqual(list(reader.iter_records(start=1)), self._RECORDS[1:])
+
+    def test_truncated(self):
+        # One record per block, the last block is cut short
+        data = self.write(finish=False, block_size=1).getvalue()
+        reader = BinaryIOLogRecordReader(io.BytesIO(data[:-2]))
+        self.assertEqual(list(reader), self._RECORDS[:-1])
+
+    def test_bad_magic(self):
+        with self.assertRaises(ValueError):
+            BinaryIOLogRecordReader(io.BytesIO(b"[0.1,"))
+
+    def test_companion_filename(self):
+        self.assertEqual(
+            get_io_log_companion_filename("/d/job.record.bin", "stdout"),
+            "/d/job.stdout",
+        )
+        self.assertEqual(
+            get_io_log_companion_filename("/d/job.record.gz", "stderr"),
+            "/d/job.stderr",
+        )
+
+
 class JobResultBuildeTests(TestCase):
 
     def test_smoke_hollow(self):
@@ -70,6 +70,19 @@ class IOLogGeneratorTests(TestCase):
         self.assertEqual(self.last_record.stream_name, "stderr")
         self.assertEqual(self.last_record.data, b"error message\n")
 
+    def test_on_lines(self):
+        builder = IOLogRecordGenerator()
+        builder.on_begin(None, None)
+        record_list = []
+        builder.on_new_record.connect(record_list.append)
+        builder.on_lines("stdout", [b"first\n", b"second\n"])
+        self.assertEqual(
+            [record.data for record in record_list], [b"first\n", b"second\n"]
+        )
+        self.assertEqual(record_list[1].stream_name, "stdout")
+        # Lines of a batch are read at the same time
+        self.assertEqual(record_list[1].delay, 0)
+
 
 class FallbackCommandOutputPrinterTests(TestCase):
 
@@ -121,3 +134,15 @@ class CommandOutputWriterTests(TestCase):
             writer.on_end(None)
             self.assertFileContentsEqual(stdout, b"text\n")
             self.assertFileContentsEqual(stderr, b"error\n")
+
+    def test_on_lines(self):
+        with TemporaryDirectory() as scratch_dir:
+            stdout = os.path.join(scratch_dir, "stdout")
+            stderr = os.path.join(scratch_dir, "stderr")
+            writer = CommandOutputWriter(stdout, stderr)
+            writer.on_begin(None, None)
+            writer.on_lines("stdout", [b"text\n", b"more text\n"])
+            writer.on_lines("stderr", [b"error\n"])
+            writer.on_end(None)
+            self.assertFileContentsEqual(stdout, b"text\nmore text\n")
+            self.assertFileContentsEqual(stderr, b"error\n")
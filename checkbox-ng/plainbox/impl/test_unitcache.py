@@ -0,0 +1,177 @@
+# This file is part of Checkbox.
+#
+# Copyright 2024 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+plainbox.impl.test_unitcache
+============================
+
+Test definitions for plainbox.impl.unitcache module
+"""
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import mock
+import os
+
+from plainbox.impl.secure.plugins import LazyFileContent
+from plainbox.impl.secure.providers.v1 import Provider1
+from plainbox.impl.secure.providers.v1 import UnitPlugIn
+from plainbox.impl.secure.rfc822 import load_rfc822_records
+from plainbox.impl.unitcache import ProviderUnitCache
+from plainbox.impl.unitcache import UnitFileCacheEntry
+
+
+class ProviderUnitCacheTests(TestCase):
+    def setUp(self):
+        self.scratch_dir = TemporaryDirectory()
+        self.addCleanup(self.scratch_dir.cleanup)
+        self.cache = ProviderUnitCache(
+            os.path.join(self.scratch_dir.name, "cache")
+        )
+        self.filename = os.path.join(self.scratch_dir.name, "jobs.pxu")
+        self.write_units("id: job1\nplugin: shell\n\nid: job2\n_summary: 2\n")
+
+    def write_units(self, text, mtime_ns=None):
+        with open(self.filename, "wt", encoding="UTF-8") as stream:
+            stream.write(text)
+        if mtime_ns is not None:
+            os.utime(self.filename, ns=(mtime_ns, mtime_ns))
+
+    def store(self):
+        text = LazyFileContent(self.filename)
+        records = load_rfc822_records(text)
+        entry = UnitFileCacheEntry(records, ["a", "b"])
+        self.cache.store(self.filename, text, "ns", entry)
+        return records
+
+    def test_lookup_missing(self):
+        text = LazyFileContent(self.filename)
+        self.assertIsNone(self.cache.lookup(self.filename, text, "ns"))
+
+    def test_lookup(self):
+        records = self.store()
+        entry = self.cache.lookup(
+            self.filename, LazyFileContent(self.filename), "ns"
+        )
+        self.assertEqual(entry.checksum_list, ["a", "b"])
+        self.assertEqual(entry.record_list, records)
+        self.assertEqual(
+            [record.raw_data for record in entry.record_list],
+            [record.raw_data for record in records],
+        )
+        self.assertEqual(
+            [record.field_offset_map for record in entry.record_list],
+            [record.field_offset_map for record in records],
+        )
+
+    def test_lookup_other_namespace(self):
+        self.store()
+        text = LazyFileContent(self.filename)
+        self.assertIsNone(self.cache.lookup(self.filename, text, "other"))
+
+    def test_lookup_touched(self):
+        self.store()
+        self.write_units(
+            "id: job1\nplugin: shell\n\nid: job2\n_summary: 2\n",
+            mtime_ns=42 * 10**9,
+        )
+        text = LazyFileContent(self.filename)
+        entry = self.cache.lookup(self.filename, text, "ns")
+        self.assertEqual(entry.checksum_list, ["a", "b"])
+        # The new modification time is remembered so the content is not
+        # hashed again
+        with mock.patch.object(ProviderUnitCache, "_get_digest") as mock_fn:
+            self.assertIsNotNone(self.cache.lookup(self.filename, text, "ns"))
+        mock_fn.assert_not_called()
+
+    def test_lookup_changed(self):
+        self.store()
+        self.write_units(
+            "id: job1\nplugin: shell\n\nid: job3\n_summary: 3\n",
+            mtime_ns=42 * 10**9,
+        )
+        text = LazyFileContent(self.filename)
+        self.assertIsNone(self.cache.lookup(self.filename, text, "ns"))
+
+    def test_lookup_corrupted(self):
+        self.store()
+        for name in os.listdir(self.cache._get_cache_path()):
+            with open(os.path.join(self.cache._get_cache_path(), name), "w"):
+                pass
+        text = LazyFileContent(self.filename)
+        with mock.patch("plainbox.impl.unitcache.logger"):
+            self.assertIsNone(self.cache.lookup(self.filename, text, "ns"))
+
+    def test_clear(self):
+        self.store()
+        self.cache.clear()
+        text = LazyFileContent(self.filename)
+        self.assertIsNone(self.cache.lookup(self.filename, text, "ns"))
+
+    def test_enabled(self):
+        with mock.patch.dict(os.environ, {"PLAINBOX_NO_UNIT_CACHE": "1"}):
+            self.assertFalse(self.cache.enabled)
+        with mock.patch.dict(os.environ, clear=True):
+            self.assertTrue(self.cache.enabled)
+
+
+class UnitPlugInCacheTests(TestCase):
+    def setUp(self):
+        self.scratch_dir = TemporaryDirectory()
+        self.addCleanup(self.scratch_dir.cleanup)
+        self.filename = os.path.join(self.scratch_dir.name, "jobs.pxu")
+        with open(self.filename, "wt", encoding="UTF-8") as stream:
+            stream.write("id: test/job\nplugin: shell\ncommand: true\n")
+        self.provider = mock.Mock(name="provider", spec=Provider1)
+        self.provider.classify.return_value = (
+            mock.Mock("role"),
+            mock.Mock("base"),
+            mock.Mock("plugin_cls"),
+        )
+        self.provider.namespace = "com.canonical.plainbox"
+        cache = ProviderUnitCache(os.path.join(self.scratch_dir.name, "c"))
+        patcher = mock.patch(
+            "plainbox.impl.secure.providers.v1.provider_unit_cache", cache
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def load(self):
+        plugin = UnitPlugIn(
+            self.filename, LazyFileContent(self.filename), 0, self.provider
+        )
+        return plugin.unit_list[0]
+
+    def test_cached_units(self):
+        unit = self.load()
+        with mock.patch(
+            "plainbox.impl.secure.providers.v1.load_rfc822_records"
+        ) as mock_load:
+            cached_unit = self.load()
+        mock_load.assert_not_called()
+        self.assertEqual(cached_unit.partial_id, "test/job")
+        self.assertEqual(cached_unit.origin, unit.origin)
+        self.assertEqual(cached_unit._checksum, unit.checksum)
+
+    def test_uncached_text(self):
+        # Content that doesn't come from disk is never cached
+        UnitPlugIn(
+            self.filename,
+            "id: test/other\nplugin: shell\ncommand: true\n",
+            0,
+            self.provider,
+        )
+        self.assertEqual(self.load().partial_id, "test/job")
@@ -0,0 +1,186 @@
+# This file is part of Checkbox.
+#
+# Copyright 2024 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+plainbox.impl.test_validationcache
+==================================
+
+Test definitions for plainbox.impl.validationcache module
+"""
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import mock
+import os
+
+from plainbox.impl.job import JobDefinition
+from plainbox.impl.secure.origin import FileTextSource
+from plainbox.impl.secure.origin import JobOutputTextSource
+from plainbox.impl.secure.origin import Origin
+from plainbox.impl.unit.validators import MultiUnitFieldIssue
+from plainbox.impl.unit.validators import UnitFieldIssue
+from plainbox.impl.validation import Problem
+from plainbox.impl.validation import Severity
+from plainbox.impl.validationcache import UnitValidationCache
+from plainbox.impl.validationcache import issue_from_record
+from plainbox.impl.validationcache import issue_list_to_record_list
+from plainbox.impl.validationcache import issue_to_record
+
+
+class IssueRecordTests(TestCase):
+    def setUp(self):
+        self.unit = JobDefinition({"id": "job"})
+        self.origin = Origin(FileTextSource("/jobs.pxu"), 2, 3)
+
+    def test_round_trip(self):
+        issue = UnitFieldIssue(
+            "message",
+            Severity.warning,
+            Problem.wrong,
+            self.origin,
+            self.unit,
+            "plugin",
+        )
+        other = issue_from_record(issue_to_record(issue), self.unit)
+        self.assertIsInstance(other, UnitFieldIssue)
+        self.assertEqual(other.message, "message")
+        self.assertIs(other.severity, Severity.warning)
+        self.assertIs(other.kind, Problem.wrong)
+        self.assertEqual(other.origin, self.origin)
+        self.assertIs(other.unit, self.unit)
+        self.assertEqual(other.field, "plugin")
+        self.assertEqual(str(other), str(issue))
+
+    def test_round_trip__multi_unit(self):
+        issue = MultiUnitFieldIssue(
+            "message",
+            Severity.error,
+            Problem.not_unique,
+            self.origin,
+            [self.unit, JobDefinition({"id": "job"})],
+            "id",
+        )
+        other = issue_from_record(issue_to_record(issue), self.unit)
+        self.assertIsInstance(other, MultiUnitFieldIssue)
+        self.assertEqual(other.unit_list, [self.unit])
+        self.assertEqual(str(other), str(issue))
+
+    def test_unsupported_origin(self):
+        origin = Origin(JobOutputTextSource(self.unit), 1, 1)
+        issue = UnitFieldIssue(
+            "message", Severity.error, Problem.wrong, origin, self.unit, "id"
+        )
+        self.assertIsNone(issue_to_record(issue))
+        self.assertIsNone(issue_list_to_record_list([issue]))
+        self.assertEqual(issue_list_to_record_list([]), [])
+
+
+class UnitValidationCacheTests(TestCase):
+    def setUp(self):
+        self.scratch_dir = TemporaryDirectory()
+        self.addCleanup(self.scratch_dir.cleanup)
+        self.cache_path = os.path.join(self.scratch_dir.name, "cache")
+        self.provider = mock.Mock(base_dir="/provider")
+        self.provider.name = "provider"
+        self.provider.namespace = "com.example"
+        self.unit = self.make_unit("job")
+        self.provider.unit_list = [self.unit]
+        self.context = mock.Mock(provider_list=[self.provider])
+
+    def make_unit(self, unit_id):
+        origin = Origin(FileTextSource("/provider/units/jobs.pxu"), 1, 2)
+        return JobDefinition(
+            {"id": unit_id, "plugin": "shell"},
+            origin=origin,
+            provider=self.provider,
+        )
+
+    def make_record_list(self, message):
+        issue = UnitFieldIssue(
+            message,
+            Severity.error,
+            Problem.wrong,
+            self.unit.origin,
+            self.unit,
+            "id",
+        )
+        return issue_list_to_record_list([issue])
+
+    def store(self):
+        cache = UnitValidationCache(self.cache_path)
+        cache.load(self.provider, self.context)
+        cache.store(
+            self.unit,
+            self.make_record_list("alone"),
+            self.make_record_list("in context"),
+        )
+        cache.save()
+
+    def lookup(self, unit):
+        cache = UnitValidationCache(self.cache_path)
+        cache.load(self.provider, self.context)
+        return cache.lookup(unit)
+
+    def test_lookup_missing(self):
+        self.assertEqual(self.lookup(self.unit), (None, None))
+
+    def test_lookup(self):
+        self.store()
+        issue_list, context_issue_list = self.lookup(self.unit)
+        self.assertEqual([issue.message for issue in issue_list], ["alone"])
+        self.assertEqual(
+            [issue.message for issue in context_issue_list], ["in context"]
+        )
+
+    def test_lookup__changed_unit(self):
+        self.store()
+        unit = self.make_unit("other-job")
+        self.provider.unit_list = [unit]
+        self.assertEqual(self.lookup(unit), (None, None))
+
+    def test_lookup__changed_context(self):
+        self.store()
+        # Issues found in units on their own are still valid
+        self.provider.unit_list.append(self.make_unit("other-job"))
+        issue_list, context_issue_list = self.lookup(self.unit)
+        self.assertEqual([issue.message for issue in issue_list], ["alone"])
+        self.assertIsNone(context_issue_list)
+
+    def test_lookup__other_version(self):
+        self.store()
+        with mock.patch(
+            "plainbox.impl.validationcache.get_version_string",
+            return_value="0.0",
+        ):
+            self.assertEqual(self.lookup(self.unit), (None, None))
+
+    def test_save__forgets_units_not_stored(self):
+        self.store()
+        cache = UnitValidationCache(self.cache_path)
+        cache.load(self.provider, self.context)
+        cache.save()
+        self.assertEqual(self.lookup(self.unit), (None, None))
+
+    def test_save__read_only_cache(self):
+        with open(self.cache_path, "wt") as stream:
+            stream.write("not a directory")
+        with self.assertLogs("plainbox.validationcache", "WARNING"):
+            self.store()
+
+    def test_clear(self):
+        self.store()
+        UnitValidationCache(self.cache_path).clear()
+        self.assertEqual(os.listdir(self.cache_path), [])
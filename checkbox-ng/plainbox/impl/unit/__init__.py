@@ -22,6 +22,7 @@
 """
 
 import string
+from functools import lru_cache
 
 from plainbox.impl.secure.plugins import PkgResourcesPlugInCollection
 
@@ -30,6 +31,7 @@ from jinja2 import Environment, meta
 __all__ = ["get_accessed_parameters", "all_unit"]
 
 
+@lru_cache(maxsize=None)
 def get_accessed_parameters(text, template_engine="default"):
     """
     Parse a new-style python string template and return parameter names
@@ -38,6 +40,9 @@ def get_accessed_parameters(text, template_engine="default"):
         Text string to parse
     :returns:
         A frozenset() with a list of names (or indices) of accessed parameters
+
+    The result is cached as the same template text is typically inspected
+    once per instantiated unit.
     """
     if template_engine == "jinja2":
         env = Environment()
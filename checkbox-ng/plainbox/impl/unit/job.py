@@ -32,6 +32,7 @@ from collections import defaultdict
 from plainbox.abc import IJobDefinition
 from plainbox.i18n import gettext as _, gettext_noop as N_
 from plainbox.impl.decorators import cached_property, instance_method_lru_cache
+from plainbox.impl.jobcache import CACHE_INPUT_RE
 from plainbox.impl.resource import ResourceProgram, parse_imports_stmt
 from plainbox.impl.secure.origin import Origin
 from plainbox.impl.symbol import SymbolDef
@@ -362,6 +363,27 @@ class JobDefinition(UnitWithId, IJobDefinition):
     def siblings(self):
         return self.get_record_value("siblings")
 
+    @cached_property
+    def cache_inputs(self):
+        return self.get_record_value("cache_inputs")
+
+    @cached_property
+    def cache_ttl(self):
+        """
+        number of seconds a cached result of this job can be used for.
+
+        The value may be None, which indicates that cached results don't
+        expire.
+        """
+        value = self.get_record_value("cache_ttl")
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            logger.warning(
+                _("Incorrect value of 'cache_ttl' in job %s"), self.id
+            )
+            return None
+
     @cached_property
     def shell(self):
         """
@@ -568,6 +590,19 @@ class JobDefinition(UnitWithId, IJobDefinition):
         else:
             return set()
 
+    def get_cache_input_list(self):
+        """
+        Return a list of inputs invalidating the cached results of this job
+
+        See :func:`plainbox.impl.jobcache.get_input_fingerprint`
+        """
+        if self.cache_inputs is not None:
+            return [
+                item for item in re.split(r"[\s,]+", self.cache_inputs) if item
+            ]
+        else:
+            return []
+
     def get_imported_jobs(self):
         """
         Parse the 'imports' line and compute the imported symbols.
@@ -777,6 +812,8 @@ class JobDefinition(UnitWithId, IJobDefinition):
             certification_status = "certification_status"
             siblings = "siblings"
             auto_retry = "auto_retry"
+            cache_inputs = "cache_inputs"
+            cache_ttl = "cache_ttl"
 
         field_validators = {
             fields.name: [
@@ -1075,6 +1112,38 @@ class JobDefinition(UnitWithId, IJobDefinition):
                 concrete_validators.templateInvariant,
                 MemberOfFieldValidator(_AutoRetryValues.get_all_symbols()),
             ],
+            fields.cache_inputs: [
+                concrete_validators.untranslatable,
+                CorrectFieldValueValidator(
+                    lambda value, unit: all(
+                        CACHE_INPUT_RE.match(item)
+                        for item in unit.get_cache_input_list()
+                    ),
+                    message=_(
+                        "cache inputs must be kernel-release, boot-id,"
+                        " env:NAME or absolute paths"
+                    ),
+                ),
+                UselessFieldValidator(
+                    message=_("only cachable resource jobs are cached"),
+                    onlyif=lambda unit: unit.plugin != "resource"
+                    or "cachable" not in unit.get_flag_set(),
+                ),
+            ],
+            fields.cache_ttl: [
+                concrete_validators.untranslatable,
+                concrete_validators.templateInvariant,
+                CorrectFieldValueValidator(
+                    lambda ttl: ttl is not None and ttl > 0,
+                    message=_("value must be a positive number"),
+                    onlyif=lambda unit: unit.get_record_value("cache_ttl"),
+                ),
+                UselessFieldValidator(
+                    message=_("only cachable resource jobs are cached"),
+                    onlyif=lambda unit: unit.plugin != "resource"
+                    or "cachable" not in unit.get_flag_set(),
+                ),
+            ],
         }
 
 
@@ -1142,6 +1211,8 @@ class InvalidJob(JobDefinition):
             certification_status = "certification_status"
             siblings = "siblings"
             auto_retry = "auto_retry"
+            cache_inputs = "cache_inputs"
+            cache_ttl = "cache_ttl"
 
     def __str__(self):
         return self.summary
@@ -469,38 +469,12 @@ class TemplateUnit(UnitWithId):
         else:
             unit_cls = self.get_target_unit_cls()
         assert unit_cls is not None
-        # Filter out template- data fields as they are not relevant to the
-        # target unit.
-        data = {
-            key: value
-            for key, value in self._data.items()
-            if not key.startswith("template-")
-        }
-        raw_data = {
-            key: value
-            for key, value in self._raw_data.items()
-            if not key.startswith("template-")
-        }
-        # Only keep template-engine and template-id fields
-        raw_data["template-engine"] = self.template_engine
-        data["template-engine"] = raw_data["template-engine"]
-        raw_data["template-id"] = self.template_id
-        data["template-id"] = raw_data["template-id"]
-        # Override the value of the 'unit' field from 'template-unit' field
-        data["unit"] = raw_data["unit"] = self.template_unit
+        data, raw_data, accessed_parameters = self._get_instance_fields()
+        data = dict(data)
+        raw_data = dict(raw_data)
         # XXX: extract raw dictionary from the resource object, there is no
         # normal API for that due to the way resource objects work.
         parameters = dict(object.__getattribute__(resource, "_data"))
-        accessed_parameters = set(
-            itertools.chain(
-                *{
-                    get_accessed_parameters(
-                        value, template_engine=self.template_engine
-                    )
-                    for value in data.values()
-                }
-            )
-        )
         # Recreate the parameters with only the subset that will actually be
         # used by the template. Doing this filter can prevent exceptions like
         # DependencyDuplicateError where an unused resource property can differ
@@ -529,6 +503,53 @@ class TemplateUnit(UnitWithId):
             self.field_offset_map,
         )
 
+    @instance_method_lru_cache(maxsize=None)
+    def _get_instance_fields(self):
+        """
+        Compute the fields shared by all the units instantiated from this
+        template.
+
+        :returns:
+            A tuple (data, raw_data, accessed_parameters) where data and
+            raw_data are the (normalized and raw) fields of the target unit and
+            accessed_parameters is a frozenset with the names of all the
+            resource attributes accessed by the data fields.
+
+        The result is computed once per template as it does not depend on the
+        resource object. Callers must copy the dictionaries before altering
+        them.
+        """
+        # Filter out template- data fields as they are not relevant to the
+        # target unit.
+        data = {
+            key: value
+            for key, value in self._data.items()
+            if not key.startswith("template-")
+        }
+        raw_data = {
+            key: value
+            for key, value in self._raw_data.items()
+            if not key.startswith("template-")
+        }
+        # Only keep template-engine and template-id fields
+        raw_data["template-engine"] = self.template_engine
+        data["template-engine"] = raw_data["template-engine"]
+        raw_data["template-id"] = self.template_id
+        data["template-id"] = raw_data["template-id"]
+        # Override the value of the 'unit' field from 'template-unit' field
+        data["unit"] = raw_data["unit"] = self.template_unit
+        accessed_parameters = frozenset(
+            itertools.chain(
+                *{
+                    get_accessed_parameters(
+                        value, template_engine=self.template_engine
+                    )
+                    for value in data.values()
+                }
+            )
+        )
+        return data, raw_data, accessed_parameters
+
     def should_instantiate(self, resource):
         """
         Check if a job should be instantiated for a specific resource.
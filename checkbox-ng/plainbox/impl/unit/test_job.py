@@ -173,6 +173,19 @@ class TestJobDefinitionDefinition(TestCase):
         job3 = JobDefinition({"flags": "a,b,c"})
         self.assertEqual(job3.get_flag_set(), set(["a", "b", "c"]))
 
+    def test_get_cache_input_list(self):
+        job1 = JobDefinition({})
+        self.assertEqual(job1.get_cache_input_list(), [])
+        job2 = JobDefinition({"cache_inputs": "boot-id\n/var/lib/a, env:X"})
+        self.assertEqual(
+            job2.get_cache_input_list(), ["boot-id", "/var/lib/a", "env:X"]
+        )
+
+    def test_cache_ttl(self):
+        self.assertEqual(JobDefinition({}).cache_ttl, None)
+        self.assertEqual(JobDefinition({"cache_ttl": "foo"}).cache_ttl, None)
+        self.assertEqual(JobDefinition({"cache_ttl": "3600"}).cache_ttl, 3600)
+
 
 class JobDefinitionParsingTests(TestCaseWithParameters):
 
@@ -617,6 +630,62 @@ class JobDefinitionFieldValidationTests(UnitWithIdFieldValidationTests):
             message,
         )
 
+    def test_cache_inputs__known(self):
+        issue_list = self.unit_cls(
+            {
+                "plugin": "resource",
+                "flags": "cachable",
+                "cache_inputs": "kernel-release relative/path",
+            },
+            provider=self.provider,
+        ).check()
+        message = (
+            "field 'cache_inputs', cache inputs must be kernel-release,"
+            " boot-id, env:NAME or absolute paths"
+        )
+        self.assertIssueFound(
+            issue_list,
+            self.unit_cls.Meta.fields.cache_inputs,
+            Problem.wrong,
+            Severity.error,
+            message,
+        )
+
+    def test_cache_inputs__useless(self):
+        issue_list = self.unit_cls(
+            {"plugin": "resource", "cache_inputs": "boot-id"},
+            provider=self.provider,
+        ).check()
+        message = (
+            "field 'cache_inputs', only cachable resource jobs are cached"
+        )
+        self.assertIssueFound(
+            issue_list,
+            self.unit_cls.Meta.fields.cache_inputs,
+            Problem.useless,
+            Severity.warning,
+            message,
+        )
+
+    def test_cache_ttl__positive(self):
+        for value in ("0", "soon"):
+            issue_list = self.unit_cls(
+                {
+                    "plugin": "resource",
+                    "flags": "cachable",
+                    "cache_ttl": value,
+                },
+                provider=self.provider,
+            ).check()
+            message = "field 'cache_ttl', value must be a positive number"
+            self.assertIssueFound(
+                issue_list,
+                self.unit_cls.Meta.fields.cache_ttl,
+                Problem.wrong,
+                Severity.error,
+                message,
+            )
+
     def test_depends__untranslatable(self):
         issue_list = self.unit_cls(
             {"_depends": "depends"}, provider=self.provider
@@ -626,6 +626,54 @@ class TemplateUnitTests(TestCase):
         self.assertEqual(len(unit_list), 1)
         self.assertEqual(unit_list[0].partial_id, "check-device-sda1")
 
+    def test_instantiate_all__fields_are_parsed_once(self):
+        template = TemplateUnit(
+            {
+                "template-resource": "resource",
+                "id": "check-device-{dev_name}",
+                "summary": "Test {name}",
+                "plugin": "shell",
+            }
+        )
+        with mock.patch(
+            "plainbox.impl.unit.template.get_accessed_parameters",
+            return_value=frozenset(["dev_name", "name"]),
+        ) as mock_get:
+            unit_list = template.instantiate_all(
+                [
+                    Resource({"dev_name": "sda1", "name": "a", "x": "1"}),
+                    Resource({"dev_name": "sda2", "name": "b", "x": "2"}),
+                ]
+            )
+        # One call per field of the target unit, regardless of the number of
+        # resource records.
+        self.assertEqual(mock_get.call_count, 6)
+        self.assertEqual(
+            [unit.partial_id for unit in unit_list],
+            ["check-device-sda1", "check-device-sda2"],
+        )
+        self.assertEqual(
+            unit_list[0].parameters,
+            {"dev_name": "sda1", "name": "a", "__index__": 1},
+        )
+
+    def test_instantiate_one__does_not_alter_shared_fields(self):
+        template = TemplateUnit(
+            {
+                "template-resource": "resource",
+                "id": "check-device-{dev_name}",
+                "plugin": "shell",
+            }
+        )
+        template.instantiate_one(Resource({"dev_name": "sda1"}))
+        data, raw_data, accessed = template._get_instance_fields()
+        job = template.instantiate_one(Resource({"dev_name": "sda2"}))
+        self.assertIsNot(job._data, data)
+        self.assertEqual(accessed, frozenset(["dev_name"]))
+        self.assertEqual(
+            template._get_instance_fields(), (data, raw_data, accessed)
+        )
+
 
 class TemplateUnitJinja2Tests(TestCase):
 
@@ -25,8 +25,11 @@ Test definitions for plainbox.impl.unit (package init file)
 
 from unittest import TestCase
 
+from jinja2 import Template
+
 from plainbox.abc import IProvider1
 from plainbox.impl.unit.unit import Unit
+from plainbox.impl.unit.unit import _compile_jinja2_template
 from plainbox.impl.unit.unit import MissingParam
 from plainbox.impl.validation import Problem
 from plainbox.impl.validation import Severity
@@ -182,6 +185,18 @@ class TestUnitDefinition(TestCase):
             unit6.get_raw_record_value("key", "default"), "default"
         )
 
+    def test_get_record_value__jinja2_templates_are_cached(self):
+        data = {"template-engine": "jinja2", "key": "{{ param }}"}
+        unit1 = Unit(data, parameters={"param": "value1"})
+        unit2 = Unit(data, parameters={"param": "value2"})
+        with mock.patch(
+            "plainbox.impl.unit.unit.Template", wraps=Template
+        ) as mock_template:
+            _compile_jinja2_template.cache_clear()
+            self.assertEqual(unit1.get_record_value("key"), "value1")
+            self.assertEqual(unit2.get_record_value("key"), "value2")
+        mock_template.assert_called_once_with("{{ param }}")
+
     def test_get_record_value(self):
         """
         Ensure that get_record_value() works okay
@@ -76,6 +76,9 @@ class NoBaseIncludeValidator(FieldValidatorBase):
             yield issue
 
     def _check_test_plan_in_context(self, parent, unit, field, context):
+        # Nothing to compare the include field patterns to
+        if getattr(unit, str(field)) is None:
+            return
         included_job_id = []
         id_map = context.compute_shared(
             "field_value_map[id]", compute_value_map, context, "id"
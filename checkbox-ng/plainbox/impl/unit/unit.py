@@ -72,6 +72,17 @@ def on_ubuntucore():
     return False
 
 
+@lru_cache(maxsize=None)
+def _compile_jinja2_template(text):
+    """
+    Compile (and cache) a Jinja2 template out of the given text
+
+    Instantiated units share the text of the fields of their template so the
+    text is parsed once and each unit only pays for rendering it.
+    """
+    return Template(text)
+
+
 class MissingParam(Exception):
     """
     Indicaiton of a missing parameter required for template instantiation.
@@ -711,7 +722,7 @@ class Unit(metaclass=UnitType):
                 tmp_params.update({"__checkbox_env__": self._checkbox_env()})
                 tmp_params.update({"__system_env__": os.environ})
                 tmp_params.update({"__on_ubuntucore__": on_ubuntucore()})
-                value = Template(value).render(tmp_params)
+                value = _compile_jinja2_template(value).render(tmp_params)
             else:
                 try:
                     value = string.Formatter().vformat(
@@ -732,7 +743,7 @@ class Unit(metaclass=UnitType):
                 "__system_env__": os.environ,
                 "__on_ubuntucore__": on_ubuntucore(),
             }
-            value = Template(value).render(tmp_params)
+            value = _compile_jinja2_template(value).render(tmp_params)
         return value
 
     @instance_method_lru_cache(maxsize=None)
@@ -761,7 +772,7 @@ class Unit(metaclass=UnitType):
                 tmp_params.update({"__checkbox_env__": self._checkbox_env()})
                 tmp_params.update({"__system_env__": os.environ})
                 tmp_params.update({"__on_ubuntucore__": on_ubuntucore()})
-                value = Template(value).render(tmp_params)
+                value = _compile_jinja2_template(value).render(tmp_params)
             else:
                 value = string.Formatter().vformat(value, (), self.parameters)
         elif (
@@ -775,7 +786,7 @@ class Unit(metaclass=UnitType):
                 "__system_env__": os.environ,
                 "__on_ubuntucore__": on_ubuntucore(),
             }
-            value = Template(value).render(tmp_params)
+            value = _compile_jinja2_template(value).render(tmp_params)
         return value
 
     @instance_method_lru_cache(maxsize=None)
@@ -822,7 +833,9 @@ class Unit(metaclass=UnitType):
                     )
                     tmp_params.update({"__system_env__": os.environ})
                     tmp_params.update({"__on_ubuntucore__": on_ubuntucore()})
-                    msgstr = Template(msgstr).render(tmp_params)
+                    msgstr = _compile_jinja2_template(msgstr).render(
+                        tmp_params
+                    )
                 else:
                     msgstr = string.Formatter().vformat(
                         msgstr, (), self.parameters
@@ -833,7 +846,7 @@ class Unit(metaclass=UnitType):
                     "__system_env__": os.environ,
                     "__on_ubuntucore__": on_ubuntucore(),
                 }
-                msgstr = Template(msgstr).render(tmp_params)
+                msgstr = _compile_jinja2_template(msgstr).render(tmp_params)
             return msgstr
         # If there was no marked-for-translation value then let's just return
         # the normal (untranslatable) version.
@@ -849,7 +862,9 @@ class Unit(metaclass=UnitType):
                     )
                     tmp_params.update({"__system_env__": os.environ})
                     tmp_params.update({"__on_ubuntucore__": on_ubuntucore()})
-                    msgstr = Template(msgstr).render(tmp_params)
+                    msgstr = _compile_jinja2_template(msgstr).render(
+                        tmp_params
+                    )
                 else:
                     msgstr = string.Formatter().vformat(
                         msgstr, (), self.parameters
@@ -860,7 +875,7 @@ class Unit(metaclass=UnitType):
                     "__system_env__": os.environ,
                     "__on_ubuntucore__": on_ubuntucore(),
                 }
-                msgstr = Template(msgstr).render(tmp_params)
+                msgstr = _compile_jinja2_template(msgstr).render(tmp_params)
             return msgstr
         # If we have nothing better let's just return the default value
         return default
@@ -0,0 +1,212 @@
+# This file is part of Checkbox.
+#
+# Copyright 2024 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+"""
+:mod:`plainbox.impl.unitcache` -- cache of parsed unit files
+============================================================
+
+This module should reduce the time needed to load providers by reusing the
+RFC822 records parsed from each unit file the last time it was loaded.
+
+Each unit file has a cache entry (a small JSON document) that holds the
+records parsed from that file, along with the checksum of each unit. An
+entry is used only if the path, size and modification time of the file
+still match, or, if only the modification time changed, if the SHA256 hash
+of the content still matches.
+
+The cache can be disabled by setting the ``PLAINBOX_NO_UNIT_CACHE``
+environment variable.
+"""
+
+import hashlib
+import logging
+import os
+
+from plainbox import get_version_string
+from plainbox.i18n import gettext as _
+from plainbox.impl.cacheutils import get_cache_path
+from plainbox.impl.cacheutils import load_json_entry
+from plainbox.impl.cacheutils import store_json_entry
+from plainbox.impl.secure.origin import Origin
+from plainbox.impl.secure.rfc822 import FileTextSource
+from plainbox.impl.secure.rfc822 import RFC822Record
+
+logger = logging.getLogger("plainbox.unitcache")
+
+#: Version of the format of cache entries, bump it when it changes
+CACHE_FORMAT = 1
+
+
+class UnitFileCacheEntry:
+    """
+    Records (and unit checksums) parsed from one unit file.
+
+    :attr record_list:
+        List of :class:`RFC822Record` objects, as returned by
+        :func:`plainbox.impl.secure.rfc822.load_rfc822_records`
+    :attr checksum_list:
+        List of unit checksums, one for each record. Items may be None if the
+        checksum is not known.
+    """
+
+    def __init__(self, record_list, checksum_list):
+        self.record_list = record_list
+        self.checksum_list = checksum_list
+
+
+class ProviderUnitCache:
+    """
+    Cache storing the records parsed from unit files of providers
+    """
+
+    def __init__(self, cache_path=None):
+        self._cache_path = cache_path
+
+    @property
+    def enabled(self):
+        return not os.environ.get("PLAINBOX_NO_UNIT_CACHE")
+
+    def lookup(self, filename, text, namespace):
+        """
+        Get the cached records of a unit file.
+
+        :param filename:
+            Name of the unit file
+        :param text:
+            Text of the unit file, it is only used (and read) if the
+            modification time of the file changed since it was cached
+        :param namespace:
+            Namespace of the provider the file belongs to. Checksums of units
+            depend on it.
+        :returns:
+            A :class:`UnitFileCacheEntry` or None if there is no valid entry
+            for this file.
+        """
+        key = self._get_key(filename, namespace)
+        if key is None:
+            return None
+        data = self._try_load_entry(self._get_entry_path(filename))
+        if data is None or not all(
+            data.get(field) == value
+            for field, value in key.items()
+            if field != "mtime_ns"
+        ):
+            logger.debug(_("%s not found in unit cache"), filename)
+            return None
+        if data["mtime_ns"] != key["mtime_ns"]:
+            # The file was touched, see if the content changed
+            if data["sha256"] != self._get_digest(text):
+                logger.debug(_("%s changed since it was cached"), filename)
+                return None
+            data["mtime_ns"] = key["mtime_ns"]
+            self._store_entry(self._get_entry_path(filename), data)
+        logger.debug(_("%s found in unit cache"), filename)
+        source = FileTextSource(filename)
+        record_list = [
+            RFC822Record(
+                record["data"],
+                Origin(source, record["line_start"], record["line_end"]),
+                record["raw_data"],
+                record["field_offset_map"],
+            )
+            for record in data["records"]
+        ]
+        checksum_list = [record["checksum"] for record in data["records"]]
+        return UnitFileCacheEntry(record_list, checksum_list)
+
+    def store(self, filename, text, namespace, entry):
+        """
+        Store the records parsed from a unit file.
+
+        :param filename:
+            Name of the unit file
+        :param text:
+            Text of the unit file
+        :param namespace:
+            Namespace of the provider the file belongs to
+        :param entry:
+            A :class:`UnitFileCacheEntry`
+        """
+        data = self._get_key(filename, namespace)
+        if data is None:
+            return
+        data["sha256"] = self._get_digest(text)
+        data["records"] = [
+            {
+                "data": record.data,
+                "raw_data": record.raw_data,
+                "field_offset_map": record.field_offset_map,
+                "line_start": record.origin.line_start,
+                "line_end": record.origin.line_end,
+                "checksum": checksum,
+            }
+            for record, checksum in zip(entry.record_list, entry.checksum_list)
+        ]
+        self._store_entry(self._get_entry_path(filename), data)
+
+    def clear(self):
+        logger.debug("Clearing unit cache")
+        try:
+            entry_list = os.listdir(self._get_cache_path())
+        except OSError:
+            return
+        for name in entry_list:
+            try:
+                os.remove(os.path.join(self._get_cache_path(), name))
+            except OSError as exc:
+                logger.warning(_("Failed to clear the unit cache. %s"), exc)
+
+    @staticmethod
+    def _get_key(filename, namespace):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        return {
+            "format": CACHE_FORMAT,
+            "version": get_version_string(),
+            "path": filename,
+            "namespace": namespace,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    @staticmethod
+    def _get_digest(text):
+        return hashlib.sha256(str(text).encode("UTF-8")).hexdigest()
+
+    def _try_load_entry(self, entry_path):
+        try:
+            return load_json_entry(entry_path)
+        except Exception as exc:
+            logger.warning(_("Error loading unit cache entry. %s"), exc)
+            return None
+
+    def _store_entry(self, entry_path, data):
+        try:
+            store_json_entry(entry_path, data)
+        except (OSError, TypeError, ValueError) as exc:
+            logger.warning(_("Failed to store unit cache entry. %s"), exc)
+
+    def _get_entry_path(self, filename):
+        name = hashlib.sha256(filename.encode("UTF-8")).hexdigest()
+        return os.path.join(self._get_cache_path(), name + ".json")
+
+    def _get_cache_path(self):
+        return self._cache_path or get_cache_path("unit_cache")
+
+
+#: Unit cache used when loading providers
+provider_unit_cache = ProviderUnitCache()
@@ -0,0 +1,332 @@
+# This file is part of Checkbox.
+#
+# Copyright 2024 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+"""
+:mod:`plainbox.impl.validationcache` -- cache of unit validation results
+========================================================================
+
+This module should reduce the time needed to validate a provider again by
+reusing the issues found in each unit the last time it was validated.
+
+Units are checked in two steps: on their own and in the context of all the
+units of all the providers. The issues found in the first step are cached
+for each unit, keyed by the checksum and origin of the unit and by the list
+of files of its provider (some fields refer to files). The issues found in
+the second step depend on other units, they are cached for each unit as well
+but they are only used if no unit of the context changed.
+
+Each validated provider has a cache entry (a JSON document). Entries are only
+used with the version of plainbox, the locale and the working directory they
+were created with, as those change the issues or their messages.
+"""
+
+import hashlib
+import locale
+import logging
+import os
+
+from plainbox import get_version_string
+from plainbox.i18n import gettext as _
+from plainbox.impl.cacheutils import get_cache_path
+from plainbox.impl.cacheutils import load_json_entry
+from plainbox.impl.cacheutils import store_json_entry
+from plainbox.impl.secure.origin import FileTextSource
+from plainbox.impl.secure.origin import Origin
+from plainbox.impl.secure.origin import UnknownTextSource
+from plainbox.impl.symbol import Symbol
+from plainbox.impl.unit.validators import MultiUnitFieldIssue
+from plainbox.impl.unit.validators import UnitFieldIssue
+from plainbox.impl.validation import Issue
+
+logger = logging.getLogger("plainbox.validationcache")
+
+#: Version of the format of cache entries, bump it when it changes or when
+#: validators report different issues
+CACHE_FORMAT = 1
+
+
+def issue_to_record(issue):
+    """
+    Convert an issue to a JSON-friendly record.
+
+    :param issue:
+        A :class:`plainbox.impl.validation.Issue` found in a unit
+    :returns:
+        A dictionary or None if the issue cannot be converted (its origin is
+        not a file)
+    """
+    record = {
+        "message": issue.message,
+        "severity": str(issue.severity),
+        "kind": str(issue.kind),
+        "field": None,
+        "multi": False,
+        "origin": None,
+    }
+    if isinstance(issue, UnitFieldIssue):
+        record["field"] = str(issue.field)
+    elif isinstance(issue, MultiUnitFieldIssue):
+        record["field"] = str(issue.field)
+        record["multi"] = True
+    origin = issue.origin
+    if origin is not None:
+        if isinstance(origin.source, FileTextSource):
+            filename = origin.source.filename
+        elif isinstance(origin.source, UnknownTextSource):
+            filename = None
+        else:
+            return None
+        record["origin"] = [filename, origin.line_start, origin.line_end]
+    return record
+
+
+def issue_from_record(record, unit):
+    """
+    Convert a record made by :func:`issue_to_record()` back to an issue.
+
+    :param record:
+        A dictionary describing the issue
+    :param unit:
+        The unit the issue was found in. Issues involving several units only
+        refer to this one.
+    :returns:
+        A :class:`plainbox.impl.validation.Issue`
+    """
+    origin = None
+    if record["origin"] is not None:
+        filename, line_start, line_end = record["origin"]
+        if filename is None:
+            source = UnknownTextSource()
+        else:
+            source = FileTextSource(filename)
+        origin = Origin(source, line_start, line_end)
+    severity = Symbol(record["severity"])
+    kind = Symbol(record["kind"])
+    if record["field"] is None:
+        return Issue(record["message"], severity, kind, origin)
+    elif record["multi"]:
+        return MultiUnitFieldIssue(
+            record["message"], severity, kind, origin, [unit], record["field"]
+        )
+    else:
+        return UnitFieldIssue(
+            record["message"], severity, kind, origin, unit, record["field"]
+        )
+
+
+def issue_list_to_record_list(issue_list):
+    """
+    Convert a list of issues to records, or to None if any cannot be.
+    """
+    record_list = [issue_to_record(issue) for issue in issue_list]
+    if any(record is None for record in record_list):
+        return None
+    return record_list
+
+
+class UnitValidationCache:
+    """
+    Cache storing the issues found in the units of a provider
+
+    :attr hits:
+        Number of units whose issues were all found in the cache
+    :attr misses:
+        Number of units that had to be checked, at least in part
+    """
+
+    def __init__(self, cache_path=None):
+        self._cache_path = cache_path
+        self._provider = None
+        self._context = None
+        self._context_digest = None
+        self._files_digest_map = {}
+        self._old_data = None
+        self._new_data = None
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, provider, context):
+        """
+        Load the cached issues of the units of a provider.
+
+        :param provider:
+            The provider being validated
+        :param context:
+            The :class:`UnitValidationContext` used to validate its units
+        """
+        self._provider = provider
+        self._context = context
+        self._context_digest = None
+        self._files_digest_map = {}
+        header = {
+            "format": CACHE_FORMAT,
+            "version": get_version_string(),
+            "locale": locale.setlocale(locale.LC_MESSAGES),
+            "cwd": os.getcwd(),
+            "context": self._get_context_digest(),
+        }
+        data = self._try_load_entry(self._get_entry_path())
+        if data is None or not all(
+            data.get(field) == value
+            for field, value in header.items()
+            if field != "context"
+        ):
+            logger.debug(_("%s not found in validation cache"), provider.name)
+            data = {"units": {}, "context_units": {}}
+        elif data["context"] != header["context"]:
+            logger.debug(
+                _("Context of %s changed since it was cached"), provider.name
+            )
+            data["context_units"] = {}
+        self._old_data = data
+        self._new_data = dict(header, units={}, context_units={})
+
+    def lookup(self, unit):
+        """
+        Get the cached issues of a unit.
+
+        :param unit:
+            A unit of the validated provider
+        :returns:
+            A pair (issue list, context issue list) with the issues found
+            in the unit alone and in the context, each of them is None if
+            the issues are not known.
+        """
+        plain_record_list = self._old_data["units"].get(
+            self._get_unit_key(unit)
+        )
+        context_record_list = self._old_data["context_units"].get(
+            self._get_unit_key(unit, in_context=True)
+        )
+        if plain_record_list is not None and context_record_list is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return (
+            self._get_issue_list(plain_record_list, unit),
+            self._get_issue_list(context_record_list, unit),
+        )
+
+    def store(self, unit, plain_record_list, context_record_list):
+        """
+        Store the issues of a unit.
+
+        :param unit:
+            A unit of the validated provider
+        :param plain_record_list:
+            Records (see :func:`issue_to_record()`) of the issues found in
+            the unit alone, or None if they cannot be cached
+        :param context_record_list:
+            Records of the issues found in the unit in the context, or None
+        """
+        if plain_record_list is not None:
+            self._new_data["units"][
+                self._get_unit_key(unit)
+            ] = plain_record_list
+        if context_record_list is not None:
+            self._new_data["context_units"][
+                self._get_unit_key(unit, in_context=True)
+            ] = context_record_list
+
+    def save(self):
+        """
+        Save the issues stored since the cache was loaded.
+
+        Issues of units that were not stored are forgotten.
+        """
+        if self._new_data is not None:
+            self._store_entry(self._get_entry_path(), self._new_data)
+
+    def clear(self):
+        logger.debug("Clearing validation cache")
+        try:
+            entry_list = os.listdir(self._get_cache_path())
+        except OSError:
+            return
+        for name in entry_list:
+            try:
+                os.remove(os.path.join(self._get_cache_path(), name))
+            except OSError as exc:
+                logger.warning(
+                    _("Failed to clear the validation cache. %s"), exc
+                )
+
+    @staticmethod
+    def _get_issue_list(record_list, unit):
+        if record_list is None:
+            return None
+        return [issue_from_record(record, unit) for record in record_list]
+
+    def _get_unit_key(self, unit, in_context=False):
+        if in_context:
+            # The digest of the context covers the files of all providers
+            return "{}:{}".format(unit.checksum, unit.origin)
+        return "{}:{}:{}".format(
+            unit.checksum, unit.origin, self._get_files_digest(unit.provider)
+        )
+
+    def _get_files_digest(self, provider):
+        # Providers have a file unit for each of their files
+        key = id(provider)
+        if key not in self._files_digest_map:
+            digest = hashlib.sha256()
+            if provider is not None:
+                for unit in provider.unit_list:
+                    if unit.Meta.name == "file":
+                        digest.update(unit.checksum.encode("UTF-8"))
+            self._files_digest_map[key] = digest.hexdigest()
+        return self._files_digest_map[key]
+
+    def _get_context_digest(self):
+        if self._context_digest is None:
+            digest = hashlib.sha256()
+            for provider in self._context.provider_list:
+                digest.update(provider.name.encode("UTF-8"))
+                for unit in provider.unit_list:
+                    digest.update(
+                        "{}:{}\n".format(unit.checksum, unit.origin).encode(
+                            "UTF-8"
+                        )
+                    )
+            self._context_digest = digest.hexdigest()
+        return self._context_digest
+
+    def _try_load_entry(self, entry_path):
+        try:
+            return load_json_entry(entry_path)
+        except Exception as exc:
+            logger.warning(_("Error loading validation cache entry. %s"), exc)
+            return None
+
+    def _store_entry(self, entry_path, data):
+        try:
+            store_json_entry(entry_path, data)
+        except (OSError, TypeError, ValueError) as exc:
+            logger.warning(
+                _("Failed to store validation cache entry. %s"), exc
+            )
+
+    def _get_entry_path(self):
+        name = hashlib.sha256(
+            str(self._provider.base_dir).encode("UTF-8")
+        ).hexdigest()
+        return os.path.join(self._get_cache_path(), name + ".json")
+
+    def _get_cache_path(self):
+        return self._cache_path or get_cache_path("validation_cache")
+
+
+#: Validation cache used by ``manage.py validate``
+unit_validation_cache = UnitValidationCache()
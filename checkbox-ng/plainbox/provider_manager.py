@@ -32,6 +32,7 @@ import argparse
 import inspect
 import itertools
 import logging
+import multiprocessing
 import os
 import re
 import shutil
@@ -69,10 +70,14 @@ from plainbox.impl.unit.packaging_metadata import PackagingDriverError
 from plainbox.impl.unit.packaging_metadata import get_packaging_driver
 from plainbox.impl.unit.unit_with_id import UnitWithId
 from plainbox.impl.unit.validators import UnitValidationContext
+from plainbox.impl.unit.validators import compute_value_map
 from plainbox.impl.validation import Issue
 from plainbox.impl.validation import Problem
 from plainbox.impl.validation import Severity
 from plainbox.impl.validation import ValidationError as UnitValidationError
+from plainbox.impl.validationcache import issue_from_record
+from plainbox.impl.validationcache import issue_list_to_record_list
+from plainbox.impl.validationcache import unit_validation_cache
 
 
 __all__ = ["setup", "manage_py_extension"]
@@ -1131,6 +1136,19 @@ class ValidateCommand(ManageCommand):
             action="store_false",
             help=_("Support deprecated syntax and features"),
         )
+        group.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=1,
+            metavar=_("N"),
+            help=_("Check units in N processes (0: one per CPU)"),
+        )
+        group.add_argument(
+            "--no-cache",
+            action="store_true",
+            help=_("Check all units, even if they did not change"),
+        )
         group.add_argument(
             "-N",
             "--new-validation-core",
@@ -1257,7 +1275,13 @@ class ValidateCommand(ManageCommand):
         unit_list, exc_list = self.collect_all_units(provider)
         early_issue_gen = self.get_early_issues(exc_list)
         context = UnitValidationContext(provider_list)
-        issue_gen = self.validate_units_in_context(context, unit_list)
+        cache = None
+        if not ns.no_cache:
+            cache = unit_validation_cache
+            cache.load(provider, context)
+        issue_gen = self.validate_units_in_context(
+            context, unit_list, cache=cache, jobs=ns.jobs
+        )
         del context
         failed = False
         hidden = 0
@@ -1311,11 +1335,117 @@ class ValidateCommand(ManageCommand):
                 _("NOTE: subsequent units from problematic files are ignored")
             )
 
-    def validate_units_in_context(self, context, unit_list):
-        for unit in unit_list:
-            _logger.info(_("Validating unit %s"), unit)
-            for issue in unit.check(context=context, live=True):
-                yield issue
+    def validate_units_in_context(
+        self, context, unit_list, cache=None, jobs=1
+    ):
+        """
+        Check units and yield the issues found in each of them, in order.
+
+        :param context:
+            The :class:`UnitValidationContext` to check units in
+        :param unit_list:
+            List of units to check
+        :param cache:
+            (optional) A :class:`UnitValidationCache` with the issues found
+            the last time units were checked. Only units that changed since
+            then (or whose context changed) are checked again.
+        :param jobs:
+            Number of processes checking units, 0 for one per CPU
+        """
+        # Maps the index of each unit to a pair (issue list, context issue
+        # list), either of them is None if the unit has to be checked
+        result_map = {}
+        if cache is not None:
+            for index, unit in enumerate(unit_list):
+                result_map[index] = cache.lookup(unit)
+            _logger.info(
+                _("Found %d units in the validation cache"), cache.hits
+            )
+        if jobs == 0:
+            jobs = os.cpu_count() or 1
+        index_list = [
+            index
+            for index in range(len(unit_list))
+            if None in result_map.get(index, (None, None))
+        ]
+        if jobs > 1 and len(index_list) > 1:
+            result_map.update(
+                self._check_units_in_pool(context, unit_list, index_list, jobs)
+            )
+        for index, unit in enumerate(unit_list):
+            issue_list, context_issue_list = result_map.get(
+                index, (None, None)
+            )
+            if issue_list is None or context_issue_list is None:
+                _logger.info(_("Validating unit %s"), unit)
+            if issue_list is None:
+                issue_list = []
+                for issue in unit.check(live=True):
+                    issue_list.append(issue)
+                    yield issue
+            else:
+                yield from issue_list
+            if context_issue_list is None:
+                context_issue_list = []
+                validator = unit.Meta.validator_cls()
+                for issue in validator.check_in_context(unit, context):
+                    context_issue_list.append(issue)
+                    yield issue
+            else:
+                yield from context_issue_list
+            if cache is not None:
+                cache.store(
+                    unit,
+                    issue_list_to_record_list(issue_list),
+                    issue_list_to_record_list(context_issue_list),
+                )
+        if cache is not None:
+            cache.save()
+
+    def _check_units_in_pool(self, context, unit_list, index_list, jobs):
+        global _pool_state
+        try:
+            mp_context = multiprocessing.get_context("fork")
+        except ValueError:
+            # Units and their context are not sent to processes, they are
+            # inherited by forking them
+            return {}
+        # Compute the map shared by most validators once, before forking
+        context.compute_shared(
+            "field_value_map[id]", compute_value_map, context, "id"
+        )
+        # Spread units over more shards than processes, as some units (test
+        # plans) take much longer to check than others
+        shard_count = jobs * 4
+        shard_list = [
+            index_list[start::shard_count] for start in range(shard_count)
+        ]
+        result_map = {}
+        _pool_state = context, unit_list
+        try:
+            with mp_context.Pool(jobs) as pool:
+                for result_list in pool.imap_unordered(
+                    _check_units, shard_list
+                ):
+                    for index, record_list, context_record_list in result_list:
+                        # Issues that could not be sent back (their origin
+                        # is not a file) are found again by this process
+                        if record_list is None or context_record_list is None:
+                            continue
+                        unit = unit_list[index]
+                        result_map[index] = (
+                            [
+                                issue_from_record(record, unit)
+                                for record in record_list
+                            ],
+                            [
+                                issue_from_record(record, unit)
+                                for record in context_record_list
+                            ],
+                        )
+        finally:
+            _pool_state = None
+        return result_map
 
     def get_provider(self):
         """
@@ -1330,6 +1460,39 @@ class ValidateCommand(ManageCommand):
         )
 
 
+# Context and list of units checked by processes of the pool used by
+# ValidateCommand, inherited when the processes are forked
+_pool_state = None
+
+
+def _check_units(index_list):
+    """
+    Check units in a process of the pool used by ValidateCommand.
+
+    :param index_list:
+        List of indices of the units to check
+    :returns:
+        A list of triplets (index, record list, context record list) with the
+        records (see :func:`issue_to_record()`) of the issues found in the
+        unit alone and in the context.
+    """
+    context, unit_list = _pool_state
+    result_list = []
+    for index in index_list:
+        unit = unit_list[index]
+        validator = unit.Meta.validator_cls()
+        result_list.append(
+            (
+                index,
+                issue_list_to_record_list(unit.check()),
+                issue_list_to_record_list(
+                    validator.check_in_context(unit, context)
+                ),
+            )
+        )
+    return result_list
+
+
 def exc2issue(exc):
     """
     Convert an arbitrary exception to an Issue
@@ -32,6 +32,7 @@ import tempfile
 import textwrap
 
 from plainbox.impl.secure.providers.v1 import Provider1Definition
+from plainbox.impl.unit.unit import Unit
 from plainbox.provider_manager import InstallCommand
 from plainbox.provider_manager import ManageCommand
 from plainbox.provider_manager import ProviderManagerTool
@@ -507,6 +508,76 @@ class ProviderManagerToolTests(TestCase):
             ),
         )
 
+    def test_validate__cached(self):
+        """
+        verify that ``validate -N`` finds issues of units that changed since
+        the last validation and the issues of units that did not
+        """
+        expected_output = inline_output(
+            """
+            error: jobs/broken.pxu:1-3: job 'broken', field 'command', command is mandatory for non-manual jobs
+            warning: jobs/broken.pxu:3: job 'broken', field 'description', field should be marked as translatable
+            Validation of provider com.example:test has failed
+            """
+        )
+        filename = os.path.join(self.tmpdir, "jobs", "broken.pxu")
+        with open(filename, "wt", encoding="UTF-8") as stream:
+            print("id: broken", file=stream)
+            print("plugin: shell", file=stream)
+        with TestIO():
+            self.tool.main(["validate", "-N"])
+        with open(filename, "at", encoding="UTF-8") as stream:
+            print("description: broken job definition", file=stream)
+        with mock.patch.object(
+            Unit, "check", autospec=True, side_effect=Unit.check
+        ) as mock_check:
+            with TestIO() as test_io:
+                self.tool.main(["validate", "-N"])
+        self.assertEqual(test_io.stdout, expected_output)
+        # Only the changed unit is checked on its own again (providers check
+        # units in a context when they are loaded, those calls are left out)
+        self.assertEqual(
+            [
+                args[0].id
+                for args, kwargs in mock_check.call_args_list
+                if "context" not in kwargs
+            ],
+            ["com.example::broken"],
+        )
+        # Nothing changed, all the issues come from the cache
+        with mock.patch.object(
+            Unit, "check", autospec=True, side_effect=Unit.check
+        ) as mock_check:
+            with TestIO() as test_io:
+                self.tool.main(["validate", "-N"])
+        self.assertEqual(test_io.stdout, expected_output)
+        self.assertFalse(
+            any(
+                "context" not in kwargs
+                for args, kwargs in mock_check.call_args_list
+            )
+        )
+
+    def test_validate__jobs(self):
+        """
+        verify that ``validate -N -j 2`` shows the same issues, in the same
+        order, as ``validate -N``
+        """
+        filename = os.path.join(self.tmpdir, "jobs", "broken.pxu")
+        with open(filename, "wt", encoding="UTF-8") as stream:
+            print("id: broken", file=stream)
+            print("plugin: magic", file=stream)
+            print("", file=stream)
+            print("id: dummy", file=stream)
+            print("plugin: manual", file=stream)
+        with TestIO() as test_io:
+            self.tool.main(["validate", "-N", "-j", "2", "--no-cache"])
+        parallel_output = test_io.stdout
+        with TestIO() as test_io:
+            self.tool.main(["validate", "-N", "--no-cache"])
+        self.assertEqual(parallel_output, test_io.stdout)
+        self.assertIn("clashes with 1 other unit", test_io.stdout)
+
     def test_info(self):
         """
         verify that ``info`` shows basic provider information
@@ -538,6 +609,12 @@ class ProviderManagerToolTests(TestCase):
 
     def setUp(self):
         self.tmpdir = tempfile.mkdtemp()
+        # Keep the validation cache away from the one of the user
+        patcher = mock.patch.dict(
+            os.environ, {"XDG_CACHE_HOME": os.path.join(self.tmpdir, "cache")}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
         self.definition = self._create_definition(self.tmpdir)
         self.tool = ProviderManagerTool(self.definition)
 
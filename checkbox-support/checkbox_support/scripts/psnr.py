@@ -20,10 +20,36 @@
 # Reference the PSNR algorithm below
 # - https://docs.opencv.org/3.4/d5/dc4/tutorial_video_input_psnr_ssim.html
 
+import argparse
+import queue
+import threading
+import time
+from collections import namedtuple
+from typing import Iterator, List, Optional, Tuple
+
 import cv2
 import numpy as np
-import argparse
-from typing import Tuple, List
+
+#: Number of frames decoded and compared together
+DEFAULT_CHUNK_SIZE = 8
+
+#: Number of decoded chunks of frames waiting to be compared, per file
+_QUEUE_DEPTH = 2
+
+#: Result of :func:`compare_files`: the average PSNR, the PSNR of each
+#: compared frame and the number of compared frames per second
+PSNRResult = namedtuple(
+    "PSNRResult", ["average", "each_frame", "frames_per_second"]
+)
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(
+            "{} is not a positive integer".format(value)
+        )
+    return number
 
 
 def psnr_args() -> argparse.ArgumentParser:
@@ -49,9 +75,53 @@ def psnr_args() -> argparse.ArgumentParser:
         default=False,
         help="Absolutely always show command output",
     )
+    parser.add_argument(
+        "--stride",
+        type=_positive_int,
+        default=1,
+        help="Compare one frame out of STRIDE frames (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--roi",
+        type=int,
+        nargs=4,
+        metavar=("X", "Y", "WIDTH", "HEIGHT"),
+        help=(
+            "Only compare the region of the frames starting at X, Y"
+            " (default: whole frames)"
+        ),
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=_positive_int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="Number of frames compared together (default: %(default)s)",
+    )
     return parser.parse_args()
 
 
+def _get_sse(I1: np.ndarray, I2: np.ndarray) -> int:
+    """
+    Calculate the sum of squared differences between two frames.
+
+    The squares are summed by OpenCV without converting the frames, the
+    result is rounded as the sum may be off by a tiny fraction on regions of
+    a frame.
+    """
+    return int(round(cv2.norm(I1, I2, cv2.NORM_L2SQR)))
+
+
+def _sse_to_psnr(sse: np.ndarray, values_per_frame: int) -> np.ndarray:
+    """
+    Convert sums of squared differences to PSNR values.
+
+    Frames identical to the reference have an infinite PSNR.
+    """
+    mse = np.asarray(sse, dtype=np.float64) / values_per_frame
+    with np.errstate(divide="ignore"):
+        return 10.0 * np.log10((255 * 255) / mse)
+
+
 def _get_psnr(I1: np.ndarray, I2: np.ndarray) -> float:
     """
     Calculate the Peak Signal-to-Noise Ratio (PSNR) between two frames.
@@ -61,25 +131,10 @@ def _get_psnr(I1: np.ndarray, I2: np.ndarray) -> float:
         I2 (np.ndarray): Frame to be compared with the reference.
 
     Returns:
-        float: PSNR value indicating the quality of I2 compared to I1.
+        float: PSNR value indicating the quality of I2 compared to I1,
+        infinite if the frames are identical.
     """
-    # Calculate the absolute difference
-    s1 = cv2.absdiff(I1, I2)
-    # cannot make a square on 8 bits
-    s1 = np.float32(s1)
-    # Calculate squared differences
-    s1 = s1 * s1
-    # Sum of squared differences per channel
-    sse = s1.sum()
-    # sum channels
-    if sse <= 1e-10:
-        # for small values return zero
-        return 0.0
-    else:
-        shape = I1.shape
-        mse = 1.0 * sse / (shape[0] * shape[1] * shape[2])
-        psnr = 10.0 * np.log10((255 * 255) / mse)
-    return psnr
+    return float(_sse_to_psnr(_get_sse(I1, I2), I1.size))
 
 
 def _get_frame_resolution(capture) -> Tuple[int, int]:
@@ -89,20 +144,127 @@ def _get_frame_resolution(capture) -> Tuple[int, int]:
     )
 
 
-def get_average_psnr(
-    reference_file_path: str, test_file_path: str
-) -> Tuple[float, List[float]]:
+class _FrameReader(threading.Thread):
     """
-    Calculate the average PSNR and PSNR for each frame between two files.
+    Thread decoding the frames of a file in chunks.
+
+    Decoding is the slowest part of the comparison, each file is decoded in
+    its own thread (OpenCV releases the GIL while decoding) while the frames
+    decoded earlier are compared.
+    """
+
+    def __init__(
+        self,
+        capture,
+        frame_count: int,
+        stride: int = 1,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        super().__init__(daemon=True)
+        self._capture = capture
+        self._frame_count = frame_count
+        self._stride = stride
+        self._roi = roi
+        self._chunk_size = chunk_size
+        self._queue = queue.Queue(_QUEUE_DEPTH)
+        self._stop_event = threading.Event()
+        self._error = None
+
+    def run(self):
+        try:
+            chunk = []
+            for frame in self._read_frames():
+                chunk.append(frame)
+                if len(chunk) == self._chunk_size:
+                    self._queue.put(chunk)
+                    chunk = []
+            if chunk:
+                self._queue.put(chunk)
+        except Exception as exc:
+            self._error = exc
+        finally:
+            self._queue.put(None)
+
+    def _read_frames(self) -> Iterator[np.ndarray]:
+        for index in range(0, self._frame_count, self._stride):
+            if self._stop_event.is_set():
+                return
+            if index and self._stride > 1:
+                # Skipped frames are decoded but not converted
+                for _ in range(self._stride - 1):
+                    if not self._capture.grab():
+                        return
+            ok, frame = self._capture.read()
+            if not ok:
+                return
+            if self._roi is not None:
+                x, y, width, height = self._roi
+                frame = frame[y : y + height, x : x + width]
+            yield frame
+
+    def chunks(self) -> Iterator[List[np.ndarray]]:
+        """Get the chunks of frames as they are decoded."""
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+            yield chunk
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """Stop decoding frames and wait for the thread to finish."""
+        self._stop_event.set()
+        while self.is_alive():
+            try:
+                self._queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self.join()
+
+
+def _iter_chunk_pairs(
+    reference_reader: _FrameReader, test_reader: _FrameReader
+) -> Iterator[Tuple[List[np.ndarray], List[np.ndarray]]]:
+    # Both files are read with the same stride and chunk size, a chunk can
+    # only be shorter than its pair if one of the files ended early
+    for reference_chunk, test_chunk in zip(
+        reference_reader.chunks(), test_reader.chunks()
+    ):
+        count = min(len(reference_chunk), len(test_chunk))
+        yield reference_chunk[:count], test_chunk[:count]
+        if count < max(len(reference_chunk), len(test_chunk)):
+            break
+
+
+def compare_files(
+    reference_file_path: str,
+    test_file_path: str,
+    stride: int = 1,
+    roi: Optional[Tuple[int, int, int, int]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> PSNRResult:
+    """
+    Calculate the PSNR between the frames of two files.
     Files can be image or video.
 
+    Both files are decoded in background threads and their frames compared
+    in chunks. The average PSNR is computed from the mean squared error of
+    all the compared frames, it is only infinite if all the frames are
+    identical to the reference.
+
     Args:
         reference_file_path (str): Path to the reference file.
         test_file_path (str): Path to the test file.
+        stride (int): Compare one frame out of ``stride`` frames.
+        roi (tuple): Only compare the region (x, y, width, height) of the
+            frames.
+        chunk_size (int): Number of frames compared together.
 
     Returns:
-        Tuple[float, List[float]]: A tuple containing the average PSNR value
-        and a list of PSNR values for each frame.
+        PSNRResult: The average PSNR, the PSNR of each compared frame and
+        the number of compared frames per second.
     """
     capt_refrnc = cv2.VideoCapture(reference_file_path)
     capt_undTst = cv2.VideoCapture(test_file_path)
@@ -116,30 +278,95 @@ def get_average_psnr(
     if ref_size != test_size:
         raise SystemExit("Error: Files have different dimensions.")
 
+    if roi is not None:
+        x, y, width, height = roi
+        if (
+            min(x, y) < 0
+            or min(width, height) < 1
+            or x + width > ref_size[0]
+            or y + height > ref_size[1]
+        ):
+            raise SystemExit("Error: The region is outside of the frames.")
+
     total_frame_count = int(capt_refrnc.get(cv2.CAP_PROP_FRAME_COUNT))
     if total_frame_count == 0:
         raise SystemExit("Error: The count of frame should not be 0")
 
-    psnr_each_frame = []
-    for _ in range(total_frame_count):
-        _, frameReference = capt_refrnc.read()
-        _, frameUnderTest = capt_undTst.read()
-        psnr = _get_psnr(frameReference, frameUnderTest)
-        psnr_each_frame.append(psnr)
+    start = time.perf_counter()
+    readers = [
+        _FrameReader(capture, total_frame_count, stride, roi, chunk_size)
+        for capture in (capt_refrnc, capt_undTst)
+    ]
+    for reader in readers:
+        reader.start()
+    sse_chunks = []
+    values_per_frame = 0
+    try:
+        for reference_chunk, test_chunk in _iter_chunk_pairs(*readers):
+            sse_chunks.append(
+                np.fromiter(
+                    (
+                        _get_sse(frameReference, frameUnderTest)
+                        for frameReference, frameUnderTest in zip(
+                            reference_chunk, test_chunk
+                        )
+                    ),
+                    dtype=np.int64,
+                    count=len(reference_chunk),
+                )
+            )
+            values_per_frame = reference_chunk[0].size
+    finally:
+        for reader in readers:
+            reader.close()
+    elapsed = time.perf_counter() - start
+
+    sse_array = np.concatenate(sse_chunks or [np.empty(0, np.int64)])
+    if not len(sse_array):
+        raise SystemExit("Error: Could not read frames of the files.")
+
+    psnr_array = _sse_to_psnr(sse_array, values_per_frame)
+    avg_psnr = float(_sse_to_psnr(sse_array.mean(), values_per_frame))
+    frames_per_second = len(sse_array) / elapsed if elapsed else 0.0
+    return PSNRResult(avg_psnr, psnr_array, frames_per_second)
+
 
-    psnr_array = np.array(psnr_each_frame)
-    avg_psnr = np.mean(psnr)
-    return avg_psnr, psnr_array
+def get_average_psnr(
+    reference_file_path: str,
+    test_file_path: str,
+    stride: int = 1,
+    roi: Optional[Tuple[int, int, int, int]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Tuple[float, np.ndarray]:
+    """
+    Calculate the average PSNR and PSNR for each frame between two files.
+    Files can be image or video.
+
+    See :func:`compare_files` for the arguments.
+
+    Returns:
+        Tuple[float, np.ndarray]: A tuple containing the average PSNR value
+        and an array of PSNR values for each compared frame.
+    """
+    result = compare_files(
+        reference_file_path, test_file_path, stride, roi, chunk_size
+    )
+    return result.average, result.each_frame
 
 
 def main() -> None:
     args = psnr_args()
-    avg_psnr, psnr_each_frame = get_average_psnr(
-        args.reference_file, args.test_file
+    result = compare_files(
+        args.reference_file,
+        args.test_file,
+        stride=args.stride,
+        roi=args.roi,
+        chunk_size=args.chunk_size,
     )
-    print("Average PSNR: ", avg_psnr)
+    print("Average PSNR: ", result.average)
     if args.show_psnr_each_frame:
-        print("PSNR each frame: ", psnr_each_frame)
+        print("PSNR each frame: ", result.each_frame)
+    print("Frames per second: {:.1f}".format(result.frames_per_second))
 
 
 if __name__ == "__main__":
@@ -8,8 +8,10 @@ from checkbox_support.scripts.psnr import (
     main,
     psnr_args,
     _get_psnr,
+    compare_files,
     get_average_psnr,
     _get_frame_resolution,
+    PSNRResult,
 )
 
 
@@ -29,6 +31,8 @@ class TestPSNRArgs(unittest.TestCase):
             self.assertEqual(args.reference_file, "ref.mp4")
             self.assertEqual(args.test_file, "test.mp4")
             self.assertFalse(args.show_psnr_each_frame)
+            self.assertEqual(args.stride, 1)
+            self.assertIsNone(args.roi)
 
     def test_psnr_args_with_custom_args(self):
         with patch(
@@ -40,6 +44,37 @@ class TestPSNRArgs(unittest.TestCase):
             self.assertEqual(args.test_file, "test.mp4")
             self.assertTrue(args.show_psnr_each_frame)
 
+    def test_psnr_args_with_sampling(self):
+        with patch(
+            "sys.argv",
+            [
+                "psnr.py",
+                "ref.mp4",
+                "test.mp4",
+                "--stride",
+                "3",
+                "--roi",
+                "0",
+                "10",
+                "20",
+                "30",
+                "--chunk-size",
+                "2",
+            ],
+        ):
+            args = psnr_args()
+            self.assertEqual(args.stride, 3)
+            self.assertEqual(args.roi, [0, 10, 20, 30])
+            self.assertEqual(args.chunk_size, 2)
+
+    def test_psnr_args_with_invalid_stride(self):
+        with patch(
+            "sys.argv",
+            ["psnr.py", "ref.mp4", "test.mp4", "--stride", "0"],
+        ), patch("sys.stderr", new_callable=StringIO):
+            with self.assertRaises(SystemExit):
+                psnr_args()
+
 
 class TestGetFrameResolution(unittest.TestCase):
     @patch("checkbox_support.scripts.psnr.cv2.VideoCapture")
@@ -60,12 +95,13 @@ class TestGetPSNR(unittest.TestCase):
     def test_identical_images(self):
         img1 = self.create_image(100, 100, 255)
         img2 = self.create_image(100, 100, 255)
-        self.assertEqual(_get_psnr(img1, img2), 0.0)
+        self.assertEqual(_get_psnr(img1, img2), float("inf"))
 
     def test_different_images(self):
         img1 = self.create_image(100, 100, 255)
         img2 = self.create_image(100, 100, 0)
-        self.assertNotEqual(_get_psnr(img1, img2), 0.0)
+        # The largest possible error
+        self.assertEqual(_get_psnr(img1, img2), 0.0)
         self.assertLessEqual(_get_psnr(img1, img2), 50.0)
 
     def test_similar_images(self):
@@ -74,6 +110,12 @@ class TestGetPSNR(unittest.TestCase):
         img2[0:10, 0:10] = [120, 120, 120]
         self.assertGreaterEqual(_get_psnr(img1, img2), 50.0)
 
+    def test_known_value(self):
+        img1 = self.create_image(10, 10, 100)
+        img2 = self.create_image(10, 10, 110)
+        # MSE of 100
+        self.assertAlmostEqual(_get_psnr(img1, img2), 10 * np.log10(650.25))
+
 
 class TestGetAveragePSNR(unittest.TestCase):
     @patch("checkbox_support.scripts.psnr.cv2.VideoCapture")
@@ -103,101 +145,202 @@ class TestGetAveragePSNR(unittest.TestCase):
         with self.assertRaises(SystemExit):
             get_average_psnr("ref_file.mp4", "test_file.mp4")
 
-    @patch("checkbox_support.scripts.psnr._get_psnr")
-    @patch("checkbox_support.scripts.psnr._get_frame_resolution")
-    @patch("checkbox_support.scripts.psnr.cv2.VideoCapture")
-    def test_get_average_psnr(
-        self, mock_VideoCapture, mock_get_frame_resolution, mock_get_psnr
-    ):
-        # Setup
-        reference_file_path = "reference.mp4"
-        test_file_path = "test.mp4"
-        total_frame_count = 5
-        mock_capt_refrnc = MagicMock()
-        mock_capt_undTst = MagicMock()
-
-        mock_VideoCapture.side_effect = [mock_capt_refrnc, mock_capt_undTst]
-
-        mock_capt_refrnc.isOpened.return_value = True
-        mock_capt_undTst.isOpened.return_value = True
-
-        mock_get_frame_resolution.return_value = (1920, 1080)
-
-        mock_capt_refrnc.get.return_value = total_frame_count
-
-        mock_capt_refrnc.read.return_value = (True, "frameReference")
-        mock_capt_undTst.read.return_value = (True, "frameUnderTest")
-
-        mock_get_psnr.return_value = 30
+    def make_capture(self, frames):
+        capture = MagicMock()
+        capture.isOpened.return_value = True
+        capture.get.return_value = len(frames)
+        capture.read.side_effect = [(True, frame) for frame in frames] + [
+            (False, None)
+        ]
+        capture.grab.return_value = True
+        return capture
+
+    def compare(self, reference_frames, test_frames, **kwargs):
+        self.reference_capture = self.make_capture(reference_frames)
+        self.test_capture = self.make_capture(test_frames)
+        with patch(
+            "checkbox_support.scripts.psnr.cv2.VideoCapture",
+            side_effect=[self.reference_capture, self.test_capture],
+        ) as mock_VideoCapture, patch(
+            "checkbox_support.scripts.psnr._get_frame_resolution",
+            return_value=(10, 10),
+        ):
+            result = compare_files("reference.mp4", "test.mp4", **kwargs)
+        mock_VideoCapture.assert_any_call("reference.mp4")
+        mock_VideoCapture.assert_any_call("test.mp4")
+        return result
 
-        # Code under test
-        avg_psnr, psnr_array = get_average_psnr(
-            reference_file_path, test_file_path
+    def test_get_average_psnr(self):
+        total_frame_count = 5
+        reference_frames = [
+            create_image_helper_function(10, 10, 100)
+        ] * total_frame_count
+        test_frames = [
+            create_image_helper_function(10, 10, 100 + index)
+            for index in range(total_frame_count)
+        ]
+        # Frames are compared in several chunks
+        result = self.compare(reference_frames, test_frames, chunk_size=2)
+
+        expected_psnr_array = np.array(
+            [
+                _get_psnr(reference_frame, test_frame)
+                for reference_frame, test_frame in zip(
+                    reference_frames, test_frames
+                )
+            ]
+        )
+        self.assertTrue(np.array_equal(result.each_frame, expected_psnr_array))
+        self.assertEqual(result.each_frame[0], float("inf"))
+        # Average of the MSE (0, 1, 4, 9, 16) of all frames
+        self.assertAlmostEqual(result.average, 10 * np.log10(65025 / 6))
+        self.assertGreater(result.frames_per_second, 0)
+        self.assertEqual(self.reference_capture.get.call_count, 1)
+        self.assertEqual(
+            self.reference_capture.read.call_count, total_frame_count
+        )
+        self.assertEqual(self.test_capture.read.call_count, total_frame_count)
+        self.assertFalse(self.reference_capture.grab.called)
+
+    def test_get_average_psnr_identical_files(self):
+        frames = [create_image_helper_function(10, 10, 100)] * 3
+        result = self.compare(frames, frames)
+        self.assertEqual(result.average, float("inf"))
+
+    def test_get_average_psnr_stride(self):
+        reference_frames = [create_image_helper_function(10, 10, 100)] * 3
+        test_frames = [create_image_helper_function(10, 10, 110)] * 3
+        result = self.compare(reference_frames, test_frames, stride=2)
+        # Frames 0 and 2 are compared, frame 1 is skipped
+        self.assertEqual(len(result.each_frame), 2)
+        self.assertEqual(self.reference_capture.read.call_count, 2)
+        self.assertEqual(self.reference_capture.grab.call_count, 1)
+        self.assertEqual(self.test_capture.grab.call_count, 1)
+
+    def test_get_average_psnr_roi(self):
+        reference_frames = [create_image_helper_function(10, 10, 100)]
+        test_frame = create_image_helper_function(10, 10, 100)
+        test_frame[5:, 5:] = 110
+        result = self.compare(reference_frames, [test_frame], roi=(0, 0, 5, 5))
+        self.assertEqual(result.average, float("inf"))
+        result = self.compare(reference_frames, [test_frame], roi=(4, 4, 2, 2))
+        # One of the four pixels differs
+        self.assertAlmostEqual(result.average, 10 * np.log10(65025 / 25))
+
+    def test_get_average_psnr_roi_outside_frames(self):
+        frames = [create_image_helper_function(10, 10, 100)]
+        with self.assertRaises(SystemExit):
+            self.compare(frames, frames, roi=(5, 5, 10, 10))
+
+    def test_get_average_psnr_test_file_shorter(self):
+        reference_frames = [create_image_helper_function(10, 10, 100)] * 5
+        test_frames = [create_image_helper_function(10, 10, 110)] * 3
+        result = self.compare(reference_frames, test_frames, chunk_size=2)
+        self.assertEqual(len(result.each_frame), 3)
+
+    def test_get_average_psnr_no_frames_read(self):
+        frames = [create_image_helper_function(10, 10, 100)]
+        reference_capture = self.make_capture(frames)
+        reference_capture.read.side_effect = None
+        reference_capture.read.return_value = (False, None)
+        with patch(
+            "checkbox_support.scripts.psnr.cv2.VideoCapture",
+            side_effect=[reference_capture, self.make_capture(frames)],
+        ), patch(
+            "checkbox_support.scripts.psnr._get_frame_resolution",
+            return_value=(10, 10),
+        ):
+            with self.assertRaises(SystemExit):
+                compare_files("reference.mp4", "test.mp4")
+
+    def test_get_average_psnr_read_error(self):
+        frames = [create_image_helper_function(10, 10, 100)] * 20
+        reference_capture = self.make_capture(frames)
+        test_capture = self.make_capture(frames)
+        test_capture.read.side_effect = RuntimeError("decoding failed")
+        with patch(
+            "checkbox_support.scripts.psnr.cv2.VideoCapture",
+            side_effect=[reference_capture, test_capture],
+        ), patch(
+            "checkbox_support.scripts.psnr._get_frame_resolution",
+            return_value=(10, 10),
+        ):
+            with self.assertRaises(RuntimeError):
+                compare_files("reference.mp4", "test.mp4", chunk_size=1)
+
+    @patch("checkbox_support.scripts.psnr.compare_files")
+    def test_get_average_psnr_result(self, mock_compare_files):
+        mock_compare_files.return_value = PSNRResult(30.0, [30.0], 100.0)
+        self.assertEqual(
+            get_average_psnr("ref.mp4", "test.mp4"), (30.0, [30.0])
+        )
+        mock_compare_files.assert_called_once_with(
+            "ref.mp4", "test.mp4", 1, None, 8
         )
-
-        # Assertions
-        expected_psnr_array = np.array([30] * total_frame_count)
-        expected_avg_psnr = np.mean(expected_psnr_array)
-
-        self.assertEqual(len(psnr_array), total_frame_count)
-        self.assertTrue(np.array_equal(psnr_array, expected_psnr_array))
-        self.assertEqual(avg_psnr, expected_avg_psnr)
-
-        # Ensure mocks were called correctly
-        mock_VideoCapture.assert_any_call(reference_file_path)
-        mock_VideoCapture.assert_any_call(test_file_path)
-        self.assertEqual(mock_capt_refrnc.isOpened.call_count, 1)
-        self.assertEqual(mock_capt_undTst.isOpened.call_count, 1)
-        self.assertEqual(mock_get_frame_resolution.call_count, 2)
-        self.assertEqual(mock_capt_refrnc.get.call_count, 1)
-        self.assertEqual(mock_capt_refrnc.read.call_count, total_frame_count)
-        self.assertEqual(mock_capt_undTst.read.call_count, total_frame_count)
-        self.assertEqual(mock_get_psnr.call_count, total_frame_count)
 
 
 class TestMainFunction(unittest.TestCase):
 
     @patch("sys.stdout", new_callable=StringIO)
-    @patch("checkbox_support.scripts.psnr.get_average_psnr")
+    @patch("checkbox_support.scripts.psnr.compare_files")
     @patch("checkbox_support.scripts.psnr.argparse.ArgumentParser.parse_args")
     def test_main_prints_avg_psnr(
-        self, mock_parse_args, mock_get_average_psnr, mock_stdout
+        self, mock_parse_args, mock_compare_files, mock_stdout
     ):
         mock_parse_args.return_value = Namespace(
             reference_file="ref.mp4",
             test_file="test.mp4",
             show_psnr_each_frame=False,
+            stride=1,
+            roi=None,
+            chunk_size=8,
         )
 
-        mock_get_average_psnr.return_value = (30.0, [28.5, 31.2, 29.8])
+        mock_compare_files.return_value = PSNRResult(
+            30.0, [28.5, 31.2, 29.8], 123.45
+        )
 
         main()
 
-        expected_output = "Average PSNR:  30.0\n"
+        expected_output = "Average PSNR:  30.0\nFrames per second: 123.5\n"
         self.assertEqual(mock_stdout.getvalue(), expected_output)
-        mock_get_average_psnr.assert_called_once_with("ref.mp4", "test.mp4")
+        mock_compare_files.assert_called_once_with(
+            "ref.mp4", "test.mp4", stride=1, roi=None, chunk_size=8
+        )
 
     @patch("sys.stdout", new_callable=StringIO)
-    @patch("checkbox_support.scripts.psnr.get_average_psnr")
+    @patch("checkbox_support.scripts.psnr.compare_files")
     @patch("checkbox_support.scripts.psnr.argparse.ArgumentParser.parse_args")
     def test_main_prints_psnr_each_frame(
-        self, mock_parse_args, mock_get_average_psnr, mock_stdout
+        self, mock_parse_args, mock_compare_files, mock_stdout
     ):
         mock_parse_args.return_value = Namespace(
             reference_file="ref_file",
             test_file="test_file",
             show_psnr_each_frame=True,
+            stride=2,
+            roi=[0, 0, 10, 10],
+            chunk_size=8,
         )
 
-        mock_get_average_psnr.return_value = (30.0, [28.5, 31.2, 29.8])
+        mock_compare_files.return_value = PSNRResult(
+            30.0, [28.5, 31.2, 29.8], 123.45
+        )
 
         main()
 
         expected_output = (
             "Average PSNR:  30.0\nPSNR each frame:  [28.5, 31.2, 29.8]\n"
+            "Frames per second: 123.5\n"
         )
         self.assertEqual(mock_stdout.getvalue(), expected_output)
-        mock_get_average_psnr.assert_called_once_with("ref_file", "test_file")
+        mock_compare_files.assert_called_once_with(
+            "ref_file",
+            "test_file",
+            stride=2,
+            roi=[0, 0, 10, 10],
+            chunk_size=8,
+        )
 
 
 if __name__ == "__main__":
@@ -124,7 +124,7 @@ def compare_psnr(
     )
     avg_psnr, _ = get_average_psnr(golden_reference_file, artifact_file)
     logging.info("Average PSNR: {}".format(avg_psnr))
-    if avg_psnr < 30 and avg_psnr > 0:
+    if avg_psnr < 30:
         raise SystemExit(
             "Error: The average PSNR value did not reach the acceptable"
             " threshold (30 dB)"
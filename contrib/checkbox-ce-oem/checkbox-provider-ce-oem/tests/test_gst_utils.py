@@ -0,0 +1,35 @@
+import os
+import unittest
+from unittest.mock import patch
+
+with patch.dict(os.environ, {"VIDEO_CODEC_TESTING_DATA": "/"}):
+    import gst_utils
+
+
+@patch("gst_utils.get_average_psnr")
+class TestComparePsnr(unittest.TestCase):
+    def test_identical_files(self, mock_get_average_psnr):
+        mock_get_average_psnr.return_value = (float("inf"), [])
+        gst_utils.compare_psnr("golden.mp4", "artifact.mp4")
+        mock_get_average_psnr.assert_called_once_with(
+            "golden.mp4", "artifact.mp4"
+        )
+
+    def test_above_threshold(self, mock_get_average_psnr):
+        mock_get_average_psnr.return_value = (42.0, [])
+        gst_utils.compare_psnr("golden.mp4", "artifact.mp4")
+
+    def test_below_threshold(self, mock_get_average_psnr):
+        mock_get_average_psnr.return_value = (29.9, [])
+        with self.assertRaises(SystemExit):
+            gst_utils.compare_psnr("golden.mp4", "artifact.mp4")
+
+    def test_maximum_error(self, mock_get_average_psnr):
+        # 0 dB means the files are as different as they can be
+        mock_get_average_psnr.return_value = (0.0, [])
+        with self.assertRaises(SystemExit):
+            gst_utils.compare_psnr("golden.mp4", "artifact.mp4")
+
+
+if __name__ == "__main__":
+    unittest.main()
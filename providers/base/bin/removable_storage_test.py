@@ -2,13 +2,18 @@
 
 import argparse
 import collections
+import concurrent.futures
 import dbus
+import errno
 import hashlib
 import logging
+import math
+import mmap
 import os
 import platform
 import re
 import shlex
+import struct
 import subprocess
 import sys
 import tempfile
@@ -58,59 +63,199 @@ class ActionTimer:
         self.interval = self.stop - self.start
 
 
-class RandomData:
-    """Class to create data files"""
-
-    def __init__(self, size):
-        self.tfile = tempfile.NamedTemporaryFile(delete=False)
-        self.path = ""
-        self.name = ""
-        self.path, self.name = os.path.split(self.tfile.name)
-        self._write_test_data_file(size)
-
-    def _generate_test_data(self):
-        seed = "104872948765827105728492766217823438120"
-        phrase = """
-        Lorem ipsum dolor sit amet, consectetuer adipiscing elit, sed diam
-        nonummy nibh euismod tincidunt ut laoreet dolore magna aliquam erat
-        volutpat. Ut wisi enim ad minim veniam, quis nostrud exerci tation
-        ullamcorper suscipit lobortis nisl ut aliquip ex ea commodo consequat.
-        Duis autem vel eum iriure dolor in hendrerit in vulputate velit esse
-        molestie consequat, vel illum dolore eu feugiat nulla facilisis at vero
-        eros et accumsan et iusto odio dignissim qui blandit praesent luptatum
-        zzril delenit augue duis dolore te feugait nulla facilisi.
-        """
-        words = phrase.replace("\n", "").split()
-        word_deque = collections.deque(words)
-        seed_deque = collections.deque(seed)
-        while True:
-            yield " ".join(list(word_deque))
-            word_deque.rotate(int(seed_deque[0]))
-            seed_deque.rotate(1)
-
-    def _write_test_data_file(self, size):
-        data = self._generate_test_data()
-        while os.path.getsize(self.tfile.name) < size:
-            self.tfile.write(next(data).encode("UTF-8"))
-        return self
+def generate_test_data():
+    seed = "104872948765827105728492766217823438120"
+    phrase = """
+    Lorem ipsum dolor sit amet, consectetuer adipiscing elit, sed diam
+    nonummy nibh euismod tincidunt ut laoreet dolore magna aliquam erat
+    volutpat. Ut wisi enim ad minim veniam, quis nostrud exerci tation
+    ullamcorper suscipit lobortis nisl ut aliquip ex ea commodo consequat.
+    Duis autem vel eum iriure dolor in hendrerit in vulputate velit esse
+    molestie consequat, vel illum dolore eu feugiat nulla facilisis at vero
+    eros et accumsan et iusto odio dignissim qui blandit praesent luptatum
+    zzril delenit augue duis dolore te feugait nulla facilisi.
+    """
+    words = phrase.replace("\n", "").split()
+    word_deque = collections.deque(words)
+    seed_deque = collections.deque(seed)
+    while True:
+        yield " ".join(list(word_deque))
+        word_deque.rotate(int(seed_deque[0]))
+        seed_deque.rotate(1)
+
+
+def generate_test_block(size):
+    """Build a block of test data of the given size"""
+    chunks = []
+    length = 0
+    for text in generate_test_data():
+        chunk = text.encode("UTF-8")
+        chunks.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            break
+    return b"".join(chunks)[:size]
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a list of values (0 if it is empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = int(math.ceil(percent / 100 * len(ordered)))
+    return ordered[max(rank, 1) - 1]
+
+
+class StreamingTransfer:
+    """
+    Write a file of test data to a disk and read it back, block by block
 
+    Blocks go through a single buffer aligned on a memory page, so that the
+    file can be opened with O_DIRECT, and are hashed on the way: memory usage
+    does not depend on the size of the file. Each block is a copy of the
+    test block stamped with the number of the stream and of the block, so
+    that misplaced blocks change the hash too.
+    """
 
-def md5_hash_file(path):
-    md5 = hashlib.md5()
-    try:
-        with open(path, "rb") as stream:
-            while True:
-                data = stream.read(8192)
-                if not data:
-                    break
-                md5.update(data)
-    except IOError as exc:
-        logging.error("unable to checksum %s: %s", path, exc)
-        return None
-    else:
+    # With O_DIRECT, the size of the file and of the test block must be
+    # multiples of the logical block size of the device, which is at most
+    ALIGNMENT = 4096
+
+    # Stamp written at the start of each block, blocks can't be smaller
+    STAMP = struct.Struct("<QQ")
+
+    def __init__(self, path, size, test_block, direct=False, stream=0):
+        self.path = path
+        self.test_block = test_block
+        self.block_size = len(test_block)
+        self.direct = direct
+        self.size = size
+        self.stream = stream
+        self.write_latencies = []
+        self.read_latencies = []
+
+    def _open(self, flags):
+        if self.direct:
+            try:
+                return os.open(self.path, flags | os.O_DIRECT, 0o644)
+            except OSError as exc:
+                if exc.errno != errno.EINVAL:
+                    raise
+                logging.warning(
+                    "O_DIRECT is not supported for %s, using the page cache",
+                    self.path,
+                )
+                self.direct = False
+        return os.open(self.path, flags, 0o644)
+
+    def write(self):
+        """
+        Write the file, return the MD5 hash of the data (None on errors)
+        """
+        md5 = hashlib.md5()
+        buffer = mmap.mmap(-1, self.block_size)
+        view = memoryview(buffer)
+        try:
+            fd = self._open(os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+            try:
+                index = 0
+                offset = 0
+                while offset < self.size:
+                    length = min(self.block_size, self.size - offset)
+                    buffer[:] = self.test_block
+                    self.STAMP.pack_into(buffer, 0, self.stream, index)
+                    md5.update(view[:length])
+                    start = time.perf_counter()
+                    written = 0
+                    while written < length:
+                        written += os.write(fd, view[written:length])
+                    self.write_latencies.append(time.perf_counter() - start)
+                    index += 1
+                    offset += length
+                os.fsync(fd)
+                if not self.direct and hasattr(os, "posix_fadvise"):
+                    # Drop the data from the page cache, it has to be read
+                    # back from the disk
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+        except OSError as exc:
+            logging.error("Unable to write data to %s: %s", self.path, exc)
+            return None
+        finally:
+            view.release()
+            buffer.close()
+        return md5.hexdigest()
+
+    def read(self):
+        """
+        Read the file back, return the MD5 hash of the data (None on errors)
+        """
+        md5 = hashlib.md5()
+        buffer = mmap.mmap(-1, self.block_size)
+        view = memoryview(buffer)
+        try:
+            fd = self._open(os.O_RDONLY)
+            try:
+                while True:
+                    start = time.perf_counter()
+                    length = os.readv(fd, [buffer])
+                    if not length:
+                        break
+                    self.read_latencies.append(time.perf_counter() - start)
+                    md5.update(view[:length])
+            finally:
+                os.close(fd)
+        except OSError as exc:
+            logging.error("Unable to read data from %s: %s", self.path, exc)
+            return None
+        finally:
+            view.release()
+            buffer.close()
         return md5.hexdigest()
 
 
+def run_transfers(transfer_list, phase, streams):
+    """
+    Run a phase ("write" or "read") of transfers, streams at a time
+
+    :returns: a tuple (time taken, list of hashes)
+    """
+    with ActionTimer() as timer:
+        with concurrent.futures.ThreadPoolExecutor(streams) as executor:
+            hash_list = list(
+                executor.map(
+                    lambda transfer: getattr(transfer, phase)(),
+                    transfer_list,
+                )
+            )
+    return timer.interval, hash_list
+
+
+def print_latencies(phase, latencies):
+    print(
+        "\t\t%s Latency per Block: p50 %0.3f ms, p90 %0.3f ms, "
+        "p99 %0.3f ms, max %0.3f ms"
+        % (
+            phase,
+            percentile(latencies, 50) * 1000,
+            percentile(latencies, 90) * 1000,
+            percentile(latencies, 99) * 1000,
+            max(latencies, default=0) * 1000,
+        )
+    )
+
+
+def positive_int(value):
+    """argparse type for integers greater than zero"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(
+            "%s is not a positive integer" % value
+        )
+    return number
+
+
 def on_ubuntucore():
     """
     Check if running from on ubuntu core
@@ -136,41 +281,12 @@ class DiskTest:
         self.rem_disks_speed = {}
         # LP: #1313581, TODO: extend to be rem_disks_driver
         self.rem_disks_xhci = {}
-        self.data = ""
         self.lsblk = ""
         self.device = device
         self.memorycard = memorycard
         self._run_lsblk(lsblkcommand)
         self._probe_disks()
 
-    def read_file(self, source):
-        with open(source, "rb") as infile:
-            try:
-                self.data = infile.read()
-            except IOError as exc:
-                logging.error("Unable to read data from %s: %s", source, exc)
-                return False
-            else:
-                return True
-
-    def write_file(self, data, dest):
-        try:
-            outfile = open(dest, "wb", 0)
-        except OSError as exc:
-            logging.error("Unable to open %s for writing.", dest)
-            logging.error("  %s", exc)
-            return False
-        with outfile:
-            try:
-                outfile.write(self.data)
-            except IOError as exc:
-                logging.error("Unable to write data to %s: %s", dest, exc)
-                return False
-            else:
-                outfile.flush()
-                os.fsync(outfile.fileno())
-                return True
-
     def clean_up(self, target):
         try:
             os.unlink(target)
@@ -679,6 +795,33 @@ def main():
             " is %(default)s"
         ),
     )
+    parser.add_argument(
+        "-b",
+        "--block-size",
+        action="store",
+        type=HumanReadableBytes,
+        default="1MiB",
+        help=(
+            "The size of the blocks data is written and read by. "
+            "Default is %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--direct",
+        action="store_true",
+        default=False,
+        help=(
+            "Bypass the page cache (O_DIRECT) when writing and reading "
+            "data, if the filesystem supports it"
+        ),
+    )
+    parser.add_argument(
+        "--streams",
+        action="store",
+        default=1,
+        type=positive_int,
+        help="The number of data files written and read at the same time",
+    )
     parser.add_argument(
         "--auto-reduce-size",
         action="store_true",
@@ -727,6 +870,16 @@ def main():
     )
 
     args = parser.parse_args()
+    if args.block_size < StreamingTransfer.STAMP.size:
+        parser.error(
+            "--block-size must be at least %s bytes"
+            % StreamingTransfer.STAMP.size
+        )
+    if args.direct and args.block_size % StreamingTransfer.ALIGNMENT:
+        parser.error(
+            "--block-size must be a multiple of %s bytes with --direct"
+            % StreamingTransfer.ALIGNMENT
+        )
 
     test = DiskTest(args.device, args.memorycard, args.lsblkcommand)
 
@@ -830,8 +983,6 @@ def main():
                         args.min_speed,
                     )
                     return 1
-                write_sizes = []
-                test_files = {}
                 disks_freespace = {}
                 for disk, path in disks_eligible.items():
                     stat = os.statvfs(path)
@@ -868,13 +1019,13 @@ def main():
                                 desired_size, smallest_partition
                             )
                         )
-                # Generate our data file(s)
-                for count in range(args.count):
-                    test_files[count] = RandomData(desired_size)
-                    write_sizes.append(
-                        os.path.getsize(test_files[count].tfile.name)
-                    )
-                    total_write_size = sum(write_sizes)
+                if args.direct:
+                    # O_DIRECT only transfers whole blocks of the device
+                    alignment = StreamingTransfer.ALIGNMENT
+                    desired_size = -(-desired_size // alignment) * alignment
+                # Every file is written from the same block of test data
+                test_block = generate_test_block(args.block_size)
+                total_write_size = desired_size * args.count
 
                 try:
                     # Clear dmesg so we can check for I/O errors later
@@ -888,53 +1039,52 @@ def main():
                             (total_write_size * args.iterations) / 1024 / 1024
                         )
                         iteration_write_times = []
+                        iteration_read_times = []
+                        write_latencies = []
+                        read_latencies = []
                         for iteration in range(args.iterations):
-                            target_file_list = []
-                            write_times = []
-                            for file_index in range(args.count):
-                                parent_file = test_files[file_index].tfile.name
-                                parent_hash = md5_hash_file(parent_file)
-                                target_filename = (
-                                    test_files[file_index].name
-                                    + ".%s" % iteration
+                            transfer_list = [
+                                StreamingTransfer(
+                                    os.path.join(
+                                        mount_point,
+                                        "removable_storage_test.%s.%s.%s"
+                                        % (os.getpid(), file_index, iteration),
+                                    ),
+                                    desired_size,
+                                    test_block,
+                                    args.direct,
+                                    file_index,
                                 )
-                                target_path = mount_point
-                                target_file = os.path.join(
-                                    target_path, target_filename
-                                )
-                                target_file_list.append(target_file)
-                                test.read_file(parent_file)
-                                with ActionTimer() as timer:
-                                    if not test.write_file(
-                                        test.data, target_file
-                                    ):
-                                        logging.error(
-                                            "Failed to copy %s to %s",
-                                            parent_file,
-                                            target_file,
-                                        )
-                                        errors += 1
-                                        continue
-                                write_times.append(timer.interval)
-                                child_hash = md5_hash_file(target_file)
-                                if parent_hash != child_hash:
+                                for file_index in range(args.count)
+                            ]
+                            total_write_time, write_hashes = run_transfers(
+                                transfer_list, "write", args.streams
+                            )
+                            total_read_time, read_hashes = run_transfers(
+                                transfer_list, "read", args.streams
+                            )
+                            for transfer, write_hash, read_hash in zip(
+                                transfer_list, write_hashes, read_hashes
+                            ):
+                                write_latencies += transfer.write_latencies
+                                read_latencies += transfer.read_latencies
+                                if write_hash is None or read_hash is None:
+                                    errors += 1
+                                elif write_hash != read_hash:
                                     logging.warning(
-                                        "[Iteration %s] Parent and Child"
-                                        " copy hashes mismatch on %s!",
+                                        "[Iteration %s] Written and read"
+                                        " data hashes mismatch on %s!",
                                         iteration,
-                                        target_file,
+                                        transfer.path,
                                     )
                                     logging.warning(
-                                        "\tParent hash: %s", parent_hash
+                                        "\tWritten hash: %s", write_hash
                                     )
                                     logging.warning(
-                                        "\tChild hash: %s", child_hash
+                                        "\tRead hash: %s", read_hash
                                     )
                                     errors += 1
-                            for file in target_file_list:
-                                test.clean_up(file)
-                            total_write_time = sum(write_times)
-                            # avg_write_time = total_write_time / args.count
+                                test.clean_up(transfer.path)
                             try:
                                 avg_write_speed = (
                                     (total_write_size / total_write_time)
@@ -943,14 +1093,26 @@ def main():
                                 )
                             except ZeroDivisionError:
                                 avg_write_speed = 0.00
-                            finally:
-                                iteration_write_times.append(total_write_time)
-                                print(
-                                    "\t[Iteration %s] Average Speed: %0.4f"
-                                    % (iteration, avg_write_speed)
+                            try:
+                                avg_read_speed = (
+                                    (total_write_size / total_read_time)
+                                    / 1024
+                                    / 1024
                                 )
-                        for iteration in range(args.iterations):
-                            iteration_write_time = sum(iteration_write_times)
+                            except ZeroDivisionError:
+                                avg_read_speed = 0.00
+                            iteration_write_times.append(total_write_time)
+                            iteration_read_times.append(total_read_time)
+                            print(
+                                "\t[Iteration %s] Average Speed: %0.4f"
+                                % (iteration, avg_write_speed)
+                            )
+                            print(
+                                "\t[Iteration %s] Average Read Speed: %0.4f"
+                                % (iteration, avg_read_speed)
+                            )
+                        iteration_write_time = sum(iteration_write_times)
+                        iteration_read_time = sum(iteration_read_times)
                         print("\tSummary:")
                         print(
                             "\t\tTotal Data Attempted: %0.4f MB"
@@ -975,9 +1137,23 @@ def main():
                                 "\t\tAverage Write Speed: %0.4f MB/s"
                                 % avg_write_speed
                             )
+                        print(
+                            "\t\tTotal Time to read: %0.4f secs"
+                            % iteration_read_time
+                        )
+                        try:
+                            avg_read_speed = (
+                                iteration_write_size / iteration_read_time
+                            )
+                        except ZeroDivisionError:
+                            avg_read_speed = 0.00
+                        print(
+                            "\t\tAverage Read Speed: %0.4f MB/s"
+                            % avg_read_speed
+                        )
+                        print_latencies("Write", write_latencies)
+                        print_latencies("Read", read_latencies)
                 finally:
-                    for key in range(args.count):
-                        test.clean_up(test_files[key].tfile.name)
                     if len(test.rem_disks_nm) > 0:
                         if test.umount() != 0:
                             errors += 1
@@ -0,0 +1,163 @@
+import errno
+import hashlib
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+sys.modules["dbus"] = MagicMock()
+sys.modules["dbus.exceptions"] = MagicMock()
+sys.modules["dbus.mainloop.glib"] = MagicMock()
+sys.modules["gi"] = MagicMock()
+sys.modules["gi.repository"] = MagicMock()
+
+import removable_storage_test  # noqa: E402
+from removable_storage_test import (  # noqa: E402
+    StreamingTransfer,
+    generate_test_block,
+    percentile,
+    run_transfers,
+)
+
+
+class GenerateTestBlockTests(unittest.TestCase):
+    def test_size(self):
+        for size in (1, 4096, 100000):
+            self.assertEqual(len(generate_test_block(size)), size)
+
+    def test_content(self):
+        self.assertTrue(generate_test_block(64).startswith(b"Lorem ipsum"))
+
+
+class PercentileTests(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_nearest_rank(self):
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile(values, 50), 3)
+        self.assertEqual(percentile(values, 90), 5)
+        self.assertEqual(percentile(values, 100), 5)
+
+
+class StreamingTransferTests(unittest.TestCase):
+    def setUp(self):
+        self.scratch_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.scratch_dir.cleanup)
+        self.path = os.path.join(self.scratch_dir.name, "data")
+        self.test_block = generate_test_block(4096)
+
+    def read_file(self):
+        with open(self.path, "rb") as stream:
+            return stream.read()
+
+    def test_write_read(self):
+        transfer = StreamingTransfer(self.path, 10000, self.test_block)
+        write_hash = transfer.write()
+        content = self.read_file()
+        self.assertEqual(len(content), 10000)
+        self.assertEqual(write_hash, hashlib.md5(content).hexdigest())
+        self.assertEqual(transfer.read(), write_hash)
+        # Two whole blocks and a partial one
+        self.assertEqual(len(transfer.write_latencies), 3)
+        self.assertEqual(len(transfer.read_latencies), 3)
+
+    def test_blocks_differ(self):
+        StreamingTransfer(self.path, 8192, self.test_block, stream=1).write()
+        content = self.read_file()
+        self.assertNotEqual(content[:4096], content[4096:])
+        # Only the stamp at the start of the block differs
+        self.assertEqual(content[16:4096], self.test_block[16:])
+
+    def test_streams_differ(self):
+        first_hash = StreamingTransfer(
+            self.path, 4096, self.test_block, stream=0
+        ).write()
+        second_hash = StreamingTransfer(
+            self.path, 4096, self.test_block, stream=1
+        ).write()
+        self.assertNotEqual(first_hash, second_hash)
+
+    def test_corrupted_data(self):
+        transfer = StreamingTransfer(self.path, 8192, self.test_block)
+        write_hash = transfer.write()
+        with open(self.path, "r+b") as stream:
+            stream.seek(5000)
+            stream.write(b"!")
+        self.assertNotEqual(transfer.read(), write_hash)
+
+    def test_write_error(self):
+        path = os.path.join(self.scratch_dir.name, "missing", "data")
+        transfer = StreamingTransfer(path, 4096, self.test_block)
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(transfer.write())
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(transfer.read())
+
+    def test_direct_not_supported(self):
+        real_open = os.open
+
+        def fake_open(path, flags, mode=0o777):
+            if flags & os.O_DIRECT:
+                raise OSError(errno.EINVAL, "Invalid argument")
+            return real_open(path, flags, mode)
+
+        transfer = StreamingTransfer(
+            self.path, 4096, self.test_block, direct=True
+        )
+        with patch("os.open", side_effect=fake_open):
+            with self.assertLogs(level="WARNING"):
+                write_hash = transfer.write()
+            self.assertEqual(transfer.read(), write_hash)
+        self.assertFalse(transfer.direct)
+
+
+class RunTransfersTests(unittest.TestCase):
+    def test_streams(self):
+        test_block = generate_test_block(4096)
+        with tempfile.TemporaryDirectory() as scratch_dir:
+            transfer_list = [
+                StreamingTransfer(
+                    os.path.join(scratch_dir, str(index)),
+                    20000,
+                    test_block,
+                    stream=index,
+                )
+                for index in range(3)
+            ]
+            write_time, write_hashes = run_transfers(transfer_list, "write", 2)
+            read_time, read_hashes = run_transfers(transfer_list, "read", 2)
+        self.assertEqual(write_hashes, read_hashes)
+        self.assertEqual(len(set(write_hashes)), 3)
+        self.assertGreater(write_time, 0)
+        self.assertGreater(read_time, 0)
+
+    def test_print_latencies(self):
+        with patch("builtins.print") as mock_print:
+            removable_storage_test.print_latencies("Write", [0.001, 0.002])
+        self.assertIn("p50 1.000 ms", mock_print.call_args[0][0])
+        self.assertIn("max 2.000 ms", mock_print.call_args[0][0])
+
+
+@patch("removable_storage_test.DiskTest")
+@patch("sys.stderr", MagicMock())
+class MainArgumentsTests(unittest.TestCase):
+    def _main(self, *args):
+        argv = ["removable_storage_test.py", "usb"] + list(args)
+        with patch("sys.argv", argv):
+            with self.assertRaises(SystemExit) as context:
+                removable_storage_test.main()
+        return context.exception.code
+
+    def test_block_size_too_small(self, mock_disk_test):
+        self.assertEqual(self._main("--block-size", "8"), 2)
+        mock_disk_test.assert_not_called()
+
+    def test_no_streams(self, mock_disk_test):
+        self.assertEqual(self._main("--streams", "0"), 2)
+        mock_disk_test.assert_not_called()
+
+    def test_positive_int(self, mock_disk_test):
+        self.assertEqual(removable_storage_test.positive_int("3"), 3)